@@ -1,4 +1,5 @@
 from ch2o.chainer2onnx import compile_model
+from ch2o.initializer import initializer_arrays
 from ch2o.testcasegen import generate_testcase
 
 from ch2o import utils
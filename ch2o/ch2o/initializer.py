@@ -16,7 +16,7 @@ def tensor_from_array(array, name):
     return onnx.numpy_helper.from_array(array, name)
 
 
-def convert_parameter(parameter, name):
+def parameter_array(parameter):
     if isinstance(parameter, chainer.Parameter):
         array = parameter.array
     elif isinstance(parameter, chainer.Variable):
@@ -30,8 +30,12 @@ def convert_parameter(parameter, name):
                 type(parameter)))
     if array.shape == ():
         array = array[None]
+    return chainer.cuda.to_cpu(array)
+
+
+def convert_parameter(parameter, name):
     # print('initialize', name, array)
-    return tensor_from_array(array, name)
+    return tensor_from_array(parameter_array(parameter), name)
 
 # 入力xから次元を決める
 # モデルにxを流して最初の重みを決める
@@ -66,15 +70,11 @@ def collect_inits(lk, pathname):
 import code
 
 
-def edit_onnx_protobuf(onnxmod, chainermod):
-    initializers = collect_inits(chainermod, '')
-
-    onnx_initializers = []
+def _set_initializer_types(onnxmod, initializers):
     for name, param in initializers:
         found = False
         for input in onnxmod.graph.input:
             if input.name == name:
-                onnx_initializers.append(convert_parameter(param, name))
                 vi = onnx.helper.make_tensor_value_info(
                     'dummy', onnx.TensorProto.FLOAT, param.shape)
                 input.type.CopyFrom(vi.type)
@@ -82,9 +82,30 @@ def edit_onnx_protobuf(onnxmod, chainermod):
                 break
         assert found, name
 
+
+def edit_onnx_protobuf(onnxmod, chainermod):
+    initializers = collect_inits(chainermod, '')
+    _set_initializer_types(onnxmod, initializers)
+
+    onnx_initializers = []
+    for name, param in initializers:
+        onnx_initializers.append(convert_parameter(param, name))
+
     dummygraph = onnx.helper.make_graph(
         [], "hoge", [], [], initializer=onnx_initializers)
     dummygraph.ClearField("name")
     # print(dummygraph)
     onnxmod.graph.MergeFrom(dummygraph)
     return initializers
+
+
+def initializer_arrays(onnxmod, chainermod):
+    """Returns initializers as numpy arrays instead of embedding them.
+
+    Unlike `edit_onnx_protobuf`, parameters are not copied into
+    `onnxmod`. The returned dict can be passed to
+    `chainer_compiler_core.load_from_bytes`, which shares the arrays.
+    """
+    initializers = collect_inits(chainermod, '')
+    _set_initializer_types(onnxmod, initializers)
+    return {name: parameter_array(param) for name, param in initializers}
@@ -174,6 +174,81 @@ class Link_BatchNormalization(Callable):
         return [self.scale, self.B, self.mean, self.var]
 
 
+def nstep_lstm(env, xs, ws, bs, out_size, direction):
+    """Emits ChainerNStepLSTM for Chainer's NStepLSTM and NStepBiLSTM.
+
+    `ws` and `bs` are the parameters of links for each layer and each
+    direction, which are reordered into the layout of ONNX's LSTM.
+    """
+    num_directions = 2 if direction == 'bidirectional' else 1
+    xs = xs.to_sequence(env)
+
+    ilens = env.calc(
+        "ChainerSequenceLengths",
+        inputs=[xs.name],
+    )
+    tilens = env.calc(
+        "ChainerSequenceStack",
+        inputs=[ilens.name],
+    )
+    v = env.calc(
+        "ChainerSequencePad",
+        inputs=[xs.name],
+    )
+
+    def lstm_param(ps):
+        p = env.calc(
+            "Concat",
+            inputs=[v.name for v in ps],
+            axis=0
+        )
+        return env.calc(
+            "Unsqueeze",
+            inputs=[p.name],
+            axes=[0]
+        )
+
+    def concat_directions(ps):
+        if len(ps) == 1:
+            return ps[0]
+        return env.calc(
+            "Concat",
+            inputs=[p.name for p in ps],
+            axis=0
+        )
+
+    inputs = [v.name, tilens.name]
+    for i in range(0, len(ws), num_directions):
+        wst = []
+        rst = []
+        bst = []
+        for w, b in zip(ws[i:i + num_directions], bs[i:i + num_directions]):
+            wst.append(lstm_param([w[0], w[3], w[1], w[2]]))
+            rst.append(lstm_param([w[4], w[7], w[5], w[6]]))
+            bst.append(lstm_param([b[0], b[3], b[1], b[2],
+                                   b[4], b[7], b[5], b[6]]))
+        inputs += [concat_directions(wst).name,
+                   concat_directions(rst).name,
+                   concat_directions(bst).name]
+
+    ys = new_tensor()
+    hs = new_tensor()
+    cs = new_tensor()
+    env.addnode(
+        "ChainerNStepLSTM",
+        inputs=inputs,
+        outputs=[ys.name, hs.name, cs.name],
+        direction=direction,
+        hidden_size=out_size,
+    )
+
+    tys = env.calc_seq(
+        "ChainerSequenceUnpad",
+        inputs=[ys.name, ilens.name],
+    )
+    return hs, cs, tys
+
+
 class Link_NStepLSTM(Callable):
     def __init__(self, ch):
         super(Link_NStepLSTM, self).__init__(L.NStepLSTM(1, 1, 1, 0))
@@ -204,101 +279,8 @@ class Link_NStepLSTM(Callable):
     def call_impl(self, env, hx, cx, xs):
         assert hx.value is None  # TODO(hamaji): Not implemented yet.
         assert cx.value is None  # TODO(hamaji): Not implemented yet.
-        xs = xs.to_sequence(env)
-
-        # とりあえずnstep を 1step ずつに分解する
-        ilens = env.calc(
-            "ChainerSequenceLengths",
-            inputs=[xs.name],
-        )
-
-        tilens = env.calc(
-            "ChainerSequenceStack",
-            inputs=[ilens.name],
-        )
-
-        v = env.calc(
-            "ChainerSequencePad",
-            inputs=[xs.name],
-        )
-        v = env.calc(
-            "Transpose",
-            perm=(1, 0, 2),
-            inputs=[v.name],
-        )
-
-        def lstm_param(ps):
-            p = env.calc(
-                "Concat",
-                inputs=[v.name for v in ps],
-                axis=0
-            )
-            return env.calc(
-                "Unsqueeze",
-                inputs=[p.name],
-                axes=[0]
-            )
-
-        ws = []
-        rs = []
-        bs = []
-        for w in self.ws:
-            ws.append(lstm_param([w[0], w[3], w[1], w[2]]))
-            rs.append(lstm_param([w[4], w[7], w[5], w[6]]))
-        for b in self.bs:
-            bs.append(lstm_param([b[0], b[3], b[1], b[2],
-                                  b[4], b[7], b[5], b[6]]))
-
-        hs = []
-        cs = []
-        for i in range(self.n_layers):
-            h = new_tensor()
-            c = new_tensor()
-            ys = new_tensor()
-
-            env.addnode(
-                "LSTM",
-                inputs=[v.name, ws[i].name, rs[i].name, bs[i].name,
-                        tilens.name],
-                outputs=[ys.name, h.name, c.name],
-                direction='forward',
-                hidden_size=self.out_size,
-                # sequence_lens=[ilens.name]
-            )
-
-            hs.append(h.name)
-            cs.append(c.name)
-            yys = env.calc(
-                "Squeeze",
-                inputs=[ys.name],
-                axes=[1]
-            )
-            v = yys
-        # print(hs)
-        # print(cs)
-        ths = env.calc(
-            "Concat",
-            inputs=hs,
-            axis=0,
-        )
-        tcs = env.calc(
-            "Concat",
-            inputs=cs,
-            axis=0,
-        )
-
-        tv = env.calc(
-            "Transpose",
-            perm=(1, 0, 2),
-            inputs=[v.name],
-        )
-        v = tv
-
-        tys = env.calc(
-            "ChainerSequenceUnpad",
-            inputs=[v.name, ilens.name],
-        )
-        return ths, tcs, tys
+        return nstep_lstm(env, xs, self.ws, self.bs, self.out_size,
+                          'forward')
 
     def init_tensors(self):
         tensors = []
@@ -340,108 +322,8 @@ class Link_NStepBiLSTM(Callable):
     def call_impl(self, env, hx, cx, xs):
         assert hx.value is None  # TODO(hamaji): Not implemented yet.
         assert cx.value is None  # TODO(hamaji): Not implemented yet.
-        xs = xs.to_sequence(env)
-
-        # とりあえずnstep を 1step ずつに分解する
-        ilens = env.calc(
-            "ChainerSequenceLengths",
-            inputs=[xs.name],
-        )
-
-        tilens = env.calc(
-            "ChainerSequenceStack",
-            inputs=[ilens.name],
-        )
-
-        v = xs
-
-        def lstm_param(ps):
-            p = env.calc(
-                "Concat",
-                inputs=[v.name for v in ps],
-                axis=0
-            )
-            return env.calc(
-                "Unsqueeze",
-                inputs=[p.name],
-                axes=[0]
-            )
-
-        wst = []
-        rst = []
-        bst = []
-        for w in self.ws:
-            wst.append(lstm_param([w[0], w[3], w[1], w[2]]))
-            rst.append(lstm_param([w[4], w[7], w[5], w[6]]))
-        for b in self.bs:
-            bst.append(lstm_param([b[0], b[3], b[1], b[2],
-                                   b[4], b[7], b[5], b[6]]))
-
-        ws = []
-        rs = []
-        bs = []
-        for i in range(self.n_layers):
-            for s, t in [(ws, wst), (rs, rst), (bs, bst)]:
-                s.append(env.calc(
-                    "Concat",
-                    inputs=[t[i*2].name, t[i*2+1].name],
-                    axis=0
-                ))
-
-        hs = []
-        cs = []
-        v = Value(v).to_sequence(env)
-        v = env.calc(
-            "ChainerSequencePad",
-            inputs=[v.name],
-        )
-        v = env.calc(
-            "Transpose",
-            perm=(1, 0, 2),
-            inputs=[v.name]
-        )
-
-        sequence_length = env.calc("ChainerGenericLen", inputs=[v.name])
-        out_shape = Value([Value(sequence_length), Value(-1),
-                           Value(self.out_size * 2)]).to_tensor(env)
-
-        for i in range(self.n_layers):
-            h = new_tensor()
-            c = new_tensor()
-            ys = new_tensor()
-
-            env.addnode(
-                "LSTM",
-                inputs=[v.name, ws[i].name,
-                        rs[i].name, bs[i].name, tilens.name],
-                outputs=[ys.name, h.name, c.name],
-                direction='bidirectional',
-                hidden_size=self.out_size,
-            )
-
-            hs.append(h.name)
-            cs.append(c.name)
-
-            # ys :: [seqlen x 2 x batchsize x hiddensize]
-            v = env.calc("Transpose", perm=(0, 2, 1, 3), inputs=[ys.name])
-            v = env.calc("Reshape", inputs=[v.name, out_shape.name])
-
-        v = env.calc("Transpose", perm=(1, 0, 2), inputs=[v.name])
-        v = env.calc_seq("ChainerSequenceUnpad", inputs=[v.name, ilens.name])
-
-        ths = env.calc(
-            "Concat",
-            inputs=hs,
-            axis=0,
-        )
-        tcs = env.calc(
-            "Concat",
-            inputs=cs,
-            axis=0,
-        )
-
-        tys = v
-        return ths, tcs, tys
+        return nstep_lstm(env, xs, self.ws, self.bs, self.out_size,
+                          'bidirectional')
 
     def init_tensors(self):
         tensors = []
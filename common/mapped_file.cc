@@ -0,0 +1,65 @@
+#include "common/mapped_file.h"
+
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <sys/types.h>
+#include <unistd.h>
+
+#include <cerrno>
+#include <cstring>
+#include <map>
+#include <mutex>
+
+#include <common/log.h>
+
+namespace chainer_compiler {
+
+std::shared_ptr<MappedFile> MappedFile::Open(const std::string& filename) {
+    static std::mutex mu;
+    static std::map<std::string, std::weak_ptr<MappedFile>> mapped_files;
+
+    std::lock_guard<std::mutex> lock(mu);
+    int fd = open(filename.c_str(), O_RDONLY);
+    CHECK_LE(0, fd) << "Failed to open " << filename << ": " << strerror(errno);
+    struct stat st;
+    CHECK_EQ(0, fstat(fd, &st)) << "Failed to stat " << filename << ": " << strerror(errno);
+    const FileId id{static_cast<uint64_t>(st.st_dev), static_cast<uint64_t>(st.st_ino), st.st_size, st.st_mtime};
+
+    std::weak_ptr<MappedFile>& mapped = mapped_files[filename];
+    if (std::shared_ptr<MappedFile> file = mapped.lock()) {
+        if (file->id_ == id) {
+            close(fd);
+            return file;
+        }
+    }
+
+    const size_t size = st.st_size;
+    char* data = nullptr;
+    if (size) {
+        void* p = mmap(nullptr, size, PROT_READ, MAP_PRIVATE, fd, 0);
+        CHECK(p != MAP_FAILED) << "Failed to mmap " << filename << ": " << strerror(errno);
+        data = static_cast<char*>(p);
+    }
+    close(fd);
+
+    std::shared_ptr<MappedFile> file(new MappedFile(filename, id, data, size));
+    file->self_ = file;
+    mapped = file;
+    return file;
+}
+
+MappedFile::MappedFile(const std::string& filename, const FileId& id, char* data, size_t size)
+    : filename_(filename), id_(id), data_(data), size_(size) {
+}
+
+MappedFile::~MappedFile() {
+    if (data_) munmap(data_, size_);
+}
+
+std::shared_ptr<void> MappedFile::GetSharedData(size_t offset) {
+    CHECK_LE(offset, size_) << filename_;
+    return std::shared_ptr<void>(self_.lock(), data_ + offset);
+}
+
+}  // namespace chainer_compiler
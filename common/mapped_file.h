@@ -0,0 +1,58 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <memory>
+#include <string>
+
+namespace chainer_compiler {
+
+// A read-only memory mapping of a whole file. Mappings are shared by
+// all users of the same file, so the memory must not be modified.
+// Copy the data to update it.
+class MappedFile {
+public:
+    // Returns the existing mapping if the file is already mapped and
+    // has not been replaced or modified since then.
+    static std::shared_ptr<MappedFile> Open(const std::string& filename);
+
+    ~MappedFile();
+
+    const std::string& filename() const {
+        return filename_;
+    }
+    const char* data() const {
+        return data_;
+    }
+    size_t size() const {
+        return size_;
+    }
+
+    // Returns a pointer to `offset` which keeps the mapping alive. The
+    // memory must not be written.
+    std::shared_ptr<void> GetSharedData(size_t offset);
+
+private:
+    struct FileId {
+        bool operator==(const FileId& rhs) const {
+            return dev == rhs.dev && ino == rhs.ino && size == rhs.size && mtime == rhs.mtime;
+        }
+
+        uint64_t dev;
+        uint64_t ino;
+        int64_t size;
+        int64_t mtime;
+    };
+
+    MappedFile(const std::string& filename, const FileId& id, char* data, size_t size);
+    MappedFile(const MappedFile&) = delete;
+    MappedFile& operator=(const MappedFile&) = delete;
+
+    const std::string filename_;
+    const FileId id_;
+    char* data_;
+    size_t size_;
+    std::weak_ptr<MappedFile> self_;
+};
+
+}  // namespace chainer_compiler
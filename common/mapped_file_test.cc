@@ -0,0 +1,66 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <unistd.h>
+
+#include <fstream>
+
+#include <gtest/gtest.h>
+
+#include <common/mapped_file.h>
+
+namespace chainer_compiler {
+namespace {
+
+TEST(MappedFileTest, Open) {
+    char filename[] = "/tmp/mapped_file_test_XXXXXX";
+    int fd = mkstemp(filename);
+    ASSERT_LE(0, fd);
+    close(fd);
+    {
+        std::ofstream ofs(filename);
+        ofs << "hello, world";
+    }
+
+    std::shared_ptr<void> data;
+    {
+        std::shared_ptr<MappedFile> file = MappedFile::Open(filename);
+        ASSERT_EQ(12, file->size());
+        EXPECT_EQ("hello, world", std::string(file->data(), file->size()));
+        EXPECT_EQ(file, MappedFile::Open(filename));
+
+        data = file->GetSharedData(7);
+    }
+    // `data` keeps the mapping alive.
+    EXPECT_EQ("world", std::string(static_cast<char*>(data.get()), 5));
+    unlink(filename);
+}
+
+TEST(MappedFileTest, Rewritten) {
+    char filename[] = "/tmp/mapped_file_test_XXXXXX";
+    int fd = mkstemp(filename);
+    ASSERT_LE(0, fd);
+    close(fd);
+    {
+        std::ofstream ofs(filename);
+        ofs << "hello";
+    }
+    std::shared_ptr<MappedFile> file = MappedFile::Open(filename);
+    EXPECT_EQ("hello", std::string(file->data(), file->size()));
+
+    // A file replaced by another one is mapped again.
+    const std::string tmp = std::string(filename) + ".tmp";
+    {
+        std::ofstream ofs(tmp);
+        ofs << "hello, world";
+    }
+    ASSERT_EQ(0, rename(tmp.c_str(), filename));
+    std::shared_ptr<MappedFile> rewritten = MappedFile::Open(filename);
+    EXPECT_NE(file, rewritten);
+    EXPECT_EQ("hello, world", std::string(rewritten->data(), rewritten->size()));
+    // The old mapping is still valid.
+    EXPECT_EQ("hello", std::string(file->data(), file->size()));
+    unlink(filename);
+}
+
+}  // namespace
+}  // namespace chainer_compiler
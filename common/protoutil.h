@@ -9,6 +9,7 @@
 
 #include <google/protobuf/io/coded_stream.h>
 #include <google/protobuf/io/zero_copy_stream_impl.h>
+#include <google/protobuf/io/zero_copy_stream_impl_lite.h>
 
 #include <common/log.h>
 
@@ -27,3 +28,13 @@ Proto LoadLargeProto(const std::string& filename) {
     CHECK(proto.ParseFromCodedStream(&cis)) << "failed to parse " << filename;
     return proto;
 }
+
+template <class Proto>
+Proto ParseLargeProto(const void* data, int size) {
+    Proto proto;
+    ::google::protobuf::io::ArrayInputStream ais(data, size);
+    ::google::protobuf::io::CodedInputStream cis(&ais);
+    cis.SetTotalBytesLimit(std::numeric_limits<int>::max(), std::numeric_limits<int>::max());
+    CHECK(proto.ParseFromCodedStream(&cis)) << "failed to parse " << size << " bytes";
+    return proto;
+}
@@ -0,0 +1,35 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <string>
+
+namespace chainer_compiler {
+
+// Computes SHA-256 digests of byte streams, e.g., to build
+// content-addressed keys.
+class SHA256 {
+public:
+    SHA256();
+
+    void Update(const void* data, size_t size);
+
+    void Update(const std::string& str) {
+        Update(str.data(), str.size());
+    }
+
+    // Returns the digest as a lower-case hexadecimal string. No more
+    // data can be added after this call.
+    std::string HexDigest();
+
+private:
+    void ProcessBlock(const uint8_t* block);
+
+    uint32_t state_[8];
+    uint8_t buffer_[64];
+    size_t buffer_size_{0};
+    uint64_t total_bytes_{0};
+    bool finished_{false};
+};
+
+}  // namespace chainer_compiler
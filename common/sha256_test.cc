@@ -0,0 +1,34 @@
+#include <gtest/gtest.h>
+
+#include <common/sha256.h>
+
+namespace chainer_compiler {
+namespace {
+
+std::string HexDigest(const std::string& str) {
+    SHA256 sha256;
+    sha256.Update(str);
+    return sha256.HexDigest();
+}
+
+TEST(SHA256Test, HexDigest) {
+    EXPECT_EQ("e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855", HexDigest(""));
+    EXPECT_EQ("ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad", HexDigest("abc"));
+    EXPECT_EQ(
+            "248d6a61d20638b8e5c026930c3e6039a33ce45964ff2167f6ecedd419db06c1",
+            HexDigest("abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq"));
+    EXPECT_EQ("cdc76e5c9914fb9281a1c7e284d73e67f1809a48a497200e046d39ccc7112cd0", HexDigest(std::string(1000000, 'a')));
+}
+
+TEST(SHA256Test, Update) {
+    const std::string str = "The quick brown fox jumps over the lazy dog, repeatedly, to fill more than one block of input.";
+    for (size_t i = 0; i <= str.size(); ++i) {
+        SHA256 sha256;
+        sha256.Update(str.substr(0, i));
+        sha256.Update(str.substr(i));
+        EXPECT_EQ(HexDigest(str), sha256.HexDigest()) << i;
+    }
+}
+
+}  // namespace
+}  // namespace chainer_compiler
@@ -0,0 +1,49 @@
+#include "thread_pool.h"
+
+#include <common/log.h>
+
+namespace chainer_compiler {
+
+ThreadPool::ThreadPool(int num_threads) {
+    CHECK_LT(0, num_threads);
+    for (int i = 0; i < num_threads; ++i) {
+        threads_.emplace_back([this]() { Loop(); });
+    }
+}
+
+ThreadPool::~ThreadPool() {
+    {
+        std::unique_lock<std::mutex> lock{mu_};
+        should_finish_ = true;
+        cond_.notify_all();
+    }
+    for (std::thread& thread : threads_) {
+        thread.join();
+    }
+}
+
+void ThreadPool::Schedule(std::function<void()> task) {
+    std::unique_lock<std::mutex> lock{mu_};
+    CHECK(!should_finish_);
+    tasks_.push(std::move(task));
+    cond_.notify_one();
+}
+
+void ThreadPool::Loop() {
+    while (true) {
+        std::function<void()> task;
+        {
+            std::unique_lock<std::mutex> lock{mu_};
+            while (tasks_.empty()) {
+                // Remaining tasks are drained before workers finish.
+                if (should_finish_) return;
+                cond_.wait(lock);
+            }
+            task = std::move(tasks_.front());
+            tasks_.pop();
+        }
+        task();
+    }
+}
+
+}  // namespace chainer_compiler
@@ -0,0 +1,38 @@
+#pragma once
+
+#include <condition_variable>
+#include <functional>
+#include <mutex>
+#include <queue>
+#include <thread>
+#include <vector>
+
+namespace chainer_compiler {
+
+// A fixed-size pool of worker threads which run scheduled tasks in
+// FIFO order.
+class ThreadPool {
+public:
+    explicit ThreadPool(int num_threads);
+    ~ThreadPool();
+
+    void Schedule(std::function<void()> task);
+
+    int num_threads() const {
+        return static_cast<int>(threads_.size());
+    }
+
+private:
+    ThreadPool(const ThreadPool&) = delete;
+    ThreadPool& operator=(const ThreadPool&) = delete;
+
+    void Loop();
+
+    std::vector<std::thread> threads_;
+    std::mutex mu_;
+    std::condition_variable cond_;
+    std::queue<std::function<void()>> tasks_;
+    bool should_finish_ = false;
+};
+
+}  // namespace chainer_compiler
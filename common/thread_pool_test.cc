@@ -0,0 +1,24 @@
+#include <gtest/gtest.h>
+
+#include <atomic>
+
+#include <common/thread_pool.h>
+
+namespace chainer_compiler {
+namespace {
+
+TEST(ThreadPoolTest, Schedule) {
+    std::atomic<int> sum{0};
+    {
+        ThreadPool pool(4);
+        EXPECT_EQ(4, pool.num_threads());
+        for (int i = 1; i <= 100; ++i) {
+            pool.Schedule([&sum, i]() { sum += i; });
+        }
+        // The destructor waits for all scheduled tasks.
+    }
+    EXPECT_EQ(5050, sum);
+}
+
+}  // namespace
+}  // namespace chainer_compiler
@@ -0,0 +1,210 @@
+#include "compiler/batch_norm_folding.h"
+
+#include <cmath>
+#include <memory>
+#include <string>
+#include <vector>
+
+#include <compiler/graph.h>
+#include <compiler/graph_builder.h>
+#include <compiler/log.h>
+#include <compiler/node.h>
+#include <compiler/tensor.h>
+#include <compiler/type.h>
+#include <compiler/value.h>
+
+namespace chainer_compiler {
+
+namespace {
+
+// Returns the tensor of an initializer or a Constant op. Returns
+// nullptr if `value` is not a constant of float or double.
+const Tensor* GetConstantTensor(const Value* value) {
+    const Tensor* tensor = value->initializer();
+    if (!tensor && value->producer() && value->producer()->op_type() == Node::kConstant) {
+        tensor = value->producer()->tensor_value().get();
+    }
+    if (!tensor) return nullptr;
+    if (tensor->dtype() != Dtype::kFloat32 && tensor->dtype() != Dtype::kFloat64) return nullptr;
+    return tensor;
+}
+
+std::vector<double> GetDoubles(const Tensor& tensor) {
+    std::vector<double> values;
+    for (int64_t i = 0; i < tensor.NumElements(); ++i) {
+        if (tensor.dtype() == Dtype::kFloat32) {
+            values.push_back(tensor.Get<float>(i));
+        } else {
+            values.push_back(tensor.Get<double>(i));
+        }
+    }
+    return values;
+}
+
+// Detaches the Constant op which produced `value` if nothing uses it.
+// Initializers stay inputs so the parameters of the graph do not
+// change.
+void DetachUnusedConstant(Graph* graph, Value* value) {
+    if (!value->users().empty() || value->initializer()) return;
+    if (value->producer() && value->producer()->op_type() == Node::kConstant) graph->DetachNode(value->producer());
+}
+
+void ReplaceInput(Node* node, Value* from, Value* to) {
+    from->DetachUser(node);
+    to->AddUser(node);
+    node->ReplaceInput(from, to);
+}
+
+// Returns the index of the output channel for each element of the
+// weight of `node`, or an empty vector if the weight does not have
+// `num_channels` output channels.
+std::vector<int64_t> GetOutputChannels(const Node& node, const Tensor& weight, int64_t num_channels) {
+    const std::vector<int64_t> dims = weight.dims();
+    const int64_t size = weight.NumElements();
+    std::vector<int64_t> channels;
+    switch (node.op_type()) {
+        case Node::kConv:
+        case Node::kChainerLinear: {
+            // (M, ...)
+            if (dims.empty() || dims[0] != num_channels) return {};
+            if (node.op_type() == Node::kChainerLinear && node.n_batch_axes() != 1) return {};
+            const int64_t inner = size / num_channels;
+            for (int64_t i = 0; i < size; ++i) channels.push_back(i / inner);
+            break;
+        }
+
+        case Node::kConvTranspose: {
+            // (C, M / group, ...)
+            if (dims.size() < 2 || dims[1] * node.group() != num_channels || dims[0] % node.group()) return {};
+            const int64_t inner = size / dims[0] / dims[1];
+            const int64_t in_channels_per_group = dims[0] / node.group();
+            for (int64_t i = 0; i < size; ++i) {
+                const int64_t c = i / (dims[1] * inner);
+                const int64_t m = i / inner % dims[1];
+                channels.push_back(c / in_channels_per_group * dims[1] + m);
+            }
+            break;
+        }
+
+        case Node::kGemm: {
+            // (M, K) if transB and (K, M) otherwise.
+            if (dims.size() != 2) return {};
+            if (node.trans_b()) {
+                if (dims[0] != num_channels) return {};
+                for (int64_t i = 0; i < size; ++i) channels.push_back(i / dims[1]);
+            } else {
+                if (dims[1] != num_channels) return {};
+                for (int64_t i = 0; i < size; ++i) channels.push_back(i % dims[1]);
+            }
+            break;
+        }
+
+        default:
+            return {};
+    }
+    return channels;
+}
+
+bool FoldBatchNormalization(Graph* graph, Node* bn) {
+    // Only inference-mode BatchNormalization has a single output.
+    if (bn->outputs().size() != 1 || bn->chainer_in_recomputing()) return false;
+    Value* x = bn->input(0);
+    Node* node = x->producer();
+    if (!node || !x->IsTemp() || x->users().size() != 1) return false;
+    const Node::OpType op_type = node->op_type();
+    if (op_type != Node::kConv && op_type != Node::kConvTranspose && op_type != Node::kGemm && op_type != Node::kChainerLinear) {
+        return false;
+    }
+
+    const Tensor* bn_params[4];
+    for (int i = 0; i < 4; ++i) {
+        bn_params[i] = GetConstantTensor(bn->input(i + 1));
+        if (!bn_params[i]) return false;
+    }
+    const int64_t num_channels = bn_params[0]->NumElements();
+    for (const Tensor* t : bn_params) {
+        if (t->NumElements() != num_channels) return false;
+    }
+
+    Value* w = node->input(1);
+    const Tensor* weight = GetConstantTensor(w);
+    if (!weight) return false;
+    Value* b = node->inputs().size() >= 3 && !node->input(2)->IsNull() ? node->input(2) : nullptr;
+    const Tensor* bias = b ? GetConstantTensor(b) : nullptr;
+    if (b && (!bias || bias->dtype() != weight->dtype())) return false;
+    // The bias must have a value for each output channel. The bias of
+    // Gemm is broadcasted and must be a vector along the output
+    // channels.
+    if (bias && bias->NumElements() != num_channels) return false;
+    if (bias && op_type == Node::kGemm && bias->dims().size() == 2 && bias->dims()[0] != 1) return false;
+
+    const std::vector<int64_t> channels = GetOutputChannels(*node, *weight, num_channels);
+    if (channels.empty()) return false;
+
+    const std::vector<double> scale = GetDoubles(*bn_params[0]);
+    const std::vector<double> bn_bias = GetDoubles(*bn_params[1]);
+    const std::vector<double> mean = GetDoubles(*bn_params[2]);
+    const std::vector<double> var = GetDoubles(*bn_params[3]);
+
+    // y = scale * (x - mean) / sqrt(var + eps) + bias
+    //   = (W * s) x + ((b - mean) * s + bias) where s = scale / sqrt(var + eps)
+    std::vector<double> s(num_channels);
+    for (int64_t c = 0; c < num_channels; ++c) {
+        s[c] = scale[c] / std::sqrt(var[c] + bn->epsilon());
+    }
+
+    std::vector<double> new_weight = GetDoubles(*weight);
+    for (size_t i = 0; i < new_weight.size(); ++i) {
+        new_weight[i] *= s[channels[i]];
+    }
+
+    std::vector<double> orig_bias(num_channels);
+    if (bias) {
+        const std::vector<double> values = GetDoubles(*bias);
+        for (int64_t c = 0; c < num_channels; ++c) {
+            orig_bias[c] = values[c];
+            if (op_type == Node::kGemm) orig_bias[c] *= node->beta();
+        }
+    }
+    std::vector<double> new_bias(num_channels);
+    for (int64_t c = 0; c < num_channels; ++c) {
+        new_bias[c] = (orig_bias[c] - mean[c]) * s[c] + bn_bias[c];
+    }
+
+    // Folded weights and biases become new constants. The original
+    // ones may be fed from outside the graph or used by other nodes, so
+    // they are not updated.
+    Value* y = bn->output(0);
+    const Dtype dtype = weight->dtype();
+    GraphBuilder gb(graph, "BatchNormFolding", y);
+    ReplaceInput(node, w, gb.Const(Type(dtype, weight->dims()), new_weight));
+    DetachUnusedConstant(graph, w);
+    Value* new_b = gb.Const(Type(dtype, {num_channels}), new_bias);
+    if (node->inputs().size() >= 3) {
+        Value* orig_b = node->input(2);
+        ReplaceInput(node, orig_b, new_b);
+        DetachUnusedConstant(graph, orig_b);
+    } else {
+        node->AddInput(new_b);
+    }
+    if (op_type == Node::kGemm) node->set_beta(1.0);
+
+    graph->DetachNode(bn);
+    node->ReplaceOutput(x, y);
+    y->SetProducer(node);
+    return true;
+}
+
+}  // namespace
+
+int FoldBatchNormalizations(Graph* graph) {
+    int num_folded = 0;
+    for (Node* node : graph->GetLiveNodes()) {
+        if (node->op_type() != Node::kBatchNormalization) continue;
+        if (FoldBatchNormalization(graph, node)) ++num_folded;
+    }
+    CLOG() << "Folded " << num_folded << " BatchNormalization layers into preceding layers" << std::endl;
+    return num_folded;
+}
+
+}  // namespace chainer_compiler
@@ -0,0 +1,14 @@
+#pragma once
+
+namespace chainer_compiler {
+
+class Graph;
+
+// Folds inference-mode BatchNormalization with constant parameters
+// into the weights and biases of their preceding Conv, ConvTranspose,
+// Gemm, or ChainerLinear. Folded weights and biases become new
+// constants, so the inputs and initializers of the graph do not
+// change. Returns the number of folded layers.
+int FoldBatchNormalizations(Graph* graph);
+
+}  // namespace chainer_compiler
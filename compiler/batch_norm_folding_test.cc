@@ -0,0 +1,152 @@
+#include <gtest/gtest.h>
+
+#include <memory>
+#include <vector>
+
+#include <compiler/batch_norm_folding.h>
+#include <compiler/graph.h>
+#include <compiler/node.h>
+#include <compiler/tensor.h>
+#include <compiler/type.h>
+#include <compiler/value.h>
+
+namespace chainer_compiler {
+namespace {
+
+Value* AddParam(Graph* graph, const std::string& name, const std::vector<int64_t>& dims, const std::vector<float>& data) {
+    Value* value = graph->AddInputValue(name, Type(Dtype::kFloat32, dims));
+    value->ResetInitializer(std::make_unique<Tensor>(name, Dtype::kFloat32, dims, data));
+    return value;
+}
+
+void AddBatchNormalizationParams(Graph* graph, std::vector<Value*>* inputs) {
+    inputs->push_back(AddParam(graph, "scale", {2}, {2, 3}));
+    inputs->push_back(AddParam(graph, "bias", {2}, {1, -1}));
+    inputs->push_back(AddParam(graph, "mean", {2}, {4, 5}));
+    inputs->push_back(AddParam(graph, "var", {2}, {3, 8}));
+}
+
+// Returns the tensor of the Constant op which produces `value`.
+const Tensor* GetConstant(const Value* value) {
+    const Node* node = value->producer();
+    if (!node || node->op_type() != Node::kConstant) return nullptr;
+    return node->tensor_value().get();
+}
+
+TEST(BatchNormFoldingTest, FoldConv) {
+    Graph graph("test");
+    Value* input = graph.AddInputValue("input", Type(Dtype::kFloat32, {1, 1, 3, 3}));
+    Value* output = graph.AddOutputValue("output", Type(Dtype::kFloat32, {1, 2, 3, 3}));
+    Value* w = AddParam(&graph, "w", {2, 1, 1, 1}, {5, 7});
+    Value* b = AddParam(&graph, "b", {2}, {10, 20});
+    std::vector<Value*> bn_inputs = {graph.AddValue("conv", Type(Dtype::kFloat32, {1, 2, 3, 3}))};
+    AddBatchNormalizationParams(&graph, &bn_inputs);
+    Node* conv = graph.AddNode(Node::kConv, {input, w, b}, {bn_inputs[0]});
+    graph.AddNode(Node::kBatchNormalization, bn_inputs, {output})->set_epsilon(1);
+    const size_t num_inputs = graph.input_values().size();
+
+    EXPECT_EQ(1, FoldBatchNormalizations(&graph));
+    graph.DeleteDetached();
+    graph.CheckSanity("folded");
+
+    // Conv and Constants for the folded weight and bias.
+    ASSERT_EQ(3, graph.nodes().size());
+    EXPECT_EQ(output, conv->output(0));
+    EXPECT_EQ(conv, output->producer());
+    ASSERT_EQ(3, conv->inputs().size());
+    EXPECT_EQ(input, conv->input(0));
+    EXPECT_EQ(num_inputs, graph.input_values().size());
+
+    // The initializers are not updated.
+    EXPECT_TRUE(w->users().empty());
+    EXPECT_TRUE(b->users().empty());
+    EXPECT_EQ(5, w->initializer()->Get<float>(0));
+    EXPECT_EQ(10, b->initializer()->Get<float>(0));
+
+    // s = scale / sqrt(var + eps) = {1, 1}.
+    const Tensor* folded_w = GetConstant(conv->input(1));
+    ASSERT_TRUE(folded_w);
+    EXPECT_EQ(std::vector<int64_t>({2, 1, 1, 1}), folded_w->dims());
+    EXPECT_EQ(5, folded_w->Get<float>(0));
+    EXPECT_EQ(7, folded_w->Get<float>(1));
+    const Tensor* folded_b = GetConstant(conv->input(2));
+    ASSERT_TRUE(folded_b);
+    EXPECT_EQ(10 - 4 + 1, folded_b->Get<float>(0));
+    EXPECT_EQ(20 - 5 - 1, folded_b->Get<float>(1));
+}
+
+TEST(BatchNormFoldingTest, FoldGemmWithoutBias) {
+    Graph graph("test");
+    Value* input = graph.AddInputValue("input", Type(Dtype::kFloat32, {1, 3}));
+    Value* output = graph.AddOutputValue("output", Type(Dtype::kFloat32, {1, 2}));
+    // B is (K, M) without transB.
+    Value* w = AddParam(&graph, "w", {3, 2}, {1, 2, 3, 4, 5, 6});
+    std::vector<Value*> bn_inputs = {graph.AddValue("gemm", Type(Dtype::kFloat32, {1, 2}))};
+    AddBatchNormalizationParams(&graph, &bn_inputs);
+    Node* gemm = graph.AddNode(Node::kGemm, {input, w}, {bn_inputs[0]});
+    gemm->set_beta(0.5);
+    graph.AddNode(Node::kBatchNormalization, bn_inputs, {output})->set_epsilon(1);
+    const size_t num_inputs = graph.input_values().size();
+
+    EXPECT_EQ(1, FoldBatchNormalizations(&graph));
+    graph.DeleteDetached();
+    graph.CheckSanity("folded");
+
+    // Gemm and Constants for the folded weight and bias.
+    ASSERT_EQ(3, graph.nodes().size());
+    ASSERT_EQ(3, gemm->inputs().size());
+    EXPECT_EQ(1.0, gemm->beta());
+    EXPECT_EQ(num_inputs, graph.input_values().size());
+    EXPECT_TRUE(w->users().empty());
+    const Tensor* folded_w = GetConstant(gemm->input(1));
+    ASSERT_TRUE(folded_w);
+    const std::vector<float> expected_w = {1, 2, 3, 4, 5, 6};
+    for (size_t i = 0; i < expected_w.size(); ++i) {
+        EXPECT_EQ(expected_w[i], folded_w->Get<float>(i));
+    }
+    const Tensor* folded_c = GetConstant(gemm->input(2));
+    ASSERT_TRUE(folded_c);
+    EXPECT_EQ(std::vector<int64_t>({2}), folded_c->dims());
+    EXPECT_EQ(-4 + 1, folded_c->Get<float>(0));
+    EXPECT_EQ(-5 - 1, folded_c->Get<float>(1));
+}
+
+TEST(BatchNormFoldingTest, KeepSharedOutput) {
+    Graph graph("test");
+    Value* input = graph.AddInputValue("input", Type(Dtype::kFloat32, {1, 3}));
+    Value* output = graph.AddOutputValue("output", Type(Dtype::kFloat32, {1, 2}));
+    Value* output2 = graph.AddOutputValue("output2", Type(Dtype::kFloat32, {1, 2}));
+    Value* w = AddParam(&graph, "w", {2, 3}, {1, 2, 3, 4, 5, 6});
+    std::vector<Value*> bn_inputs = {graph.AddValue("linear", Type(Dtype::kFloat32, {1, 2}))};
+    AddBatchNormalizationParams(&graph, &bn_inputs);
+    graph.AddNode(Node::kChainerLinear, {input, w}, {bn_inputs[0]});
+    graph.AddNode(Node::kBatchNormalization, bn_inputs, {output});
+    graph.AddNode(Node::kIdentity, {bn_inputs[0]}, {output2});
+
+    // The output of Linear is used by other than BatchNormalization.
+    EXPECT_EQ(0, FoldBatchNormalizations(&graph));
+    EXPECT_EQ(3, graph.GetLiveNodes().size());
+}
+
+TEST(BatchNormFoldingTest, FoldSharedWeight) {
+    Graph graph("test");
+    Value* input = graph.AddInputValue("input", Type(Dtype::kFloat32, {1, 3}));
+    Value* output = graph.AddOutputValue("output", Type(Dtype::kFloat32, {1, 2}));
+    Value* output2 = graph.AddOutputValue("output2", Type(Dtype::kFloat32, {1, 2}));
+    Value* w = AddParam(&graph, "w", {2, 3}, {1, 2, 3, 4, 5, 6});
+    std::vector<Value*> bn_inputs = {graph.AddValue("linear", Type(Dtype::kFloat32, {1, 2}))};
+    AddBatchNormalizationParams(&graph, &bn_inputs);
+    Node* linear = graph.AddNode(Node::kChainerLinear, {input, w}, {bn_inputs[0]});
+    graph.AddNode(Node::kBatchNormalization, bn_inputs, {output});
+    Node* linear2 = graph.AddNode(Node::kChainerLinear, {input, w}, {output2});
+
+    // The other Linear keeps using the original weight.
+    EXPECT_EQ(1, FoldBatchNormalizations(&graph));
+    EXPECT_NE(w, linear->input(1));
+    EXPECT_EQ(w, linear2->input(1));
+    ASSERT_EQ(1, w->users().size());
+    EXPECT_EQ(1, w->initializer()->Get<float>(0));
+}
+
+}  // namespace
+}  // namespace chainer_compiler
@@ -1,5 +1,9 @@
 #include "compiler/computation_order/core.h"
 
+#include <set>
+
+#include <compiler/memory_simulator.h>
+
 namespace chainer_compiler {
 
 std::ostream& operator<<(std::ostream& os, const Order& order) {
@@ -29,4 +33,44 @@ std::ostream& operator<<(std::ostream& os, const Order& order) {
     return os;
 }
 
+int64_t SimulatePeakMemory(const std::vector<Order>& orders) {
+    std::set<Value*> live_values;
+    MemoryUsageCounter counter;
+    for (const Order& order : orders) {
+        switch (order.kind) {
+            case Order::kComputeForward:
+                for (Value* value : order.node->outputs()) {
+                    if (live_values.insert(value).second) counter.Alloc(value);
+                }
+                break;
+            case Order::kForgetForward:
+                if (live_values.erase(order.value)) counter.Free(order.value);
+                break;
+            case Order::kComputeBackward: {
+                // Gradients of the inputs.
+                for (Value* value : order.node->inputs()) counter.Alloc(value);
+                for (Value* value : order.node->inputs()) counter.Free(value);
+                for (Value* value : order.node->outputs()) {
+                    if (live_values.erase(value)) counter.Free(value);
+                }
+                break;
+            }
+            default:
+                break;
+        }
+    }
+    return counter.usage().peak;
+}
+
+int CountRecomputedNodes(const std::vector<Order>& orders) {
+    std::set<Node*> nodes;
+    int num_forwards = 0;
+    for (const Order& order : orders) {
+        if (order.kind != Order::kComputeForward) continue;
+        ++num_forwards;
+        nodes.insert(order.node);
+    }
+    return num_forwards - nodes.size();
+}
+
 }  // namespace chainer_compiler
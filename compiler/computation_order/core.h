@@ -1,5 +1,6 @@
 #pragma once
 
+#include <cstdint>
 #include <ostream>
 #include <string>
 #include <vector>
@@ -33,4 +34,14 @@ public:
 
 std::ostream& operator<<(std::ostream& os, const Order& order);
 
+// Estimates the peak memory of `orders` from the sizes of live
+// forward values with the memory model of `SimulateMemoryUsage`. In a
+// backward computation of a node, gradients of its inputs are
+// allocated and its outputs are released afterwards. Inputs and
+// parameters of the graph are not counted.
+int64_t SimulatePeakMemory(const std::vector<Order>& orders);
+
+// Returns the number of forward computations for recomputation.
+int CountRecomputedNodes(const std::vector<Order>& orders);
+
 }  // namespace chainer_compiler
@@ -5,11 +5,13 @@
 #include <cmath>
 #include <iostream>
 #include <map>
-#include <numeric>
-#include <queue>
 #include <set>
+#include <tuple>
+#include <unordered_map>
 #include <vector>
 
+#include <common/log.h>
+#include <common/strutil.h>
 #include <compiler/flags.h>
 #include <compiler/graph.h>
 #include <compiler/node.h>
@@ -18,70 +20,90 @@ namespace chainer_compiler {
 
 std::set<Node*> FindArticulationPoints(const Graph& graph) {
     // Convert to consise representation (undirected graph)
-    std::vector<Node*> nodes = graph.nodes();
-    const size_t n = nodes.size();
-    std::map<Node*, size_t> node_ids;
-    for (size_t i = 0; i < n; ++i) {
+    const std::vector<Node*>& nodes = graph.nodes();
+    const int n = nodes.size();
+    std::unordered_map<const Node*, int> node_ids;
+    for (int i = 0; i < n; ++i) {
         node_ids.emplace(nodes[i], i);
     }
-    std::vector<std::vector<size_t>> adj(n);
+    std::vector<std::vector<int>> adj(n);
 
-    for (Node* node : graph.nodes()) {
-        for (Value* output : node->outputs()) {
+    for (int i = 0; i < n; ++i) {
+        for (Value* output : nodes[i]->outputs()) {
             for (Node* user : output->users()) {
                 // There is an edge (node, user)
-                size_t i = node_ids[node], j = node_ids[user];
-                adj[i].push_back(j);
-                adj[j].push_back(i);
+                auto found = node_ids.find(user);
+                if (found == node_ids.end()) continue;
+                adj[i].push_back(found->second);
+                adj[found->second].push_back(i);
             }
         }
     }
+    // Parallel edges are removed so the edge to the parent can be
+    // skipped by its node ID below.
+    for (std::vector<int>& a : adj) {
+        std::sort(a.begin(), a.end());
+        a.erase(std::unique(a.begin(), a.end()), a.end());
+    }
 
-    std::set<Node*> articulation_points;
-    // In this implementation, we try naive approach to enumerate articulation points
-    for (size_t i = 0; i < n; ++i) {
-        // Check connectivity after the removal of node i
-        std::vector<size_t> visited(n);
-        std::queue<size_t> q;
-        q.push((i + 1) % n);
-        while (!q.empty()) {
-            size_t j = q.front();
-            q.pop();
-            if (visited[j]) continue;
-            visited[j] = 1;
-
-            for (size_t k : adj[j]) {
-                if (k == i || visited[k]) continue;
-                q.push(k);
+    // Tarjan's algorithm with an explicit stack, as graphs of unrolled
+    // RNNs are too deep for recursion.
+    std::vector<int> preorder(n, -1);
+    std::vector<int> lowlink(n);
+    std::vector<bool> is_articulation_point(n);
+    int num_visited = 0;
+    for (int root = 0; root < n; ++root) {
+        if (preorder[root] >= 0) continue;
+        preorder[root] = lowlink[root] = num_visited++;
+        int num_root_children = 0;
+        // Tuples of a node, its parent, and the index of the next edge.
+        std::vector<std::tuple<int, int, size_t>> stack = {std::make_tuple(root, -1, 0)};
+        while (!stack.empty()) {
+            const int v = std::get<0>(stack.back());
+            const int parent = std::get<1>(stack.back());
+            size_t& edge_index = std::get<2>(stack.back());
+            if (edge_index < adj[v].size()) {
+                const int w = adj[v][edge_index++];
+                if (w == parent) continue;
+                if (preorder[w] < 0) {
+                    preorder[w] = lowlink[w] = num_visited++;
+                    if (v == root) ++num_root_children;
+                    stack.emplace_back(w, v, 0);
+                } else {
+                    lowlink[v] = std::min(lowlink[v], preorder[w]);
+                }
+                continue;
+            }
+
+            stack.pop_back();
+            if (parent >= 0) {
+                lowlink[parent] = std::min(lowlink[parent], lowlink[v]);
+                if (parent != root && lowlink[v] >= preorder[parent]) is_articulation_point[parent] = true;
             }
         }
-        if (std::accumulate(visited.begin(), visited.end(), 0) < n - 1) {
-            articulation_points.insert(nodes[i]);
-        }
+        if (num_root_children > 1) is_articulation_point[root] = true;
+    }
+
+    std::set<Node*> articulation_points;
+    for (int i = 0; i < n; ++i) {
+        if (is_articulation_point[i]) articulation_points.insert(nodes[i]);
     }
     return articulation_points;
 }
 
-std::vector<Order> ChenPolicy(const Graph& graph) {
-    int64_t budget = g_chen_budget * 1000000LL;
-    if (g_chen_budget == 0) {
-        // default budget = sqrt of total memory
-        for (Node* node : graph.nodes()) {
-            for (Value* value : node->outputs()) {
-                budget += value->GetNBytes();
-            }
+int64_t GetDefaultChenBudget(const Graph& graph) {
+    // default budget = sqrt of total memory
+    int64_t budget = 0;
+    for (Node* node : graph.nodes()) {
+        for (Value* value : node->outputs()) {
+            budget += value->GetNBytes();
         }
-        budget = budget / static_cast<int64_t>(std::sqrt(graph.nodes().size()));
-        std::cout << "Budget = " << budget / 1000000LL << " MB is used." << std::endl;
     }
+    return budget / static_cast<int64_t>(std::sqrt(graph.nodes().size()));
+}
 
-    std::vector<Order> orders;
-
-    std::vector<Node*> sorted = graph.GetTopologicallySortedNodes();
-
+std::vector<size_t> SelectChenSplits(const std::vector<Node*>& sorted, const std::set<Node*>& split_candidates, int64_t budget) {
     // find blocks to split
-    std::set<Node*> split_candidates = FindArticulationPoints(graph);
-    std::vector<Node*> splits;
     std::vector<size_t> split_indices;
 
     int64_t sum = 0;
@@ -93,18 +115,26 @@ std::vector<Order> ChenPolicy(const Graph& graph) {
             consumption += output->GetNBytes();
         }
         if (split_candidates.count(node) && sum + consumption > budget) {
-            splits.push_back(node);
             split_indices.push_back(i);
             sum = 0;
         } else {
             sum += consumption;
         }
     }
-    for (auto s : splits) std::cout << "Split at " << s->outputs()[0]->name() << std::endl;
+    if (g_compiler_log) {
+        for (size_t i : split_indices) std::cout << "Split at " << sorted[i]->outputs()[0]->name() << std::endl;
+    }
+    return split_indices;
+}
 
-    // schedule forward computation
-    for (Node* node : sorted) {
-        orders.emplace_back(Order::kComputeForward, node, nullptr);
+std::vector<Order> ComputeOrdersWithSplits(
+        const std::vector<Node*>& sorted, const std::vector<size_t>& split_indices, const std::vector<bool>& kept_segments) {
+    CHECK(kept_segments.empty() || kept_segments.size() == split_indices.size() + 1);
+    std::vector<Order> orders;
+
+    std::vector<Node*> splits;
+    for (size_t i : split_indices) {
+        splits.push_back(sorted[i]);
     }
 
     // perform forgetting
@@ -136,17 +166,41 @@ std::vector<Order> ChenPolicy(const Graph& graph) {
                     must_remember.insert(value);
                 }
             }
+            if (!kept_segments.empty() && kept_segments[g]) {
+                // values in a segment which is not recomputed
+                for (Value* value : node->outputs()) {
+                    must_remember.insert(value);
+                }
+            }
             if (g < splits.size() && splits[g] == node) {
                 g++;
             }
         }
     }
 
-    for (Node* node : sorted) {
-        for (Value* value : node->outputs()) {
-            if (!must_remember.count(value)) {
-                orders.emplace_back(Order::kForgetForward, nullptr, value);
+    // schedule forward computation. Values are forgotten right after
+    // their last users so the simulated memory usage reflects the
+    // lifetimes of forgotten values.
+    std::map<Node*, size_t> node_indices;
+    for (size_t i = 0; i < sorted.size(); ++i) {
+        node_indices.emplace(sorted[i], i);
+    }
+    std::vector<std::vector<Value*>> forgets(sorted.size());
+    for (size_t i = 0; i < sorted.size(); ++i) {
+        for (Value* value : sorted[i]->outputs()) {
+            if (must_remember.count(value)) continue;
+            size_t last_use = i;
+            for (Node* user : value->users()) {
+                auto found = node_indices.find(user);
+                if (found != node_indices.end()) last_use = std::max(last_use, found->second);
             }
+            forgets[last_use].push_back(value);
+        }
+    }
+    for (size_t i = 0; i < sorted.size(); ++i) {
+        orders.emplace_back(Order::kComputeForward, sorted[i], nullptr);
+        for (Value* value : forgets[i]) {
+            orders.emplace_back(Order::kForgetForward, nullptr, value);
         }
     }
 
@@ -178,4 +232,68 @@ std::vector<Order> ChenPolicy(const Graph& graph) {
     return orders;
 }
 
+namespace {
+
+std::vector<Order> ChenPolicyWithBudget(const std::vector<Node*>& sorted, const std::set<Node*>& split_candidates, int64_t budget) {
+    return ComputeOrdersWithSplits(sorted, SelectChenSplits(sorted, split_candidates, budget), {});
+}
+
+// Binary-searches the largest budget, i.e., the plan with the fewest
+// checkpoints, whose simulated peak memory fits in `target`. The peak
+// is assumed to increase with the budget, which holds for budgets
+// larger than the square root one Chen et al. recommend.
+std::vector<Order> SearchChenBudget(const std::vector<Node*>& sorted, const std::set<Node*>& split_candidates, int64_t target) {
+    int64_t total = 0;
+    for (Node* node : sorted) {
+        for (Value* value : node->outputs()) total += std::max<int64_t>(value->GetNBytes(), 0);
+    }
+
+    int64_t lo = 1;
+    int64_t hi = std::max<int64_t>(total, 1);
+    int64_t best_budget = -1;
+    int64_t min_peak = -1;
+    int64_t min_peak_budget = hi;
+    while (lo <= hi) {
+        const int64_t budget = lo + (hi - lo) / 2;
+        const int64_t peak = SimulatePeakMemory(ChenPolicyWithBudget(sorted, split_candidates, budget));
+        if (min_peak < 0 || peak < min_peak) {
+            min_peak = peak;
+            min_peak_budget = budget;
+        }
+        if (peak <= target) {
+            best_budget = budget;
+            lo = budget + 1;
+        } else {
+            hi = budget - 1;
+        }
+    }
+
+    if (best_budget < 0) {
+        WARN_ONCE(StrCat("No plan of Chen's policy fits in ", target / 1000000LL, "MB"));
+        best_budget = min_peak_budget;
+    }
+    std::vector<Order> orders = ChenPolicyWithBudget(sorted, split_candidates, best_budget);
+    std::cout << "Budget = " << best_budget / 1000000LL << " MB is used (simulated peak = " << SimulatePeakMemory(orders) / 1000000LL
+              << " MB, recomputed nodes = " << CountRecomputedNodes(orders) << ")." << std::endl;
+    return orders;
+}
+
+}  // namespace
+
+std::vector<Order> ChenPolicy(const Graph& graph) {
+    std::vector<Node*> sorted = graph.GetTopologicallySortedNodes();
+    std::set<Node*> split_candidates = FindArticulationPoints(graph);
+
+    if (g_chen_memory_target > 0) {
+        return SearchChenBudget(sorted, split_candidates, g_chen_memory_target * 1000000LL);
+    }
+
+    int64_t budget = g_chen_budget * 1000000LL;
+    if (g_chen_budget == 0) {
+        budget = GetDefaultChenBudget(graph);
+        std::cout << "Budget = " << budget / 1000000LL << " MB is used." << std::endl;
+    }
+    return ChenPolicyWithBudget(sorted, split_candidates, budget);
+}
+
 }  // namespace chainer_compiler
@@ -2,10 +2,32 @@
 
 #include "compiler/computation_order/core.h"
 
+#include <cstdint>
+#include <set>
 #include <vector>
 
 namespace chainer_compiler {
 
+// Returns nodes whose removal disconnects the graph, regarding edges
+// between nodes as undirected.
+std::set<Node*> FindArticulationPoints(const Graph& graph);
+
+// Returns the budget of a segment (in bytes) recommended by Chen et
+// al., i.e., the total size of values divided by sqrt(#nodes).
+int64_t GetDefaultChenBudget(const Graph& graph);
+
+// Returns indices of nodes in `sorted` at which segments are split so
+// the size of values in a segment does not exceed `budget` much.
+std::vector<size_t> SelectChenSplits(const std::vector<Node*>& sorted, const std::set<Node*>& split_candidates, int64_t budget);
+
+// Returns orders which forget values in segments split at
+// `split_indices` except values crossing segments, and recompute them
+// before the backward computation of each segment. Values in segment
+// `i` are kept instead if `kept_segments[i]` is true. An empty
+// `kept_segments` means all segments are recomputed.
+std::vector<Order> ComputeOrdersWithSplits(
+        const std::vector<Node*>& sorted, const std::vector<size_t>& split_indices, const std::vector<bool>& kept_segments);
+
 std::vector<Order> ChenPolicy(const Graph& graph);
 
 }  // namespace chainer_compiler
@@ -0,0 +1,53 @@
+#include <gtest/gtest.h>
+
+#include <compiler/computation_order/policy_chen.h>
+#include <compiler/graph.h>
+#include <compiler/graph_builder.h>
+#include <compiler/node.h>
+
+namespace chainer_compiler {
+namespace {
+
+TEST(PolicyChenTest, ArticulationPointsOfChain) {
+    Type type(Dtype::kFloat32, {2, 3});
+    Graph graph("test");
+    Value* input = graph.AddInputValue("input", type);
+    Value* output = graph.AddOutputValue("output", type);
+    Value* r1;
+    Value* r2;
+    {
+        GraphBuilder gb(&graph, "test", output);
+        r1 = gb.Op(Node::kRelu, {input});
+        r2 = gb.Op(Node::kRelu, {r1});
+        gb.Op(Node::kRelu, {r2}, output);
+    }
+
+    std::set<Node*> articulation_points = FindArticulationPoints(graph);
+    ASSERT_EQ(1, articulation_points.size());
+    EXPECT_EQ(r2->producer(), *articulation_points.begin());
+}
+
+TEST(PolicyChenTest, ArticulationPointsOfDiamond) {
+    Type type(Dtype::kFloat32, {2, 3});
+    Graph graph("test");
+    Value* input = graph.AddInputValue("input", type);
+    Value* output = graph.AddOutputValue("output", type);
+    Value* sum;
+    {
+        GraphBuilder gb(&graph, "test", output);
+        Value* a = gb.Op(Node::kRelu, {input});
+        Value* b = gb.Op(Node::kRelu, {a});
+        Value* c = gb.Op(Node::kTanh, {a});
+        sum = gb.Op(Node::kAdd, {b, c});
+        gb.Op(Node::kMul, {sum, sum}, output);
+    }
+
+    // Nodes in the cycle a-b-sum-c are not articulation points
+    // except `sum`, which connects the last Mul.
+    std::set<Node*> articulation_points = FindArticulationPoints(graph);
+    ASSERT_EQ(1, articulation_points.size());
+    EXPECT_EQ(sum->producer(), *articulation_points.begin());
+}
+
+}  // namespace
+}  // namespace chainer_compiler
@@ -0,0 +1,125 @@
+#include "compiler/computation_order/policy_recompute.h"
+
+#include <algorithm>
+#include <iostream>
+#include <set>
+#include <vector>
+
+#include <common/log.h>
+#include <common/strutil.h>
+#include <compiler/computation_order/policy_chen.h>
+#include <compiler/flags.h>
+#include <compiler/flops.h>
+#include <compiler/graph.h>
+#include <compiler/node.h>
+
+namespace chainer_compiler {
+namespace {
+
+int64_t GetKnownFlops(const Node& node) {
+    int num_unknown_flops = 0;
+    return std::max<int64_t>(CalculateFlops(node, &num_unknown_flops), 0);
+}
+
+int64_t CountRecomputedFlops(const std::vector<Order>& orders) {
+    std::set<Node*> computed;
+    int64_t flops = 0;
+    for (const Order& order : orders) {
+        if (order.kind != Order::kComputeForward) continue;
+        if (!computed.insert(order.node).second) flops += GetKnownFlops(*order.node);
+    }
+    return flops;
+}
+
+struct Plan {
+    std::vector<Order> orders;
+    int64_t peak{-1};
+    int64_t recomputed_flops{-1};
+};
+
+// Starts from the plan which recomputes all segments split at
+// `split_indices` and keeps segments greedily in the descending order
+// of saved FLOPs per byte as long as the simulated peak fits in
+// `target`.
+Plan KeepSegmentsGreedily(const std::vector<Node*>& sorted, const std::vector<size_t>& split_indices, int64_t target) {
+    const size_t num_segments = split_indices.size() + 1;
+    std::vector<int64_t> segment_flops(num_segments);
+    std::vector<int64_t> segment_bytes(num_segments);
+    {
+        size_t g = 0;
+        for (size_t i = 0; i < sorted.size(); ++i) {
+            segment_flops[g] += GetKnownFlops(*sorted[i]);
+            for (Value* value : sorted[i]->outputs()) {
+                segment_bytes[g] += std::max<int64_t>(value->GetNBytes(), 0);
+            }
+            if (g < split_indices.size() && split_indices[g] == i) {
+                g++;
+            }
+        }
+    }
+
+    std::vector<size_t> candidates;
+    for (size_t g = 0; g < num_segments; ++g) {
+        candidates.push_back(g);
+    }
+    std::stable_sort(candidates.begin(), candidates.end(), [&segment_flops, &segment_bytes](size_t a, size_t b) {
+        // segment_flops[a] / segment_bytes[a] > segment_flops[b] / segment_bytes[b]
+        return static_cast<double>(segment_flops[a]) * segment_bytes[b] > static_cast<double>(segment_flops[b]) * segment_bytes[a];
+    });
+
+    std::vector<bool> kept_segments(num_segments, false);
+    Plan plan;
+    plan.orders = ComputeOrdersWithSplits(sorted, split_indices, kept_segments);
+    plan.peak = SimulatePeakMemory(plan.orders);
+    if (plan.peak <= target) {
+        for (size_t g : candidates) {
+            kept_segments[g] = true;
+            std::vector<Order> orders = ComputeOrdersWithSplits(sorted, split_indices, kept_segments);
+            const int64_t peak = SimulatePeakMemory(orders);
+            if (peak <= target) {
+                plan.orders.swap(orders);
+                plan.peak = peak;
+            } else {
+                kept_segments[g] = false;
+            }
+        }
+    }
+    plan.recomputed_flops = CountRecomputedFlops(plan.orders);
+    return plan;
+}
+
+}  // namespace
+
+std::vector<Order> RecomputePolicy(const Graph& graph) {
+    std::vector<Node*> sorted = graph.GetTopologicallySortedNodes();
+    std::set<Node*> split_candidates = FindArticulationPoints(graph);
+    const int64_t default_budget = std::max<int64_t>(GetDefaultChenBudget(graph), 1);
+
+    int64_t target = g_recompute_budget * 1000000LL;
+    if (target <= 0) {
+        // Use as much memory as the default plan of Chen's policy.
+        target = SimulatePeakMemory(ComputeOrdersWithSplits(sorted, SelectChenSplits(sorted, split_candidates, default_budget), {}));
+    }
+
+    // Try segmentations around the one of Chen's policy and pick the
+    // plan with the least recomputation.
+    Plan best;
+    Plan min_peak;
+    for (int64_t segment_budget : {default_budget / 4, default_budget / 2, default_budget, default_budget * 2, default_budget * 4}) {
+        Plan plan = KeepSegmentsGreedily(sorted, SelectChenSplits(sorted, split_candidates, segment_budget), target);
+        if (min_peak.peak < 0 || plan.peak < min_peak.peak) min_peak = plan;
+        if (plan.peak > target) continue;
+        if (best.peak < 0 || plan.recomputed_flops < best.recomputed_flops) best = plan;
+    }
+
+    if (best.peak < 0) {
+        WARN_ONCE(StrCat("No plan of recomputation fits in ", target / 1000000LL, "MB"));
+        best = min_peak;
+    }
+    std::cout << "Budget = " << target / 1000000LL << " MB is used (simulated peak = " << best.peak / 1000000LL
+              << " MB, recomputed nodes = " << CountRecomputedNodes(best.orders) << ", recomputed flops = " << best.recomputed_flops << ")."
+              << std::endl;
+    return best.orders;
+}
+
+}  // namespace chainer_compiler
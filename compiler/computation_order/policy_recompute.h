@@ -0,0 +1,14 @@
+#pragma once
+
+#include "compiler/computation_order/core.h"
+
+#include <vector>
+
+namespace chainer_compiler {
+
+// Chooses segments whose values are kept instead of recomputed so the
+// recomputation FLOPs are minimized while the simulated peak memory
+// fits in `g_recompute_budget`.
+std::vector<Order> RecomputePolicy(const Graph& graph);
+
+}  // namespace chainer_compiler
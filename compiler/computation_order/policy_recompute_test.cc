@@ -0,0 +1,48 @@
+#include <gtest/gtest.h>
+
+#include <common/strutil.h>
+#include <compiler/computation_order/policy_chen.h>
+#include <compiler/computation_order/policy_recompute.h>
+#include <compiler/flags.h>
+#include <compiler/graph.h>
+#include <compiler/graph_builder.h>
+#include <compiler/node.h>
+
+namespace chainer_compiler {
+namespace {
+
+void BuildChain(Graph* graph, int num_nodes) {
+    Type type(Dtype::kFloat32, {1000, 1000});
+    Value* input = graph->AddInputValue("input", type);
+    Value* output = graph->AddOutputValue("output", type);
+    GraphBuilder gb(graph, "test", output);
+    Value* v = input;
+    for (int i = 0; i < num_nodes - 1; ++i) {
+        v = gb.Op(Node::kRelu, {v}, graph->AddValue(StrCat("v", i), type));
+    }
+    gb.Op(Node::kRelu, {v}, output);
+}
+
+TEST(PolicyRecomputeTest, KeepAllWithLargeBudget) {
+    Graph graph("test");
+    BuildChain(&graph, 16);
+
+    g_recompute_budget = 1000;
+    std::vector<Order> orders = RecomputePolicy(graph);
+    g_recompute_budget = 0;
+    EXPECT_EQ(0, CountRecomputedNodes(orders));
+}
+
+TEST(PolicyRecomputeTest, NoMoreMemoryThanChen) {
+    Graph graph("test");
+    BuildChain(&graph, 16);
+
+    std::vector<Order> chen_orders = ChenPolicy(graph);
+    std::vector<Order> orders = RecomputePolicy(graph);
+    EXPECT_LE(SimulatePeakMemory(orders), SimulatePeakMemory(chen_orders));
+    EXPECT_LE(CountRecomputedNodes(orders), CountRecomputedNodes(chen_orders));
+    EXPECT_LT(0, CountRecomputedNodes(orders));
+}
+
+}  // namespace
+}  // namespace chainer_compiler
@@ -13,6 +13,11 @@ public:
 
     virtual bool HasOp(Node::OpType op) const = 0;
 
+    // Returns true if Conv, ConvTranspose, and their gradients with
+    // `group` > 1 are supported. Otherwise, grouped Conv is split
+    // into per-group Conv ops.
+    virtual bool HasGroupedConv() const = 0;
+
     virtual std::string name() const = 0;
 
 protected:
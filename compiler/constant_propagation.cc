@@ -1,5 +1,8 @@
 #include "compiler/constant_propagation.h"
 
+#include <map>
+#include <queue>
+#include <set>
 #include <vector>
 
 #include <compiler/evaluator.h>
@@ -8,94 +11,163 @@
 #include <compiler/log.h>
 #include <compiler/node.h>
 #include <compiler/tensor.h>
+#include <compiler/type.h>
 #include <compiler/value.h>
 
 namespace chainer_compiler {
 
 namespace {
 
-bool HasConstantInputsOnly(const Node& node) {
-    if (node.inputs().empty()) return false;
-    for (Value* input : node.inputs()) {
-        if (input->producer() &&
-            (input->producer()->op_type() == Node::kConstant || input->producer()->op_type() == Node::kChainerSequenceConstants)) {
-        } else {
-            return false;
-        }
-    }
-    return true;
-}
+// Constant outputs of ops which generate data, such as
+// ConstantOfShape, are not folded beyond this size so the program does
+// not bloat.
+constexpr int64_t kMaxGeneratedConstantBytes = 1024 * 1024;
 
-void DoConstantPropagation(Graph* graph, Node* node) {
-    CLOG() << "Propagate " << node->ToString() << std::endl;
-    std::vector<Node*> inputs;
-    for (Value* input : node->inputs()) inputs.push_back(input->producer());
-
-    std::vector<std::unique_ptr<EvaluatedValue>> next_values;
-    std::vector<Node*> nodes = inputs;
-    nodes.push_back(node);
-    Eval(nodes, node->outputs(), &next_values);
-
-    for (size_t i = 0; i < next_values.size(); ++i) {
-        auto& next_value = next_values[i];
-        GraphBuilder gb(graph, "Const", node->output(i));
-        if (next_value->is_tensor()) {
-            gb.Op(Node::kConstant, {}, node->output(i))->producer()->set_tensor_value(next_value->ReleaseTensor());
-        } else {
-            gb.Op(Node::kChainerSequenceConstants, {}, node->output(i))->producer()->set_tensor_values(next_value->ReleaseSequence());
-        }
-    }
-
-    graph->DetachNode(node);
-    for (Node* input : inputs) {
-        if (input->output(0)->users().empty()) {
-            graph->DetachNode(input);
-        }
-    }
+bool IsConstant(const Node& node) {
+    return node.op_type() == Node::kConstant || node.op_type() == Node::kChainerSequenceConstants;
 }
 
-bool MaybePropagateConstant(Graph* graph, Node* node) {
-    switch (node->op_type()) {
-        // TODO(hamaji): Handle more ops.
+bool IsFoldableOp(const Node& node) {
+    switch (node.op_type()) {
         case Node::kIdentity:
         case Node::kAdd:
         case Node::kSub:
         case Node::kMul:
         case Node::kDiv:
+        case Node::kNeg:
+        case Node::kAbs:
+        case Node::kFloor:
+        case Node::kCeil:
+        case Node::kMax:
+        case Node::kMin:
+        case Node::kEqual:
+        case Node::kGreater:
+        case Node::kLess:
+        case Node::kNot:
+        case Node::kAnd:
+        case Node::kOr:
         case Node::kChainerGenericIs:
         case Node::kChainerGenericLen:
         case Node::kShape:
+        case Node::kSize:
+        case Node::kReshape:
+        case Node::kFlatten:
+        case Node::kSqueeze:
         case Node::kUnsqueeze:
+        case Node::kTranspose:
+        case Node::kConcat:
         case Node::kGather:
         case Node::kSlice:
         case Node::kExpand:
         case Node::kCast:
+        case Node::kReduceSum:
+        case Node::kReduceMax:
+        case Node::kReduceMin:
         case Node::kChainerSequenceAppend:
         case Node::kChainerSequenceConcat:
         case Node::kChainerSequenceCreate:
         case Node::kChainerSequenceStack:
-        case Node::kChainerSequenceRange: {
-            DoConstantPropagation(graph, node);
+        case Node::kChainerSequenceRange:
+        case Node::kChainerSequenceSize:
+        case Node::kChainerSequenceLookup:
+        case Node::kChainerSequenceGetSlice:
             return true;
+
+        case Node::kConstantOfShape: {
+            const Type& type = node.output(0)->type();
+            return type.HasKnownShape() && type.GetNBytes() <= kMaxGeneratedConstantBytes;
         }
 
         default:
-            CLOG() << "Not propagate " << node->ToString() << std::endl;
+            return false;
     }
-    return false;
 }
 
 }  // namespace
 
 void PropagateConstants(Graph* graph) {
-    bool replaced = true;
-    while (replaced) {
-        replaced = false;
-        for (Node* node : graph->GetLiveNodes()) {
-            if (!HasConstantInputsOnly(*node)) continue;
-            if (MaybePropagateConstant(graph, node)) {
-                replaced = true;
+    // Find nodes whose inputs are all constants or outputs of other
+    // foldable nodes. They form constant subgraphs which are
+    // evaluated by a single XCVM run. Nodes are visited from
+    // constants so `folded_nodes` is topologically sorted.
+    std::vector<Node*> constant_nodes;
+    std::map<Node*, size_t> num_pending_inputs;
+    std::queue<Value*> q;
+    for (Node* node : graph->GetLiveNodes()) {
+        if (IsConstant(*node)) {
+            constant_nodes.push_back(node);
+            q.push(node->output(0));
+        } else if (!node->inputs().empty()) {
+            num_pending_inputs.emplace(node, node->inputs().size());
+        }
+    }
+
+    std::vector<Node*> folded_nodes;
+    std::set<Node*> folded_node_set;
+    while (!q.empty()) {
+        Value* value = q.front();
+        q.pop();
+        for (Node* user : value->users()) {
+            auto found = num_pending_inputs.find(user);
+            if (found == num_pending_inputs.end() || --found->second) continue;
+            if (!IsFoldableOp(*user)) {
+                CLOG() << "Not propagate " << user->ToString() << std::endl;
+                continue;
             }
+            CLOG() << "Propagate " << user->ToString() << std::endl;
+            folded_nodes.push_back(user);
+            folded_node_set.insert(user);
+            for (Value* output : user->outputs()) q.push(output);
+        }
+    }
+    if (folded_nodes.empty()) return;
+
+    std::vector<Node*> used_constant_nodes;
+    for (Node* node : constant_nodes) {
+        for (Node* user : node->output(0)->users()) {
+            if (folded_node_set.count(user)) {
+                used_constant_nodes.push_back(node);
+                break;
+            }
+        }
+    }
+
+    // Only values used outside the constant subgraphs are fetched.
+    std::vector<Value*> fetches;
+    for (Node* node : folded_nodes) {
+        for (Value* output : node->outputs()) {
+            bool is_used_outside = output->IsOutput();
+            for (Node* user : output->users()) {
+                if (!folded_node_set.count(user)) is_used_outside = true;
+            }
+            if (is_used_outside) fetches.push_back(output);
+        }
+    }
+
+    if (!fetches.empty()) {
+        std::vector<Node*> nodes = used_constant_nodes;
+        nodes.insert(nodes.end(), folded_nodes.begin(), folded_nodes.end());
+        std::vector<std::unique_ptr<EvaluatedValue>> next_values;
+        Eval(nodes, fetches, &next_values);
+        CHECK_EQ(fetches.size(), next_values.size());
+
+        for (size_t i = 0; i < next_values.size(); ++i) {
+            auto& next_value = next_values[i];
+            GraphBuilder gb(graph, "Const", fetches[i]);
+            if (next_value->is_tensor()) {
+                gb.Op(Node::kConstant, {}, fetches[i])->producer()->set_tensor_value(next_value->ReleaseTensor());
+            } else {
+                gb.Op(Node::kChainerSequenceConstants, {}, fetches[i])->producer()->set_tensor_values(next_value->ReleaseSequence());
+            }
+        }
+    }
+
+    for (Node* node : folded_nodes) {
+        graph->DetachNode(node);
+    }
+    for (Node* node : used_constant_nodes) {
+        if (node->output(0)->users().empty()) {
+            graph->DetachNode(node);
         }
     }
 }
@@ -0,0 +1,51 @@
+#include <gtest/gtest.h>
+
+#include <compiler/constant_propagation.h>
+#include <compiler/graph.h>
+#include <compiler/graph_builder.h>
+#include <compiler/node.h>
+#include <compiler/tensor.h>
+
+namespace chainer_compiler {
+namespace {
+
+TEST(ConstantPropagationTest, FoldConstantSubgraph) {
+    Type type(Dtype::kFloat32, {2, 3});
+    Graph graph("test");
+    Value* input = graph.AddInputValue("input", type);
+    Value* output = graph.AddOutputValue("output", type);
+    {
+        GraphBuilder gb(&graph, "test", output);
+        Value* c = gb.Const(type, std::vector<float>{0, 1, 2, 3, 4, 5});
+        Value* shape = gb.Const(Type(Dtype::kInt64, {2}), std::vector<int64_t>{3, 2});
+        Value* reshaped = gb.Op(Node::kReshape, {c, shape});
+        Value* transposed = gb.Op(Node::kTranspose, {reshaped});
+        Value* one = gb.Const(Type(Dtype::kFloat32, {}), std::vector<float>{1});
+        Value* added = gb.Op(Node::kAdd, {transposed, one});
+        gb.Op(Node::kMul, {input, added}, output);
+    }
+
+    PropagateConstants(&graph);
+    graph.DeleteDetached();
+
+    // Reshape, Transpose, and Add are folded into a single constant.
+    ASSERT_EQ(2, graph.nodes().size());
+    const Node* constant = nullptr;
+    for (const Node* node : graph.nodes()) {
+        if (node->op_type() == Node::kConstant) constant = node;
+    }
+    ASSERT_TRUE(constant);
+    ASSERT_EQ(1, constant->output(0)->users().size());
+    EXPECT_EQ(Node::kMul, constant->output(0)->users()[0]->op_type());
+
+    const Tensor& tensor = *constant->tensor_value();
+    ASSERT_EQ(std::vector<int64_t>({2, 3}), tensor.dims());
+    const std::vector<float> expected = {1, 3, 5, 2, 4, 6};
+    for (size_t i = 0; i < expected.size(); ++i) {
+        EXPECT_EQ(expected[i], tensor.Get<float>(i));
+    }
+    graph.CheckSanity("folded");
+}
+
+}  // namespace
+}  // namespace chainer_compiler
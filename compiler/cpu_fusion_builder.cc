@@ -0,0 +1,150 @@
+#include "compiler/cpu_fusion_builder.h"
+
+#include <iomanip>
+#include <limits>
+#include <map>
+#include <queue>
+#include <sstream>
+
+#include <common/log.h>
+#include <compiler/node.h>
+#include <compiler/tensor.h>
+#include <compiler/type.h>
+#include <compiler/value.h>
+
+namespace chainer_compiler {
+
+namespace {
+
+const char* GetInstructionName(Node::OpType op_type) {
+    switch (op_type) {
+        case Node::kIdentity:
+            return "identity";
+        case Node::kAdd:
+            return "add";
+        case Node::kSub:
+            return "sub";
+        case Node::kMul:
+            return "mul";
+        case Node::kDiv:
+            return "div";
+        case Node::kTanh:
+            return "tanh";
+        case Node::kExp:
+            return "exp";
+        case Node::kSigmoid:
+            return "sigmoid";
+        default:
+            return nullptr;
+    }
+}
+
+// Computes the broadcast shape of `values`. Returns false if any of
+// them has an unknown shape or the shapes are not broadcastable.
+bool GetBroadcastShape(const std::vector<Value*>& values, std::vector<int64_t>* dims) {
+    dims->clear();
+    for (Value* value : values) {
+        const Type& type = value->type();
+        if (type.kind() != Type::Kind::kTensor || !type.HasKnownShape()) return false;
+        const std::vector<int64_t>& vdims = type.dims();
+        if (dims->size() < vdims.size()) dims->insert(dims->begin(), vdims.size() - dims->size(), 1);
+        const size_t offset = dims->size() - vdims.size();
+        for (size_t i = 0; i < vdims.size(); ++i) {
+            int64_t& d = (*dims)[offset + i];
+            if (d == vdims[i] || vdims[i] == 1) continue;
+            if (d != 1) return false;
+            d = vdims[i];
+        }
+    }
+    return true;
+}
+
+}  // namespace
+
+bool BuildCpuFusionProgram(
+        const std::vector<Node*>& nodes, const std::vector<Value*>& inputs, const std::vector<Value*>& outputs, std::string* prog) {
+    // `ElementWiseCpu` allocates every output with the broadcast shape
+    // of the inputs, so a narrower intermediate value cannot be an
+    // output of the group.
+    std::vector<int64_t> dims;
+    if (!GetBroadcastShape(inputs, &dims)) return false;
+    for (Value* value : outputs) {
+        const Type& type = value->type();
+        if (type.kind() != Type::Kind::kTensor || !type.HasKnownShape() || type.dims() != dims) return false;
+    }
+
+    std::ostringstream oss;
+    oss << std::setprecision(std::numeric_limits<double>::max_digits10);
+
+    std::map<Value*, int> registers;
+    auto get_register = [&registers](Value* value) {
+        auto found = registers.find(value);
+        CHECK(found != registers.end()) << value->name();
+        return found->second;
+    };
+    auto add_register = [&registers](Value* value) {
+        const int reg = registers.size();
+        CHECK(registers.emplace(value, reg).second) << value->name();
+        return reg;
+    };
+
+    std::map<Node*, int> input_counts;
+    for (Node* node : nodes) {
+        CHECK(input_counts.emplace(node, node->GetNumActualInputs()).second);
+    }
+
+    std::queue<Value*> q;
+    for (Value* value : inputs) {
+        add_register(value);
+        q.push(value);
+    }
+
+    for (Node* node : nodes) {
+        if (node->op_type() != Node::kConstant) continue;
+        Tensor* t = node->tensor_value().get();
+        if (t->NumElements() != 1) return false;
+        double value;
+        switch (t->dtype()) {
+            case Dtype::kFloat32:
+                value = t->Get<float>(0);
+                break;
+            case Dtype::kFloat64:
+                value = t->Get<double>(0);
+                break;
+            default:
+                return false;
+        }
+        oss << "const " << add_register(node->output(0)) << ' ' << value << '\n';
+        q.push(node->output(0));
+    }
+
+    while (!q.empty()) {
+        Value* value = q.front();
+        q.pop();
+
+        for (Node* node : value->users()) {
+            auto found = input_counts.find(node);
+            if (found == input_counts.end()) continue;
+            if (--found->second != 0) continue;
+
+            const char* name = GetInstructionName(node->op_type());
+            if (!name || node->outputs().size() != 1) return false;
+            std::vector<int> srcs;
+            for (Value* input : node->inputs()) srcs.push_back(get_register(input));
+            oss << name << ' ' << add_register(node->output(0));
+            for (int src : srcs) oss << ' ' << src;
+            oss << '\n';
+            q.push(node->output(0));
+        }
+    }
+
+    for (Value* value : outputs) {
+        if (!registers.count(value)) return false;
+        oss << "out " << get_register(value) << '\n';
+    }
+
+    *prog = oss.str();
+    return true;
+}
+
+}  // namespace chainer_compiler
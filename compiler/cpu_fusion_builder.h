@@ -0,0 +1,22 @@
+#pragma once
+
+#include <string>
+#include <vector>
+
+namespace chainer_compiler {
+
+class Node;
+class Value;
+
+// Builds a program of `ElementWiseCpu` for an elementwise fusion
+// group. Returns false if `nodes` contain an unsupported op or any of
+// `outputs` does not have the known broadcast shape of `inputs`.
+//
+// The program consists of lines of an instruction and its operands
+// (e.g., "add 3 0 2"). The first operand is the destination register
+// and registers from zero to `inputs.size() - 1` hold inputs. "const"
+// takes a scalar value and "out" takes a register of an output.
+bool BuildCpuFusionProgram(
+        const std::vector<Node*>& nodes, const std::vector<Value*>& inputs, const std::vector<Value*>& outputs, std::string* prog);
+
+}  // namespace chainer_compiler
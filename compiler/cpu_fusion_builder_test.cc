@@ -0,0 +1,55 @@
+#include <gtest/gtest.h>
+
+#include <string>
+#include <vector>
+
+#include <compiler/cpu_fusion_builder.h>
+#include <compiler/graph.h>
+#include <compiler/node.h>
+#include <compiler/type.h>
+#include <compiler/value.h>
+
+namespace chainer_compiler {
+namespace {
+
+TEST(CpuFusionBuilderTest, Build) {
+    Graph graph("test");
+    Value* x = graph.AddInputValue("x", Type(Dtype::kFloat32, {3}));
+    Value* y = graph.AddInputValue("y", Type(Dtype::kFloat32, {2, 3}));
+    Value* a = graph.AddValue("a", Type(Dtype::kFloat32, {2, 3}));
+    Value* b = graph.AddOutputValue("b", Type(Dtype::kFloat32, {2, 3}));
+    Node* add = graph.AddNode(Node::kAdd, {x, y}, {a});
+    Node* tanh = graph.AddNode(Node::kTanh, {a}, {b});
+
+    std::string prog;
+    ASSERT_TRUE(BuildCpuFusionProgram({add, tanh}, {x, y}, {b}, &prog));
+    EXPECT_EQ("add 2 0 1\ntanh 3 2\nout 3\n", prog);
+}
+
+TEST(CpuFusionBuilderTest, RejectNarrowOutput) {
+    Graph graph("test");
+    Value* x = graph.AddInputValue("x", Type(Dtype::kFloat32, {3}));
+    Value* y = graph.AddInputValue("y", Type(Dtype::kFloat32, {2, 3}));
+    // `a` is also used outside the group and narrower than `b`.
+    Value* a = graph.AddOutputValue("a", Type(Dtype::kFloat32, {3}));
+    Value* b = graph.AddOutputValue("b", Type(Dtype::kFloat32, {2, 3}));
+    Node* tanh = graph.AddNode(Node::kTanh, {x}, {a});
+    Node* add = graph.AddNode(Node::kAdd, {a, y}, {b});
+
+    std::string prog;
+    EXPECT_FALSE(BuildCpuFusionProgram({tanh, add}, {x, y}, {a, b}, &prog));
+    EXPECT_TRUE(BuildCpuFusionProgram({tanh, add}, {x, y}, {b}, &prog));
+}
+
+TEST(CpuFusionBuilderTest, RejectUnknownShape) {
+    Graph graph("test");
+    Value* x = graph.AddInputValue("x", Type(Dtype::kFloat32, {-1, 3}));
+    Value* b = graph.AddOutputValue("b", Type(Dtype::kFloat32, {-1, 3}));
+    Node* tanh = graph.AddNode(Node::kTanh, {x}, {b});
+
+    std::string prog;
+    EXPECT_FALSE(BuildCpuFusionProgram({tanh}, {x}, {b}, &prog));
+}
+
+}  // namespace
+}  // namespace chainer_compiler
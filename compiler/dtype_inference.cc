@@ -240,6 +240,27 @@ void InferDtype(Node* node) {
             break;
         }
 
+        case Node::kChainerNStepLSTM: {
+            Dtype dtype = CoerceDtype(in0, node->input(2)->type().dtype());
+            oset(0, dtype);
+            oset(1, dtype);
+            oset(2, dtype);
+            break;
+        }
+
+        case Node::kChainerNStepLSTMGrad: {
+            // The outputs are gradients of X, W_0, R_0, B_0, ... of
+            // the forward op, which produces the context.
+            const Node* fwd = node->input(3)->producer();
+            if (fwd == nullptr || fwd->op_type() != Node::kChainerNStepLSTM) break;
+            CHECK_EQ(fwd->inputs().size(), node->outputs().size() + 1) << node->ToString();
+            oset(0, fwd->input(0)->type().dtype());
+            for (size_t i = 1; i < node->outputs().size(); ++i) {
+                oset(i, fwd->input(i + 1)->type().dtype());
+            }
+            break;
+        }
+
         case Node::kConv:
         case Node::kConvTranspose:
         case Node::kChainerConvGradWeight: {
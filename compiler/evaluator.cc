@@ -96,7 +96,7 @@ void Eval(
 
     runtime::XCVM xcvm(program);
     runtime::XCVMOptions xcvm_options;
-    runtime::XCVMState state(xcvm_options, xcvm.num_variables(), {});
+    runtime::XCVMState state(xcvm_options, xcvm.num_variables(), {}, xcvm.output_names().size());
 
     for (size_t i = 0; i < feeds.size(); ++i) {
         int input_id = input_ids[i];
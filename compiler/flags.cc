@@ -1,5 +1,7 @@
 #include "compiler/flags.h"
 
+#include <common/strutil.h>
+
 namespace chainer_compiler {
 
 bool g_compiler_log;
@@ -10,6 +12,8 @@ bool g_skip_inference;
 
 bool g_replace_constant;
 
+bool g_skip_batch_norm_folding;
+
 bool g_modify_pool_with_imbalanced_pads;
 
 bool g_use_cuda;
@@ -17,6 +21,7 @@ bool g_use_cuda;
 bool g_fuse_operations;
 
 bool g_use_nvrtc;
+bool g_use_cpu_fusion;
 
 bool g_use_tvm;
 
@@ -26,6 +31,10 @@ std::string g_dump_autotvm_task_dir;
 
 std::string g_autotvm_log;
 
+bool g_reuse_variable_slots;
+
+bool g_use_memory_arena;
+
 bool g_use_ngraph;
 
 std::string g_backend_name;
@@ -37,7 +46,67 @@ bool g_dump_after_fusion;
 bool g_dump_after_scheduling;
 bool g_dump_subgraphs;
 
+std::string g_disabled_passes;
+bool g_pass_stats_json;
+int g_compiler_threads;
+
+std::string g_scheduler;
+int g_scheduler_lookahead;
+
 std::string g_computation_order;
 int g_chen_budget;
+int g_chen_memory_target;
+int g_recompute_budget;
+
+std::string GetCodegenFlagsString() {
+    // Flags only for logging and dumping are not included.
+    return StrCat(
+            "permissive=",
+            g_permissive,
+            " skip_inference=",
+            g_skip_inference,
+            " replace_constant=",
+            g_replace_constant,
+            " skip_batch_norm_folding=",
+            g_skip_batch_norm_folding,
+            " modify_pool_with_imbalanced_pads=",
+            g_modify_pool_with_imbalanced_pads,
+            " use_cuda=",
+            g_use_cuda,
+            " fuse_operations=",
+            g_fuse_operations,
+            " use_nvrtc=",
+            g_use_nvrtc,
+            " use_cpu_fusion=",
+            g_use_cpu_fusion,
+            " use_tvm=",
+            g_use_tvm,
+            " reuse_tvm_code=",
+            g_reuse_tvm_code,
+            " autotvm_log=",
+            g_autotvm_log,
+            " reuse_variable_slots=",
+            g_reuse_variable_slots,
+            " use_memory_arena=",
+            g_use_memory_arena,
+            " use_ngraph=",
+            g_use_ngraph,
+            " backend_name=",
+            g_backend_name,
+            " disabled_passes=",
+            g_disabled_passes,
+            " scheduler=",
+            g_scheduler,
+            " scheduler_lookahead=",
+            g_scheduler_lookahead,
+            " computation_order=",
+            g_computation_order,
+            " chen_budget=",
+            g_chen_budget,
+            " chen_memory_target=",
+            g_chen_memory_target,
+            " recompute_budget=",
+            g_recompute_budget);
+}
 
 }  // namespace chainer_compiler
@@ -18,6 +18,10 @@ extern bool g_skip_inference;
 // Similar to onnx/optimizer/passes/extract_constant_to_initializer.h
 extern bool g_replace_constant;
 
+// Do not fold inference-mode BatchNormalization into the weights of
+// preceding Conv, ConvTranspose, Gemm, and Linear.
+extern bool g_skip_batch_norm_folding;
+
 // Modifies MaxPool and AveragePool with imbalanced pads (e.g., (0, 0,
 // 1, 1)) so these ops will be split into Pad and Pool. This is
 // for backends such as Chainer which do not support imbalanced pads.
@@ -32,6 +36,10 @@ extern bool g_fuse_operations;
 // Use NVRTC to execute fused operations.
 extern bool g_use_nvrtc;
 
+// Execute fused elementwise operations by a single tiled loop on CPU
+// instead of running them one by one.
+extern bool g_use_cpu_fusion;
+
 // Use TVM to execute fused operations.
 extern bool g_use_tvm;
 
@@ -44,6 +52,13 @@ extern std::string g_dump_autotvm_task_dir;
 // A tuning log of AutoTVM which contains best scheduling parameters.
 extern std::string g_autotvm_log;
 
+// Reuse variable slots of XCVM for values with disjoint lifetimes.
+extern bool g_reuse_variable_slots;
+
+// Place intermediate values with known shapes in a memory arena
+// planned at compile time and reused across runs.
+extern bool g_use_memory_arena;
+
 // Use nGraph to execute fused operations.
 extern bool g_use_ngraph;
 
@@ -58,8 +73,36 @@ extern bool g_dump_after_fusion;
 extern bool g_dump_after_scheduling;
 extern bool g_dump_subgraphs;
 
+// Comma separated names of optional compiler passes to be skipped.
+extern std::string g_disabled_passes;
+
+// Shows statistics of compiler passes as JSON instead of a table
+// when `g_compiler_log` is set.
+extern bool g_pass_stats_json;
+
+// The number of threads to run compiler passes for subgraphs. Passes
+// run serially if this is less than two.
+extern int g_compiler_threads;
+
+// The scheduler of nodes, "greedy" (default), "naive", or "memory".
+extern std::string g_scheduler;
+// The number of nodes to look ahead in the "memory" scheduler.
+extern int g_scheduler_lookahead;
+
 // The policy of computation order.
 extern std::string g_computation_order;
 extern int g_chen_budget;
+// If positive, the budget of Chen's policy is searched so the
+// simulated peak memory fits in this (in MB) and `g_chen_budget` is
+// ignored.
+extern int g_chen_memory_target;
+// The memory budget of the recompute policy (in MB). The simulated
+// peak of the default plan of Chen's policy is used if this is zero.
+extern int g_recompute_budget;
+
+// Returns the values of flags which may change the compiled program.
+// This is a part of keys of `ProgramCache` so new flags which affect
+// outputs of the compiler must be added to this function.
+std::string GetCodegenFlagsString();
 
 }  // namespace chainer_compiler
@@ -5,8 +5,11 @@
 #include <algorithm>
 #include <functional>
 #include <iterator>
+#include <map>
+#include <queue>
 #include <set>
 #include <stack>
+#include <unordered_map>
 #include <vector>
 
 #include <common/strutil.h>
@@ -20,14 +23,14 @@ namespace chainer_compiler {
 
 namespace {
 
-void CreateFusionGroup(Graph* graph, const std::set<Node*>& nodes, const std::string& fusion_type, int fusion_group_id) {
+Node* CreateFusionGroup(Graph* graph, const std::set<Node*>& nodes, const std::string& fusion_type, int fusion_group_id) {
     std::vector<Value*> inputs;
     std::vector<Value*> outputs;
     std::vector<Value*> temps;
     ClassifyValues(std::vector<Node*>(nodes.begin(), nodes.end()), &inputs, &outputs, &temps);
     CHECK(!inputs.empty());
     if (outputs.empty()) {
-        return;
+        return nullptr;
     }
 
     GraphBuilder gb(graph, StrCat("Fusion", fusion_group_id), outputs.front());
@@ -81,9 +84,102 @@ void CreateFusionGroup(Graph* graph, const std::set<Node*>& nodes, const std::st
         }
     }
 #endif
+    return fused;
 }
 
-void RejectCyclicNodes(std::set<Node*>* cands) {
+// Maintains ranks of nodes such that a node has a larger rank than
+// producers of its inputs. Ranks are spaced so a fusion group can
+// usually be ranked without renumbering other nodes.
+class NodeRanks {
+public:
+    explicit NodeRanks(Graph* graph) : graph_(graph) {
+        Renumber();
+    }
+
+    int64_t rank(Node* node) const {
+        auto found = ranks_.find(node);
+        CHECK(found != ranks_.end()) << node->ToString();
+        return found->second;
+    }
+
+    // Ranks `fused` between producers of its inputs and users of its
+    // outputs. Fused nodes are removed from the graph so their ranks
+    // do not matter.
+    void AddFusionGroup(Node* fused) {
+        bool has_lo = false, has_hi = false;
+        int64_t lo = 0, hi = 0;
+        for (Value* value : fused->inputs()) {
+            if (Node* producer = value->producer()) {
+                lo = has_lo ? std::max(lo, rank(producer)) : rank(producer);
+                has_lo = true;
+            }
+        }
+        for (Value* value : fused->outputs()) {
+            for (Node* user : value->users()) {
+                hi = has_hi ? std::min(hi, rank(user)) : rank(user);
+                has_hi = true;
+            }
+        }
+
+        if (!has_lo && !has_hi) {
+            ranks_[fused] = 0;
+        } else if (!has_lo) {
+            ranks_[fused] = hi - kGap;
+        } else if (!has_hi) {
+            ranks_[fused] = lo + kGap;
+        } else if (hi - lo >= 2) {
+            ranks_[fused] = lo + (hi - lo) / 2;
+        } else {
+            Renumber();
+        }
+    }
+
+private:
+    static constexpr int64_t kGap = 1 << 20;
+
+    void Renumber() {
+        const std::vector<Node*> nodes = graph_->GetLiveNodes();
+        std::map<Node*, int> input_counts;
+        for (Node* node : nodes) input_counts.emplace(node, 0);
+        for (Node* node : nodes) {
+            for (Value* value : node->inputs()) {
+                if (value->producer() && input_counts.count(value->producer())) ++input_counts[node];
+            }
+        }
+
+        ranks_.clear();
+        std::queue<Node*> q;
+        for (Node* node : nodes) {
+            if (input_counts[node] == 0) q.push(node);
+        }
+        while (!q.empty()) {
+            Node* node = q.front();
+            q.pop();
+            ranks_.emplace(node, (ranks_.size() + 1) * kGap);
+            for (Value* value : node->outputs()) {
+                for (Node* user : value->users()) {
+                    auto found = input_counts.find(user);
+                    if (found == input_counts.end()) continue;
+                    if (--found->second == 0) q.push(user);
+                }
+            }
+        }
+        CHECK_EQ(nodes.size(), ranks_.size()) << "Cycle in " << graph_->name();
+    }
+
+    Graph* graph_;
+    std::unordered_map<Node*, int64_t> ranks_;
+};
+
+// Rejects candidates reachable from a user of candidates outside the
+// candidates, as fusing them would make a cycle. Nodes ranked after
+// all candidates cannot reach them so they are not visited.
+void RejectCyclicNodes(const NodeRanks& ranks, std::set<Node*>* cands) {
+    int64_t max_rank = 0;
+    for (Node* node : *cands) {
+        max_rank = std::max(max_rank, ranks.rank(node));
+    }
+
     std::stack<Node*> q;
     for (Node* node : *cands) {
         for (Value* output : node->outputs()) {
@@ -99,14 +195,12 @@ void RejectCyclicNodes(std::set<Node*>* cands) {
     while (!q.empty()) {
         Node* node = q.top();
         q.pop();
+        if (ranks.rank(node) > max_rank) continue;
         if (!seen.emplace(node).second) continue;
         if (cands->count(node)) {
             rejected.insert(node);
         }
 
-        // TODO(hamaji): Optimize this algorithm by pre-calculating
-        // the max distance from the input for all nodes.
-
         for (Value* output : node->outputs()) {
             for (Node* n : output->users()) {
                 q.push(n);
@@ -120,6 +214,7 @@ void RejectCyclicNodes(std::set<Node*>* cands) {
 void FuseAllConnectedNodes(const char* name, Graph* graph, int min_fuse_ops, const std::function<bool(const Node&)>& is_fusable) {
     int num_fusion_groups = 0;
     const std::vector<Node*> all_nodes(graph->nodes());
+    NodeRanks ranks(graph);
     for (Node* base_node : all_nodes) {
         if (base_node->chainer_fusion_group()) continue;
         if (!is_fusable(*base_node)) continue;
@@ -149,7 +244,7 @@ void FuseAllConnectedNodes(const char* name, Graph* graph, int min_fuse_ops, con
             }
         }
 
-        RejectCyclicNodes(&cands);
+        RejectCyclicNodes(ranks, &cands);
 
         int num_calculation = 0;
         for (Node* node : cands) {
@@ -162,7 +257,9 @@ void FuseAllConnectedNodes(const char* name, Graph* graph, int min_fuse_ops, con
             node->set_chainer_fusion_group(num_fusion_groups);
         }
 
-        CreateFusionGroup(graph, cands, name, num_fusion_groups);
+        if (Node* fused = CreateFusionGroup(graph, cands, name, num_fusion_groups)) {
+            ranks.AddFusionGroup(fused);
+        }
     }
 }
 
@@ -263,6 +360,10 @@ void FuseTVMOperations(Graph* graph) {
         if (!is_fusable(base_node)) {
             continue;
         }
+        // The TVM backend does not support grouped convolutions.
+        if ((base_node->op_type() == Node::kConv || base_node->op_type() == Node::kConvTranspose) && base_node->group() != 1) {
+            continue;
+        }
 
         std::set<Node*> fused_nodes = {base_node};
 
@@ -25,5 +25,73 @@ TEST(FusionTest, Basic) {
     graph.CheckSanity("fused");
 }
 
+TEST(FusionTest, RejectCycle) {
+    Type type(Dtype::kFloat32, {});
+    Graph graph("test");
+    Value* input = graph.AddInputValue("input", type);
+    Value* output = graph.AddOutputValue("output", type);
+    GraphBuilder gb(&graph, "test", output);
+    Value* t = gb.Op(Node::kTanh, {input});
+    Value* r = gb.Op(Node::kRelu, {t});
+    Value* a = gb.Op(Node::kAdd, {t, r});
+    gb.Op(Node::kSigmoid, {a}, {output});
+
+    // Fusing Tanh and Add would make a cycle via Relu and Tanh alone
+    // is too small to be fused.
+    FuseOperations(&graph);
+    ASSERT_EQ(4, graph.nodes().size());
+    for (const Node* node : graph.nodes()) {
+        EXPECT_NE(Node::kChainerFusionGroup, node->op_type());
+    }
+    graph.CheckSanity("fused");
+}
+
+TEST(FusionTest, MultipleGroups) {
+    Type type(Dtype::kFloat32, {});
+    Graph graph("test");
+    Value* input = graph.AddInputValue("input", type);
+    Value* output = graph.AddOutputValue("output", type);
+    GraphBuilder gb(&graph, "test", output);
+    Value* v = gb.Op(Node::kTanh, {input});
+    v = gb.Op(Node::kSigmoid, {v});
+    v = gb.Op(Node::kRelu, {v});
+    v = gb.Op(Node::kTanh, {v});
+    v = gb.Op(Node::kSigmoid, {v});
+    v = gb.Op(Node::kRelu, {v});
+    v = gb.Op(Node::kTanh, {v});
+    gb.Op(Node::kSigmoid, {v}, {output});
+
+    FuseOperations(&graph);
+    ASSERT_EQ(5, graph.nodes().size());
+    int num_fusion_groups = 0;
+    for (const Node* node : graph.nodes()) {
+        if (node->op_type() == Node::kChainerFusionGroup) ++num_fusion_groups;
+    }
+    EXPECT_EQ(3, num_fusion_groups);
+    graph.CheckSanity("fused");
+}
+
+TEST(FusionTest, TVMRejectsGroupedConv) {
+    for (int group : {1, 2}) {
+        Type type(Dtype::kFloat32, {1, 4, 3, 3});
+        Graph graph("test");
+        Value* input = graph.AddInputValue("input", type);
+        Value* w = graph.AddInputValue("w", Type(Dtype::kFloat32, {4, 4 / group, 1, 1}));
+        Value* output = graph.AddOutputValue("output", type);
+        GraphBuilder gb(&graph, "test", output);
+        Value* conv = gb.Op(Node::kConv, {input, w}, gb.Temp(type));
+        conv->producer()->set_group(group);
+        gb.Op(Node::kRelu, {conv}, {output});
+
+        FuseOperations(&graph, true /* use_tvm */);
+        int num_fusion_groups = 0;
+        for (const Node* node : graph.nodes()) {
+            if (node->op_type() == Node::kChainerFusionGroup) ++num_fusion_groups;
+        }
+        EXPECT_EQ(group == 1 ? 1 : 0, num_fusion_groups) << "group=" << group;
+        graph.CheckSanity("fused");
+    }
+}
+
 }  // namespace
 }  // namespace chainer_compiler
@@ -241,6 +241,19 @@ NodeDef('ChainerSelectItemGrad', 3, 1)
 NodeDef('ChainerLRNGrad', 4, 1,
         alpha=1e-4, beta=0.75, bias=1.0, size=Required(int))
 NodeDef('ChainerLSTMGrad', 2, 4)
+# Stacked LSTM over padded sequences like Chainer's NStepLSTM and
+# NStepBiLSTM: (X, I, W_0, R_0, B_0, ..., W_N, R_N, B_N) -> (Y, H, C)
+# X: [batch_size, seq_length, input_size]
+# I: the lengths of sequences in int32 or int64 [batch_size]
+# W_l, R_l, B_l: the parameters of the l-th layer as same as LSTM.
+# Y: [batch_size, seq_length, num_directions * hidden_size]
+# H, C: [num_layers * num_directions, batch_size, hidden_size]
+# The fourth output is for backward context.
+NodeDef('ChainerNStepLSTM', None, (3, 4),
+        direction='forward', hidden_size=int)
+# (gY, gH, gC, ctx) -> (gX, gW_0, gR_0, gB_0, ..., gW_N, gR_N, gB_N)
+# gY, gH, and gC are optional.
+NodeDef('ChainerNStepLSTMGrad', 4, None)
 NodeDef('ChainerConvGradWeight', 3, 1, **conv_attrs)
 NodeDef('ChainerGatherGrad', 3, 1, axis=0)
 NodeDef('ChainerDynamicSliceGrad', (4, 5, 6), 1)
@@ -1,5 +1,6 @@
 #include "compiler/gradient_ops.h"
 
+#include <algorithm>
 #include <atomic>
 #include <iostream>
 #include <map>
@@ -420,16 +421,22 @@ void ConvGradFn(GradientOpContext* gc) {
                     ->producer()
                     ->set_strides(node->strides())
                     ->set_pads(node->pads())
+                    ->set_group(node->group())
                     ->set_output_shape({x->type().dims().begin() + 2, x->type().dims().end()});
         } else {
             Value* x_shape = gb.Op(Node::kShape, {gc->x(0)});
             gc->GradOp(Node::kChainerConvTransposeWithDynamicOutputShape, 0, {gy, w, x_shape})
                     ->producer()
                     ->set_strides(node->strides())
-                    ->set_pads(node->pads());
+                    ->set_pads(node->pads())
+                    ->set_group(node->group());
         }
     }
-    gc->GradOp(Node::kChainerConvGradWeight, 1, {w, gc->x(0), gy})->producer()->set_strides(node->strides())->set_pads(node->pads());
+    gc->GradOp(Node::kChainerConvGradWeight, 1, {w, gc->x(0), gy})
+            ->producer()
+            ->set_strides(node->strides())
+            ->set_pads(node->pads())
+            ->set_group(node->group());
     if (node->inputs().size() == 3) {
         std::vector<int64_t> axes{{0}};
         CHECK(!node->kernel_shape().empty()) << "ConvGrad with no kernel_shape is not supported yet.";
@@ -563,6 +570,25 @@ void LSTMGradFn(GradientOpContext* gc) {
     gc->GradMOp(Node::kChainerLSTMGrad, {0, 1, 2, 3}, {gc->gy(0), context});
 }
 
+void NStepLSTMGradFn(GradientOpContext* gc) {
+    GraphBuilder gb{gc->builder(0)};
+    Node* node = gc->node();
+    CHECK_EQ(3UL, node->outputs().size());
+    // Outputs which do not contribute to the loss have no gradient.
+    std::vector<Value*> gys;
+    for (int i = 0; i < 3; ++i) gys.push_back(gc->NoRetainY(i)->grad());
+    if (std::all_of(gys.begin(), gys.end(), [](Value* gy) { return gy == nullptr; })) {
+        throw GradientOpContext::NoGradient();
+    }
+    std::vector<Value*> inputs;
+    for (Value* gy : gys) inputs.push_back(gy ? gy : gb.Null());
+    inputs.push_back(gc->AddOutput(Type(Type::Kind::kOpaque)));
+    // No gradient for sequence lengths.
+    std::vector<int> xis = {0};
+    for (size_t i = 2; i < node->inputs().size(); ++i) xis.push_back(i);
+    gc->GradMOp(Node::kChainerNStepLSTMGrad, xis, inputs);
+}
+
 void DoNothingGradFn(GradientOpContext*) {
 }
 
@@ -995,6 +1021,7 @@ bool AddGradientForNode(Graph* graph, Graph* dest_graph, Node* node, std::map<Va
 
         register_grad_fn(Node::kChainerLinear, &LinearGradFn);
         register_grad_fn(Node::kLSTM, &LSTMGradFn);
+        register_grad_fn(Node::kChainerNStepLSTM, &NStepLSTMGradFn);
 
         // TODO(hamaji): Implement dropout.
         register_grad_fn(Node::kDropout, &IdentityGradFn);
@@ -2,6 +2,7 @@
 
 #include "compiler/computation_order/policy_chen.h"
 #include "compiler/computation_order/policy_dummy.h"
+#include "compiler/computation_order/policy_recompute.h"
 
 #include <functional>
 #include <iostream>
@@ -99,6 +100,8 @@ std::vector<Order> GetComputationOrder(const Graph& graph, const std::string& po
         return DummyPolicy(graph);
     } else if (policy == "chen") {
         return ChenPolicy(graph);
+    } else if (policy == "recompute") {
+        return RecomputePolicy(graph);
     } else {
         CHECK(false) << "Unknown policy of computation order: " << policy;
         return {};
@@ -0,0 +1,122 @@
+#include "compiler/memory_planner.h"
+
+#include <iterator>
+
+#include <common/log.h>
+#include <compiler/graph.h>
+#include <compiler/node.h>
+#include <compiler/value.h>
+
+namespace chainer_compiler {
+namespace {
+
+constexpr int64_t kAlignment = 256;
+
+int64_t Align(int64_t size) {
+    return (size + kAlignment - 1) / kAlignment * kAlignment;
+}
+
+// A best-fit allocator over a virtual arena which grows on demand.
+class ArenaAllocator {
+public:
+    int64_t Allocate(int64_t size) {
+        size = Align(size);
+        auto best = free_blocks_.end();
+        for (auto iter = free_blocks_.begin(); iter != free_blocks_.end(); ++iter) {
+            if (iter->second < size) continue;
+            if (best == free_blocks_.end() || iter->second < best->second) best = iter;
+        }
+        if (best != free_blocks_.end()) {
+            const int64_t offset = best->first;
+            const int64_t rest = best->second - size;
+            free_blocks_.erase(best);
+            if (rest) free_blocks_.emplace(offset + size, rest);
+            return offset;
+        }
+
+        // Extend the arena, reusing the free block at its end if exists.
+        int64_t offset = size_;
+        if (!free_blocks_.empty()) {
+            auto last = std::prev(free_blocks_.end());
+            if (last->first + last->second == size_) {
+                offset = last->first;
+                free_blocks_.erase(last);
+            }
+        }
+        size_ = offset + size;
+        return offset;
+    }
+
+    void Free(int64_t offset, int64_t size) {
+        size = Align(size);
+        auto iter = free_blocks_.emplace(offset, size).first;
+        auto next = std::next(iter);
+        if (next != free_blocks_.end() && offset + size == next->first) {
+            iter->second += next->second;
+            free_blocks_.erase(next);
+        }
+        if (iter != free_blocks_.begin()) {
+            auto prev = std::prev(iter);
+            if (prev->first + prev->second == iter->first) {
+                prev->second += iter->second;
+                free_blocks_.erase(iter);
+            }
+        }
+    }
+
+    int64_t size() const {
+        return size_;
+    }
+
+private:
+    // A map from offsets to sizes of free blocks.
+    std::map<int64_t, int64_t> free_blocks_;
+    int64_t size_{0};
+};
+
+}  // namespace
+
+MemoryPlan PlanMemory(const Graph& graph, const std::function<bool(const Value*)>& can_place) {
+    MemoryPlan plan;
+    ArenaAllocator arena;
+    std::map<const Value*, int> num_users;
+
+    auto alloc = [&plan, &arena, &can_place](const Value* value) {
+        if (value->IsNull()) return;
+        if (can_place && !can_place(value)) return;
+        const int64_t bytes = value->GetNBytes();
+        if (bytes < 0) {
+            plan.num_dynamic++;
+            return;
+        }
+        CHECK(plan.offsets.emplace(value, arena.Allocate(bytes)).second) << value->DebugString();
+    };
+
+    for (const Value* value : graph.GetNecessaryValues()) {
+        if (value->IsInput()) {
+            // Parameters stay resident outside the arena.
+            if (value->initializer()) continue;
+            alloc(value);
+        }
+        CHECK(num_users.emplace(value, value->users().size()).second);
+    }
+
+    for (const Node* node : graph.GetComputationSequence()) {
+        for (const Value* value : node->outputs()) {
+            alloc(value);
+        }
+        for (const Value* value : node->inputs()) {
+            auto found = num_users.find(value);
+            if (found == num_users.end()) continue;
+            if (--found->second) continue;
+            auto offset = plan.offsets.find(value);
+            if (offset == plan.offsets.end()) continue;
+            arena.Free(offset->second, value->GetNBytes());
+        }
+    }
+
+    plan.arena_size = arena.size();
+    return plan;
+}
+
+}  // namespace chainer_compiler
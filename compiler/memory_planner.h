@@ -0,0 +1,31 @@
+#pragma once
+
+#include <stdint.h>
+
+#include <functional>
+#include <map>
+
+namespace chainer_compiler {
+
+class Graph;
+class Value;
+
+struct MemoryPlan {
+    // The size of the arena which can hold all values with known
+    // shapes. Parameters are not placed in the arena.
+    int64_t arena_size{0};
+    // Offsets of values in the arena.
+    std::map<const Value*, int64_t> offsets;
+    // The number of values which need dynamic allocation due to
+    // unknown shapes.
+    int num_dynamic{0};
+};
+
+// Assigns offsets in a single arena to values of the scheduled
+// `graph` so values with disjoint lifetimes share memory. Lifetimes
+// are the same as the ones used by `SimulateMemoryUsage`. If
+// `can_place` is given, only values for which it returns true are
+// placed in the arena.
+MemoryPlan PlanMemory(const Graph& graph, const std::function<bool(const Value*)>& can_place = nullptr);
+
+}  // namespace chainer_compiler
@@ -0,0 +1,73 @@
+#include <gtest/gtest.h>
+
+#include <compiler/graph.h>
+#include <compiler/memory_planner.h>
+#include <compiler/node.h>
+#include <compiler/scheduler.h>
+#include <compiler/type.h>
+
+namespace chainer_compiler {
+namespace {
+
+TEST(MemoryPlannerTest, Chain) {
+    Graph graph("test");
+    Type type(Dtype::kFloat32, {1024});
+    Value* in = graph.AddInputValue("in", type);
+    Value* out = graph.AddOutputValue("out", type);
+    Value* t1 = graph.AddValue("t1", type);
+    Value* t2 = graph.AddValue("t2", type);
+    graph.AddNode(Node::kRelu, {in}, {t1});
+    graph.AddNode(Node::kRelu, {t1}, {t2});
+    graph.AddNode(Node::kRelu, {t2}, {out});
+    ScheduleComputation(graph, 0);
+
+    MemoryPlan plan = PlanMemory(graph);
+    EXPECT_EQ(0, plan.num_dynamic);
+    EXPECT_EQ(8192, plan.arena_size);
+    ASSERT_EQ(4UL, plan.offsets.size());
+    EXPECT_EQ(0, plan.offsets[in]);
+    EXPECT_EQ(4096, plan.offsets[t1]);
+    // `t2` and `out` reuse the memory of `in` and `t1`.
+    EXPECT_EQ(0, plan.offsets[t2]);
+    EXPECT_EQ(4096, plan.offsets[out]);
+}
+
+TEST(MemoryPlannerTest, UnknownShape) {
+    Graph graph("test");
+    Type type(Dtype::kFloat32, {1024});
+    Value* in = graph.AddInputValue("in", type);
+    Value* out = graph.AddOutputValue("out", type);
+    Value* tmp = graph.AddValue("tmp");
+    graph.AddNode(Node::kRelu, {in}, {tmp});
+    graph.AddNode(Node::kRelu, {tmp}, {out});
+    ScheduleComputation(graph, 0);
+
+    MemoryPlan plan = PlanMemory(graph);
+    EXPECT_EQ(1, plan.num_dynamic);
+    EXPECT_EQ(0, plan.offsets.count(tmp));
+    // `out` reuses the memory of `in`.
+    EXPECT_EQ(0, plan.offsets[out]);
+}
+
+TEST(MemoryPlannerTest, CanPlace) {
+    Graph graph("test");
+    Type type(Dtype::kFloat32, {1024});
+    Value* in = graph.AddInputValue("in", type);
+    Value* out = graph.AddOutputValue("out", type);
+    Value* t1 = graph.AddValue("t1", type);
+    Value* t2 = graph.AddValue("t2", type);
+    graph.AddNode(Node::kRelu, {in}, {t1});
+    graph.AddNode(Node::kRelu, {t1}, {t2});
+    graph.AddNode(Node::kRelu, {t2}, {out});
+    ScheduleComputation(graph, 0);
+
+    MemoryPlan plan = PlanMemory(graph, [](const Value* value) { return value->IsTemp(); });
+    EXPECT_EQ(0, plan.num_dynamic);
+    EXPECT_EQ(8192, plan.arena_size);
+    ASSERT_EQ(2UL, plan.offsets.size());
+    EXPECT_EQ(0, plan.offsets[t1]);
+    EXPECT_EQ(4096, plan.offsets[t2]);
+}
+
+}  // namespace
+}  // namespace chainer_compiler
@@ -1,5 +1,6 @@
 #include "compiler/memory_simulator.h"
 
+#include <algorithm>
 #include <map>
 #include <numeric>
 
@@ -7,26 +8,38 @@
 #include <common/strutil.h>
 #include <compiler/graph.h>
 #include <compiler/log.h>
+#include <compiler/memory_planner.h>
 
 namespace chainer_compiler {
 
+bool MemoryUsageCounter::Alloc(const Value* value) {
+    const int64_t increase = value->GetNBytes();
+    usage_.num_values++;
+    if (increase < 0) {
+        usage_.num_unknowns++;
+        return false;
+    }
+    mem_ += increase;
+    usage_.all += increase;
+    usage_.peak = std::max<int64_t>(usage_.peak, mem_);
+    return true;
+}
+
+void MemoryUsageCounter::Free(const Value* value) {
+    const int64_t decrease = value->GetNBytes();
+    if (decrease > 0) mem_ -= decrease;
+}
+
 SimulatedMemoryUsage SimulateMemoryUsage(const Graph& graph) {
     std::map<const Value*, int> num_users;
-    SimulatedMemoryUsage usage{};
-    int64_t mem = 0;
+    MemoryUsageCounter counter;
+    int64_t param = 0;
 
-    auto alloc = [&usage, &mem](const Value* value) {
-        const int64_t increase = value->GetNBytes();
-        usage.num_values++;
-        if (increase < 0) {
+    auto alloc = [&counter](const Value* value) {
+        if (!counter.Alloc(value)) {
             CLOG() << "Unknown " << value->type().kind() << " shape: " << value->name()
                    << " producer=" << (value->producer() ? Node::OpTypeToString(value->producer()->op_type()) : "") << std::endl;
-            usage.num_unknowns++;
-            return;
         }
-        mem += increase;
-        usage.all += increase;
-        usage.peak = std::max<int64_t>(usage.peak, mem);
     };
 
     for (const Value* value : graph.GetNecessaryValues()) {
@@ -34,7 +47,7 @@ SimulatedMemoryUsage SimulateMemoryUsage(const Graph& graph) {
         if (value->IsInput()) {
             int64_t bytes = value->GetNBytes();
             if (value->initializer()) {
-                usage.param += bytes >= 0 ? bytes : 0;
+                param += bytes >= 0 ? bytes : 0;
                 // We assume parameters will never be freed.
                 nu++;
             }
@@ -52,11 +65,13 @@ SimulatedMemoryUsage SimulateMemoryUsage(const Graph& graph) {
             auto found = num_users.find(value);
             if (found == num_users.end()) continue;
             if (--found->second == 0) {
-                mem -= value->GetNBytes();
+                counter.Free(value);
             }
         }
     }
 
+    SimulatedMemoryUsage usage = counter.usage();
+    usage.param = param;
     return usage;
 }
 
@@ -69,6 +84,10 @@ void ShowSimulatedMemoryUsage(const Graph& graph) {
     int64_t peak_mb = usage.peak / 1000 / 1000;
     int64_t all_mb = usage.all / 1000 / 1000;
     std::cerr << "Simulated memory usage: param=" << param_mb << "MB peak=" << peak_mb << "MB all=" << all_mb << "MB" << std::endl;
+
+    MemoryPlan plan = PlanMemory(graph);
+    int64_t arena_mb = plan.arena_size / 1000 / 1000;
+    std::cerr << "Planned memory usage: arena=" << arena_mb << "MB dynamic=" << plan.num_dynamic << "/" << usage.num_values << std::endl;
 }
 
 }  // namespace chainer_compiler
@@ -5,6 +5,7 @@
 namespace chainer_compiler {
 
 class Graph;
+class Value;
 
 struct SimulatedMemoryUsage {
     int64_t param;
@@ -14,6 +15,24 @@ struct SimulatedMemoryUsage {
     int num_unknowns;
 };
 
+// Accumulates the memory usage of values allocated and freed in a
+// given order. Values with unknown shapes are counted only in
+// `num_unknowns`.
+class MemoryUsageCounter {
+public:
+    // Returns false if the size of `value` is unknown.
+    bool Alloc(const Value* value);
+    void Free(const Value* value);
+
+    const SimulatedMemoryUsage& usage() const {
+        return usage_;
+    }
+
+private:
+    SimulatedMemoryUsage usage_{};
+    int64_t mem_{0};
+};
+
 SimulatedMemoryUsage SimulateMemoryUsage(const Graph& graph);
 
 void ShowSimulatedMemoryUsage(const Graph& graph);
@@ -0,0 +1,199 @@
+#include "compiler/pass_manager.h"
+
+#include <unistd.h>
+
+#include <chrono>
+#include <condition_variable>
+#include <fstream>
+#include <iomanip>
+#include <iostream>
+#include <mutex>
+
+#include <common/log.h>
+#include <common/strutil.h>
+#include <common/thread_pool.h>
+#include <compiler/flags.h>
+#include <compiler/graph.h>
+#include <compiler/node.h>
+
+namespace chainer_compiler {
+namespace {
+
+void RunRecursivelyImpl(const std::function<void(Graph*)>& fn, Graph* graph) {
+    fn(graph);
+    for (const Node* node : graph->nodes()) {
+        for (Graph* subgraph : node->GetSubGraphs()) {
+            RunRecursivelyImpl(fn, subgraph);
+        }
+    }
+}
+
+int64_t CountNodes(const Graph& graph) {
+    int64_t num_nodes = 0;
+    for (const Node* node : graph.nodes()) {
+        ++num_nodes;
+        for (Graph* subgraph : node->GetSubGraphs()) {
+            num_nodes += CountNodes(*subgraph);
+        }
+    }
+    return num_nodes;
+}
+
+// Returns the resident set size of this process in bytes, or zero if
+// it is not available.
+int64_t GetResidentSetSize() {
+    std::ifstream ifs("/proc/self/statm");
+    int64_t total_pages, resident_pages;
+    if (!(ifs >> total_pages >> resident_pages)) return 0;
+    return resident_pages * sysconf(_SC_PAGESIZE);
+}
+
+}  // namespace
+
+PassManager::PassManager(const std::string& name, Graph* graph) : name_(name), graph_(graph), disabled_passes_(GetDisabledPasses()) {
+}
+
+PassManager::~PassManager() {
+}
+
+void PassManager::Run(const std::string& name, const std::function<void(Graph*)>& fn, bool required) {
+    PassStats stats;
+    stats.name = name;
+    stats.num_nodes_before = CountNodes(*graph_);
+    stats.rss_before = GetResidentSetSize();
+    if (disabled_passes_.count(name)) {
+        CHECK(!required) << "Pass " << name << " cannot be disabled";
+        stats.skipped = true;
+    } else {
+        auto start = std::chrono::steady_clock::now();
+        fn(graph_);
+        stats.elapsed_sec = std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+    }
+    stats.num_nodes_after = CountNodes(*graph_);
+    stats.rss_after = GetResidentSetSize();
+    stats_.push_back(stats);
+}
+
+void PassManager::RunRecursively(const std::string& name, const std::function<void(Graph*)>& fn, bool required) {
+    Run(name, [&fn](Graph* graph) { RunRecursivelyImpl(fn, graph); }, required);
+}
+
+void PassManager::RunRecursivelyInParallel(const std::string& name, const std::function<void(Graph*)>& fn, bool required) {
+    if (g_compiler_threads <= 1) {
+        RunRecursively(name, fn, required);
+        return;
+    }
+    Run(name, [this, &fn](Graph* graph) { RunLevelByLevel(fn); }, required);
+}
+
+void PassManager::RunLevelByLevel(const std::function<void(Graph*)>& fn) {
+    if (!thread_pool_) thread_pool_.reset(new ThreadPool(g_compiler_threads));
+
+    std::vector<Graph*> graphs = {graph_};
+    while (!graphs.empty()) {
+        if (graphs.size() == 1) {
+            fn(graphs[0]);
+        } else {
+            std::mutex mu;
+            std::condition_variable cond;
+            size_t num_done = 0;
+            for (Graph* graph : graphs) {
+                thread_pool_->Schedule([&fn, &mu, &cond, &num_done, graph]() {
+                    fn(graph);
+                    std::unique_lock<std::mutex> lock{mu};
+                    ++num_done;
+                    cond.notify_one();
+                });
+            }
+            std::unique_lock<std::mutex> lock{mu};
+            while (num_done < graphs.size()) cond.wait(lock);
+        }
+
+        std::vector<Graph*> subgraphs;
+        for (Graph* graph : graphs) {
+            for (const Node* node : graph->nodes()) {
+                for (Graph* subgraph : node->GetSubGraphs()) {
+                    subgraphs.push_back(subgraph);
+                }
+            }
+        }
+        graphs.swap(subgraphs);
+    }
+}
+
+void PassManager::ShowTable(std::ostream& os) const {
+    double total_sec = 0;
+    for (const PassStats& stats : stats_) {
+        total_sec += stats.elapsed_sec;
+    }
+    auto mb = [](int64_t bytes) { return bytes / 1000.0 / 1000.0; };
+
+    os << "=== Passes of " << name_ << " (total " << std::fixed << std::setprecision(1) << total_sec * 1000 << "ms) ===\n";
+    os << std::left << std::setw(28) << "Pass" << std::right << std::setw(12) << "Time(ms)" << std::setw(7) << "%" << std::setw(10)
+       << "Nodes" << std::setw(10) << "Delta" << std::setw(12) << "RSS(MB)" << std::setw(12) << "Delta(MB)" << '\n';
+    for (const PassStats& stats : stats_) {
+        os << std::left << std::setw(28) << stats.name << std::right;
+        if (stats.skipped) {
+            os << std::setw(12) << "skipped" << '\n';
+            continue;
+        }
+        os << std::setw(12) << stats.elapsed_sec * 1000 << std::setw(7) << (total_sec ? stats.elapsed_sec * 100 / total_sec : 0.0)
+           << std::setw(10) << stats.num_nodes_after << std::setw(10) << stats.num_nodes_after - stats.num_nodes_before << std::setw(12)
+           << mb(stats.rss_after) << std::setw(12) << mb(stats.rss_after - stats.rss_before) << '\n';
+    }
+    os << std::defaultfloat << std::flush;
+}
+
+void PassManager::EmitJSON(std::ostream& os) const {
+    os << "{\"name\":\"" << name_ << "\",\"passes\":[\n";
+    bool is_first = true;
+    for (const PassStats& stats : stats_) {
+        if (!is_first) os << ",\n";
+        is_first = false;
+        os << "{\"name\":\"" << stats.name << "\",";
+        os << "\"skipped\":" << (stats.skipped ? "true" : "false") << ",";
+        os << "\"elapsed_sec\":" << stats.elapsed_sec << ",";
+        os << "\"num_nodes_before\":" << stats.num_nodes_before << ",";
+        os << "\"num_nodes_after\":" << stats.num_nodes_after << ",";
+        os << "\"rss_before\":" << stats.rss_before << ",";
+        os << "\"rss_after\":" << stats.rss_after << "}";
+    }
+    os << "]}\n" << std::flush;
+}
+
+void PassManager::Report() const {
+    if (!g_compiler_log) return;
+    if (g_pass_stats_json) {
+        EmitJSON(std::cerr);
+    } else {
+        ShowTable(std::cerr);
+    }
+}
+
+std::set<std::string> GetDisabledPasses() {
+    // Passes in passes.cc which are not required.
+    static const std::set<std::string> kOptionalPasses = {
+            "infer_dtype_and_shape",
+            "simplify",
+            "propagate_constants",
+            "fold_batch_norm",
+            "evaluate_shapes",
+            "simplify_after_gradient",
+            "propagate_constants_after_gradient",
+            "fuse_operations",
+            "check_all_ops_supported",
+            "infer_shapes",
+    };
+
+    std::set<std::string> passes;
+    if (g_disabled_passes.empty()) return passes;
+    for (const std::string& pass : SplitString(g_disabled_passes, ",")) {
+        if (pass.empty()) continue;
+        CHECK(kOptionalPasses.count(pass)) << "Unknown pass in --disabled_passes: " << pass
+                                           << " (available: " << JoinString(kOptionalPasses) << ")";
+        passes.insert(pass);
+    }
+    return passes;
+}
+
+}  // namespace chainer_compiler
@@ -0,0 +1,74 @@
+#pragma once
+
+#include <cstdint>
+#include <functional>
+#include <memory>
+#include <ostream>
+#include <set>
+#include <string>
+#include <vector>
+
+namespace chainer_compiler {
+
+class Graph;
+class ThreadPool;
+
+// Runs named passes over a graph and records the wall time, the
+// number of nodes (including nodes in subgraphs), and the resident
+// memory of the process before and after each pass. Optional passes
+// listed in `g_disabled_passes` are skipped.
+class PassManager {
+public:
+    struct PassStats {
+        std::string name;
+        bool skipped{false};
+        double elapsed_sec{0.0};
+        int64_t num_nodes_before{0};
+        int64_t num_nodes_after{0};
+        int64_t rss_before{0};
+        int64_t rss_after{0};
+    };
+
+    PassManager(const std::string& name, Graph* graph);
+    ~PassManager();
+
+    // Runs `fn` for the graph. A required pass cannot be disabled.
+    void Run(const std::string& name, const std::function<void(Graph*)>& fn, bool required = false);
+
+    // Runs `fn` for the graph and all its subgraphs.
+    void RunRecursively(const std::string& name, const std::function<void(Graph*)>& fn, bool required = false);
+
+    // Same as `RunRecursively` but runs `fn` for subgraphs on
+    // `g_compiler_threads` threads. `fn` must not touch graphs other
+    // than its argument. Subgraphs are visited level by level, i.e.,
+    // `fn` for a subgraph runs after `fn` for its parent graph, and
+    // subgraphs are collected after the parent is processed as
+    // `RunRecursively` does.
+    void RunRecursivelyInParallel(const std::string& name, const std::function<void(Graph*)>& fn, bool required = false);
+
+    const std::vector<PassStats>& stats() const {
+        return stats_;
+    }
+
+    void ShowTable(std::ostream& os) const;
+
+    void EmitJSON(std::ostream& os) const;
+
+    // Shows the statistics to stderr if `g_compiler_log` is set, as
+    // JSON if `g_pass_stats_json` is also set.
+    void Report() const;
+
+private:
+    void RunLevelByLevel(const std::function<void(Graph*)>& fn);
+
+    const std::string name_;
+    Graph* graph_;
+    std::set<std::string> disabled_passes_;
+    std::vector<PassStats> stats_;
+    std::unique_ptr<ThreadPool> thread_pool_;
+};
+
+// Returns pass names in `g_disabled_passes`.
+std::set<std::string> GetDisabledPasses();
+
+}  // namespace chainer_compiler
@@ -0,0 +1,99 @@
+#include <map>
+#include <mutex>
+#include <sstream>
+#include <string>
+
+#include <gtest/gtest.h>
+
+#include <compiler/flags.h>
+#include <compiler/graph.h>
+#include <compiler/node.h>
+#include <compiler/pass_manager.h>
+#include <compiler/value.h>
+
+namespace chainer_compiler {
+namespace {
+
+TEST(PassManagerTest, Stats) {
+    Graph graph("test");
+    Value* in = graph.AddValue("in", Value::Kind::kInput);
+    Value* tmp = graph.AddValue("tmp");
+    Value* out = graph.AddValue("out", Value::Kind::kOutput);
+    graph.AddNode(Node::kIdentity, {in}, {tmp});
+
+    PassManager pm("test passes", &graph);
+    pm.Run("add", [tmp, out](Graph* g) { g->AddNode(Node::kIdentity, {tmp}, {out}); });
+    pm.RunRecursively("nop", [](Graph* g) {});
+
+    ASSERT_EQ(2, pm.stats().size());
+    EXPECT_EQ("add", pm.stats()[0].name);
+    EXPECT_FALSE(pm.stats()[0].skipped);
+    EXPECT_EQ(1, pm.stats()[0].num_nodes_before);
+    EXPECT_EQ(2, pm.stats()[0].num_nodes_after);
+    EXPECT_EQ("nop", pm.stats()[1].name);
+    EXPECT_EQ(2, pm.stats()[1].num_nodes_before);
+    EXPECT_EQ(2, pm.stats()[1].num_nodes_after);
+
+    std::ostringstream oss;
+    pm.EmitJSON(oss);
+    EXPECT_NE(std::string::npos, oss.str().find("{\"name\":\"add\",\"skipped\":false,"));
+}
+
+TEST(PassManagerTest, DisabledPasses) {
+    g_disabled_passes = "simplify,fold_batch_norm";
+    Graph graph("test");
+    PassManager pm("test passes", &graph);
+    g_disabled_passes = "";
+
+    int num_runs = 0;
+    pm.Run("fold_batch_norm", [&num_runs](Graph* g) { ++num_runs; });
+    pm.Run("propagate_constants", [&num_runs](Graph* g) { ++num_runs; });
+    pm.RunRecursively("simplify", [&num_runs](Graph* g) { ++num_runs; });
+    EXPECT_EQ(1, num_runs);
+
+    ASSERT_EQ(3, pm.stats().size());
+    EXPECT_TRUE(pm.stats()[0].skipped);
+    EXPECT_FALSE(pm.stats()[1].skipped);
+    EXPECT_TRUE(pm.stats()[2].skipped);
+}
+
+TEST(PassManagerTest, UnknownDisabledPass) {
+    g_disabled_passes = "simplify,no_such_pass";
+    EXPECT_DEATH(GetDisabledPasses(), "Unknown pass in --disabled_passes: no_such_pass");
+    g_disabled_passes = "";
+}
+
+TEST(PassManagerTest, RunRecursivelyInParallel) {
+    Graph graph("root");
+    std::vector<std::string> expected = {"root"};
+    for (int i = 0; i < 4; ++i) {
+        Graph* body = new Graph("body" + std::to_string(i));
+        Graph* inner = new Graph("inner" + std::to_string(i));
+        body->AddNode(Node::kLoop, {}, {})->set_body(inner);
+        graph.AddNode(Node::kLoop, {}, {})->set_body(body);
+        expected.push_back(body->name());
+        expected.push_back(inner->name());
+    }
+
+    g_compiler_threads = 4;
+    PassManager pm("test passes", &graph);
+    std::mutex mu;
+    std::map<std::string, int> visits;
+    int num_visits = 0;
+    pm.RunRecursivelyInParallel("visit", [&mu, &visits, &num_visits](Graph* g) {
+        std::lock_guard<std::mutex> lock(mu);
+        visits[g->name()] = num_visits++;
+    });
+    g_compiler_threads = 0;
+
+    ASSERT_EQ(expected.size(), visits.size());
+    for (int i = 0; i < 4; ++i) {
+        const std::string id = std::to_string(i);
+        // Subgraphs are visited after their parents.
+        EXPECT_LT(visits["root"], visits["body" + id]);
+        EXPECT_LT(visits["body" + id], visits["inner" + id]);
+    }
+}
+
+}  // namespace
+}  // namespace chainer_compiler
@@ -1,9 +1,13 @@
 #include "compiler/passes.h"
 
+#include <algorithm>
 #include <iostream>
 #include <map>
 #include <memory>
+#include <mutex>
+#include <vector>
 
+#include <compiler/batch_norm_folding.h>
 #include <compiler/config.h>
 #include <compiler/constant_propagation.h>
 #include <compiler/flags.h>
@@ -13,6 +17,7 @@
 #include <compiler/graph.h>
 #include <compiler/memory_simulator.h>
 #include <compiler/model.h>
+#include <compiler/pass_manager.h>
 #include <compiler/scheduler.h>
 #include <compiler/shape_evaluator.h>
 #include <compiler/simplifier.h>
@@ -49,6 +54,38 @@ void Recursively(Fn fn, Graph* graph) {
     }
 }
 
+// Numbers nodes in all graphs by a single counter in the order of
+// `Recursively`. Graphs are scheduled in parallel from zero and then
+// renumbered so the result does not depend on `g_compiler_threads`.
+void ScheduleRecursively(PassManager* pm, Graph* graph) {
+    std::mutex mu;
+    std::map<Graph*, std::vector<Node*>> scheduled_nodes;
+    pm->RunRecursivelyInParallel(
+            "schedule",
+            [&mu, &scheduled_nodes](Graph* g) {
+                std::vector<Node*> unscheduled;
+                for (Node* node : g->nodes()) {
+                    if (node->chainer_order() <= 0) unscheduled.push_back(node);
+                }
+                ScheduleComputation(*g, 0, GetSchedulerType(g_scheduler));
+                std::vector<Node*> nodes;
+                for (Node* node : unscheduled) {
+                    if (node->chainer_order() > 0) nodes.push_back(node);
+                }
+                std::sort(nodes.begin(), nodes.end(), [](const Node* a, const Node* b) { return a->chainer_order() < b->chainer_order(); });
+                std::lock_guard<std::mutex> lock(mu);
+                CHECK(scheduled_nodes.emplace(g, nodes).second);
+            },
+            true /* required */);
+
+    int64_t order = 0;
+    Recursively(
+            [&order, &scheduled_nodes](Graph* g) {
+                for (Node* node : scheduled_nodes[g]) node->set_chainer_order(++order);
+            },
+            graph);
+}
+
 }  //  namespace
 
 void RunDefaultPasses(Model* model, bool gen_backprop) {
@@ -60,8 +97,9 @@ void RunDefaultPasses(Graph* graph, bool gen_backprop) {
     g_modify_pool_with_imbalanced_pads = !g_use_ngraph;
 
     std::unique_ptr<CompilerConfig> ccfg{GetCompilerConfig(g_backend_name)};
+    PassManager pm("default passes", graph);
 
-    InferAllDtypeAndShape(graph);
+    pm.Run("infer_dtype_and_shape", InferAllDtypeAndShape);
 
     auto dump_onnx = [&graph](bool cond, const char* msg) {
         if (cond) {
@@ -74,28 +112,38 @@ void RunDefaultPasses(Graph* graph, bool gen_backprop) {
 
     dump_onnx(g_dump_after_inference, "after inference");
 
-    CanonicalizeSubGraphs(graph);
+    pm.Run("canonicalize_subgraphs", CanonicalizeSubGraphs, true /* required */);
 
-    Recursively([&ccfg, gen_backprop](Graph* g) { Simplify(*ccfg, g, gen_backprop); }, graph);
+    pm.RunRecursivelyInParallel("simplify", [&ccfg, gen_backprop](Graph* g) { Simplify(*ccfg, g, gen_backprop); });
 
-    Recursively(PropagateConstants, graph);
+    pm.RunRecursivelyInParallel("propagate_constants", PropagateConstants);
 
-    Recursively(EvaluateShapes, graph);
+    // Folding reads weights and biases from initializers. It runs only
+    // for the outermost graph, which owns the initializers.
+    if (!gen_backprop && !g_skip_batch_norm_folding) {
+        pm.Run("fold_batch_norm", [](Graph* g) { FoldBatchNormalizations(g); });
+    }
+
+    pm.RunRecursivelyInParallel("evaluate_shapes", EvaluateShapes);
 
-    Recursively([](Graph* g) { g->DeleteDetached(); }, graph);
+    pm.RunRecursivelyInParallel("delete_detached", [](Graph* g) { g->DeleteDetached(); }, true /* required */);
 
     dump_onnx(g_dump_after_simplification, "after simplification");
 
-    bool skip_scheduling = false;
+    // Nodes are scheduled by the specified computation order.
+    const bool skip_scheduling = gen_backprop && !g_computation_order.empty();
     if (gen_backprop) {
         if (g_computation_order.empty()) {
             // normal computation order
-            AddGradientNodesForTraining(graph);
+            pm.Run("gradient", AddGradientNodesForTraining, true /* required */);
         } else {
             // specified computation order
-            skip_scheduling = true;
-            auto orders = GetComputationOrder(*graph, g_computation_order);
-            AddGradientNodesForTrainingWithOrders(graph, orders);
+            pm.Run("gradient_with_order",
+                   [](Graph* g) {
+                       auto orders = GetComputationOrder(*g, g_computation_order);
+                       AddGradientNodesForTrainingWithOrders(g, orders);
+                   },
+                   true /* required */);
             // SimplifyOps({Node::kIdentity}, graph);
         }
     }
@@ -104,11 +152,11 @@ void RunDefaultPasses(Graph* graph, bool gen_backprop) {
     // if (!g_skip_inference) graph->InferShapes();
 
     if (!skip_scheduling) {
-        Recursively([&ccfg, gen_backprop](Graph* g) { Simplify(*ccfg, g, gen_backprop); }, graph);
+        pm.RunRecursivelyInParallel("simplify_after_gradient", [&ccfg, gen_backprop](Graph* g) { Simplify(*ccfg, g, gen_backprop); });
 
-        Recursively(PropagateConstants, graph);
+        pm.RunRecursivelyInParallel("propagate_constants_after_gradient", PropagateConstants);
 
-        Recursively([](Graph* g) { g->DeleteDetached(); }, graph);
+        pm.RunRecursivelyInParallel("delete_detached_after_gradient", [](Graph* g) { g->DeleteDetached(); }, true /* required */);
     }
 
     dump_onnx(g_dump_after_gradient, "after gradient generation");
@@ -119,34 +167,37 @@ void RunDefaultPasses(Graph* graph, bool gen_backprop) {
 
     if (!skip_scheduling) {
         if (g_fuse_operations) {
-            FuseOperations(graph, g_use_tvm, g_use_ngraph);
+            pm.Run("fuse_operations", [](Graph* g) { FuseOperations(g, g_use_tvm, g_use_ngraph); });
             dump_onnx(g_dump_after_fusion, "after fusion");
         }
     }
 
-    int64_t order = 0;
-    Recursively([&order](Graph* g) { order = ScheduleComputation(*g, order); }, graph);
+    ScheduleRecursively(&pm, graph);
 
     if (g_compiler_log) {
         ShowSimulatedMemoryUsage(*graph);
         ShowFlops(*graph);
     }
 
-    Recursively(CollectGarbageNode, graph);
+    pm.RunRecursivelyInParallel("collect_garbage_node", CollectGarbageNode, true /* required */);
 
     dump_onnx(g_dump_after_scheduling, "after scheduling");
 
-    Recursively([&ccfg](Graph* g) { CheckAllOpsSupported(*ccfg, g); }, graph);
+    pm.RunRecursivelyInParallel("check_all_ops_supported", [&ccfg](Graph* g) { CheckAllOpsSupported(*ccfg, g); });
+
+    pm.Report();
 }
 
 void RunDefaultPassesBeforeGradient(Graph* graph) {
     std::unique_ptr<CompilerConfig> ccfg{GetCompilerConfig(g_backend_name)};
-    graph->InferShapes();
-    CanonicalizeSubGraphs(graph);
-    Recursively([&ccfg](Graph* g) { Simplify(*ccfg, g, true); }, graph);
-    Recursively(PropagateConstants, graph);
-    Recursively([](Graph* g) { g->DeleteDetached(); }, graph);
-    Recursively([&ccfg](Graph* g) { CheckAllOpsSupported(*ccfg, g); }, graph);
+    PassManager pm("passes before gradient", graph);
+    pm.Run("infer_shapes", [](Graph* g) { g->InferShapes(); });
+    pm.Run("canonicalize_subgraphs", CanonicalizeSubGraphs, true /* required */);
+    pm.RunRecursivelyInParallel("simplify", [&ccfg](Graph* g) { Simplify(*ccfg, g, true); });
+    pm.RunRecursivelyInParallel("propagate_constants", PropagateConstants);
+    pm.RunRecursivelyInParallel("delete_detached", [](Graph* g) { g->DeleteDetached(); }, true /* required */);
+    pm.RunRecursivelyInParallel("check_all_ops_supported", [&ccfg](Graph* g) { CheckAllOpsSupported(*ccfg, g); });
+    pm.Report();
 }
 
 }  // namespace chainer_compiler
@@ -5,8 +5,12 @@
 #include <iterator>
 #include <map>
 #include <queue>
+#include <set>
+#include <tuple>
+#include <utility>
 #include <vector>
 
+#include <compiler/flags.h>
 #include <compiler/graph.h>
 #include <compiler/log.h>
 #include <compiler/node.h>
@@ -199,6 +203,184 @@ std::vector<Node*> ScheduleGreedy(const Graph& graph, const std::vector<Value*>&
     return nodes;
 }
 
+// A list scheduler which picks a ready node minimizing live bytes
+// after scheduling it and at most `lookahead` following nodes. Unlike
+// `ScheduleGreedy`, inputs freed by a node are counted exactly by
+// remaining users of values and `EstimateMemoryIncrease` is used only
+// to break ties. Inputs of the graph are not counted.
+class MemoryScheduler {
+public:
+    MemoryScheduler(const Graph& graph, const std::vector<Value*>& input_values, const std::vector<Value*>& output_values)
+        : input_counts_(graph.GetNecessaryNodesAndInputCounts(output_values)), kept_values_(output_values.begin(), output_values.end()) {
+        for (Node* node : graph.nodes()) {
+            if (input_counts_.count(node)) node_indices_.emplace(node, node_indices_.size());
+        }
+        for (const auto& p : input_counts_) {
+            for (const Value* value : p.first->inputs()) {
+                if (!value->IsNull()) ++remaining_uses_[value];
+            }
+            if (p.second == 0) ready_.emplace(node_indices_[p.first], p.first);
+        }
+        for (const Value* value : input_values) {
+            if (value->IsNull()) continue;
+            for (Node* node : value->users()) {
+                auto found = input_counts_.find(node);
+                if (found == input_counts_.end()) continue;
+                if (--found->second == 0) ready_.emplace(node_indices_[node], node);
+            }
+        }
+    }
+
+    std::vector<Node*> Schedule(int lookahead) {
+        std::vector<Node*> nodes;
+        while (!ready_.empty()) {
+            Node* best_node = nullptr;
+            std::tuple<int64_t, int64_t, int64_t> best_score;
+            // With lookahead, only promising nodes are examined.
+            for (Node* node : lookahead > 0 ? GetBestCandidates(kBeamWidth) : GetReadyNodes()) {
+                const Score score = Evaluate(node, lookahead);
+                std::tuple<int64_t, int64_t, int64_t> key(score.live, score.peak, EstimateMemoryIncrease(node));
+                if (!best_node || key < best_score) {
+                    best_node = node;
+                    best_score = key;
+                }
+            }
+            Apply(best_node);
+            if (best_node->chainer_order() < 0) nodes.push_back(best_node);
+        }
+        return nodes;
+    }
+
+    // Returns the peak of live bytes when `nodes` run in the order.
+    int64_t EstimatePeak(const std::vector<Node*>& nodes) {
+        int64_t peak = 0;
+        for (Node* node : nodes) {
+            peak = std::max(peak, Apply(node));
+        }
+        return peak;
+    }
+
+private:
+    // The number of candidates examined in each step of lookahead.
+    static constexpr size_t kBeamWidth = 4;
+
+    struct Score {
+        int64_t live;
+        int64_t peak;
+    };
+
+    std::vector<Node*> GetReadyNodes() const {
+        std::vector<Node*> nodes;
+        for (const auto& p : ready_) nodes.push_back(p.second);
+        return nodes;
+    }
+
+    int64_t GetBytes(const Value* value) const {
+        // Inputs of the graph are alive anyway.
+        if (!value->producer() || !input_counts_.count(value->producer())) return 0;
+        return std::max<int64_t>(value->GetNBytes(), 0);
+    }
+
+    bool IsFreed(const Value* value) const {
+        if (kept_values_.count(value)) return false;
+        auto found = remaining_uses_.find(value);
+        return found == remaining_uses_.end() || found->second == 0;
+    }
+
+    // Schedules `node` and returns live bytes during its execution.
+    int64_t Apply(Node* node) {
+        ready_.erase(std::make_pair(node_indices_[node], node));
+        for (const Value* value : node->outputs()) {
+            if (value->IsNull()) continue;
+            live_bytes_ += GetBytes(value);
+            for (Node* user : value->users()) {
+                auto found = input_counts_.find(user);
+                if (found == input_counts_.end()) continue;
+                if (--found->second == 0) ready_.emplace(node_indices_[user], user);
+            }
+        }
+        const int64_t peak = live_bytes_;
+        for (const Value* value : node->inputs()) {
+            if (value->IsNull()) continue;
+            if (--remaining_uses_[value] == 0 && !kept_values_.count(value)) live_bytes_ -= GetBytes(value);
+        }
+        for (const Value* value : node->outputs()) {
+            if (!value->IsNull() && IsFreed(value)) live_bytes_ -= GetBytes(value);
+        }
+        return peak;
+    }
+
+    // Reverts `Apply(node)`.
+    void Undo(Node* node) {
+        for (const Value* value : node->outputs()) {
+            if (!value->IsNull() && IsFreed(value)) live_bytes_ += GetBytes(value);
+        }
+        for (const Value* value : node->inputs()) {
+            if (value->IsNull()) continue;
+            if (remaining_uses_[value]++ == 0 && !kept_values_.count(value)) live_bytes_ += GetBytes(value);
+        }
+        for (const Value* value : node->outputs()) {
+            if (value->IsNull()) continue;
+            live_bytes_ -= GetBytes(value);
+            for (Node* user : value->users()) {
+                auto found = input_counts_.find(user);
+                if (found == input_counts_.end()) continue;
+                if (found->second++ == 0) ready_.erase(std::make_pair(node_indices_[user], user));
+            }
+        }
+        ready_.emplace(node_indices_[node], node);
+    }
+
+    // Returns at most `n` ready nodes with the least live bytes after
+    // scheduling them.
+    std::vector<Node*> GetBestCandidates(size_t n) {
+        std::vector<std::pair<int64_t, Node*>> candidates;
+        for (Node* node : GetReadyNodes()) {
+            candidates.emplace_back(Evaluate(node, 0).live, node);
+        }
+        std::stable_sort(candidates.begin(), candidates.end(), [](const auto& a, const auto& b) { return a.first < b.first; });
+        if (candidates.size() > n) candidates.resize(n);
+        std::vector<Node*> nodes;
+        for (const auto& p : candidates) nodes.push_back(p.second);
+        return nodes;
+    }
+
+    Score Evaluate(Node* node, int depth) {
+        const int64_t step_peak = Apply(node);
+        Score score{live_bytes_, step_peak};
+        if (depth > 0 && !ready_.empty()) {
+            Score best{-1, -1};
+            for (Node* next : GetBestCandidates(kBeamWidth)) {
+                const Score s = Evaluate(next, depth - 1);
+                if (best.live < 0 || std::make_pair(s.live, s.peak) < std::make_pair(best.live, best.peak)) best = s;
+            }
+            score = Score{best.live, std::max(step_peak, best.peak)};
+        }
+        Undo(node);
+        return score;
+    }
+
+    std::map<Node*, int> input_counts_;
+    const std::set<const Value*> kept_values_;
+    // Nodes are ordered by their positions in the graph for determinism.
+    std::map<Node*, size_t> node_indices_;
+    std::set<std::pair<size_t, Node*>> ready_;
+    std::map<const Value*, int> remaining_uses_;
+    int64_t live_bytes_{0};
+};
+
+std::vector<Node*> ScheduleMemory(const Graph& graph, const std::vector<Value*>& input_values, const std::vector<Value*>& output_values) {
+    std::vector<Node*> nodes = MemoryScheduler(graph, input_values, output_values).Schedule(g_scheduler_lookahead);
+    if (g_compiler_log) {
+        const std::vector<Node*> greedy_nodes = ScheduleGreedy(graph, input_values, output_values);
+        const int64_t greedy_peak = MemoryScheduler(graph, input_values, output_values).EstimatePeak(greedy_nodes);
+        const int64_t peak = MemoryScheduler(graph, input_values, output_values).EstimatePeak(nodes);
+        CLOG() << "Estimated peak memory of " << graph.name() << ": greedy=" << greedy_peak / 1000 / 1000 << "MB memory=" << peak / 1000 / 1000
+               << "MB" << std::endl;
+    }
+    return nodes;
+}
+
 void CheckSanity(
         const Graph& graph,
         const std::vector<Value*>& input_values,
@@ -250,6 +432,9 @@ int64_t ScheduleComputation(
         case SchedulerType::kGreedy:
             nodes = ScheduleGreedy(graph, input_values, output_values);
             break;
+        case SchedulerType::kMemory:
+            nodes = ScheduleMemory(graph, input_values, output_values);
+            break;
     }
 
     CheckSanity(graph, input_values, output_values, nodes);
@@ -264,4 +449,16 @@ int64_t ScheduleComputation(const Graph& graph, int64_t order, SchedulerType sch
     return ScheduleComputation(graph, graph.input_values(), graph.output_values(), order, scheduler_type);
 }
 
+SchedulerType GetSchedulerType(const std::string& name) {
+    if (name.empty() || name == "greedy") {
+        return SchedulerType::kGreedy;
+    } else if (name == "naive") {
+        return SchedulerType::kNaive;
+    } else if (name == "memory") {
+        return SchedulerType::kMemory;
+    }
+    CHECK(false) << "Unknown scheduler: " << name;
+    return SchedulerType::kGreedy;
+}
+
 }  // namespace chainer_compiler
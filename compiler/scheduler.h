@@ -1,4 +1,5 @@
 #include <stdint.h>
+#include <string>
 #include <vector>
 
 namespace chainer_compiler {
@@ -9,6 +10,8 @@ class Value;
 enum class SchedulerType {
     kNaive,
     kGreedy,
+    // Minimizes live bytes with lookahead of `g_scheduler_lookahead`.
+    kMemory,
 };
 
 int64_t ScheduleComputation(
@@ -20,4 +23,7 @@ int64_t ScheduleComputation(
 
 int64_t ScheduleComputation(const Graph& graph, int64_t order, SchedulerType scheduler_type = SchedulerType::kGreedy);
 
+// Returns the scheduler for "naive", "greedy", or "memory".
+SchedulerType GetSchedulerType(const std::string& name);
+
 }  // namespace chainer_compiler
@@ -4,8 +4,10 @@
 
 #include <common/log.h>
 #include <compiler/graph.h>
+#include <compiler/memory_simulator.h>
 #include <compiler/node.h>
 #include <compiler/scheduler.h>
+#include <compiler/type.h>
 
 namespace chainer_compiler {
 namespace {
@@ -94,7 +96,44 @@ TEST_P(SchedulerTest, MultipleTimes) {
     EXPECT_EQ(2, n3->chainer_order());
 }
 
-INSTANTIATE_TEST_CASE_P(ForEachScheduler, SchedulerTest, ::testing::Values(SchedulerType::kNaive, SchedulerType::kGreedy));
+INSTANTIATE_TEST_CASE_P(
+        ForEachScheduler, SchedulerTest, ::testing::Values(SchedulerType::kNaive, SchedulerType::kGreedy, SchedulerType::kMemory));
+
+// Builds a graph with two branches, each of which computes a large
+// value and then a small value.
+std::vector<Node*> BuildTwoBranches(Graph* graph) {
+    Value* x = graph->AddInputValue("x", Type(Dtype::kFloat32, {1}));
+    Value* out = graph->AddOutputValue("out", Type(Dtype::kFloat32, {1}));
+    Value* a = graph->AddValue("a", Type(Dtype::kFloat32, {750 * 1000}));
+    Value* a2 = graph->AddValue("a2", Type(Dtype::kFloat32, {1}));
+    Value* b = graph->AddValue("b", Type(Dtype::kFloat32, {1000 * 1000}));
+    Value* b2 = graph->AddValue("b2", Type(Dtype::kFloat32, {1}));
+    return {graph->AddNode(Node::kIdentity, {x}, {a}),
+            graph->AddNode(Node::kRelu, {a}, {a2}),
+            graph->AddNode(Node::kIdentity, {x}, {b}),
+            graph->AddNode(Node::kIdentity, {b}, {b2}),
+            graph->AddNode(Node::kAdd, {a2, b2}, {out})};
+}
+
+TEST(MemorySchedulerTest, DelayLargeValue) {
+    Graph graph("test");
+    std::vector<Node*> expected = BuildTwoBranches(&graph);
+    ScheduleComputation(graph, 0, SchedulerType::kMemory);
+
+    // The large value `a` is consumed before `b` is computed.
+    const std::vector<const Node*> nodes(graph.GetComputationSequence());
+    ASSERT_EQ(expected.size(), nodes.size());
+    for (size_t i = 0; i < expected.size(); ++i) {
+        EXPECT_EQ(expected[i], nodes[i]) << i;
+    }
+
+    Graph greedy_graph("test");
+    BuildTwoBranches(&greedy_graph);
+    ScheduleComputation(greedy_graph, 0, SchedulerType::kGreedy);
+    const int64_t peak = SimulateMemoryUsage(graph).peak;
+    EXPECT_GT(5 * 1000 * 1000, peak);
+    EXPECT_LE(peak, SimulateMemoryUsage(greedy_graph).peak);
+}
 
 }  // namespace
 }  // namespace chainer_compiler
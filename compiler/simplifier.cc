@@ -682,7 +682,7 @@ void Simplify(const CompilerConfig& ccfg, Graph* graph, bool gen_backprop) {
     CHECK(simplifiers.emplace(Node::kSlice, ReplaceSlice).second);
     CHECK(simplifiers.emplace(Node::kMaxRoiPool, ReplaceMaxRoiPool).second);
     CHECK(simplifiers.emplace(Node::kIdentity, RemoveIdentity).second);
-    if (!g_use_ngraph) {
+    if (!g_use_ngraph && !ccfg.HasGroupedConv()) {
         CHECK(simplifiers.emplace(Node::kConv, ReplaceConv).second);
     }
 
@@ -6,6 +6,7 @@
 #include <sstream>
 
 #include <common/log.h>
+#include <common/mapped_file.h>
 #include <compiler/serializer_util.h>
 
 namespace chainer_compiler {
@@ -70,6 +71,36 @@ Tensor::UniqueData LoadDataFromTypedData(Dtype dtype, const void* data, int64_t
     }
 }
 
+// Maps the external data without copying it if its offset is aligned.
+// Relative locations are relative to the current directory. Use
+// `LoadONNXModel` to resolve them based on the model path.
+std::shared_ptr<void> LoadExternalData(const onnx::TensorProto& xtensor, int64_t nbytes, int alignment) {
+    std::string location;
+    int64_t offset = 0;
+    int64_t length = -1;
+    for (const onnx::StringStringEntryProto& entry : xtensor.external_data()) {
+        if (entry.key() == "location") {
+            location = entry.value();
+        } else if (entry.key() == "offset") {
+            offset = std::stoll(entry.value());
+        } else if (entry.key() == "length") {
+            length = std::stoll(entry.value());
+        }
+    }
+    CHECK(!location.empty()) << "No location of external data: " << xtensor.name();
+
+    std::shared_ptr<MappedFile> file = MappedFile::Open(location);
+    if (length < 0) length = file->size() - offset;
+    CHECK_EQ(nbytes, length) << "Unexpected size of external data: " << xtensor.name();
+    CHECK_LE(offset + length, file->size()) << "External data out of range: " << xtensor.name();
+    if (offset % alignment == 0) {
+        return file->GetSharedData(offset);
+    }
+    Tensor::UniqueData p(std::malloc(nbytes), &std::free);
+    std::memcpy(p.get(), file->data() + offset, nbytes);
+    return std::shared_ptr<void>(std::move(p));
+}
+
 template <typename From, typename To>
 void DumpDataToRepeated(const Tensor& t, ::google::protobuf::RepeatedField<To>* a) {
     CHECK_LE(static_cast<size_t>(t.ElementSize()), sizeof(To));
@@ -88,12 +119,14 @@ void DumpDataToRepeated(const Tensor& t, ::google::protobuf::RepeatedField<To>*
 Tensor::Tensor(const onnx::TensorProto& xtensor)
     : dims_(xtensor.dims().begin(), xtensor.dims().end()),
       dtype_(xtensor.data_type()),
-      data_(nullptr, &std::free),
       name_(xtensor.name()),
       doc_string_(xtensor.doc_string()) {
     CHECK(!xtensor.has_segment()) << "Segmented TensorProto not supported";
 
-    if (xtensor.has_raw_data()) {
+    if (xtensor.data_location() == onnx::TensorProto::EXTERNAL) {
+        CHECK_LE(0, NumElements()) << "External data with unknown shape: " << name_;
+        data_ = LoadExternalData(xtensor, ElementSize() * NumElements(), ElementSize());
+    } else if (xtensor.has_raw_data()) {
         CHECK_EQ(0, xtensor.float_data_size());
         CHECK_EQ(0, xtensor.int32_data_size());
         CHECK_EQ(0, xtensor.string_data_size());
@@ -103,31 +136,31 @@ Tensor::Tensor(const onnx::TensorProto& xtensor)
 
         switch (dtype_) {
             case Dtype::kBool:
-                data_.reset(LoadDataFromRawData<bool>(xtensor.raw_data(), NumElements()).release());
+                data_ = LoadDataFromRawData<bool>(xtensor.raw_data(), NumElements());
                 break;
             case Dtype::kInt8:
-                data_.reset(LoadDataFromRawData<int8_t>(xtensor.raw_data(), NumElements()).release());
+                data_ = LoadDataFromRawData<int8_t>(xtensor.raw_data(), NumElements());
                 break;
             case Dtype::kInt16:
-                data_.reset(LoadDataFromRawData<int16_t>(xtensor.raw_data(), NumElements()).release());
+                data_ = LoadDataFromRawData<int16_t>(xtensor.raw_data(), NumElements());
                 break;
             case Dtype::kInt32:
-                data_.reset(LoadDataFromRawData<int32_t>(xtensor.raw_data(), NumElements()).release());
+                data_ = LoadDataFromRawData<int32_t>(xtensor.raw_data(), NumElements());
                 break;
             case Dtype::kInt64:
-                data_.reset(LoadDataFromRawData<int64_t>(xtensor.raw_data(), NumElements()).release());
+                data_ = LoadDataFromRawData<int64_t>(xtensor.raw_data(), NumElements());
                 break;
             case Dtype::kUInt8:
-                data_.reset(LoadDataFromRawData<uint8_t>(xtensor.raw_data(), NumElements()).release());
+                data_ = LoadDataFromRawData<uint8_t>(xtensor.raw_data(), NumElements());
                 break;
             case Dtype::kFloat16:
-                data_.reset(LoadDataFromRawData<int16_t>(xtensor.raw_data(), NumElements()).release());
+                data_ = LoadDataFromRawData<int16_t>(xtensor.raw_data(), NumElements());
                 break;
             case Dtype::kFloat32:
-                data_.reset(LoadDataFromRawData<float>(xtensor.raw_data(), NumElements()).release());
+                data_ = LoadDataFromRawData<float>(xtensor.raw_data(), NumElements());
                 break;
             case Dtype::kFloat64:
-                data_.reset(LoadDataFromRawData<double>(xtensor.raw_data(), NumElements()).release());
+                data_ = LoadDataFromRawData<double>(xtensor.raw_data(), NumElements());
                 break;
             default:
                 CHECK(false) << "Unknown data type: " << dtype_.ToString();
@@ -135,28 +168,28 @@ Tensor::Tensor(const onnx::TensorProto& xtensor)
     } else {
         switch (dtype_) {
             case Dtype::kBool:
-                data_.reset(LoadDataFromRepeated<int32_t, bool>(xtensor.int32_data()).release());
+                data_ = LoadDataFromRepeated<int32_t, bool>(xtensor.int32_data());
                 break;
             case Dtype::kInt8:
-                data_.reset(LoadDataFromRepeated<int32_t, int8_t>(xtensor.int32_data()).release());
+                data_ = LoadDataFromRepeated<int32_t, int8_t>(xtensor.int32_data());
                 break;
             case Dtype::kInt16:
-                data_.reset(LoadDataFromRepeated<int32_t, int16_t>(xtensor.int32_data()).release());
+                data_ = LoadDataFromRepeated<int32_t, int16_t>(xtensor.int32_data());
                 break;
             case Dtype::kInt32:
-                data_.reset(LoadDataFromRepeated<int32_t, int32_t>(xtensor.int32_data()).release());
+                data_ = LoadDataFromRepeated<int32_t, int32_t>(xtensor.int32_data());
                 break;
             case Dtype::kInt64:
-                data_.reset(LoadDataFromRepeated<int64_t, int64_t>(xtensor.int64_data()).release());
+                data_ = LoadDataFromRepeated<int64_t, int64_t>(xtensor.int64_data());
                 break;
             case Dtype::kUInt8:
-                data_.reset(LoadDataFromRepeated<int32_t, uint8_t>(xtensor.int32_data()).release());
+                data_ = LoadDataFromRepeated<int32_t, uint8_t>(xtensor.int32_data());
                 break;
             case Dtype::kFloat32:
-                data_.reset(LoadDataFromRepeated<float, float>(xtensor.float_data()).release());
+                data_ = LoadDataFromRepeated<float, float>(xtensor.float_data());
                 break;
             case Dtype::kFloat64:
-                data_.reset(LoadDataFromRepeated<double, double>(xtensor.double_data()).release());
+                data_ = LoadDataFromRepeated<double, double>(xtensor.double_data());
                 break;
             default:
                 CHECK(false) << "Unknown data type: " << dtype_.ToString();
@@ -168,6 +201,11 @@ Tensor::Tensor(const std::string& name, Dtype dtype, const std::vector<int64_t>&
     : dims_(dims), dtype_(dtype), data_(data, &std::free), name_(name), doc_string_() {
 }
 
+Tensor::Tensor(const std::string& name, Dtype dtype, const std::vector<int64_t>& dims, std::shared_ptr<void> data)
+    : dims_(dims), dtype_(dtype), data_(data), name_(name), doc_string_() {
+    CHECK(data_) << "No data for " << name;
+}
+
 Tensor::~Tensor() {
 }
 
@@ -239,10 +277,9 @@ template Tensor::Tensor(const std::string& name, Dtype dtype, const std::vector<
 Tensor::Tensor(const std::string& name, const Tensor& t)
     : dims_(t.dims_),
       dtype_(t.dtype_),
-      data_(Tensor::UniqueData(std::malloc(t.ElementSize() * t.NumElements()), &std::free)),
+      data_(t.data_),
       name_(name),
       doc_string_(t.doc_string_) {
-    std::memcpy(data_.get(), t.data_.get(), t.ElementSize() * t.NumElements());
 }
 
 }  // namespace chainer_compiler
@@ -30,10 +30,13 @@ public:
     }
     // Takes the ownership of `data`.
     Tensor(const std::string& name, Dtype dtype, const std::vector<int64_t>& dims, void* data);
+    // Shares `data`, e.g., a buffer owned by a host language.
+    Tensor(const std::string& name, Dtype dtype, const std::vector<int64_t>& dims, std::shared_ptr<void> data);
 
     Tensor(const Tensor&) = delete;
     Tensor& operator=(const Tensor&) = delete;
 
+    // Shares the data of `t`.
     Tensor(const std::string& name, const Tensor& t);
 
     void ToONNX(onnx::TensorProto* xtensor) const;
@@ -65,10 +68,16 @@ public:
         return data_.get();
     }
 
+    // The data may be shared with other tensors and arrays created
+    // by `runtime::LoadParams`, and may be memory-mapped external data.
+    const std::shared_ptr<void>& data() const {
+        return data_;
+    }
+
 private:
     std::vector<int64_t> dims_;
     Dtype dtype_;
-    UniqueData data_;
+    std::shared_ptr<void> data_;
     std::string name_;
     std::string doc_string_;
 };
@@ -1,3 +1,8 @@
+#include <stdlib.h>
+#include <unistd.h>
+
+#include <cstdint>
+#include <fstream>
 #include <string>
 
 #include <gtest/gtest.h>
@@ -43,5 +48,56 @@ TEST(TensorTest, Constructor) {
     }
 }
 
+TEST(TensorTest, SharedData) {
+    std::shared_ptr<void> data(new float[2]{2.0f, 3.0f}, [](void* p) { delete[] static_cast<float*>(p); });
+    Tensor tensor("foo", Dtype::kFloat32, {2}, data);
+    EXPECT_EQ(data.get(), tensor.GetRawData());
+    EXPECT_EQ(2.0, tensor.Get<float>(0));
+    EXPECT_EQ(3.0, tensor.Get<float>(1));
+    EXPECT_EQ(2, data.use_count());
+}
+
+TEST(TensorTest, ExternalData) {
+    char filename[] = "/tmp/tensor_test_XXXXXX";
+    int fd = mkstemp(filename);
+    ASSERT_LE(0, fd);
+    close(fd);
+    {
+        const float data[] = {0.0f, 1.0f, 2.0f, 3.0f, 4.0f};
+        std::ofstream ofs(filename, std::ios::binary);
+        ofs.write(reinterpret_cast<const char*>(data), sizeof(data));
+        ofs.write(reinterpret_cast<const char*>(data), 3);
+    }
+
+    auto make_xtensor = [&filename](int offset) {
+        onnx::TensorProto xtensor;
+        xtensor.set_name("foo");
+        xtensor.set_data_type(onnx::TensorProto::FLOAT);
+        xtensor.add_dims(2);
+        xtensor.set_data_location(onnx::TensorProto::EXTERNAL);
+        for (const auto& p : std::vector<std::pair<std::string, std::string>>{
+                     {"location", filename}, {"offset", std::to_string(offset)}, {"length", "8"}}) {
+            onnx::StringStringEntryProto* entry = xtensor.add_external_data();
+            entry->set_key(p.first);
+            entry->set_value(p.second);
+        }
+        return xtensor;
+    };
+
+    {
+        Tensor tensor(make_xtensor(8));
+        EXPECT_EQ(2.0, tensor.Get<float>(0));
+        EXPECT_EQ(3.0, tensor.Get<float>(1));
+        Tensor copied("bar", tensor);
+        EXPECT_EQ(tensor.GetRawData(), copied.GetRawData());
+    }
+    {
+        // Unaligned data is copied.
+        Tensor tensor(make_xtensor(2));
+        EXPECT_EQ(0, reinterpret_cast<uintptr_t>(tensor.GetRawData()) % sizeof(float));
+    }
+    unlink(filename);
+}
+
 }  // namespace
 }  // namespace chainer_compiler
@@ -1,11 +1,69 @@
 #include "compiler/util.h"
 
+#include <common/protoutil.h>
 #include <common/strutil.h>
 
 #include <compiler/tensor.h>
 
 namespace chainer_compiler {
 
+namespace {
+
+bool HasExternalData(const onnx::TensorProto& tensor) {
+    return tensor.data_location() == onnx::TensorProto::EXTERNAL;
+}
+
+void ResolveExternalDataLocations(const std::string& dir, onnx::TensorProto* tensor) {
+    if (!HasExternalData(*tensor)) return;
+    for (int i = 0; i < tensor->external_data_size(); ++i) {
+        onnx::StringStringEntryProto* entry = tensor->mutable_external_data(i);
+        if (entry->key() == "location" && !HasPrefix(entry->value(), "/")) {
+            entry->set_value(StrCat(dir, '/', entry->value()));
+        }
+    }
+}
+
+void ResolveExternalDataLocations(const std::string& dir, onnx::GraphProto* graph) {
+    for (int i = 0; i < graph->initializer_size(); ++i) {
+        ResolveExternalDataLocations(dir, graph->mutable_initializer(i));
+    }
+    for (int i = 0; i < graph->node_size(); ++i) {
+        onnx::NodeProto* node = graph->mutable_node(i);
+        for (int j = 0; j < node->attribute_size(); ++j) {
+            onnx::AttributeProto* attr = node->mutable_attribute(j);
+            if (attr->type() == onnx::AttributeProto::TENSOR) {
+                ResolveExternalDataLocations(dir, attr->mutable_t());
+            } else if (attr->type() == onnx::AttributeProto::GRAPH) {
+                ResolveExternalDataLocations(dir, attr->mutable_g());
+            }
+        }
+    }
+}
+
+void GetExternalDataFiles(const onnx::TensorProto& tensor, std::set<std::string>* files) {
+    if (!HasExternalData(tensor)) return;
+    for (const onnx::StringStringEntryProto& entry : tensor.external_data()) {
+        if (entry.key() == "location") files->insert(entry.value());
+    }
+}
+
+void GetExternalDataFiles(const onnx::GraphProto& graph, std::set<std::string>* files) {
+    for (const onnx::TensorProto& tensor : graph.initializer()) {
+        GetExternalDataFiles(tensor, files);
+    }
+    for (const onnx::NodeProto& node : graph.node()) {
+        for (const onnx::AttributeProto& attr : node.attribute()) {
+            if (attr.type() == onnx::AttributeProto::TENSOR) {
+                GetExternalDataFiles(attr.t(), files);
+            } else if (attr.type() == onnx::AttributeProto::GRAPH) {
+                GetExternalDataFiles(attr.g(), files);
+            }
+        }
+    }
+}
+
+}  // namespace
+
 void MakeHumanReadableValue(onnx::TensorProto* tensor) {
     if (tensor->raw_data().empty()) return;
     Tensor t(*tensor);
@@ -53,6 +111,20 @@ void StripONNXModel(onnx::ModelProto* model) {
     StripONNXGraph(model->mutable_graph());
 }
 
+onnx::ModelProto LoadONNXModel(const std::string& path) {
+    onnx::ModelProto model(LoadLargeProto<onnx::ModelProto>(path));
+    const size_t found = path.rfind('/');
+    const std::string dir = found == std::string::npos ? "." : path.substr(0, found);
+    ResolveExternalDataLocations(dir, model.mutable_graph());
+    return model;
+}
+
+std::set<std::string> GetExternalDataFiles(const onnx::ModelProto& model) {
+    std::set<std::string> files;
+    GetExternalDataFiles(model.graph(), &files);
+    return files;
+}
+
 std::string CleanseIdent(const std::string& s) {
     std::string o;
     for (char c : s) {
@@ -1,5 +1,8 @@
 #pragma once
 
+#include <set>
+#include <string>
+
 #include <compiler/onnx.h>
 
 namespace chainer_compiler {
@@ -12,6 +15,13 @@ void StripONNXGraph(onnx::GraphProto* graph);
 
 void StripONNXModel(onnx::ModelProto* model);
 
+// Loads an ONNX model. Relative locations of external data are
+// resolved based on the directory of `path`.
+onnx::ModelProto LoadONNXModel(const std::string& path);
+
+// Returns the files which have external data of tensors in `model`.
+std::set<std::string> GetExternalDataFiles(const onnx::ModelProto& model);
+
 std::string CleanseIdent(const std::string& s);
 
 }  // namespace chainer_compiler
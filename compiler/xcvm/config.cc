@@ -13,6 +13,9 @@ class XCVMCompilerConfig : public CompilerConfig {
 public:
     explicit XCVMCompilerConfig(bool diversed) {
         name_ = diversed ? "xcvm_test" : "xcvm";
+        // Grouped Conv is split into per-group Conv ops for the test
+        // backend.
+        has_grouped_conv_ = !diversed;
 
         CHECK(op_set_.emplace(Node::kAbs).second);
         CHECK(op_set_.emplace(Node::kAcos).second);
@@ -49,6 +52,8 @@ public:
         CHECK(op_set_.emplace(Node::kChainerLSTMGrad).second);
         CHECK(op_set_.emplace(Node::kChainerMaxPoolGrad).second);
         CHECK(op_set_.emplace(Node::kChainerMaxPoolGradNoCtx).second);
+        CHECK(op_set_.emplace(Node::kChainerNStepLSTM).second);
+        CHECK(op_set_.emplace(Node::kChainerNStepLSTMGrad).second);
         CHECK(op_set_.emplace(Node::kChainerNullConstant).second);
         CHECK(op_set_.emplace(Node::kChainerPrint).second);
         CHECK(op_set_.emplace(Node::kChainerROIAverageAlign2D).second);
@@ -160,12 +165,17 @@ public:
         return op_set_.count(op);
     }
 
+    virtual bool HasGroupedConv() const {
+        return has_grouped_conv_;
+    }
+
     virtual std::string name() const {
         return name_;
     }
 
 protected:
     std::string name_;
+    bool has_grouped_conv_;
     std::set<Node::OpType> op_set_;
 };
 
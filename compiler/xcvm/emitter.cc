@@ -4,10 +4,12 @@
 
 #include <common/log.h>
 #include <common/strutil.h>
+#include <compiler/cpu_fusion_builder.h>
 #include <compiler/flags.h>
 #include <compiler/gen_xcvm_codegen.h>
 #include <compiler/graph.h>
 #include <compiler/log.h>
+#include <compiler/memory_planner.h>
 #include <compiler/model.h>
 #include <compiler/node.h>
 #include <compiler/nvrtc_builder.h>
@@ -15,6 +17,7 @@
 #include <compiler/passes.h>
 #include <compiler/tvm/compiler.h>
 #include <compiler/value.h>
+#include <compiler/xcvm/register_allocator.h>
 #include <runtime/xcvm.pb.h>
 
 namespace chainer_compiler {
@@ -50,6 +53,58 @@ std::vector<int64_t> ComplementStrideOrPad(const std::vector<int64_t>& orig, con
     return filled;
 }
 
+// Returns true if the output of `node` may be placed in the memory
+// arena. The runtime of these ops writes its output into the arena.
+bool CanOutputToArena(const Node& node) {
+    switch (node.op_type()) {
+        case Node::kAdd:
+        case Node::kSub:
+        case Node::kMul:
+        case Node::kMatMul:
+        case Node::kGemm:
+        case Node::kChainerFusionGroup:
+            return true;
+        default:
+            return false;
+    }
+}
+
+// Returns true if the runtime of `node` neither returns views of its
+// inputs nor keeps references to them after it finishes.
+bool ReleasesInputs(const Node& node) {
+    switch (node.op_type()) {
+        case Node::kAdd:
+        case Node::kSub:
+        case Node::kMul:
+        case Node::kDiv:
+        case Node::kNeg:
+        case Node::kExp:
+        case Node::kLog:
+        case Node::kSqrt:
+        case Node::kTanh:
+        case Node::kSigmoid:
+        case Node::kRelu:
+        case Node::kConv:
+        case Node::kMatMul:
+        case Node::kGemm:
+            return true;
+        default:
+            return false;
+    }
+}
+
+// A value can be placed in the memory arena only when its memory is
+// not referenced after the planned lifetime, i.e., its last user.
+bool CanPlaceInArena(const Value* value) {
+    if (!value->IsTemp() || !value->producer() || value->users().empty()) return false;
+    if (value->type().kind() != Type::Kind::kTensor) return false;
+    if (!CanOutputToArena(*value->producer())) return false;
+    for (const Node* user : value->users()) {
+        if (!ReleasesInputs(*user)) return false;
+    }
+    return true;
+}
+
 void FillOpInfo(const Node& node, const std::string& debug_info, XCProgramProto* prog) {
     runtime::XCInstructionProto* inst = prog->mutable_instructions(prog->instructions_size() - 1);
     inst->set_debug_info(debug_info);
@@ -64,6 +119,12 @@ public:
     void EmitModel(const Graph& graph, XCProgramProto* program, bool dump_value_names) {
         EmitInputTypes(graph, program);
         AssignValueIds(graph);
+        if (g_use_memory_arena) {
+            MemoryPlan plan = PlanMemory(graph, CanPlaceInArena);
+            CLOG() << "Memory arena: " << plan.arena_size << " bytes for " << plan.offsets.size() << " values" << std::endl;
+            program->set_arena_size(plan.arena_size);
+            arena_offsets_ = plan.offsets;
+        }
         EmitGraph(graph, program, false /* in_loop */, graph.output_values());
         EmitOutputs(graph.output_values(), program);
         if (dump_value_names) {
@@ -291,7 +352,11 @@ private:
             CHECK_EQ(1UL, node.outputs().size());
             // TODO(ChainerX): Support dilation.
             for (int d : node.dilations()) CHECK_EQ(d, 1) << "Dilation is not supported yet";
-            EMIT(Conv, out(0), in(0), in(1), oin(2), strides(), pads());
+            if (node.group() > 1) {
+                EMIT(GroupedConv, out(0), in(0), in(1), oin(2), strides(), pads(), node.group());
+            } else {
+                EMIT(Conv, out(0), in(0), in(1), oin(2), strides(), pads());
+            }
         } else if (node.op_type() == Node::kConvTranspose) {
             CHECK_LE(2UL, node.inputs().size());
             CHECK_GE(3UL, node.inputs().size());
@@ -300,17 +365,29 @@ private:
             for (int d : node.dilations()) CHECK_EQ(d, 1) << "Dilation is not supported yet";
             // TODO(hamaji): Handle output_padding and output_shape.
             std::vector<int64_t> output_shape(node.output_shape());
-            EMIT(ConvTranspose, out(0), in(0), in(1), oin(2), strides(), pads(), output_shape);
+            if (node.group() > 1) {
+                EMIT(GroupedConvTranspose, out(0), in(0), in(1), oin(2), strides(), pads(), output_shape, node.group());
+            } else {
+                EMIT(ConvTranspose, out(0), in(0), in(1), oin(2), strides(), pads(), output_shape);
+            }
         } else if (node.op_type() == Node::kChainerConvTransposeWithDynamicOutputShape) {
             CHECK_EQ(3UL, node.inputs().size());
             CHECK_EQ(1UL, node.outputs().size());
-            EMIT(ConvTransposeWithDynamicShape, out(0), in(0), in(1), in(2), strides(), pads());
+            if (node.group() > 1) {
+                EMIT(GroupedConvTransposeWithDynamicShape, out(0), in(0), in(1), in(2), strides(), pads(), node.group());
+            } else {
+                EMIT(ConvTransposeWithDynamicShape, out(0), in(0), in(1), in(2), strides(), pads());
+            }
         } else if (node.op_type() == Node::kChainerConvGradWeight) {
             CHECK_EQ(3UL, node.inputs().size());
             CHECK_EQ(1UL, node.outputs().size());
             // TODO(ChainerX): Support dilation.
             for (int d : node.dilations()) CHECK_EQ(d, 1) << "Dilation is not supported yet";
-            EMIT(ConvGradWeight, out(0), in(0), in(1), in(2), strides(), pads());
+            if (node.group() > 1) {
+                EMIT(GroupedConvGradWeight, out(0), in(0), in(1), in(2), strides(), pads(), node.group());
+            } else {
+                EMIT(ConvGradWeight, out(0), in(0), in(1), in(2), strides(), pads());
+            }
         } else if (node.op_type() == Node::kRNN) {
             CHECK(node.activations().empty()) << "activations not supporte yet";
             CHECK(node.activation_alpha().empty()) << "activation_alpha not supporte yet";
@@ -353,6 +430,16 @@ private:
                  direction());
         } else if (node.op_type() == Node::kChainerLSTMGrad) {
             EMIT(LSTMGrad, out(0), out(1), out(2), out(3), in(0), in(1));
+        } else if (node.op_type() == Node::kChainerNStepLSTM) {
+            CHECK_LE(5UL, node.inputs().size());
+            CHECK_EQ(2UL, node.inputs().size() % 3);
+            std::vector<int> weights;
+            for (size_t i = 2; i < node.inputs().size(); ++i) weights.push_back(in(i));
+            EMIT(NStepLSTM, out(0), out(1), out(2), oout(3), in(0), in(1), weights, node.hidden_size(), direction());
+        } else if (node.op_type() == Node::kChainerNStepLSTMGrad) {
+            std::vector<XCVMValue> outs;
+            for (size_t i = 0; i < node.outputs().size(); ++i) outs.push_back(out(i));
+            EMIT(NStepLSTMGrad, outs, oin(0), oin(1), oin(2), in(3));
         } else if (node.op_type() == Node::kShape) {
             CHECK_EQ(1UL, node.inputs().size());
             CHECK_EQ(1UL, node.outputs().size());
@@ -787,7 +874,9 @@ private:
                 }
             }
 
+            const int node_begin = prog->instructions_size();
             EmitNode(&graph, *node, prog);
+            if (!in_loop) SetArenaOffsets(*node, node_begin, prog);
 
             for (const Value* output : node->outputs()) {
                 // Do not free output values.
@@ -808,6 +897,27 @@ private:
         }
     }
 
+    // Records offsets of outputs of `node` placed in the memory arena
+    // to instructions emitted for `node` from `begin`.
+    void SetArenaOffsets(const Node& node, int begin, XCProgramProto* prog) {
+        std::map<int, int64_t> offsets;
+        for (const Value* output : node.outputs()) {
+            auto found = arena_offsets_.find(output);
+            if (found != arena_offsets_.end()) offsets.emplace(GetValueId(output), found->second);
+        }
+        if (offsets.empty()) return;
+        for (int pc = begin; pc < prog->instructions_size(); ++pc) {
+            runtime::XCInstructionProto* inst = prog->mutable_instructions(pc);
+            bool has_offset = false;
+            for (int id : inst->outputs()) has_offset |= offsets.count(id) > 0;
+            if (!has_offset) continue;
+            for (int id : inst->outputs()) {
+                auto found = offsets.find(id);
+                inst->add_output_offsets(found == offsets.end() ? -1 : found->second);
+            }
+        }
+    }
+
     std::string GetFusionGroupSummary(const Node& node) {
         std::string ret = node.ToString();
         ret += " (";
@@ -905,6 +1015,26 @@ private:
             return;
         }
 
+        std::string cpu_program;
+        if (g_use_cpu_fusion && node.fusion_type() == "nvrtc" &&
+            BuildCpuFusionProgram(body.nodes(), body.input_values(), body.output_values(), &cpu_program)) {
+            if (g_compiler_log) {
+                CLOG() << "Fusion group (CPU) " << GetFusionGroupSummary(node) << std::endl;
+                CLOG() << cpu_program;
+            }
+
+            std::vector<int> inputs;
+            std::vector<XCVMValue> outputs;
+            for (Value* value : node.inputs()) {
+                inputs.push_back(GetValueId(value));
+            }
+            for (Value* value : node.outputs()) {
+                outputs.emplace_back(GetValueId(value), value);
+            }
+            EMIT(ElementWiseCpu, outputs, inputs, outputs.size(), cpu_program);
+            return;
+        }
+
         AssignValueIds(body);
 
         for (size_t i = 0; i < node.inputs().size(); ++i) {
@@ -1052,11 +1182,14 @@ private:
             EMIT(Identity, XCVMValue(GetValueId(body_in)), GetValueId(loop_in));
         }
 
-        // Prepare temporary sequences for scan outputs.
+        // Prepare buffers for scan outputs. The trip count is known
+        // only when there is no terminal condition. Otherwise, the
+        // buffers grow geometrically.
         std::vector<int> scan_out_ids;
+        const int capacity_id = terminal_condition->IsNull() ? GetValueId(max_trip_count) : -1;
         for (int i = 0; i < num_scans; ++i) {
             int id = next_value_id_++;
-            EMIT(SequenceCreate, XCVMValue(id), {});
+            EMIT(ScanBufferCreate, XCVMValue(id), capacity_id);
             scan_out_ids.push_back(id);
         }
 
@@ -1116,7 +1249,7 @@ private:
         for (int i = 0; i < num_scans; ++i) {
             CHECK_LT(i + num_states + 1, body_output_values.size());
             const Value* body_out = body_output_values[i + num_states + 1];
-            EMIT(SequenceAppend, scan_out_ids[i], GetValueId(body_out));
+            EMIT(ScanBufferAppend, scan_out_ids[i], GetValueId(body_out));
             FREE(GetValueId(body_out));
         }
 
@@ -1158,7 +1291,7 @@ private:
         for (int i = 0; i < num_scans; ++i) {
             CHECK_LT(i + num_states, loop.outputs().size());
             const Value* loop_out = loop.output(i + num_states);
-            EMIT(SequenceStack, XCVMValue(GetValueId(loop_out)), scan_out_ids[i], loop.chainer_stack_axis());
+            EMIT(ScanBufferStack, XCVMValue(GetValueId(loop_out)), scan_out_ids[i], loop.chainer_stack_axis());
             FREE(scan_out_ids[i]);
         }
 
@@ -1202,6 +1335,7 @@ private:
     std::map<const Value*, int> value_ids_;
     std::map<int, int> stack_ids_;
     std::set<const Node*> emitted_;
+    std::map<const Value*, int64_t> arena_offsets_;
 };
 
 }  // namespace
@@ -1213,6 +1347,10 @@ void Emit(const Model& model, XCProgramProto* program, bool dump_value_names) {
 void Emit(const Graph& graph, XCProgramProto* program, bool dump_value_names) {
     XCVMEmitter emitter;
     emitter.EmitModel(graph, program, dump_value_names);
+    if (g_reuse_variable_slots) {
+        int num_slots = AllocateRegisters(program);
+        CLOG() << "Variable slots after register allocation: " << num_slots << std::endl;
+    }
 }
 
 void Emit(const Model& model, std::ostream& out, bool dump_value_names) {
@@ -0,0 +1,93 @@
+#include "compiler/xcvm/program_cache.h"
+
+#include <sys/stat.h>
+#include <sys/types.h>
+#include <unistd.h>
+
+#include <cerrno>
+#include <cstdio>
+#include <cstring>
+#include <fstream>
+#include <limits>
+
+#include <google/protobuf/descriptor.h>
+#include <google/protobuf/io/coded_stream.h>
+#include <google/protobuf/io/zero_copy_stream_impl.h>
+#include <google/protobuf/message.h>
+
+#include <common/log.h>
+#include <common/sha256.h>
+#include <common/strutil.h>
+#include <compiler/flags.h>
+#include <runtime/xcvm.pb.h>
+
+namespace chainer_compiler {
+namespace xcvm {
+namespace {
+
+// Bump this when the layout of cache entries changes.
+constexpr int kCacheVersion = 1;
+
+// Opcodes in cached programs are valid only while XCVM ops are not
+// renumbered.
+std::string GetXCVMOpsString() {
+    const google::protobuf::EnumDescriptor* ops = runtime::XCInstructionProto_Op_descriptor();
+    std::string str;
+    for (int i = 0; i < ops->value_count(); ++i) {
+        str += StrCat(ops->value(i)->name(), '=', ops->value(i)->number(), ' ');
+    }
+    return str;
+}
+
+}  // namespace
+
+ProgramCache::ProgramCache(const std::string& cache_dir) : cache_dir_(cache_dir) {
+    CHECK(!cache_dir_.empty());
+    if (mkdir(cache_dir_.c_str(), 0755) != 0) {
+        CHECK_EQ(EEXIST, errno) << "Failed to create the cache directory " << cache_dir_ << ": " << strerror(errno);
+    }
+}
+
+std::string ProgramCache::GetKey(const std::string& model, const std::string& options) {
+    SHA256 sha256;
+    for (const std::string& str : {StrCat("version=", kCacheVersion), GetCodegenFlagsString(), GetXCVMOpsString(), options}) {
+        // Length prefixes keep the boundaries of fields.
+        sha256.Update(StrCat(str.size(), ':', str));
+    }
+    sha256.Update(model);
+    return sha256.HexDigest();
+}
+
+bool ProgramCache::Load(const std::string& key, const std::string& name, google::protobuf::Message* proto) const {
+    const std::string path = GetPath(key, name);
+    struct stat st;
+    if (stat(path.c_str(), &st) != 0) {
+        CHECK_EQ(ENOENT, errno) << "Failed to stat " << path << ": " << strerror(errno);
+        return false;
+    }
+    std::ifstream ifs(path, std::ios::binary);
+    CHECK(ifs) << "Failed to open " << path;
+    google::protobuf::io::IstreamInputStream iis(&ifs);
+    google::protobuf::io::CodedInputStream cis(&iis);
+    cis.SetTotalBytesLimit(std::numeric_limits<int>::max(), std::numeric_limits<int>::max());
+    CHECK(proto->ParseFromCodedStream(&cis)) << "Broken cache entry: " << path;
+    return true;
+}
+
+void ProgramCache::Store(const std::string& key, const std::string& name, const google::protobuf::Message& proto) const {
+    const std::string path = GetPath(key, name);
+    const std::string tmp_path = StrCat(path, ".tmp.", getpid());
+    {
+        std::ofstream ofs(tmp_path, std::ios::binary);
+        CHECK(ofs) << "Failed to open " << tmp_path;
+        CHECK(proto.SerializeToOstream(&ofs)) << "Failed to write " << tmp_path;
+    }
+    CHECK_EQ(0, std::rename(tmp_path.c_str(), path.c_str())) << "Failed to rename " << tmp_path << ": " << strerror(errno);
+}
+
+std::string ProgramCache::GetPath(const std::string& key, const std::string& name) const {
+    return StrCat(cache_dir_, '/', key, '.', name);
+}
+
+}  // namespace xcvm
+}  // namespace chainer_compiler
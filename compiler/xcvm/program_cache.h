@@ -0,0 +1,47 @@
+#pragma once
+
+#include <string>
+
+namespace google {
+namespace protobuf {
+class Message;
+}  // namespace protobuf
+}  // namespace google
+
+namespace chainer_compiler {
+namespace xcvm {
+
+// A content-addressed on-disk cache of compiled XCVM programs. A key
+// is a digest of the input model, the flags in compiler/flags.h
+// (including the backend), the set of XCVM ops, and `options` which
+// can contain anything else which affects the compilation. Each key
+// can have multiple entries (e.g., programs for forward and backward
+// computation and the optimized ONNX model), distinguished by names.
+//
+// The cache does not know changes of the compiler itself. Clear the
+// cache directory after updating the compiler.
+class ProgramCache {
+public:
+    explicit ProgramCache(const std::string& cache_dir);
+
+    static std::string GetKey(const std::string& model, const std::string& options = "");
+
+    // Returns false if the entry does not exist.
+    bool Load(const std::string& key, const std::string& name, google::protobuf::Message* proto) const;
+
+    // Entries are written atomically so processes can share a cache
+    // directory.
+    void Store(const std::string& key, const std::string& name, const google::protobuf::Message& proto) const;
+
+    const std::string& cache_dir() const {
+        return cache_dir_;
+    }
+
+private:
+    std::string GetPath(const std::string& key, const std::string& name) const;
+
+    const std::string cache_dir_;
+};
+
+}  // namespace xcvm
+}  // namespace chainer_compiler
@@ -0,0 +1,55 @@
+#include <stdlib.h>
+
+#include <gtest/gtest.h>
+
+#include <common/log.h>
+#include <compiler/flags.h>
+#include <compiler/xcvm/program_cache.h>
+#include <runtime/xcvm.pb.h>
+
+namespace chainer_compiler {
+namespace xcvm {
+namespace {
+
+TEST(ProgramCacheTest, Key) {
+    const std::string key = ProgramCache::GetKey("model");
+    EXPECT_EQ(64, key.size());
+    EXPECT_EQ(key, ProgramCache::GetKey("model"));
+    EXPECT_NE(key, ProgramCache::GetKey("model2"));
+    EXPECT_NE(key, ProgramCache::GetKey("model", "backprop"));
+
+    const bool orig_fuse_operations = g_fuse_operations;
+    g_fuse_operations = !orig_fuse_operations;
+    EXPECT_NE(key, ProgramCache::GetKey("model"));
+    g_fuse_operations = orig_fuse_operations;
+}
+
+TEST(ProgramCacheTest, StoreAndLoad) {
+    char tmpl[] = "/tmp/program_cache_test_XXXXXX";
+    CHECK(mkdtemp(tmpl));
+    ProgramCache cache(tmpl);
+    const std::string key = ProgramCache::GetKey("model");
+
+    runtime::XCProgramProto program;
+    EXPECT_FALSE(cache.Load(key, "xcvm", &program));
+
+    program.add_input_names("input");
+    runtime::XCInstructionProto* inst = program.add_instructions();
+    inst->set_op(runtime::XCInstructionProto::Identity);
+    inst->set_id(42);
+    cache.Store(key, "xcvm", program);
+
+    runtime::XCProgramProto loaded;
+    ASSERT_TRUE(cache.Load(key, "xcvm", &loaded));
+    EXPECT_EQ(program.SerializeAsString(), loaded.SerializeAsString());
+    EXPECT_FALSE(cache.Load(key, "bp.xcvm", &loaded));
+    EXPECT_FALSE(cache.Load(ProgramCache::GetKey("model2"), "xcvm", &loaded));
+
+    // The directory already exists.
+    ProgramCache cache2(tmpl);
+    EXPECT_TRUE(cache2.Load(key, "xcvm", &loaded));
+}
+
+}  // namespace
+}  // namespace xcvm
+}  // namespace chainer_compiler
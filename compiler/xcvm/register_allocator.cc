@@ -0,0 +1,165 @@
+#include "compiler/xcvm/register_allocator.h"
+
+#include <algorithm>
+#include <set>
+#include <utility>
+#include <vector>
+
+#include <common/log.h>
+#include <runtime/xcvm.pb.h>
+
+namespace chainer_compiler {
+namespace xcvm {
+namespace {
+
+using runtime::XCInstructionProto;
+using runtime::XCProgramProto;
+using runtime::XCValueProto;
+
+// Calls `fn` for all variable IDs referenced by `inst` and replaces
+// them by the return values of `fn`. `is_output` is true for values
+// defined by `inst`.
+template <class Fn>
+void RewriteVariables(XCInstructionProto* inst, Fn fn) {
+    for (XCValueProto& input : *inst->mutable_inputs()) {
+        switch (input.type()) {
+            case XCValueProto::ARRAY:
+                if (input.array() >= 0) input.set_array(fn(input.array(), false));
+                break;
+            case XCValueProto::ARRAY_LIST:
+                for (int i = 0; i < input.array_list_size(); ++i) {
+                    if (input.array_list(i) >= 0) input.set_array_list(i, fn(input.array_list(i), false));
+                }
+                break;
+            case XCValueProto::SEQUENCE:
+                if (input.sequence() >= 0) input.set_sequence(fn(input.sequence(), false));
+                break;
+            case XCValueProto::OPAQUE:
+                if (input.opaque() >= 0) input.set_opaque(fn(input.opaque(), false));
+                break;
+            default:
+                break;
+        }
+    }
+    for (int i = 0; i < inst->outputs_size(); ++i) {
+        if (inst->outputs(i) >= 0) inst->set_outputs(i, fn(inst->outputs(i), true));
+    }
+}
+
+int GetJumpTarget(const XCInstructionProto& inst) {
+    switch (inst.op()) {
+        case XCInstructionProto::Jmp:
+            return inst.inputs(0).i();
+        case XCInstructionProto::JmpTrue:
+        case XCInstructionProto::JmpFalse:
+            return inst.inputs(1).i();
+        default:
+            return -1;
+    }
+}
+
+struct LiveRange {
+    int id{-1};
+    int begin{-1};
+    int end{-1};
+    // True if the first reference defines the value.
+    bool begins_with_def{false};
+    // True if the last reference is a `Free`, i.e., the slot is known
+    // to be empty after `end`.
+    bool ends_with_free{false};
+};
+
+}  // namespace
+
+int AllocateRegisters(XCProgramProto* program) {
+    std::vector<LiveRange> ranges;
+    std::vector<std::pair<int, int>> loops;
+    for (int pc = 0; pc < program->instructions_size(); ++pc) {
+        XCInstructionProto* inst = program->mutable_instructions(pc);
+        const bool is_free = inst->op() == XCInstructionProto::Free;
+        RewriteVariables(inst, [&ranges, pc, is_free](int id, bool is_output) {
+            if (ranges.size() <= id) ranges.resize(id + 1);
+            LiveRange* range = &ranges[id];
+            if (range->id < 0) {
+                range->id = id;
+                range->begin = pc;
+                range->begins_with_def = is_output;
+            }
+            range->end = pc;
+            range->ends_with_free = is_free;
+            return id;
+        });
+
+        const int target = GetJumpTarget(*inst);
+        if (0 <= target && target <= pc) {
+            loops.emplace_back(target, pc);
+        }
+    }
+
+    // A value which is alive at the boundary of a loop must be kept
+    // during the entire loop. Iterate until the fixpoint for nested
+    // loops.
+    for (bool changed = true; changed;) {
+        changed = false;
+        for (LiveRange& range : ranges) {
+            if (range.id < 0) continue;
+            for (const std::pair<int, int>& loop : loops) {
+                const int head = loop.first;
+                const int tail = loop.second;
+                if (range.end < head || tail < range.begin) continue;
+                const bool contained = head <= range.begin && range.end <= tail;
+                if (contained && range.begins_with_def) continue;
+                if (head < range.begin) {
+                    range.begin = head;
+                    changed = true;
+                }
+                if (range.end < tail) {
+                    range.end = tail;
+                    changed = true;
+                }
+            }
+        }
+    }
+
+    std::vector<const LiveRange*> sorted;
+    for (const LiveRange& range : ranges) {
+        if (range.id >= 0) sorted.push_back(&range);
+    }
+    std::stable_sort(sorted.begin(), sorted.end(), [](const LiveRange* a, const LiveRange* b) { return a->begin < b->begin; });
+
+    // Slot ID zero is kept unused as the emitter does.
+    int num_slots = 1;
+    std::vector<int> slots(ranges.size(), -1);
+    std::set<int> free_slots;
+    std::set<std::pair<int, int>> active;
+    for (const LiveRange* range : sorted) {
+        while (!active.empty() && active.begin()->first < range->begin) {
+            free_slots.insert(active.begin()->second);
+            active.erase(active.begin());
+        }
+
+        int slot;
+        if (free_slots.empty()) {
+            slot = num_slots++;
+        } else {
+            slot = *free_slots.begin();
+            free_slots.erase(free_slots.begin());
+        }
+        slots[range->id] = slot;
+        // Slots of values which may not be freed are never reused.
+        if (range->ends_with_free) {
+            active.emplace(range->end, slot);
+        }
+    }
+
+    for (XCInstructionProto& inst : *program->mutable_instructions()) {
+        RewriteVariables(&inst, [&slots](int id, bool is_output) {
+            CHECK_LE(0, slots[id]) << id;
+            return slots[id];
+        });
+    }
+    return num_slots;
+}
+
+}  // namespace xcvm
+}  // namespace chainer_compiler
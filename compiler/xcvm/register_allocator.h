@@ -0,0 +1,19 @@
+#pragma once
+
+namespace chainer_compiler {
+
+namespace runtime {
+class XCProgramProto;
+}
+
+namespace xcvm {
+
+// Renumbers variable IDs in `program` so values whose lifetimes do
+// not overlap share the same slot. Lifetimes are computed over the
+// linearized instruction stream and values alive across a backward
+// jump are kept alive for the entire loop. Returns the number of
+// variable slots required by the rewritten program.
+int AllocateRegisters(runtime::XCProgramProto* program);
+
+}  // namespace xcvm
+}  // namespace chainer_compiler
@@ -0,0 +1,72 @@
+#include <gtest/gtest.h>
+
+#include <compiler/gen_xcvm_codegen.h>
+#include <compiler/xcvm/register_allocator.h>
+#include <compiler/xcvm/xcvm_value.h>
+#include <runtime/xcvm.pb.h>
+
+namespace chainer_compiler {
+namespace xcvm {
+namespace {
+
+using runtime::XCProgramProto;
+
+TEST(RegisterAllocatorTest, Basic) {
+    XCProgramProto program;
+    AddInOp(&program, XCVMValue(1), "a");
+    AddInOp(&program, XCVMValue(2), "b");
+    AddAddOp(&program, XCVMValue(3), 1, 2);
+    AddFreeOp(&program, 1);
+    AddFreeOp(&program, 2);
+    AddReluOp(&program, XCVMValue(4), 3);
+    AddFreeOp(&program, 3);
+    AddOutOp(&program, "out", 4);
+    AddFreeOp(&program, 4);
+
+    EXPECT_EQ(4, AllocateRegisters(&program));
+
+    EXPECT_EQ(1, program.instructions(0).outputs(0));
+    EXPECT_EQ(2, program.instructions(1).outputs(0));
+    EXPECT_EQ(3, program.instructions(2).outputs(0));
+    // The slot of `a` is reused for the output of Relu.
+    EXPECT_EQ(1, program.instructions(5).outputs(0));
+    EXPECT_EQ(3, program.instructions(5).inputs(0).array());
+    EXPECT_EQ(1, program.instructions(7).inputs(1).array());
+}
+
+TEST(RegisterAllocatorTest, Loop) {
+    XCProgramProto program;
+    AddInOp(&program, XCVMValue(1), "x");
+    AddInOp(&program, XCVMValue(2), "cond");
+    // Loop begin.
+    AddReluOp(&program, XCVMValue(3), 1);
+    AddFreeOp(&program, 3);
+    AddReluOp(&program, XCVMValue(4), 1);
+    AddFreeOp(&program, 4);
+    AddJmpTrueOp(&program, 2, 2);
+    // Loop end.
+    AddFreeOp(&program, 2);
+    AddReluOp(&program, XCVMValue(5), 1);
+    AddFreeOp(&program, 1);
+    AddOutOp(&program, "out", 5);
+    AddFreeOp(&program, 5);
+
+    EXPECT_EQ(4, AllocateRegisters(&program));
+
+    const int x = program.instructions(0).outputs(0);
+    const int cond = program.instructions(1).outputs(0);
+    const int tmp1 = program.instructions(2).outputs(0);
+    const int tmp2 = program.instructions(4).outputs(0);
+    const int out = program.instructions(8).outputs(0);
+    // Temporary values in the loop share a slot.
+    EXPECT_EQ(tmp1, tmp2);
+    EXPECT_NE(x, tmp1);
+    EXPECT_NE(cond, tmp1);
+    // `cond` is freed after the loop.
+    EXPECT_EQ(cond, out);
+    EXPECT_EQ(2, program.instructions(6).inputs(1).i());
+}
+
+}  // namespace
+}  // namespace xcvm
+}  // namespace chainer_compiler
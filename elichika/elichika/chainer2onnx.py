@@ -290,6 +290,73 @@ def convert_onnx_chainer_convolution2d(onnx_graph : 'ONNXGraph', node : 'nodes.N
         pads=pads,
         strides=stride)
 
+def convert_onnx_chainer_nstep_lstm(onnx_graph : 'ONNXGraph', node : 'nodes.Node'):
+    chainer_inst = node.func.owner.inst # type: chainer.links.NStepLSTM
+    onnx_name = node2onnx_parameter[node].onnx_name
+
+    # TODO: support initial states.
+    assert(isinstance(node.inputs[0], values.NoneValue))
+    assert(isinstance(node.inputs[1], values.NoneValue))
+
+    if isinstance(chainer_inst, chainer.links.NStepBiLSTM):
+        direction = 'bidirectional'
+        num_directions = 2
+    else:
+        direction = 'forward'
+        num_directions = 1
+
+    xs = ONNXValue(onnx_graph, node.inputs[2])
+    hy = ONNXValue(onnx_graph, node.outputs[0].values[0])
+    cy = ONNXValue(onnx_graph, node.outputs[0].values[1])
+    ys = ONNXValue(onnx_graph, node.outputs[0].values[2])
+
+    (ilens,) = onnx_graph.add_node(
+        'ChainerSequenceLengths',
+        [xs],
+        [None],
+        str(node.lineprop))
+
+    (tilens,) = onnx_graph.add_node(
+        'ChainerSequenceStack',
+        [ilens],
+        [None],
+        str(node.lineprop))
+
+    (x,) = onnx_graph.add_node(
+        'ChainerSequencePad',
+        [xs],
+        [None],
+        str(node.lineprop))
+
+    # Reorder the gates of Chainer (i, f, c, o) into ONNX's (i, o, f, c).
+    def reorder(ps):
+        return np.concatenate([ps[0].data, ps[3].data, ps[1].data, ps[2].data])
+
+    weights = []
+    for l in range(chainer_inst.n_layers):
+        ws = chainer_inst.ws[l * num_directions:(l + 1) * num_directions]
+        bs = chainer_inst.bs[l * num_directions:(l + 1) * num_directions]
+        w = np.stack([reorder(w[0:4]) for w in ws])
+        r = np.stack([reorder(w[4:8]) for w in ws])
+        b = np.stack([np.concatenate([reorder(b[0:4]), reorder(b[4:8])]) for b in bs])
+        weights.append(ONNXValue(onnx_graph, w, [onnx_name, '/W%d' % l]))
+        weights.append(ONNXValue(onnx_graph, r, [onnx_name, '/R%d' % l]))
+        weights.append(ONNXValue(onnx_graph, b, [onnx_name, '/B%d' % l]))
+
+    (y,) = onnx_graph.add_node(
+        'ChainerNStepLSTM',
+        [x, tilens] + weights,
+        [None, hy, cy],
+        str(node.lineprop),
+        direction=direction,
+        hidden_size=chainer_inst.out_size)
+
+    onnx_graph.add_node(
+        'ChainerSequenceUnpad',
+        [y, ilens],
+        [ys],
+        str(node.lineprop))
+
 class ONNXValue:
     """
     A wrapper of ONNX value
@@ -919,6 +986,9 @@ class ONNXGenerator:
                     if isinstance(original_inst, chainer.links.Convolution2D):
                         convert_onnx_chainer_convolution2d(onnx_graph, node)
 
+                    if isinstance(original_inst, (chainer.links.NStepLSTM, chainer.links.NStepBiLSTM)):
+                        convert_onnx_chainer_nstep_lstm(onnx_graph, node)
+
             if isinstance(node, nodes.NodeIf):
                 node_ = node # type: nodes.NodeIf
 
@@ -10,6 +10,8 @@ def is_builtin_chainer_link(value) -> 'bool':
         return True
     if isinstance(value, chainer.links.Convolution2D):
         return True
+    if isinstance(value, (chainer.links.NStepLSTM, chainer.links.NStepBiLSTM)):
+        return True
     return False
 
 class ChainerLinkFunction(functions.FunctionBase):
@@ -32,6 +34,10 @@ class ChainerLinkFunction(functions.FunctionBase):
         if(isinstance(self.owner.inst, chainer.links.Convolution2D)):
             value = functions.generate_tensor_value_with_undefined_shape_size(args[0].obj.get_value())
 
+        if(isinstance(self.owner.inst, (chainer.links.NStepLSTM, chainer.links.NStepBiLSTM))):
+            # (hy, cy, ys)
+            value = values.TupleValue([values.TensorValue(), values.TensorValue(), values.ListValue()])
+
         node.set_outputs([value])
         return values.Object(value)
 
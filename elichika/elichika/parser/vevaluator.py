@@ -176,9 +176,15 @@ def veval_ast_assign(astc : 'AstContext', local_field : 'values.Field', graph :
         isTuple = True
 
     if isTuple:
+        tuple_values = value_obj.get_value().values
         for i in range(len(targets)):
-            node_assign = nodes.NodeAssign(targets[i], value.values[i], astc.lineno)
-            targets[i].revise(value.values[i])
+            # A tuple returned by a function may contain raw values.
+            if isinstance(tuple_values[i], values.Value):
+                value_i = values.Object(tuple_values[i])
+            else:
+                value_i = try_get_obj(tuple_values[i], 'assign', lineprop)
+            node_assign = nodes.NodeAssign(targets[i], value_i, astc.lineno)
+            targets[i].revise(value_i)
             graph.add_node(node_assign)
     else:
         node_assign = nodes.NodeAssign(targets, value_obj, astc.lineno)
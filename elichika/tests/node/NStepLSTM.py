@@ -0,0 +1,58 @@
+# coding: utf-8
+
+import chainer
+import chainer.links as L
+
+# Network definition
+
+
+class NStepLSTM(chainer.Chain):
+
+    def __init__(self, n_layer, n_in, n_out):
+        super(NStepLSTM, self).__init__()
+        with self.init_scope():
+            self.l1 = L.NStepLSTM(n_layer, n_in, n_out, 0.1)
+
+    def forward(self, xs):
+        hy, cs, ys = self.l1(None, None, xs)
+        return hy, cs, ys
+
+
+class NStepBiLSTM(chainer.Chain):
+
+    def __init__(self, n_layer, n_in, n_out):
+        super(NStepBiLSTM, self).__init__()
+        with self.init_scope():
+            self.l1 = L.NStepBiLSTM(n_layer, n_in, n_out, 0.1)
+
+    def forward(self, xs):
+        hy, cs, ys = self.l1(None, None, xs)
+        return hy, cs, ys
+
+
+# ======================================
+
+import testtools
+import numpy as np
+
+
+def main():
+    np.random.seed(314)
+
+    n_batch = 7
+    n_layer = 3
+    n_in = 8
+    n_hidden = 5
+
+    xs = [np.random.rand(i + 2, n_in).astype(np.float32)
+          for i in range(n_batch)]
+
+    testtools.generate_testcase(NStepLSTM(n_layer, n_in, n_hidden), [xs],
+                                subname='forward')
+
+    testtools.generate_testcase(NStepBiLSTM(n_layer, n_in, n_hidden), [xs],
+                                subname='bidirectional')
+
+
+if __name__ == '__main__':
+    main()
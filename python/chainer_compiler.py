@@ -1,7 +1,9 @@
 import chainer
-import os
+import chainer.functions as F
+import collections
+import concurrent.futures
 import sys
-import tempfile
+import time
 
 import ch2o
 import chainer_compiler_core
@@ -58,14 +60,14 @@ def _from_var(v, device):
 
 class RunCompiledModel(chainer.function_node.FunctionNode):
 
-    def __init__(self, compiled_model, input_tmpl):
-        self.fwd_input_names = compiled_model.fwd_input_names
-        self.fwd_output_names = compiled_model.fwd_output_names
-        self.bwd_input_names = compiled_model.bwd_input_names
-        self.bwd_output_names = compiled_model.bwd_output_names
-        self.fwd = compiled_model.fwd
-        self.bwd = compiled_model.bwd
-        self.num_outputs = len(compiled_model.orig_output_names)
+    def __init__(self, program, input_tmpl):
+        self.fwd_input_names = program.fwd_input_names
+        self.fwd_output_names = program.fwd_output_names
+        self.bwd_input_names = program.bwd_input_names
+        self.bwd_output_names = program.bwd_output_names
+        self.fwd = program.fwd
+        self.bwd = program.bwd
+        self.num_outputs = len(program.orig_output_names)
         self.input_tmpl = input_tmpl
         self.chainerx_device_name = None
 
@@ -91,6 +93,8 @@ class RunCompiledModel(chainer.function_node.FunctionNode):
         for name, value in zip(self.fwd_input_names, args):
             inputs[name] = self._to_var(value)
 
+        # The GIL is released while running, so other Python threads,
+        # e.g., a data loader preparing the next batch, can proceed.
         with chainer.using_device(self.chainerx_device_name):
             outputs = self.fwd.run(inputs)
         outputs_and_retained = []
@@ -144,31 +148,225 @@ class RunCompiledModel(chainer.function_node.FunctionNode):
         return gxs
 
 
-class CompiledModel(chainer.Chain):
+def _shape(x):
+    return getattr(x, 'shape', ())
+
+
+def _signature(xs):
+    o = []
+    for x in xs:
+        if _is_array(x):
+            if isinstance(x, chainer.Variable):
+                x = x.array
+            dtype = getattr(x, 'dtype', type(x))
+            o.append((tuple(_shape(x)), str(dtype)))
+        else:
+            o.append(tuple(_signature(x)))
+    return tuple(o)
+
+
+def _map_arrays(fn, xs):
+    if _is_array(xs):
+        return fn(xs)
+    return type(xs)(_map_arrays(fn, x) for x in xs)
 
-    def __init__(self, model, inputs, dump_onnx=False):
+
+def _first_array(xs):
+    for x in _flatten(xs):
+        return x
+    return None
+
+
+class CompiledProgram(object):
+    """Forward and backward XCVM programs for an input signature."""
+
+    def __init__(self, orig_output_names, fwd_graph, bwd_graph,
+                 num_inputs, cache_dir):
+        self.orig_output_names = orig_output_names
+        self.fwd_input_names = fwd_graph.input_names()
+        self.fwd_output_names = fwd_graph.output_names()
+        self.bwd_input_names = bwd_graph.input_names()
+        self.bwd_output_names = bwd_graph.output_names()
+        # TODO(hamaji): Revive shape inference.
+        self.fwd = fwd_graph.compile(skip_inference=True,
+                                     cache_dir=cache_dir)
+        self.bwd = bwd_graph.compile(skip_inference=True,
+                                     cache_dir=cache_dir)
+        self.param_names = self.fwd_input_names[num_inputs:]
+        self.param_values = None
+        self.compile_time = None
+
+
+class CompiledModel(chainer.Chain):
+    """Runs a Chainer model with compiled XCVM programs.
+
+    Programs are compiled for each signature (shapes and dtypes) of
+    inputs and at most `max_programs` recently used programs are kept.
+    The first call with a new signature runs the original model.
+
+    When `bucket_sizes` is specified, array inputs are padded with
+    zeros along `bucket_axis` to the smallest bucket size which is
+    not smaller than the size of the first array input so fewer
+    programs are compiled. Only inputs with the same size as the
+    first array input are padded, and outputs with the bucket size
+    along the axis are sliced back. This is valid only for models
+    whose computation is independent along the axis, e.g., models
+    which do not reduce the batch axis.
+
+    When `background_compile` is True, programs are compiled in a
+    background thread and calls keep running the original model until
+    the program for their signature is ready.
+    """
+
+    def __init__(self, model, inputs, dump_onnx=False, cache_dir='',
+                 max_programs=8, bucket_sizes=None, bucket_axis=0,
+                 background_compile=False):
         super(CompiledModel, self).__init__()
         with self.init_scope():
             self.mc = model
         self.dump_onnx = dump_onnx
-
-        self.compiled = False
-        self.param_names = None
-        self.param_values = None
+        self.cache_dir = cache_dir
+        self.max_programs = max_programs
+        self.bucket_sizes = sorted(bucket_sizes) if bucket_sizes else None
+        self.bucket_axis = bucket_axis
+        self.background_compile = background_compile
+
+        self.programs = collections.OrderedDict()
+        # Futures of programs being compiled in the background.
+        self.pending_programs = {}
+        self.executor = None
+        self.num_calls = 0
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_evictions = 0
+        self.compile_time = 0.0
+        # The first call which ran a compiled program.
+        self.switch_iteration = None
         if inputs is not None:
             self.compile(inputs)
 
+    @property
+    def compiled(self):
+        return bool(self.programs)
+
+    def stats(self):
+        return {
+            'programs': len(self.programs),
+            'hits': self.num_hits,
+            'misses': self.num_misses,
+            'evictions': self.num_evictions,
+            'pending': len(self.pending_programs),
+            'compile_time': self.compile_time,
+            'switch_iteration': self.switch_iteration,
+        }
+
+    def _get_bucket(self, inputs):
+        """Returns the original size and the bucket size to be padded."""
+        if self.bucket_sizes is None:
+            return None, None
+        axis = self.bucket_axis
+        first = _first_array(inputs)
+        if first is None or len(_shape(first)) <= axis:
+            return None, None
+        size = first.shape[axis]
+        for bucket in self.bucket_sizes:
+            if size <= bucket:
+                return size, bucket
+        return None, None
+
+    def _pad_inputs(self, inputs, size, bucket):
+        axis = self.bucket_axis
+
+        def pad(x):
+            if len(_shape(x)) <= axis or x.shape[axis] != size:
+                return x
+            pad_width = [(0, 0)] * len(x.shape)
+            pad_width[axis] = (0, bucket - size)
+            return F.pad(x, pad_width, 'constant')
+
+        return _map_arrays(pad, inputs)
+
+    def _slice_outputs(self, outputs, size, bucket):
+        axis = self.bucket_axis
+
+        def unpad(x):
+            if len(_shape(x)) <= axis or x.shape[axis] != bucket:
+                return x
+            return x[(slice(None),) * axis + (slice(0, size),)]
+
+        return _map_arrays(unpad, outputs)
+
+    def _prepare_inputs(self, inputs):
+        """Returns padded inputs, their signature, and the bucket."""
+        size, bucket = self._get_bucket(inputs)
+        if bucket is not None:
+            inputs = self._pad_inputs(inputs, size, bucket)
+        return inputs, _signature(inputs), size, bucket
+
     def compile(self, inputs):
+        inputs, key, _, _ = self._prepare_inputs(inputs)
+        if self.background_compile:
+            self._compile_in_background(key, inputs)
+            return None
+        if key not in self.programs:
+            self._add_program(key, self._compile_program(inputs))
+        return self.programs[key]
+
+    def wait_compile(self):
+        """Waits for programs being compiled in the background."""
+        for future in list(self.pending_programs.values()):
+            future.result()
+        self._add_compiled_programs()
+
+    def _compile_in_background(self, key, inputs):
+        if key in self.programs or key in self.pending_programs:
+            return
+        # ch2o temporarily replaces parameters of the model while
+        # converting it, so the conversion must not overlap with calls
+        # of the model. Only the native compilation runs in the
+        # background.
+        start = time.time()
+        onnx_bytes = self._convert_model(inputs)
+        convert_time = time.time() - start
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1)
+        self.pending_programs[key] = self.executor.submit(
+            self._build_program, onnx_bytes, len(inputs), convert_time)
+
+    def _add_compiled_programs(self):
+        # Programs are added only in the calling thread so a call sees
+        # either no program or a complete one for its signature.
+        for key, future in list(self.pending_programs.items()):
+            if future.done():
+                del self.pending_programs[key]
+                self._add_program(key, future.result())
+
+    def _add_program(self, key, program):
+        self.compile_time += program.compile_time
+        self.programs[key] = program
+        if self.max_programs and len(self.programs) > self.max_programs:
+            self.programs.popitem(last=False)
+            self.num_evictions += 1
+
+    def _compile_program(self, inputs):
+        start = time.time()
+        onnx_bytes = self._convert_model(inputs)
+        return self._build_program(onnx_bytes, len(inputs),
+                                   time.time() - start)
+
+    def _convert_model(self, inputs):
+        """Converts the model into a serialized ONNX model."""
         xmodel = ch2o.compile_model(self.mc, inputs)
-        f = tempfile.NamedTemporaryFile(delete=False)
-        f.write(xmodel.SerializeToString())
-        f.close()
-        del xmodel
+        # Parameters are not embedded by ch2o but fed in each run.
+        return xmodel.SerializeToString()
 
-        graph = chainer_compiler_core.load(f.name)
-        os.unlink(f.name)
+    def _build_program(self, onnx_bytes, num_inputs, convert_time):
+        """Compiles a serialized ONNX model without touching the model."""
+        start = time.time()
+        graph = chainer_compiler_core.load_from_bytes(onnx_bytes)
 
-        self.orig_output_names = graph.output_names()
+        orig_output_names = graph.output_names()
 
         fwd_graph, bwd_graph = graph.backward_to(graph.input_names())
         if self.dump_onnx:
@@ -180,37 +378,44 @@ class CompiledModel(chainer.Chain):
                              '\n=== ^^^ backward ^^^ ===\n')
 
         assert graph.input_names() == fwd_graph.input_names()
-        self.fwd_input_names = fwd_graph.input_names()
-        self.fwd_output_names = fwd_graph.output_names()
-        self.bwd_input_names = bwd_graph.input_names()
-        self.bwd_output_names = bwd_graph.output_names()
-        # TODO(hamaji): Revive shape inference.
-        self.fwd = fwd_graph.compile(skip_inference=True)
-        self.bwd = bwd_graph.compile(skip_inference=True)
-        self.param_names = self.fwd_input_names[len(inputs):]
-
-        self.compiled = True
+        program = CompiledProgram(orig_output_names, fwd_graph, bwd_graph,
+                                  num_inputs, self.cache_dir)
+        program.compile_time = convert_time + time.time() - start
+        return program
 
     def forward(self, *args):
-        if not self.compiled:
+        self.num_calls += 1
+        self._add_compiled_programs()
+        inputs, key, size, bucket = self._prepare_inputs(list(args))
+        program = self.programs.get(key)
+        if program is None:
+            self.num_misses += 1
+            # This also initializes parameters of the model lazily.
             outputs = self.mc(*args)
-            self.compile(args)
+            if self.background_compile:
+                self._compile_in_background(key, inputs)
+            else:
+                self._add_program(key, self._compile_program(inputs))
             return outputs
+        self.num_hits += 1
+        self.programs.move_to_end(key)
+        if self.switch_iteration is None:
+            self.switch_iteration = self.num_calls
 
-        if self.param_values is None:
-            assert self.param_names is not None
+        if program.param_values is None:
             params = dict(self.mc.namedparams())
-            self.param_values = []
-            for name in self.param_names:
+            program.param_values = []
+            for name in program.param_names:
                 assert name in params
-                self.param_values.append(params[name])
+                program.param_values.append(params[name])
 
-        inputs = list(args)
         flat_inputs = _flatten(inputs)
-        runner = RunCompiledModel(self, inputs + self.param_values)
-        outputs = runner.apply(flat_inputs + self.param_values)
+        runner = RunCompiledModel(program, inputs + program.param_values)
+        outputs = runner.apply(flat_inputs + program.param_values)
         outputs = runner.unflatten_outputs(outputs)
-        outputs = outputs[:len(self.orig_output_names)]
+        outputs = outputs[:len(program.orig_output_names)]
+        if bucket is not None:
+            outputs = self._slice_outputs(outputs, size, bucket)
         if len(outputs) == 1:
             outputs = outputs[0]
         return outputs
@@ -218,3 +423,16 @@ class CompiledModel(chainer.Chain):
 
 def compile(model, inputs=None, **kwargs):
     return CompiledModel(model, inputs, **kwargs)
+
+
+def load_model(model, inputs):
+    """Converts a Chainer model into a graph with its parameters.
+
+    The parameters become initializers of the graph which share memory
+    with the numpy arrays of `model` instead of being serialized into
+    the ONNX model.
+    """
+    xmodel = ch2o.compile_model(model, inputs)
+    initializers = ch2o.initializer_arrays(xmodel, model)
+    return chainer_compiler_core.load_from_bytes(
+        xmodel.SerializeToString(), initializers)
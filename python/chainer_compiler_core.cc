@@ -1,15 +1,27 @@
+#include <algorithm>
+#include <chrono>
+#include <future>
 #include <memory>
+#include <mutex>
+#include <sstream>
+#include <thread>
 
 #include <compiler/onnx.h>
 
+#include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
 #include <chainerx/array.h>
 #include <chainerx/array_body.h>
+#include <chainerx/backprop_mode.h>
+#include <chainerx/context.h>
+#include <chainerx/device.h>
 
 #include <common/log.h>
 #include <common/protoutil.h>
+#include <common/strutil.h>
+#include <common/thread_pool.h>
 #include <compiler/custom_onnx_ops.h>
 #include <compiler/flags.h>
 #include <compiler/gradient.h>
@@ -17,10 +29,17 @@
 #include <compiler/model.h>
 #include <compiler/passes.h>
 #include <compiler/subgraph_canonicalizer.h>
+#include <compiler/tensor.h>
+#include <compiler/util.h>
+#include <compiler/value.h>
 #include <compiler/xcvm/emitter.h>
+#include <compiler/xcvm/program_cache.h>
 #include <runtime/chrome_tracing.h>
 #include <runtime/xcvm.h>
 #include <runtime/xcvm.pb.h>
+#include <runtime/xcvm_batcher.h>
+#include <runtime/xcvm_profiler.h>
+#include <runtime/xcvm_session.h>
 #include <runtime/xcvm_var.h>
 #include <tools/util.h>
 
@@ -33,31 +52,159 @@ typedef std::shared_ptr<chainerx::internal::ArrayBody> ArrayBodyPtr;
 typedef std::shared_ptr<runtime::XCVMVar> VarPtr;
 
 std::shared_ptr<Graph> LoadGraph(const std::string& onnx_path) {
-    onnx::ModelProto xmodel(LoadLargeProto<onnx::ModelProto>(onnx_path));
+    onnx::ModelProto xmodel(LoadONNXModel(onnx_path));
     return std::make_shared<Graph>(xmodel.graph());
 }
 
-std::map<std::string, VarPtr> LoadParams(const std::shared_ptr<Graph>& graph) {
+Dtype GetDtype(const py::dtype& dtype) {
+    switch (dtype.kind()) {
+        case 'b':
+            return Dtype::kBool;
+        case 'i':
+            switch (dtype.itemsize()) {
+                case 1:
+                    return Dtype::kInt8;
+                case 2:
+                    return Dtype::kInt16;
+                case 4:
+                    return Dtype::kInt32;
+                case 8:
+                    return Dtype::kInt64;
+            }
+            break;
+        case 'u':
+            if (dtype.itemsize() == 1) return Dtype::kUInt8;
+            break;
+        case 'f':
+            switch (dtype.itemsize()) {
+                case 2:
+                    return Dtype::kFloat16;
+                case 4:
+                    return Dtype::kFloat32;
+                case 8:
+                    return Dtype::kFloat64;
+            }
+            break;
+    }
+    throw py::value_error(StrCat("Unsupported dtype: ", py::str(dtype).cast<std::string>()));
+}
+
+// Parses a serialized ONNX model without writing it to a file. Arrays
+// in `initializers` become initializers of the inputs with the same
+// names without copies, so they must not be modified while the graph
+// or parameters loaded from it are alive.
+std::shared_ptr<Graph> LoadGraphFromBytes(const py::bytes& model, const std::map<std::string, py::array>& initializers) {
+    char* buf;
+    Py_ssize_t size;
+    CHECK_EQ(0, PyBytes_AsStringAndSize(model.ptr(), &buf, &size));
+    std::shared_ptr<Graph> graph;
+    {
+        py::gil_scoped_release release;
+        onnx::ModelProto xmodel(ParseLargeProto<onnx::ModelProto>(buf, size));
+        graph = std::make_shared<Graph>(xmodel.graph());
+    }
+
+    std::map<std::string, Value*> inputs;
+    for (Value* value : graph->input_values()) {
+        CHECK(inputs.emplace(value->name(), value).second);
+    }
+    // Initializers come from Python, so they are validated with
+    // exceptions instead of CHECKs which would abort the interpreter.
+    for (const auto& p : initializers) {
+        auto found = inputs.find(p.first);
+        if (found == inputs.end()) {
+            throw py::value_error(StrCat("Invalid name for an initializer: ", p.first));
+        }
+        Value* value = found->second;
+        if (value->initializer()) {
+            throw py::value_error(StrCat("Duplicated initializer: ", p.first));
+        }
+
+        py::array array = py::array::ensure(p.second, py::array::c_style);
+        if (!array) {
+            throw py::value_error(StrCat("Invalid initializer: ", p.first));
+        }
+        const std::vector<int64_t> dims(array.shape(), array.shape() + array.ndim());
+        const Dtype dtype = GetDtype(array.dtype());
+        void* ptr = const_cast<void*>(array.data());
+        // The tensor owns a reference to the array.
+        PyObject* owner = array.release().ptr();
+        std::shared_ptr<void> data(ptr, [owner](void*) {
+            py::gil_scoped_acquire acquire;
+            Py_DECREF(owner);
+        });
+        value->ResetInitializer(std::make_unique<Tensor>(p.first, dtype, dims, data));
+    }
+    return graph;
+}
+
+std::map<std::string, VarPtr> LoadParams(const std::shared_ptr<Graph>& graph, bool copy) {
     std::map<std::string, VarPtr> params;
-    for (auto& p : runtime::LoadParams(*graph)) {
+    for (auto& p : runtime::LoadParams(*graph, copy)) {
         chainerx::Array array = p.second->GetArray();
         CHECK(params.emplace(p.first, std::make_shared<runtime::XCVMVar>(array)).second);
     }
     return params;
 }
 
+// The compiler flags are global variables and the compilation runs
+// without the GIL, so compilations from Python threads (e.g., the
+// background compilation of CompiledModel) hold this lock while they
+// set and use the flags.
+std::mutex& GetCompilerMutex() {
+    static std::mutex mu;
+    return mu;
+}
+
+// Returns the data of initializers keyed by their names.
+std::map<std::string, const void*> GetInitializerData(const Graph& graph) {
+    std::map<std::string, const void*> data;
+    for (const Value* value : graph.input_values()) {
+        if (const Tensor* initializer = value->initializer()) data.emplace(value->name(), initializer->GetRawData());
+    }
+    return data;
+}
+
+// Stores initializers which were replaced by the passes (e.g., folded
+// BatchNormalization) since `orig_data` was taken.
+void StoreReplacedInitializers(const Graph& graph, const std::map<std::string, const void*>& orig_data, onnx::GraphProto* xgraph) {
+    for (const Value* value : graph.input_values()) {
+        const Tensor* initializer = value->initializer();
+        if (!initializer) continue;
+        auto found = orig_data.find(value->name());
+        if (found != orig_data.end() && found->second == initializer->GetRawData()) continue;
+        initializer->ToONNX(xgraph->add_initializer());
+    }
+}
+
+void RestoreInitializers(const onnx::GraphProto& xgraph, Graph* graph) {
+    std::map<std::string, Value*> inputs;
+    for (Value* value : graph->input_values()) {
+        CHECK(inputs.emplace(value->name(), value).second);
+    }
+    for (const onnx::TensorProto& xtensor : xgraph.initializer()) {
+        auto found = inputs.find(xtensor.name());
+        CHECK(found != inputs.end()) << "Unknown initializer in the cache: " << xtensor.name();
+        found->second->ResetInitializer(std::make_unique<Tensor>(xtensor));
+    }
+}
+
 std::shared_ptr<runtime::XCVM> Compile(
         const std::shared_ptr<Graph>& graph,
         bool compiler_log,
         bool permissive,
         bool skip_inference,
+        bool skip_batch_norm_folding,
         bool use_cuda,
         bool fuse_operations,
         bool use_nvrtc,
+        bool use_cpu_fusion,
         bool use_tvm,
         bool reuse_tvm_code,
         const std::string& dump_autotvm_task_dir,
         const std::string& autotvm_log,
+        bool reuse_variable_slots,
+        bool use_memory_arena,
         bool use_ngraph,
         const std::string& backend_name,
         bool dump_after_inference,
@@ -65,17 +212,28 @@ std::shared_ptr<runtime::XCVM> Compile(
         bool dump_after_gradient,
         bool dump_after_fusion,
         bool dump_after_scheduling,
-        bool dump_subgraphs) {
+        bool dump_subgraphs,
+        const std::vector<std::string>& disabled_passes,
+        bool pass_stats_json,
+        int compiler_threads,
+        const std::string& scheduler,
+        int scheduler_lookahead,
+        const std::string& cache_dir) {
+    std::lock_guard<std::mutex> lock(GetCompilerMutex());
     g_compiler_log = compiler_log;
     g_permissive = permissive;
     g_skip_inference = skip_inference;
+    g_skip_batch_norm_folding = skip_batch_norm_folding;
     g_use_cuda = use_cuda;
     g_fuse_operations = fuse_operations;
     g_use_nvrtc = use_nvrtc;
+    g_use_cpu_fusion = use_cpu_fusion;
     g_use_tvm = use_tvm;
     g_reuse_tvm_code = reuse_tvm_code;
     g_dump_autotvm_task_dir = dump_autotvm_task_dir;
     g_autotvm_log = autotvm_log;
+    g_reuse_variable_slots = reuse_variable_slots;
+    g_use_memory_arena = use_memory_arena;
     g_use_ngraph = use_ngraph;
     g_backend_name = backend_name;
     g_dump_after_inference = dump_after_inference;
@@ -84,14 +242,43 @@ std::shared_ptr<runtime::XCVM> Compile(
     g_dump_after_fusion = dump_after_fusion;
     g_dump_after_scheduling = dump_after_scheduling;
     g_dump_subgraphs = dump_subgraphs;
+    g_disabled_passes = JoinString(disabled_passes, ",");
+    g_pass_stats_json = pass_stats_json;
+    g_compiler_threads = compiler_threads;
+    g_scheduler = scheduler;
+    g_scheduler_lookahead = scheduler_lookahead;
+
+    runtime::XCProgramProto xcvm_prog;
+    std::unique_ptr<xcvm::ProgramCache> cache;
+    std::string cache_key;
+    if (!cache_dir.empty()) {
+        cache.reset(new xcvm::ProgramCache(cache_dir));
+        onnx::GraphProto xgraph;
+        graph->ToONNX(&xgraph);
+        cache_key = xcvm::ProgramCache::GetKey(xgraph.SerializeAsString());
+        // Note `graph` is not optimized in this case. Only parameters
+        // updated by the passes are restored so `graph.params()`
+        // matches the program.
+        onnx::GraphProto xparams;
+        if (cache->Load(cache_key, "xcvm", &xcvm_prog) && cache->Load(cache_key, "params", &xparams)) {
+            RestoreInitializers(xparams, graph.get());
+            return std::make_shared<runtime::XCVM>(xcvm_prog);
+        }
+    }
 
     if (!g_skip_inference) graph->InferShapes();
 
+    const std::map<std::string, const void*> orig_data = GetInitializerData(*graph);
     constexpr bool kBackprop = false;
     RunDefaultPasses(graph.get(), kBackprop);
-    runtime::XCProgramProto xcvm_prog;
     constexpr bool kDumpValueNames = false;
     xcvm::Emit(*graph, &xcvm_prog, kDumpValueNames);
+    if (cache) {
+        onnx::GraphProto xparams;
+        StoreReplacedInitializers(*graph, orig_data, &xparams);
+        cache->Store(cache_key, "params", xparams);
+        cache->Store(cache_key, "xcvm", xcvm_prog);
+    }
     return std::make_shared<runtime::XCVM>(xcvm_prog);
 }
 
@@ -112,6 +299,7 @@ std::vector<std::string> GetOutputNames(const std::shared_ptr<Graph>& graph) {
 }
 
 std::pair<std::shared_ptr<Graph>, std::shared_ptr<Graph>> GenerateBackward(const std::shared_ptr<Graph>& graph) {
+    std::lock_guard<std::mutex> lock(GetCompilerMutex());
     auto backprop = std::make_shared<Graph>(graph->name() + "_backprop");
     RunDefaultPassesBeforeGradient(graph.get());
     GenerateGradientNodes(graph.get(), backprop.get());
@@ -120,6 +308,7 @@ std::pair<std::shared_ptr<Graph>, std::shared_ptr<Graph>> GenerateBackward(const
 
 std::pair<std::shared_ptr<Graph>, std::shared_ptr<Graph>> GenerateBackwardTo(
         const std::shared_ptr<Graph>& graph, const std::vector<std::string>& param_names) {
+    std::lock_guard<std::mutex> lock(GetCompilerMutex());
     auto backprop = std::make_shared<Graph>(graph->name() + "_backprop");
     RunDefaultPassesBeforeGradient(graph.get());
     GenerateGradientNodesTo(graph.get(), backprop.get(), param_names);
@@ -132,20 +321,28 @@ std::string Dump(const std::shared_ptr<Graph>& graph) {
 
 void InitGraph(py::module& m) {
     py::class_<Graph, std::shared_ptr<Graph>> c{m, "Graph"};
-    c.def("params", &LoadParams, "Load parameters of a model");
+    c.def("params",
+          &LoadParams,
+          "Load parameters of a model. Unset `copy` to share memory with "
+          "the model, which is valid only when they are not updated in place",
+          py::arg("copy") = true);
     c.def("compile",
           &Compile,
           "Compile a model",
           py::arg("compiler_log") = false,
           py::arg("permissive") = false,
           py::arg("skip_inference") = false,
+          py::arg("skip_batch_norm_folding") = false,
           py::arg("use_cuda") = false,
           py::arg("fuse_operations") = false,
           py::arg("use_nvrtc") = false,
+          py::arg("use_cpu_fusion") = false,
           py::arg("use_tvm") = false,
           py::arg("reuse_tvm_code") = false,
           py::arg("dump_autotvm_task_dir") = "",
           py::arg("autotvm_log") = "",
+          py::arg("reuse_variable_slots") = false,
+          py::arg("use_memory_arena") = false,
           py::arg("use_ngraph") = false,
           py::arg("backend_name") = "",
           py::arg("dump_after_inference") = false,
@@ -153,24 +350,36 @@ void InitGraph(py::module& m) {
           py::arg("dump_after_gradient") = false,
           py::arg("dump_after_fusion") = false,
           py::arg("dump_after_scheduling") = false,
-          py::arg("dump_subgraphs") = false);
+          py::arg("dump_subgraphs") = false,
+          py::arg("disabled_passes") = std::vector<std::string>(),
+          py::arg("pass_stats_json") = false,
+          py::arg("compiler_threads") = 0,
+          py::arg("scheduler") = "",
+          py::arg("scheduler_lookahead") = 0,
+          py::arg("cache_dir") = "",
+          py::call_guard<py::gil_scoped_release>());
     c.def("input_names", &GetInputNames, "Names of inputs");
     c.def("output_names", &GetOutputNames, "Names of outputs");
-    c.def("backward", &GenerateBackward, "Generate a pair of graphs for forward and back propagation");
-    c.def("backward_to", &GenerateBackwardTo, "Generate a pair of graphs for forward and back propagation");
+    c.def("backward",
+          &GenerateBackward,
+          "Generate a pair of graphs for forward and back propagation",
+          py::call_guard<py::gil_scoped_release>());
+    c.def("backward_to",
+          &GenerateBackwardTo,
+          "Generate a pair of graphs for forward and back propagation",
+          py::call_guard<py::gil_scoped_release>());
     c.def("dump", &Dump, "Dump a model to a string");
 }
 
-std::map<std::string, VarPtr> Run(
-        const std::shared_ptr<runtime::XCVM>& xcvm,
-        const std::map<std::string, VarPtr>& inputs,
+runtime::XCVMOptions MakeRunOptions(
         bool trace,
         bool verbose,
         bool training,
         bool check_nans,
         bool check_infs,
         bool dump_memory_usage,
-        const std::string& chrome_tracing) {
+        int num_threads,
+        runtime::XCVMProfiler* profiler) {
     runtime::XCVMOptions xcvm_opts;
     if (trace) xcvm_opts.trace_level = 1;
     if (verbose) xcvm_opts.trace_level = 2;
@@ -178,16 +387,198 @@ std::map<std::string, VarPtr> Run(
     xcvm_opts.check_nans = check_nans;
     xcvm_opts.check_infs = check_infs;
     xcvm_opts.dump_memory_usage = dump_memory_usage;
+    xcvm_opts.num_threads = num_threads;
+    xcvm_opts.profiler = profiler;
+    return xcvm_opts;
+}
+
+// Must be called without the GIL.
+runtime::InOuts RunWithOptions(
+        runtime::XCVM* xcvm, const runtime::InOuts& inputs, runtime::XCVMOptions xcvm_opts, const std::string& chrome_tracing) {
+    std::unique_ptr<runtime::ChromeTracingEmitter> tracing;
     if (!chrome_tracing.empty()) {
-        xcvm_opts.chrome_tracing = new runtime::ChromeTracingEmitter();
+        tracing.reset(new runtime::ChromeTracingEmitter());
+        xcvm_opts.chrome_tracing = tracing.get();
     }
     runtime::InOuts outputs(xcvm->Run(inputs, xcvm_opts));
-    if (xcvm_opts.chrome_tracing) {
-        xcvm_opts.chrome_tracing->Emit(chrome_tracing);
+    if (tracing) {
+        tracing->Emit(chrome_tracing);
     }
     return outputs;
 }
 
+std::map<std::string, VarPtr> Run(
+        const std::shared_ptr<runtime::XCVM>& xcvm,
+        const std::map<std::string, VarPtr>& inputs,
+        bool trace,
+        bool verbose,
+        bool training,
+        bool check_nans,
+        bool check_infs,
+        bool dump_memory_usage,
+        const std::string& chrome_tracing,
+        int num_threads,
+        runtime::XCVMProfiler* profiler) {
+    runtime::XCVMOptions xcvm_opts =
+            MakeRunOptions(trace, verbose, training, check_nans, check_infs, dump_memory_usage, num_threads, profiler);
+    // Other Python threads can run while XCVM is running. Note
+    // `inputs` and the outputs are converted with the GIL held.
+    py::gil_scoped_release release;
+    return RunWithOptions(xcvm.get(), inputs, xcvm_opts, chrome_tracing);
+}
+
+// The result of `XCVM.run_async`.
+class RunFuture {
+public:
+    explicit RunFuture(std::shared_future<runtime::InOuts> future) : future_(future) {
+    }
+
+    bool Done() const {
+        return future_.wait_for(std::chrono::seconds(0)) == std::future_status::ready;
+    }
+
+    // Blocks until the outputs are ready. An exception thrown in the
+    // run is rethrown.
+    std::map<std::string, VarPtr> Result() const {
+        py::gil_scoped_release release;
+        return future_.get();
+    }
+
+private:
+    std::shared_future<runtime::InOuts> future_;
+};
+
+// Runs in worker threads shared by all XCVMs. Intentionally leaked
+// so workers are not joined while the interpreter is finalized.
+ThreadPool* GetAsyncThreadPool() {
+    static ThreadPool* thread_pool = new ThreadPool(std::max(1U, std::thread::hardware_concurrency()));
+    return thread_pool;
+}
+
+std::shared_ptr<RunFuture> RunAsync(
+        const std::shared_ptr<runtime::XCVM>& xcvm,
+        const std::map<std::string, VarPtr>& inputs,
+        bool trace,
+        bool verbose,
+        bool training,
+        bool check_nans,
+        bool check_infs,
+        bool dump_memory_usage,
+        const std::string& chrome_tracing,
+        int num_threads,
+        const std::shared_ptr<runtime::XCVMProfiler>& profiler) {
+    // `profiler` is set in the worker so it is kept alive by the task.
+    const runtime::XCVMOptions xcvm_opts =
+            MakeRunOptions(trace, verbose, training, check_nans, check_infs, dump_memory_usage, num_threads, nullptr);
+    auto promise = std::make_shared<std::promise<runtime::InOuts>>();
+    auto future = std::make_shared<RunFuture>(promise->get_future().share());
+
+    // ChainerX states are thread local, so the ones of the caller are
+    // used in the worker.
+    chainerx::Context* context = &chainerx::GetDefaultContext();
+    chainerx::Device* device = &chainerx::GetDefaultDevice();
+    const bool is_backprop_required = chainerx::IsBackpropRequired();
+    GetAsyncThreadPool()->Schedule([=]() {
+        chainerx::ContextScope context_scope(*context);
+        chainerx::DeviceScope device_scope(*device);
+        std::unique_ptr<chainerx::NoBackpropModeScope> no_backprop;
+        if (!is_backprop_required) no_backprop.reset(new chainerx::NoBackpropModeScope());
+        runtime::XCVMOptions opts = xcvm_opts;
+        opts.profiler = profiler.get();
+        try {
+            promise->set_value(RunWithOptions(xcvm.get(), inputs, opts, chrome_tracing));
+        } catch (...) {
+            promise->set_exception(std::current_exception());
+        }
+    });
+    return future;
+}
+
+std::shared_ptr<runtime::XCVMSession> CreateSession(
+        const std::shared_ptr<runtime::XCVM>& xcvm,
+        const std::vector<std::string>& input_names,
+        const std::map<std::string, VarPtr>& params,
+        bool training,
+        bool check_nans,
+        bool check_infs,
+        int num_threads) {
+    runtime::XCVMOptions xcvm_opts;
+    xcvm_opts.is_training = training;
+    xcvm_opts.check_nans = check_nans;
+    xcvm_opts.check_infs = check_infs;
+    xcvm_opts.num_threads = num_threads;
+    auto session = std::make_shared<runtime::XCVMSession>(xcvm.get(), input_names, xcvm_opts);
+    for (const auto& p : params) {
+        session->SetParam(p.first, p.second);
+    }
+    return session;
+}
+
+void InitXCVMSession(py::module& m) {
+    py::class_<runtime::XCVMSession, std::shared_ptr<runtime::XCVMSession>> c{m, "XCVMSession"};
+    c.def("run",
+          &runtime::XCVMSession::Run,
+          "Run the model with positional inputs",
+          py::arg("inputs"),
+          py::call_guard<py::gil_scoped_release>());
+    c.def("input_names", &runtime::XCVMSession::input_names, "Names of positional inputs");
+    c.def("output_names", &runtime::XCVMSession::output_names, "Names of outputs");
+}
+
+std::shared_ptr<runtime::XCVMBatcher> CreateBatcher(
+        const std::shared_ptr<runtime::XCVM>& xcvm,
+        const std::vector<std::string>& input_names,
+        const std::map<std::string, VarPtr>& params,
+        int max_batch_size,
+        int64_t timeout_usec,
+        int padded_batch_size,
+        int num_threads,
+        int num_workers) {
+    runtime::XCVMOptions xcvm_opts;
+    xcvm_opts.num_threads = num_threads;
+    return std::make_shared<runtime::XCVMBatcher>(
+            xcvm.get(), input_names, params, xcvm_opts, max_batch_size, timeout_usec, padded_batch_size, num_workers);
+}
+
+void InitXCVMBatcher(py::module& m) {
+    py::class_<runtime::XCVMBatcher, std::shared_ptr<runtime::XCVMBatcher>> c{m, "XCVMBatcher"};
+    // Other Python threads can enqueue their requests while waiting.
+    c.def("run",
+          &runtime::XCVMBatcher::Run,
+          "Run the model for a request in a batch",
+          py::arg("inputs"),
+          py::call_guard<py::gil_scoped_release>());
+    c.def("output_names", &runtime::XCVMBatcher::output_names, "Names of outputs");
+    c.def("num_batches", &runtime::XCVMBatcher::num_batches, "The number of batches run so far");
+    c.def("num_requests", &runtime::XCVMBatcher::num_requests, "The number of requests served so far");
+}
+
+std::string GetProfileTable(const runtime::XCVMProfiler& profiler, int num_instructions) {
+    std::ostringstream oss;
+    profiler.ShowTable(oss, num_instructions);
+    return oss.str();
+}
+
+std::string GetProfileJSON(const runtime::XCVMProfiler& profiler) {
+    std::ostringstream oss;
+    profiler.EmitJSON(oss);
+    return oss.str();
+}
+
+void InitXCVMProfiler(py::module& m) {
+    py::class_<runtime::XCVMProfiler, std::shared_ptr<runtime::XCVMProfiler>> c{m, "XCVMProfiler"};
+    c.def(py::init<>());
+    c.def("table", &GetProfileTable, "Statistics of ops and instructions as a table", py::arg("num_instructions") = 20);
+    c.def("json", &GetProfileJSON, "Statistics of ops and instructions as JSON");
+    c.def("emit", &runtime::XCVMProfiler::Emit, "Write statistics to a file (JSON if it ends with .json)", py::arg("output_filename"));
+}
+
+void InitRunFuture(py::module& m) {
+    py::class_<RunFuture, std::shared_ptr<RunFuture>> c{m, "RunFuture"};
+    c.def("done", &RunFuture::Done, "Check if the outputs are ready");
+    c.def("result", &RunFuture::Result, "Wait for the outputs and return them");
+}
+
 void InitXCVM(py::module& m) {
     py::class_<runtime::XCVM, std::shared_ptr<runtime::XCVM>> c{m, "XCVM"};
     c.def("run",
@@ -200,7 +591,43 @@ void InitXCVM(py::module& m) {
           py::arg("check_nans") = false,
           py::arg("check_infs") = false,
           py::arg("dump_memory_usage") = false,
-          py::arg("chrome_tracing") = "");
+          py::arg("chrome_tracing") = "",
+          py::arg("num_threads") = 0,
+          py::arg("profiler") = nullptr);
+    c.def("run_async",
+          &RunAsync,
+          "Run the model in a worker thread and return a future of outputs",
+          py::arg("inputs"),
+          py::arg("trace") = false,
+          py::arg("verbose") = false,
+          py::arg("training") = false,
+          py::arg("check_nans") = false,
+          py::arg("check_infs") = false,
+          py::arg("dump_memory_usage") = false,
+          py::arg("chrome_tracing") = "",
+          py::arg("num_threads") = 0,
+          py::arg("profiler") = nullptr);
+    c.def("session",
+          &CreateSession,
+          "Create a session which keeps parameters resident",
+          py::arg("input_names"),
+          py::arg("params") = std::map<std::string, VarPtr>(),
+          py::arg("training") = false,
+          py::arg("check_nans") = false,
+          py::arg("check_infs") = false,
+          py::arg("num_threads") = 0,
+          py::keep_alive<0, 1>());
+    c.def("batcher",
+          &CreateBatcher,
+          "Create a batcher which runs concurrent requests as a batch",
+          py::arg("input_names"),
+          py::arg("params") = std::map<std::string, VarPtr>(),
+          py::arg("max_batch_size") = 32,
+          py::arg("timeout_usec") = 1000,
+          py::arg("padded_batch_size") = 0,
+          py::arg("num_threads") = 0,
+          py::arg("num_workers") = 1,
+          py::keep_alive<0, 1>());
 }
 
 bool IsArray(const VarPtr& v) {
@@ -254,9 +681,24 @@ PYBIND11_MODULE(chainer_compiler_core, m) {  // NOLINT
 
     InitXCVMVar(m);
 
+    InitXCVMProfiler(m);
+
+    InitRunFuture(m);
+
     InitXCVM(m);
 
-    m.def("load", &LoadGraph, "Load an ONNX model");
+    InitXCVMSession(m);
+
+    InitXCVMBatcher(m);
+
+    // Compilation releases the GIL so models can be compiled in a
+    // background thread.
+    m.def("load", &LoadGraph, "Load an ONNX model", py::call_guard<py::gil_scoped_release>());
+    m.def("load_from_bytes",
+          &LoadGraphFromBytes,
+          "Load a serialized ONNX model with initializers shared with numpy arrays",
+          py::arg("model"),
+          py::arg("initializers") = std::map<std::string, py::array>());
     m.def("value", &CreateValueFromArray, "Create an XCVMVar from a ChainerX Array");
     m.def("value", &CreateValueFromSequence, "Create an XCVMVar from a sequence of XCVMVars");
 }
@@ -1,9 +1,13 @@
 import os
+import pytest
 import sys
+import tempfile
 
 import chainerx
 import chainerx.testing
 import numpy as np
+import onnx
+from onnx import numpy_helper
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.join(project_root, 'build/python'))
@@ -43,6 +47,151 @@ def test_inference():
     assert 'op_type: "ChainerLinear"' in graph.dump()
 
 
+def test_load_from_bytes():
+    model_path = 'out/ch2o_node_Linear/model.onnx'
+    xmodel = onnx.load(model_path)
+    initializers = {}
+    for tensor in xmodel.graph.initializer:
+        initializers[tensor.name] = numpy_helper.to_array(tensor)
+    del xmodel.graph.initializer[:]
+
+    graph = chainer_compiler_core.load_from_bytes(
+        xmodel.SerializeToString(), initializers)
+    params = graph.params()
+    assert sorted(params.keys()) == sorted(initializers.keys())
+    for name, array in initializers.items():
+        chainerx.testing.assert_array_equal(array, params[name].array())
+
+    expected_graph = chainer_compiler_core.load(model_path)
+    assert graph.input_names() == expected_graph.input_names()
+    assert graph.output_names() == expected_graph.output_names()
+
+    inputs = dict(params)
+    input_names = graph.input_names()
+    inputs[input_names[0]] = chainer_compiler_core.value(aranges(5, 7))
+    outputs = graph.compile().run(inputs)
+    expected_outputs = expected_graph.compile().run(inputs)
+    for name in graph.output_names():
+        chainerx.testing.assert_allclose(
+            expected_outputs[name].array(), outputs[name].array())
+
+
+def test_load_from_bytes_invalid_initializers():
+    xmodel = onnx.load('out/ch2o_node_Linear/model.onnx')
+    tensor = xmodel.graph.initializer[0]
+    array = numpy_helper.to_array(tensor)
+
+    # The initializer is still in the model.
+    with pytest.raises(ValueError):
+        chainer_compiler_core.load_from_bytes(
+            xmodel.SerializeToString(), {tensor.name: array})
+    with pytest.raises(ValueError):
+        chainer_compiler_core.load_from_bytes(
+            xmodel.SerializeToString(), {'unknown': array})
+
+
+def test_session():
+    graph = chainer_compiler_core.load('out/ch2o_node_Linear/model.onnx')
+    params = graph.params()
+    input_names = graph.input_names()
+    output_names = graph.output_names()
+
+    xcvm = graph.compile()
+    session = xcvm.session(input_names, params)
+    assert session.input_names() == input_names
+    assert sorted(session.output_names()) == sorted(output_names)
+
+    for i in range(3):
+        t1 = aranges(5, 7) + i
+        outputs = session.run([chainer_compiler_core.value(t1)])
+        assert len(outputs) == 2
+        outputs = dict(zip(session.output_names(), outputs))
+
+        y1 = (chainerx.dot(t1, params['/l1/W'].array().T) +
+              params['/l1/b'].array())
+        y2 = chainerx.dot(t1, params['/l2/W'].array().T)
+        chainerx.testing.assert_allclose(
+            y1, outputs[output_names[0]].array())
+        chainerx.testing.assert_allclose(
+            y2, outputs[output_names[1]].array())
+
+
+def test_profiler():
+    graph = chainer_compiler_core.load('out/ch2o_node_Linear/model.onnx')
+    input_names = graph.input_names()
+    xcvm = graph.compile()
+
+    inputs = dict(graph.params())
+    inputs[input_names[0]] = chainer_compiler_core.value(aranges(5, 7))
+
+    profiler = chainer_compiler_core.XCVMProfiler()
+    for i in range(3):
+        xcvm.run(inputs, profiler=profiler)
+
+    assert 'Linear' in profiler.table()
+    assert '"op":"Linear","count":6,' in profiler.json()
+
+
+def test_run_async():
+    graph = chainer_compiler_core.load('out/ch2o_node_Linear/model.onnx')
+    params = graph.params()
+    input_names = graph.input_names()
+    output_names = graph.output_names()
+    xcvm = graph.compile()
+
+    futures = []
+    for i in range(4):
+        inputs = dict(params)
+        inputs[input_names[0]] = chainer_compiler_core.value(aranges(5, 7) + i)
+        futures.append((xcvm.run(inputs), xcvm.run_async(inputs)))
+
+    for expected, future in futures:
+        outputs = future.result()
+        assert future.done()
+        for name in output_names:
+            chainerx.testing.assert_allclose(
+                expected[name].array(), outputs[name].array())
+
+
+def test_pass_stats(capfd):
+    graph = chainer_compiler_core.load('out/ch2o_node_Linear/model.onnx')
+    input_names = graph.input_names()
+    output_names = graph.output_names()
+    xcvm = graph.compile(compiler_log=True, pass_stats_json=True,
+                         disabled_passes=['propagate_constants'])
+    err = capfd.readouterr().err
+    assert '{"name":"simplify","skipped":false,' in err
+    assert '{"name":"propagate_constants","skipped":true,' in err
+
+    inputs = dict(graph.params())
+    t1 = aranges(5, 7)
+    inputs[input_names[0]] = chainer_compiler_core.value(t1)
+    outputs = xcvm.run(inputs)
+    y2 = chainerx.dot(t1, inputs['/l2/W'].array().T)
+    chainerx.testing.assert_allclose(y2, outputs[output_names[1]].array())
+
+
+def test_cache():
+    cache_dir = tempfile.mkdtemp()
+    t1 = aranges(5, 7)
+    results = []
+    for i in range(2):
+        graph = chainer_compiler_core.load('out/ch2o_node_Linear/model.onnx')
+        input_names = graph.input_names()
+        output_names = graph.output_names()
+        xcvm = graph.compile(cache_dir=cache_dir)
+        # The program and parameters updated by the compiler.
+        assert len(os.listdir(cache_dir)) == 2
+
+        inputs = dict(graph.params())
+        inputs[input_names[0]] = chainer_compiler_core.value(t1)
+        outputs = xcvm.run(inputs)
+        results.append([outputs[name].array() for name in output_names])
+
+    for expected, actual in zip(*results):
+        chainerx.testing.assert_allclose(expected, actual)
+
+
 def test_backprop():
     graph = chainer_compiler_core.load('out/ch2o_node_Linear_backprop/model.onnx')
     params = graph.params()
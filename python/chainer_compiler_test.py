@@ -1,6 +1,8 @@
+import concurrent.futures
 import os
 import pytest
 import sys
+import threading
 
 import chainer
 import chainer.functions as F
@@ -24,6 +26,7 @@ sys.path.append(os.path.join(project_root, 'python'))
 sys.path.append(os.path.join(project_root, 'build/python'))
 
 import chainer_compiler
+import chainer_compiler_core
 
 
 def aranges(xp, *shape):
@@ -151,6 +154,159 @@ def test_mnist(device_name):
         chainerx.testing.assert_allclose(e_grad, a_grad, rtol=1e-4)
 
 
+def test_load_model():
+    np.random.seed(40)
+    mlp = MLP(4, 10)
+    x = np.random.rand(3, 5).astype(np.float32)
+    # Initializes the parameters.
+    expected = mlp(x).array
+
+    graph = chainer_compiler.load_model(mlp, [x])
+    params = dict(mlp.namedparams())
+    assert sorted(graph.params().keys()) == sorted(params.keys())
+
+    inputs = dict(graph.params())
+    inputs[graph.input_names()[0]] = chainer_compiler_core.value(
+        chainerx.array(x))
+    outputs = graph.compile().run(inputs)
+    assert len(outputs) == 1
+    actual = list(outputs.values())[0].array()
+    _assert_allclose(expected, actual, rtol=1e-5)
+
+    # The initializers share memory with the parameters, and so do
+    # the parameters loaded without copies.
+    shared = graph.params(copy=False)
+    copied = graph.params()
+    params['/l1/W'].array[...] = 42
+    chainerx.testing.assert_array_equal(
+        params['/l1/W'].array, shared['/l1/W'].array())
+    assert not (copied['/l1/W'].array() == 42).all()
+
+
+@pytest.mark.parametrize('device_name', [np])
+def test_multiple_signatures(device_name):
+    np.random.seed(40)
+    device = chainer.get_device(device_name)
+    device.use()
+
+    mlp = MLP(4, 10)
+    mlp.to_device(device)
+    inputs = [np.random.rand(batch_size, 5).astype(np.float32)
+              for batch_size in [3, 2, 3, 2, 1]]
+    expected = [mlp(x).array for x in inputs]
+
+    model = chainer_compiler.compile(mlp, [inputs[0]], max_programs=2)
+    model.to_device(device)
+    for e, x in zip(expected, inputs):
+        _assert_allclose(e, _array(model(x)), rtol=1e-5)
+
+    stats = model.stats()
+    assert stats['programs'] == 2
+    assert stats['hits'] == 3
+    assert stats['misses'] == 2
+    assert stats['evictions'] == 1
+    assert stats['compile_time'] > 0
+
+
+@pytest.mark.parametrize('device_name', [np])
+def test_bucketing(device_name):
+    np.random.seed(40)
+    device = chainer.get_device(device_name)
+    device.use()
+
+    mlp = MLP(4, 10)
+    mlp.to_device(device)
+    inputs = [np.random.rand(batch_size, 5).astype(np.float32)
+              for batch_size in [4, 3, 2]]
+    expected = [_run_fwd_bwd(mlp, [x]) for x in inputs]
+
+    model = chainer_compiler.compile(mlp, [inputs[0]], bucket_sizes=[4, 8])
+    model.to_device(device)
+    for (expected_y, expected_grads), x in zip(expected, inputs):
+        actual_y, actual_grads = _run_fwd_bwd(model, [x])
+        assert expected_y.shape == actual_y.shape
+        _assert_allclose(expected_y, actual_y, rtol=1e-5)
+        for (e_name, e_grad), (a_name, a_grad) in zip(
+                expected_grads, actual_grads):
+            assert e_name == a_name
+            _assert_allclose(e_grad, a_grad, rtol=1e-4)
+
+    stats = model.stats()
+    assert stats['programs'] == 1
+    assert stats['hits'] == 3
+    assert stats['misses'] == 0
+
+
+@pytest.mark.parametrize('device_name', [np])
+def test_background_compile(device_name):
+    np.random.seed(40)
+    device = chainer.get_device(device_name)
+    device.use()
+
+    mlp = MLP(4, 10)
+    mlp.to_device(device)
+    input = np.random.rand(3, 5).astype(np.float32)
+    expected = mlp(input).array
+
+    model = chainer_compiler.compile(mlp, background_compile=True)
+    model.to_device(device)
+    _assert_allclose(expected, _array(model(input)), rtol=1e-5)
+    model.wait_compile()
+    assert model.compiled
+    _assert_allclose(expected, _array(model(input)), rtol=1e-5)
+
+    stats = model.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+    assert stats['pending'] == 0
+    assert stats['switch_iteration'] == 2
+    assert stats['compile_time'] > 0
+
+
+class DirectParam(chainer.Chain):
+
+    def __init__(self):
+        super(DirectParam, self).__init__()
+        with self.init_scope():
+            self.W = chainer.Parameter(np.arange(6, dtype=np.float32) / 6)
+
+    def forward(self, x):
+        return x * self.W
+
+
+@pytest.mark.parametrize('device_name', [np])
+def test_background_compile_pending(device_name):
+    device = chainer.get_device(device_name)
+    device.use()
+
+    model = DirectParam()
+    model.to_device(device)
+    input = np.random.rand(3, 6).astype(np.float32)
+    expected = model(input).array
+
+    model = chainer_compiler.compile(model, background_compile=True)
+    model.to_device(device)
+    # Keeps the compilation pending until the model is called again.
+    released = threading.Event()
+    model.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    model.executor.submit(released.wait)
+
+    _assert_allclose(expected, _array(model(input)), rtol=1e-5)
+    assert model.stats()['pending'] == 1
+    assert isinstance(model.mc.W, chainer.Parameter)
+    _assert_allclose(expected, _array(model(input)), rtol=1e-5)
+    assert model.stats()['pending'] == 1
+
+    released.set()
+    model.wait_compile()
+    _assert_allclose(expected, _array(model(input)), rtol=1e-5)
+
+    stats = model.stats()
+    assert stats['misses'] == 2
+    assert stats['hits'] == 1
+    assert stats['pending'] == 0
+
+
 class MultiInOuts(chainer.Chain):
 
     def forward(self, x, y):
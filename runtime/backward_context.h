@@ -22,6 +22,10 @@ public:
 
     void SetOutput(const std::vector<chainerx::Array>& ys);
 
+    const std::vector<chainerx::Array>& ys() const {
+        return ys_;
+    }
+
     std::vector<chainerx::Array> Backward(const std::vector<chainerx::Array>& gys) const;
 
 private:
@@ -71,6 +71,15 @@ chainerx::Array MakeHostArray(chainerx::Dtype dtype, chainerx::Shape shape, cons
     return array;
 }
 
+chainerx::Array MakeArray(chainerx::Dtype dtype, chainerx::Shape shape, const std::shared_ptr<void>& data) {
+    return chainerx::FromContiguousHostData(shape, dtype, data);
+}
+
+chainerx::Array MakeHostArray(chainerx::Dtype dtype, chainerx::Shape shape, const std::shared_ptr<void>& data) {
+    return chainerx::FromData(
+            shape, dtype, data, nonstd::nullopt /* strides */, 0 /* offset */, chainerx::GetNativeBackend().GetDevice(0));
+}
+
 std::vector<chainerx::Array> SplitByLengths(const chainerx::Array& input, int axis, const std::vector<int64_t>& split) {
     CHECK_EQ(std::accumulate(split.begin(), split.end(), 0), input.shape()[axis]);
     std::vector<chainerx::Array> results;
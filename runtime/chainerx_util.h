@@ -1,6 +1,7 @@
 #pragma once
 
 #include <map>
+#include <memory>
 #include <string>
 
 #include <chainerx/array.h>
@@ -20,6 +21,12 @@ chainerx::Array MakeScalarArray(float f);
 
 chainerx::Array MakeHostArray(chainerx::Dtype dtype, chainerx::Shape shape, const void* src);
 
+// Variants which share `data` without copying it when the array is
+// placed on a native device.
+chainerx::Array MakeArray(chainerx::Dtype dtype, chainerx::Shape shape, const std::shared_ptr<void>& data);
+
+chainerx::Array MakeHostArray(chainerx::Dtype dtype, chainerx::Shape shape, const std::shared_ptr<void>& data);
+
 // This function was renamed from `Split` to clearly tell this is
 // different from chainerx::Split.
 std::vector<chainerx::Array> SplitByLengths(const chainerx::Array& input, int axis, const std::vector<int64_t>& split);
@@ -10,6 +10,10 @@ ChromeTracingEmitter::ChromeTracingEmitter() : base_time_(std::chrono::system_cl
 }
 
 void ChromeTracingEmitter::AddEvent(Event* event) {
+    std::lock_guard<std::mutex> lock(mu_);
+    // Threads are numbered in the order of their first events.
+    auto inserted = thread_ids_.emplace(std::this_thread::get_id(), thread_ids_.size() + 1);
+    event->tid = inserted.first->second;
     events_.emplace_back(event);
 }
 
@@ -53,7 +57,7 @@ void ChromeTracingEmitter::Emit(const std::string& output_filename) const {
         ofs << "\"name\":\"" << event->name << "\",";
         ofs << "\"ts\":" << ts << ",";
         ofs << "\"dur\":" << dur << ",";
-        ofs << "\"tid\":1,";
+        ofs << "\"tid\":" << event->tid << ",";
         ofs << "\"pid\":1,";
         if (event->pc >= 0) {
             ofs << "\"args\":{\"pc\":" << event->pc << "},";
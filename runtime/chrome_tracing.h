@@ -1,8 +1,11 @@
 #pragma once
 
 #include <chrono>
+#include <map>
 #include <memory>
+#include <mutex>
 #include <string>
+#include <thread>
 #include <vector>
 
 namespace chainer_compiler {
@@ -16,6 +19,8 @@ public:
         std::string category;
         std::string name;
         int pc;
+        // Set by `AddEvent` to distinguish events run by different threads.
+        int tid{1};
         std::chrono::system_clock::time_point start_time;
         std::chrono::system_clock::time_point end_time;
     };
@@ -31,13 +36,15 @@ public:
 
     ChromeTracingEmitter();
 
-    // Takes the ownership of `event`.
+    // Takes the ownership of `event`. Thread-safe.
     void AddEvent(Event* event);
 
     void Emit(const std::string& output_filename) const;
 
 private:
+    std::mutex mu_;
     std::vector<std::unique_ptr<Event>> events_;
+    std::map<std::thread::id, int> thread_ids_;
     std::chrono::system_clock::time_point base_time_;
 };
 
@@ -0,0 +1,402 @@
+#include <algorithm>
+#include <cmath>
+#include <sstream>
+#include <string>
+#include <utility>
+#include <vector>
+
+#include <chainerx/array.h>
+#include <chainerx/routines/creation.h>
+#include <chainerx/routines/math.h>
+#include <chainerx/shape.h>
+
+#include <common/log.h>
+#include <runtime/chainerx_util.h>
+#include <runtime/gen_xcvm_ops.h>
+#include <runtime/xcvm_state.h>
+
+namespace chainer_compiler {
+namespace runtime {
+
+namespace {
+
+// The number of elements processed at once. Temporary values of a
+// block stay in the L1 or L2 cache.
+constexpr int64_t kBlockSize = 2048;
+
+enum class FusedOp {
+    kConst,
+    kIdentity,
+    kAdd,
+    kSub,
+    kMul,
+    kDiv,
+    kTanh,
+    kExp,
+    kSigmoid,
+};
+
+struct FusedInstruction {
+    FusedOp op;
+    int dst;
+    int src0;
+    int src1;
+    double value;
+};
+
+struct FusedProgram {
+    std::vector<FusedInstruction> insts;
+    std::vector<int> outputs;
+    int num_registers;
+};
+
+FusedProgram ParseProgram(const std::string& program, int num_inputs) {
+    FusedProgram prog;
+    prog.num_registers = num_inputs;
+    std::istringstream iss(program);
+    std::string line;
+    while (std::getline(iss, line)) {
+        if (line.empty()) continue;
+        std::istringstream liss(line);
+        std::string name;
+        FusedInstruction inst{FusedOp::kConst, -1, -1, -1, 0.0};
+        liss >> name;
+        if (name == "out") {
+            int reg;
+            CHECK(liss >> reg) << line;
+            prog.outputs.push_back(reg);
+            continue;
+        }
+
+        int num_srcs = 1;
+        if (name == "const") {
+            inst.op = FusedOp::kConst;
+            num_srcs = 0;
+        } else if (name == "identity") {
+            inst.op = FusedOp::kIdentity;
+        } else if (name == "add") {
+            inst.op = FusedOp::kAdd;
+            num_srcs = 2;
+        } else if (name == "sub") {
+            inst.op = FusedOp::kSub;
+            num_srcs = 2;
+        } else if (name == "mul") {
+            inst.op = FusedOp::kMul;
+            num_srcs = 2;
+        } else if (name == "div") {
+            inst.op = FusedOp::kDiv;
+            num_srcs = 2;
+        } else if (name == "tanh") {
+            inst.op = FusedOp::kTanh;
+        } else if (name == "exp") {
+            inst.op = FusedOp::kExp;
+        } else if (name == "sigmoid") {
+            inst.op = FusedOp::kSigmoid;
+        } else {
+            CHECK(false) << "Unknown instruction: " << line;
+        }
+
+        CHECK(liss >> inst.dst) << line;
+        if (num_srcs == 0) CHECK(liss >> inst.value) << line;
+        if (num_srcs >= 1) CHECK(liss >> inst.src0) << line;
+        if (num_srcs >= 2) CHECK(liss >> inst.src1) << line;
+        CHECK_LT(inst.src0, inst.dst) << line;
+        CHECK_LT(inst.src1, inst.dst) << line;
+        prog.num_registers = std::max(prog.num_registers, inst.dst + 1);
+        prog.insts.push_back(inst);
+    }
+    for (int reg : prog.outputs) CHECK_LT(reg, prog.num_registers);
+    return prog;
+}
+
+// A register in a block. `stride` is zero for a broadcasted scalar.
+template <typename T>
+struct Operand {
+    const T* ptr;
+    int64_t stride;
+};
+
+template <typename T, typename F>
+Operand<T> Map1(int64_t n, Operand<T> a, T* dst, F f) {
+    if (a.stride == 0) {
+        dst[0] = f(a.ptr[0]);
+        return {dst, 0};
+    }
+    for (int64_t i = 0; i < n; ++i) dst[i] = f(a.ptr[i]);
+    return {dst, 1};
+}
+
+template <typename T, typename F>
+Operand<T> Map2(int64_t n, Operand<T> a, Operand<T> b, T* dst, F f) {
+    if (a.stride == 0 && b.stride == 0) {
+        dst[0] = f(a.ptr[0], b.ptr[0]);
+        return {dst, 0};
+    }
+    if (b.stride == 0) {
+        const T y = b.ptr[0];
+        for (int64_t i = 0; i < n; ++i) dst[i] = f(a.ptr[i], y);
+    } else if (a.stride == 0) {
+        const T x = a.ptr[0];
+        for (int64_t i = 0; i < n; ++i) dst[i] = f(x, b.ptr[i]);
+    } else {
+        for (int64_t i = 0; i < n; ++i) dst[i] = f(a.ptr[i], b.ptr[i]);
+    }
+    return {dst, 1};
+}
+
+// An input of a fused program. `strides` are in elements for each
+// axis of the output shape and zero for broadcasted axes, so
+// broadcasted inputs such as biases are not materialized.
+template <typename T>
+struct FusedInput {
+    const T* ptr;
+    std::vector<int64_t> strides;
+    // True if the input has the output shape and is contiguous.
+    bool is_contiguous;
+    bool is_scalar;
+};
+
+template <typename T>
+FusedInput<T> MakeFusedInput(const chainerx::Array& a, const chainerx::Shape& shape) {
+    FusedInput<T> input;
+    input.ptr = static_cast<const T*>(chainerx::internal::GetRawOffsetData(a));
+    input.is_contiguous = a.shape() == shape && a.IsContiguous();
+    input.is_scalar = a.GetTotalSize() == 1;
+    // Shapes are aligned to the right as NumPy's broadcast.
+    const int64_t lead = shape.ndim() - a.ndim();
+    CHECK_LE(0, lead);
+    input.strides.resize(shape.ndim());
+    for (int i = 0; i < shape.ndim(); ++i) {
+        const int j = i - lead;
+        if (j < 0 || a.shape()[j] == 1) {
+            input.strides[i] = 0;
+        } else {
+            CHECK_EQ(a.shape()[j], shape[i]);
+            input.strides[i] = a.strides()[j] / static_cast<int64_t>(sizeof(T));
+        }
+    }
+    return input;
+}
+
+// Copies elements [begin, begin + n) of `input` broadcasted to
+// `shape` in the row-major order to `dst`.
+template <typename T>
+void GatherBlock(const FusedInput<T>& input, const chainerx::Shape& shape, int64_t begin, int64_t n, T* dst) {
+    const int ndim = shape.ndim();
+    std::vector<int64_t> index(ndim);
+    int64_t offset = 0;
+    int64_t rest = begin;
+    for (int i = ndim - 1; i >= 0; --i) {
+        index[i] = rest % shape[i];
+        rest /= shape[i];
+        offset += index[i] * input.strides[i];
+    }
+
+    const int64_t last_dim = shape[ndim - 1];
+    const int64_t last_stride = input.strides[ndim - 1];
+    for (int64_t i = 0; i < n;) {
+        // Copies a run along the last axis.
+        const int64_t run = std::min(n - i, last_dim - index[ndim - 1]);
+        const T* src = input.ptr + offset;
+        if (last_stride == 0) {
+            std::fill(dst + i, dst + i + run, src[0]);
+        } else {
+            for (int64_t j = 0; j < run; ++j) dst[i + j] = src[j * last_stride];
+        }
+        i += run;
+        index[ndim - 1] += run;
+        offset += run * last_stride;
+        for (int d = ndim - 1; d > 0 && index[d] == shape[d]; --d) {
+            offset += input.strides[d - 1] - index[d] * input.strides[d];
+            index[d] = 0;
+            ++index[d - 1];
+        }
+    }
+}
+
+// Runs `prog` block by block. Inputs of other shapes or layouts are
+// gathered to a buffer of a block.
+template <typename T>
+void RunFusedProgram(
+        const FusedProgram& prog, const std::vector<chainerx::Array>& inputs, const std::vector<chainerx::Array>& outputs) {
+    const chainerx::Shape& shape = outputs.front().shape();
+    const int64_t size = shape.GetTotalSize();
+    std::vector<FusedInput<T>> fused_inputs;
+    std::vector<std::vector<T>> gathered(inputs.size());
+    for (size_t i = 0; i < inputs.size(); ++i) {
+        fused_inputs.push_back(MakeFusedInput<T>(inputs[i], shape));
+        if (!fused_inputs[i].is_contiguous && !fused_inputs[i].is_scalar) gathered[i].resize(kBlockSize);
+    }
+    std::vector<T*> out_ptrs;
+    for (const chainerx::Array& output : outputs) {
+        CHECK(output.IsContiguous());
+        out_ptrs.push_back(static_cast<T*>(chainerx::internal::GetRawOffsetData(output)));
+    }
+
+    std::vector<std::vector<T>> scratch(prog.num_registers, std::vector<T>(kBlockSize));
+    std::vector<Operand<T>> regs(prog.num_registers);
+    for (int64_t begin = 0; begin < size; begin += kBlockSize) {
+        const int64_t n = std::min(kBlockSize, size - begin);
+        for (size_t i = 0; i < inputs.size(); ++i) {
+            const FusedInput<T>& input = fused_inputs[i];
+            if (input.is_scalar) {
+                regs[i] = Operand<T>{input.ptr, 0};
+            } else if (input.is_contiguous) {
+                regs[i] = Operand<T>{input.ptr + begin, 1};
+            } else {
+                GatherBlock(input, shape, begin, n, gathered[i].data());
+                regs[i] = Operand<T>{gathered[i].data(), 1};
+            }
+        }
+
+        for (const FusedInstruction& inst : prog.insts) {
+            T* dst = scratch[inst.dst].data();
+            const Operand<T>& a = regs[std::max(inst.src0, 0)];
+            const Operand<T>& b = regs[std::max(inst.src1, 0)];
+            switch (inst.op) {
+                case FusedOp::kConst:
+                    dst[0] = static_cast<T>(inst.value);
+                    regs[inst.dst] = Operand<T>{dst, 0};
+                    break;
+                case FusedOp::kIdentity:
+                    regs[inst.dst] = a;
+                    break;
+                case FusedOp::kAdd:
+                    regs[inst.dst] = Map2(n, a, b, dst, [](T x, T y) { return x + y; });
+                    break;
+                case FusedOp::kSub:
+                    regs[inst.dst] = Map2(n, a, b, dst, [](T x, T y) { return x - y; });
+                    break;
+                case FusedOp::kMul:
+                    regs[inst.dst] = Map2(n, a, b, dst, [](T x, T y) { return x * y; });
+                    break;
+                case FusedOp::kDiv:
+                    regs[inst.dst] = Map2(n, a, b, dst, [](T x, T y) { return x / y; });
+                    break;
+                case FusedOp::kTanh:
+                    regs[inst.dst] = Map1(n, a, dst, [](T x) { return std::tanh(x); });
+                    break;
+                case FusedOp::kExp:
+                    regs[inst.dst] = Map1(n, a, dst, [](T x) { return std::exp(x); });
+                    break;
+                case FusedOp::kSigmoid:
+                    regs[inst.dst] = Map1(n, a, dst, [](T x) {
+                        const T half = 0.5;
+                        return std::tanh(x * half) * half + half;
+                    });
+                    break;
+            }
+        }
+
+        for (size_t i = 0; i < outputs.size(); ++i) {
+            const Operand<T>& r = regs[prog.outputs[i]];
+            T* out = out_ptrs[i] + begin;
+            if (r.stride == 0) {
+                std::fill(out, out + n, r.ptr[0]);
+            } else {
+                std::copy(r.ptr, r.ptr + n, out);
+            }
+        }
+    }
+}
+
+// Runs `prog` op by op with ChainerX for devices other than CPU.
+std::vector<chainerx::Array> RunFusedProgramByChainerX(const FusedProgram& prog, const std::vector<chainerx::Array>& inputs) {
+    const chainerx::Array& x = inputs.front();
+    std::vector<chainerx::Array> regs(inputs);
+    regs.resize(prog.num_registers);
+    for (const FusedInstruction& inst : prog.insts) {
+        const chainerx::Array& a = regs[std::max(inst.src0, 0)];
+        const chainerx::Array& b = regs[std::max(inst.src1, 0)];
+        chainerx::Array& dst = regs[inst.dst];
+        switch (inst.op) {
+            case FusedOp::kConst:
+                dst = chainerx::Full(chainerx::Shape{}, inst.value, x.dtype(), x.device());
+                break;
+            case FusedOp::kIdentity:
+                dst = a;
+                break;
+            case FusedOp::kAdd:
+                dst = a + b;
+                break;
+            case FusedOp::kSub:
+                dst = a - b;
+                break;
+            case FusedOp::kMul:
+                dst = a * b;
+                break;
+            case FusedOp::kDiv:
+                dst = a / b;
+                break;
+            case FusedOp::kTanh:
+                dst = chainerx::Tanh(a);
+                break;
+            case FusedOp::kExp:
+                dst = chainerx::Exp(a);
+                break;
+            case FusedOp::kSigmoid:
+                dst = Sigmoid(a);
+                break;
+        }
+    }
+
+    std::vector<chainerx::Array> outputs;
+    for (int reg : prog.outputs) outputs.push_back(regs[reg]);
+    return outputs;
+}
+
+}  // namespace
+
+class ElementWiseCpuOp::ElementWiseCpuImpl {
+public:
+    explicit ElementWiseCpuImpl(FusedProgram p) : prog(std::move(p)) {
+    }
+
+    // Parsed once when the op is created and never modified, so runs
+    // can share it.
+    const FusedProgram prog;
+};
+
+void ElementWiseCpuOp::InitImpl() {
+    FusedProgram prog = ParseProgram(program, inputs.size());
+    CHECK_EQ(num_outputs, static_cast<int>(prog.outputs.size()));
+    impl_ = new ElementWiseCpuImpl(std::move(prog));
+}
+
+ElementWiseCpuOp::~ElementWiseCpuOp() {
+    delete impl_;
+}
+
+std::vector<chainerx::Array> ElementWiseCpuOp::RunImpl(
+        chainer_compiler::runtime::XCVMState* st, const std::vector<chainerx::Array>& orig_inputs) {
+    CHECK(!orig_inputs.empty());
+    CHECK_EQ(inputs.size(), orig_inputs.size());
+    const FusedProgram& prog = impl_->prog;
+
+    const chainerx::Dtype dtype = orig_inputs[0].dtype();
+    chainerx::Shape shape = orig_inputs[0].shape();
+    bool is_supported =
+            IsNativeDevice(&orig_inputs[0].device()) && (dtype == chainerx::Dtype::kFloat32 || dtype == chainerx::Dtype::kFloat64);
+    for (const chainerx::Array& input : orig_inputs) {
+        if (dtype != input.dtype() || !IsNativeDevice(&input.device())) is_supported = false;
+        shape = chainerx::internal::BroadcastShapes(shape, input.shape());
+    }
+    if (!is_supported) {
+        return RunFusedProgramByChainerX(prog, orig_inputs);
+    }
+
+    std::vector<chainerx::Array> results;
+    for (int i = 0; i < num_outputs; ++i) {
+        nonstd::optional<chainerx::Array> planned = st->GetPlannedArray(outputs[i], shape, dtype, orig_inputs[0].device());
+        results.push_back(planned.has_value() ? *planned : chainerx::Empty(shape, dtype, orig_inputs[0].device()));
+    }
+    if (dtype == chainerx::Dtype::kFloat32) {
+        RunFusedProgram<float>(prog, orig_inputs, results);
+    } else {
+        RunFusedProgram<double>(prog, orig_inputs, results);
+    }
+    return results;
+}
+
+}  // namespace runtime
+}  // namespace chainer_compiler
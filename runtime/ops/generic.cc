@@ -40,11 +40,11 @@ int64_t GetOptionalInt(XCVMState* st, int index, int64_t default_value) {
 }  // namespace
 
 void InOp::RunImpl(XCVMState* st) {
-    st->Input(name, v);
+    st->Input(name, inout_index(), v);
 }
 
 void OutOp::RunImpl(XCVMState* st) {
-    st->Output(name, v);
+    st->Output(name, inout_index(), v);
 }
 
 void IdentityOp::RunImpl(XCVMState* st) {
@@ -0,0 +1,369 @@
+#include <algorithm>
+#include <utility>
+#include <vector>
+
+#include <chainerx/array.h>
+#include <chainerx/routines/connection.h>
+#include <chainerx/routines/creation.h>
+#include <chainerx/routines/manipulation.h>
+#include <chainerx/shape.h>
+
+#include <common/log.h>
+#include <runtime/chainerx_util.h>
+#include <runtime/gen_xcvm_ops.h>
+
+namespace chainer_compiler {
+namespace runtime {
+
+namespace {
+
+// The geometry of a 2D grouped convolution from `x` (N, C, H, W) to
+// `y` (N, M, OH, OW) with `w` (M, C / group, KH, KW). Channels are
+// counted per group.
+struct ConvGeometry {
+    int64_t batch_size;
+    int64_t group;
+    int64_t in_channels;
+    int64_t out_channels;
+    int64_t in_h;
+    int64_t in_w;
+    int64_t out_h;
+    int64_t out_w;
+    int64_t kernel_h;
+    int64_t kernel_w;
+    int64_t stride_y;
+    int64_t stride_x;
+    int64_t pad_y;
+    int64_t pad_x;
+};
+
+ConvGeometry MakeConvGeometry(
+        const chainerx::Shape& x_shape,
+        const chainerx::Shape& w_shape,
+        const chainerx::Shape& y_shape,
+        const Int64StackVector& strides,
+        const Int64StackVector& pads,
+        int64_t group) {
+    CHECK_EQ(4, x_shape.size());
+    CHECK_EQ(4, w_shape.size());
+    CHECK_EQ(4, y_shape.size());
+    CHECK_EQ(2, strides.size());
+    CHECK_EQ(2, pads.size());
+    CHECK_EQ(x_shape[0], y_shape[0]);
+    CHECK_EQ(x_shape[1], w_shape[1] * group) << x_shape << " " << w_shape << " group=" << group;
+    CHECK_EQ(y_shape[1], w_shape[0]) << y_shape << " " << w_shape;
+    CHECK_EQ(0, w_shape[0] % group) << w_shape << " group=" << group;
+    return ConvGeometry{x_shape[0],
+                        group,
+                        w_shape[1],
+                        w_shape[0] / group,
+                        x_shape[2],
+                        x_shape[3],
+                        y_shape[2],
+                        y_shape[3],
+                        w_shape[2],
+                        w_shape[3],
+                        strides[0],
+                        strides[1],
+                        pads[0],
+                        pads[1]};
+}
+
+// Returns the range of output positions `o` such that the input
+// position `o * stride - pad + k` is in [0, in_size).
+std::pair<int64_t, int64_t> GetValidRange(int64_t k, int64_t stride, int64_t pad, int64_t in_size, int64_t out_size) {
+    const int64_t lo = pad - k;
+    const int64_t hi = in_size - 1 + pad - k;
+    const int64_t begin = lo <= 0 ? 0 : (lo + stride - 1) / stride;
+    const int64_t end = hi < 0 ? 0 : std::min(out_size, hi / stride + 1);
+    return std::make_pair(begin, std::max(begin, end));
+}
+
+// Calls `fn(k, y_offset, x_offset, ox_begin, ox_end)` for each kernel
+// position `k` and output row. The output element `y_offset + ox`
+// corresponds to the input element `x_offset + ox * stride_x` for ox
+// in [ox_begin, ox_end).
+template <class Fn>
+void ForEachKernelRow(const ConvGeometry& g, Fn fn) {
+    for (int64_t ky = 0; ky < g.kernel_h; ++ky) {
+        const std::pair<int64_t, int64_t> oys = GetValidRange(ky, g.stride_y, g.pad_y, g.in_h, g.out_h);
+        for (int64_t kx = 0; kx < g.kernel_w; ++kx) {
+            const std::pair<int64_t, int64_t> oxs = GetValidRange(kx, g.stride_x, g.pad_x, g.in_w, g.out_w);
+            if (oxs.first == oxs.second) continue;
+            for (int64_t oy = oys.first; oy < oys.second; ++oy) {
+                const int64_t iy = oy * g.stride_y - g.pad_y + ky;
+                fn(ky * g.kernel_w + kx, oy * g.out_w, iy * g.in_w - g.pad_x + kx, oxs.first, oxs.second);
+            }
+        }
+    }
+}
+
+// Direct convolution without im2col. Each group has only a few input
+// channels for grouped Conv (e.g., ResNeXt) and a single input
+// channel for depthwise Conv (e.g., MobileNet), so a kernel tap is
+// applied to whole output rows, which are contiguous in memory.
+template <typename T>
+void GroupedConvForward(const ConvGeometry& g, const T* x, const T* w, const T* b, T* y) {
+    const int64_t in_size = g.in_h * g.in_w;
+    const int64_t out_size = g.out_h * g.out_w;
+    const int64_t kernel_size = g.kernel_h * g.kernel_w;
+    const int64_t num_in_channels = g.in_channels * g.group;
+    const int64_t num_out_channels = g.out_channels * g.group;
+    for (int64_t n = 0; n < g.batch_size; ++n) {
+        for (int64_t m = 0; m < num_out_channels; ++m) {
+            T* yp = y + (n * num_out_channels + m) * out_size;
+            std::fill(yp, yp + out_size, b ? b[m] : T(0));
+            const int64_t first_channel = m / g.out_channels * g.in_channels;
+            for (int64_t c = 0; c < g.in_channels; ++c) {
+                const T* xp = x + (n * num_in_channels + first_channel + c) * in_size;
+                const T* wp = w + (m * g.in_channels + c) * kernel_size;
+                ForEachKernelRow(g, [&g, xp, wp, yp](int64_t k, int64_t yo, int64_t xo, int64_t begin, int64_t end) {
+                    const T wv = wp[k];
+                    if (g.stride_x == 1) {
+                        for (int64_t ox = begin; ox < end; ++ox) yp[yo + ox] += wv * xp[xo + ox];
+                    } else {
+                        for (int64_t ox = begin; ox < end; ++ox) yp[yo + ox] += wv * xp[xo + ox * g.stride_x];
+                    }
+                });
+            }
+        }
+    }
+}
+
+// Computes the gradient of `x` from `gy`, which is also the grouped
+// ConvTranspose of `gy`.
+template <typename T>
+void GroupedConvBackwardData(const ConvGeometry& g, const T* w, const T* gy, T* gx) {
+    const int64_t in_size = g.in_h * g.in_w;
+    const int64_t out_size = g.out_h * g.out_w;
+    const int64_t kernel_size = g.kernel_h * g.kernel_w;
+    const int64_t num_in_channels = g.in_channels * g.group;
+    const int64_t num_out_channels = g.out_channels * g.group;
+    std::fill(gx, gx + g.batch_size * num_in_channels * in_size, T(0));
+    for (int64_t n = 0; n < g.batch_size; ++n) {
+        for (int64_t m = 0; m < num_out_channels; ++m) {
+            const T* gyp = gy + (n * num_out_channels + m) * out_size;
+            const int64_t first_channel = m / g.out_channels * g.in_channels;
+            for (int64_t c = 0; c < g.in_channels; ++c) {
+                T* gxp = gx + (n * num_in_channels + first_channel + c) * in_size;
+                const T* wp = w + (m * g.in_channels + c) * kernel_size;
+                ForEachKernelRow(g, [&g, gxp, wp, gyp](int64_t k, int64_t yo, int64_t xo, int64_t begin, int64_t end) {
+                    const T wv = wp[k];
+                    for (int64_t ox = begin; ox < end; ++ox) gxp[xo + ox * g.stride_x] += wv * gyp[yo + ox];
+                });
+            }
+        }
+    }
+}
+
+template <typename T>
+void GroupedConvBackwardWeight(const ConvGeometry& g, const T* x, const T* gy, T* gw) {
+    const int64_t in_size = g.in_h * g.in_w;
+    const int64_t out_size = g.out_h * g.out_w;
+    const int64_t kernel_size = g.kernel_h * g.kernel_w;
+    const int64_t num_in_channels = g.in_channels * g.group;
+    const int64_t num_out_channels = g.out_channels * g.group;
+    std::fill(gw, gw + num_out_channels * g.in_channels * kernel_size, T(0));
+    for (int64_t n = 0; n < g.batch_size; ++n) {
+        for (int64_t m = 0; m < num_out_channels; ++m) {
+            const T* gyp = gy + (n * num_out_channels + m) * out_size;
+            const int64_t first_channel = m / g.out_channels * g.in_channels;
+            for (int64_t c = 0; c < g.in_channels; ++c) {
+                const T* xp = x + (n * num_in_channels + first_channel + c) * in_size;
+                T* gwp = gw + (m * g.in_channels + c) * kernel_size;
+                ForEachKernelRow(g, [&g, xp, gwp, gyp](int64_t k, int64_t yo, int64_t xo, int64_t begin, int64_t end) {
+                    T acc = 0;
+                    for (int64_t ox = begin; ox < end; ++ox) acc += gyp[yo + ox] * xp[xo + ox * g.stride_x];
+                    gwp[k] += acc;
+                });
+            }
+        }
+    }
+}
+
+// Returns true if the direct kernels above can be used.
+bool UseNativeKernel(const std::vector<const chainerx::Array*>& arrays) {
+    const chainerx::Array& x = *arrays[0];
+    if (x.ndim() != 4 || !IsNativeDevice(&x.device())) return false;
+    if (x.dtype() != chainerx::Dtype::kFloat32 && x.dtype() != chainerx::Dtype::kFloat64) return false;
+    for (const chainerx::Array* a : arrays) {
+        if (a->dtype() != x.dtype() || !IsNativeDevice(&a->device())) return false;
+    }
+    return true;
+}
+
+chainerx::Array AsContiguous(const chainerx::Array& a) {
+    return a.IsContiguous() ? a : chainerx::Copy(a);
+}
+
+// Contiguous arrays may still be views with offsets, e.g., outputs of
+// Split along channels.
+template <typename T>
+const T* Data(const chainerx::Array& a) {
+    return static_cast<const T*>(chainerx::internal::GetRawOffsetData(a));
+}
+
+template <typename T>
+T* MutableData(const chainerx::Array& a) {
+    return static_cast<T*>(chainerx::internal::GetRawOffsetData(a));
+}
+
+chainerx::Array SliceChannels(const chainerx::Array& a, int axis, int64_t index, int64_t size) {
+    std::vector<chainerx::ArrayIndex> indices(axis + 1, chainerx::Slice());
+    indices[axis] = chainerx::Slice(index * size, (index + 1) * size);
+    return a.At(indices);
+}
+
+chainerx::Array GroupedConv(
+        const chainerx::Array& x,
+        const chainerx::Array& w,
+        const nonstd::optional<chainerx::Array>& b,
+        const Int64StackVector& strides,
+        const Int64StackVector& pads,
+        int64_t group) {
+    std::vector<const chainerx::Array*> arrays = {&x, &w};
+    if (b.has_value()) arrays.push_back(&*b);
+    if (!UseNativeKernel(arrays)) {
+        // Run ChainerX for each group. This is still cheaper than
+        // Split/Conv/Concat in the graph as slices of inputs are views.
+        const int64_t in_channels = x.shape()[1] / group;
+        const int64_t out_channels = w.shape()[0] / group;
+        std::vector<chainerx::Array> ys;
+        for (int64_t i = 0; i < group; ++i) {
+            nonstd::optional<chainerx::Array> bi = nonstd::nullopt;
+            if (b.has_value()) bi = SliceChannels(*b, 0, i, out_channels);
+            ys.push_back(chainerx::Conv(SliceChannels(x, 1, i, in_channels), SliceChannels(w, 0, i, out_channels), bi, strides, pads));
+        }
+        return chainerx::Concatenate(ys, 1);
+    }
+
+    CHECK_EQ(2, strides.size());
+    CHECK_EQ(2, pads.size());
+    const chainerx::Shape y_shape{x.shape()[0],
+                                  w.shape()[0],
+                                  (x.shape()[2] + pads[0] * 2 - w.shape()[2]) / strides[0] + 1,
+                                  (x.shape()[3] + pads[1] * 2 - w.shape()[3]) / strides[1] + 1};
+    const ConvGeometry g = MakeConvGeometry(x.shape(), w.shape(), y_shape, strides, pads, group);
+    chainerx::Array y = chainerx::Empty(y_shape, x.dtype(), x.device());
+    const chainerx::Array cx = AsContiguous(x);
+    const chainerx::Array cw = AsContiguous(w);
+    const nonstd::optional<chainerx::Array> cb = b.has_value() ? nonstd::optional<chainerx::Array>(AsContiguous(*b)) : nonstd::nullopt;
+    if (x.dtype() == chainerx::Dtype::kFloat32) {
+        GroupedConvForward<float>(g, Data<float>(cx), Data<float>(cw), cb.has_value() ? Data<float>(*cb) : nullptr, MutableData<float>(y));
+    } else {
+        GroupedConvForward<double>(
+                g, Data<double>(cx), Data<double>(cw), cb.has_value() ? Data<double>(*cb) : nullptr, MutableData<double>(y));
+    }
+    return y;
+}
+
+// `out_size` is the spatial shape of the output. It is inferred from
+// the input if empty.
+chainerx::Array GroupedConvTranspose(
+        const chainerx::Array& x,
+        const chainerx::Array& w,
+        const nonstd::optional<chainerx::Array>& b,
+        const Int64StackVector& strides,
+        const Int64StackVector& pads,
+        const Int64StackVector& out_size,
+        int64_t group) {
+    std::vector<const chainerx::Array*> arrays = {&x, &w};
+    if (b.has_value()) arrays.push_back(&*b);
+    if (!UseNativeKernel(arrays)) {
+        const int64_t in_channels = x.shape()[1] / group;
+        const int64_t out_channels = w.shape()[1];
+        nonstd::optional<Int64StackVector> os = nonstd::nullopt;
+        if (!out_size.empty()) os = out_size;
+        std::vector<chainerx::Array> ys;
+        for (int64_t i = 0; i < group; ++i) {
+            nonstd::optional<chainerx::Array> bi = nonstd::nullopt;
+            if (b.has_value()) bi = SliceChannels(*b, 0, i, out_channels);
+            ys.push_back(chainerx::ConvTranspose(
+                    SliceChannels(x, 1, i, in_channels), SliceChannels(w, 0, i, in_channels), bi, strides, pads, os));
+        }
+        return chainerx::Concatenate(ys, 1);
+    }
+
+    CHECK_EQ(2, strides.size());
+    CHECK_EQ(2, pads.size());
+    chainerx::Shape y_shape{x.shape()[0], w.shape()[1] * group};
+    for (int i = 0; i < 2; ++i) {
+        if (out_size.empty()) {
+            y_shape.push_back((x.shape()[i + 2] - 1) * strides[i] - pads[i] * 2 + w.shape()[i + 2]);
+        } else {
+            CHECK_EQ(2, out_size.size());
+            y_shape.push_back(out_size[i]);
+        }
+    }
+    // This is the gradient of Conv from `y` to `x`.
+    const ConvGeometry g = MakeConvGeometry(y_shape, w.shape(), x.shape(), strides, pads, group);
+    chainerx::Array y = chainerx::Empty(y_shape, x.dtype(), x.device());
+    const chainerx::Array cx = AsContiguous(x);
+    const chainerx::Array cw = AsContiguous(w);
+    if (x.dtype() == chainerx::Dtype::kFloat32) {
+        GroupedConvBackwardData<float>(g, Data<float>(cw), Data<float>(cx), MutableData<float>(y));
+    } else {
+        GroupedConvBackwardData<double>(g, Data<double>(cw), Data<double>(cx), MutableData<double>(y));
+    }
+    if (b.has_value()) {
+        y += b->Reshape({1, b->GetTotalSize(), 1, 1});
+    }
+    return y;
+}
+
+}  // namespace
+
+chainerx::Array GroupedConvOp::RunImpl(
+        XCVMState* st, const chainerx::Array& x, const chainerx::Array& w, const nonstd::optional<chainerx::Array>& b) {
+    return GroupedConv(x, w, b, ComplementStride(strides, x), ComplementPad(pads, x), group);
+}
+
+chainerx::Array GroupedConvTransposeOp::RunImpl(
+        XCVMState* st, const chainerx::Array& x, const chainerx::Array& w, const nonstd::optional<chainerx::Array>& b) {
+    return GroupedConvTranspose(x, w, b, ComplementStride(strides, x), ComplementPad(pads, x), output_shape, group);
+}
+
+chainerx::Array GroupedConvTransposeWithDynamicShapeOp::RunImpl(
+        XCVMState* st, const chainerx::Array& x, const chainerx::Array& w, const chainerx::Array& output_shape) {
+    chainerx::Shape shape = ArrayToShape(output_shape);
+    Int64StackVector out_size(shape.begin() + 2, shape.end());
+    return GroupedConvTranspose(x, w, nonstd::nullopt, ComplementStride(strides, x), ComplementPad(pads, x), out_size, group);
+}
+
+chainerx::Array GroupedConvGradWeightOp::RunImpl(
+        XCVMState* st, const chainerx::Array& w, const chainerx::Array& x, const chainerx::Array& gy) {
+    const Int64StackVector stride = ComplementStride(strides, x);
+    const Int64StackVector pad = ComplementPad(pads, x);
+    if (!UseNativeKernel({&x, &w, &gy})) {
+        const int64_t in_channels = x.shape()[1] / group;
+        const int64_t out_channels = w.shape()[0] / group;
+        chainerx::Shape w_shape = w.shape();
+        w_shape[0] = out_channels;
+        std::vector<chainerx::Array> gws;
+        for (int64_t i = 0; i < group; ++i) {
+            gws.push_back(x.device().ConvGradWeight(
+                    w.dtype(),
+                    w_shape,
+                    SliceChannels(x, 1, i, in_channels),
+                    SliceChannels(gy, 1, i, out_channels),
+                    stride,
+                    pad,
+                    false /* cover_all */));
+        }
+        return chainerx::Concatenate(gws, 0);
+    }
+
+    const ConvGeometry g = MakeConvGeometry(x.shape(), w.shape(), gy.shape(), stride, pad, group);
+    chainerx::Array gw = chainerx::Empty(w.shape(), w.dtype(), w.device());
+    const chainerx::Array cx = AsContiguous(x);
+    const chainerx::Array cgy = AsContiguous(gy);
+    if (x.dtype() == chainerx::Dtype::kFloat32) {
+        GroupedConvBackwardWeight<float>(g, Data<float>(cx), Data<float>(cgy), MutableData<float>(gw));
+    } else {
+        GroupedConvBackwardWeight<double>(g, Data<double>(cx), Data<double>(cgy), MutableData<double>(gw));
+    }
+    return gw;
+}
+
+}  // namespace runtime
+}  // namespace chainer_compiler
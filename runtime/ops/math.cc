@@ -1,3 +1,4 @@
+#include <chainerx/device.h>
 #include <chainerx/routines/creation.h>
 #include <chainerx/routines/linalg.h>
 #include <chainerx/routines/logic.h>
@@ -7,6 +8,7 @@
 #include <common/log.h>
 #include <runtime/chainerx_util.h>
 #include <runtime/gen_xcvm_ops.h>
+#include <runtime/xcvm_state.h>
 
 namespace chainer_compiler {
 namespace runtime {
@@ -39,20 +41,40 @@ std::tuple<chainerx::Array, chainerx::Array> CoerceBinary(const chainerx::Array&
     return std::tie(ax, bx);
 }
 
+// Returns the array planned in the memory arena for the output
+// `index` of a binary elementwise op whose inputs are broadcast to it.
+nonstd::optional<chainerx::Array> GetPlannedBinaryOutput(XCVMState* st, int index, const chainerx::Array& a, const chainerx::Array& b) {
+    if (a.dtype() != b.dtype() || &a.device() != &b.device()) return nonstd::nullopt;
+    chainerx::Shape shape = chainerx::internal::BroadcastShapes(a.shape(), b.shape());
+    return st->GetPlannedArray(index, shape, a.dtype(), a.device());
+}
+
 }  // namespace
 
 chainerx::Array AddOp::RunImpl(XCVMState* st, const chainerx::Array& a, const chainerx::Array& b) {
     auto t = CoerceBinary(a, b);
+    if (nonstd::optional<chainerx::Array> out = GetPlannedBinaryOutput(st, c, std::get<0>(t), std::get<1>(t))) {
+        out->device().Add(std::get<0>(t).BroadcastTo(out->shape()), std::get<1>(t).BroadcastTo(out->shape()), *out);
+        return *out;
+    }
     return std::get<0>(t) + std::get<1>(t);
 }
 
 chainerx::Array SubOp::RunImpl(XCVMState* st, const chainerx::Array& a, const chainerx::Array& b) {
     auto t = CoerceBinary(a, b);
+    if (nonstd::optional<chainerx::Array> out = GetPlannedBinaryOutput(st, c, std::get<0>(t), std::get<1>(t))) {
+        out->device().Subtract(std::get<0>(t).BroadcastTo(out->shape()), std::get<1>(t).BroadcastTo(out->shape()), *out);
+        return *out;
+    }
     return std::get<0>(t) - std::get<1>(t);
 }
 
 chainerx::Array MulOp::RunImpl(XCVMState* st, const chainerx::Array& a, const chainerx::Array& b) {
     auto t = CoerceBinary(a, b);
+    if (nonstd::optional<chainerx::Array> out = GetPlannedBinaryOutput(st, c, std::get<0>(t), std::get<1>(t))) {
+        out->device().Multiply(std::get<0>(t).BroadcastTo(out->shape()), std::get<1>(t).BroadcastTo(out->shape()), *out);
+        return *out;
+    }
     return std::get<0>(t) * std::get<1>(t);
 }
 
@@ -138,6 +160,12 @@ chainerx::Array ClipOp::RunImpl(XCVMState* st, const chainerx::Array& x) {
 
 chainerx::Array MatMulOp::RunImpl(XCVMState* st, const chainerx::Array& a, const chainerx::Array& b) {
     // TODO(hamaji): Handle non 2D arrays.
+    if (a.ndim() == 2 && b.ndim() == 2 && a.dtype() == b.dtype() && &a.device() == &b.device()) {
+        if (nonstd::optional<chainerx::Array> out = st->GetPlannedArray(y, {a.shape()[0], b.shape()[1]}, a.dtype(), a.device())) {
+            out->device().Dot(a, b, *out);
+            return *out;
+        }
+    }
     return chainerx::Dot(a, b);
 }
 
@@ -146,6 +174,19 @@ chainerx::Array GemmOp::RunImpl(XCVMState* st, const chainerx::Array& a, const c
     chainerx::Array xb = b;
     if (trans_a) xa = chainerx::Transpose(xa);
     if (trans_b) xb = chainerx::Transpose(xb);
+    if (xa.dtype() == xb.dtype() && &xa.device() == &xb.device()) {
+        const chainerx::Shape shape{xa.shape()[0], xb.shape()[1]};
+        if (nonstd::optional<chainerx::Array> out = st->GetPlannedArray(y, shape, xa.dtype(), xa.device())) {
+            chainerx::Device& device = out->device();
+            device.Dot(xa, xb, *out);
+            if (alpha != 1.0) device.MultiplyAS(*out, alpha, *out);
+            if (beta == 0.0) return *out;
+            chainerx::Array xc = c;
+            if (beta != 1.0) xc = xc * beta;
+            device.Add(*out, CastTo(xc, out->dtype()).BroadcastTo(shape), *out);
+            return *out;
+        }
+    }
     chainerx::Array r = chainerx::Dot(xa, xb);
     if (alpha != 1.0) r *= alpha;
     if (beta == 0.0) return r;
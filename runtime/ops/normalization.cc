@@ -106,6 +106,10 @@ PreprocessBatchNormResult PreprocessBatchNorm(
     return {std::move(gamma_reshaped), std::move(beta_reshaped), std::move(mean_reshaped), std::move(var_reshaped), sorted_axis};
 }
 
+double GetCudnnSafeEpsilon(double epsilon) {
+    return epsilon <= 1e-5 ? 1e-5 + 1e-12 : epsilon;
+}
+
 }  // namespace
 
 std::tuple<chainerx::Array, XCVMOpaque*, chainerx::Array, chainerx::Array, chainerx::Array, chainerx::Array> BatchNormalizationOp::RunImpl(
@@ -115,8 +119,9 @@ std::tuple<chainerx::Array, XCVMOpaque*, chainerx::Array, chainerx::Array, chain
         const chainerx::Array& bias,
         const chainerx::Array& mean,
         const chainerx::Array& var) {
-    // To workaround the limitation of CuDNN.
-    if (epsilon <= 1e-5) epsilon = 1e-5 + 1e-12;
+    // To workaround the limitation of CuDNN. The op may run
+    // concurrently, so `epsilon` is not updated.
+    const double eps = GetCudnnSafeEpsilon(epsilon);
     chainerx::Axes axes;
     for (int i = 0; i < x.shape().size(); ++i) {
         if (i != 1) axes.push_back(i);
@@ -130,7 +135,7 @@ std::tuple<chainerx::Array, XCVMOpaque*, chainerx::Array, chainerx::Array, chain
         result = PreprocessBatchNorm(x, s, bias, mean, var, axes);
     }
     std::unique_ptr<chainerx::BatchNormForwardBackward> fb =
-            x.device().GetBatchNormForwardBackward(result.mean, result.var, epsilon, decay, result.sorted_axis);
+            x.device().GetBatchNormForwardBackward(result.mean, result.var, eps, decay, result.sorted_axis);
     const Array& gamma_reshaped = result.gamma;
     const Array& beta_reshaped = result.beta;
     chainerx::Array out = fb->Forward(x, gamma_reshaped, beta_reshaped);
@@ -161,13 +166,14 @@ chainerx::Array FixedBatchNormalizationOp::RunImpl(
         const chainerx::Array& bias,
         const chainerx::Array& mean,
         const chainerx::Array& var) {
-    // To workaround the limitation of CuDNN.
-    if (epsilon <= 1e-5) epsilon = 1e-5 + 1e-12;
+    // To workaround the limitation of CuDNN. The op may run
+    // concurrently, so `epsilon` is not updated.
+    const double eps = GetCudnnSafeEpsilon(epsilon);
     chainerx::Axes axes;
     for (int i = 0; i < x.shape().size(); ++i) {
         if (i != 1) axes.push_back(i);
     }
-    return chainerx::FixedBatchNorm(x, s, bias, mean, var, epsilon, axes);
+    return chainerx::FixedBatchNorm(x, s, bias, mean, var, eps, axes);
 }
 
 std::tuple<chainerx::Array, chainerx::Array, chainerx::Array> BatchNormalizationGradOp::RunImpl(
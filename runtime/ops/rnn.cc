@@ -36,24 +36,42 @@ public:
 
     void UpdateState(int time, const chainerx::Array& new_value, chainerx::Array* out) {
         if (has_mask_) {
-            CHECK_LE(0, time);
-            if (prev_time_ != time) {
-                pmask_ = chainerx::Reshape(sequence_mask_.At({time}), {batch_size_, 1});
-                nmask_ = 1 - pmask_;
-                prev_time_ = time;
-            }
+            UpdateMasks(time);
             *out = new_value * pmask_ + *out * nmask_;
         } else {
             *out = new_value;
         }
     }
 
+    // Same as `UpdateState` but overwrites `new_value`, which must not
+    // be tracked by autograd, in place by the state to be kept.
+    void UpdateStateInplace(int time, const chainerx::Array& prev, chainerx::Array new_value) {
+        if (!has_mask_) return;
+        UpdateMasks(time);
+        new_value *= pmask_;
+        new_value += prev * nmask_;
+    }
+
+    // `out` is [seq_length, (num_directions,) batch_size, hidden_size].
     void MaskOutput(chainerx::Array* out) const {
         if (!has_mask_) return;
-        *out = *out * chainerx::Reshape(sequence_mask_, {out->shape()[0], batch_size_, 1});
+        chainerx::Shape shape;
+        for (int8_t i = 0; i < out->ndim(); ++i) {
+            shape.push_back(i == 0 ? out->shape()[0] : i == out->ndim() - 2 ? batch_size_ : 1);
+        }
+        *out = *out * chainerx::Reshape(sequence_mask_, shape);
     }
 
 private:
+    void UpdateMasks(int time) {
+        CHECK_LE(0, time);
+        if (prev_time_ != time) {
+            pmask_ = chainerx::Reshape(sequence_mask_.At({time}), {batch_size_, 1});
+            nmask_ = 1 - pmask_;
+            prev_time_ = time;
+        }
+    }
+
     chainerx::Array sequence_mask_;
     int batch_size_;
     bool has_mask_;
@@ -61,6 +79,39 @@ private:
     chainerx::Array pmask_, nmask_;
 };
 
+// Computes the input-to-hidden projection of all timesteps and all
+// directions by a single GEMM so the time loop only needs to compute
+// the recurrent part. Returns an array of [seq_length, batch_size,
+// num_directions, gate_size].
+chainerx::Array ProjectInputs(const chainerx::Array& x, const chainerx::Array& w) {
+    // X: [seq_length, batch_size, input_size]
+    // W: [num_directions, gate_size, input_size]
+    int64_t seq_length = x.shape()[0];
+    int64_t batch_size = x.shape()[1];
+    int64_t input_size = x.shape()[2];
+    int64_t num_directions = w.shape()[0];
+    int64_t gate_size = w.shape()[1];
+    CHECK_EQ(input_size, w.shape()[2]);
+    chainerx::Array xs = chainerx::Reshape(x, {seq_length * batch_size, input_size});
+    chainerx::Array wt = chainerx::Transpose(chainerx::Reshape(w, {num_directions * gate_size, input_size}));
+    return chainerx::Reshape(chainerx::Dot(xs, wt), {seq_length, batch_size, num_directions, gate_size});
+}
+
+// In-place activations for buffers which are not tracked by autograd.
+
+void TanhInplace(const chainerx::Array& a) {
+    a.device().Tanh(a, a);
+}
+
+void SigmoidInplace(const chainerx::Array& a) {
+    // The same formula as `Sigmoid`.
+    chainerx::Scalar half(0.5);
+    a.device().MultiplyAS(a, half, a);
+    a.device().Tanh(a, a);
+    a.device().MultiplyAS(a, half, a);
+    a.device().AddAS(a, half, a);
+}
+
 }  // namespace
 
 std::tuple<chainerx::Array, chainerx::Array> RNNOp::RunImpl(
@@ -88,33 +139,30 @@ std::tuple<chainerx::Array, chainerx::Array> RNNOp::RunImpl(
     CHECK_EQ(hidden_size, r.shape()[1]);
     if (b.has_value()) CHECK_EQ(2 * hidden_size, b.value().shape()[1]);
 
-    chainerx::Array wt = chainerx::Transpose(chainerx::Squeeze(w, {0}));
-    chainerx::Array rt = chainerx::Transpose(chainerx::Squeeze(r, {0}));
-    chainerx::Array bm;
+    chainerx::Array xw = ProjectInputs(x, w);
     if (b.has_value()) {
-        chainerx::Array bs = chainerx::Squeeze(b.value(), {0});
-        chainerx::Array b1 = bs.At({chainerx::Slice(0, hidden_size)});
-        chainerx::Array b2 = bs.At({chainerx::Slice(hidden_size, 2 * hidden_size)});
-        bm = b1 + b2;
+        xw += b->At({chainerx::Slice(), chainerx::Slice(0, hidden_size)});
+        xw += b->At({chainerx::Slice(), chainerx::Slice(hidden_size, 2 * hidden_size)});
     }
+    chainerx::Array rt = chainerx::Transpose(chainerx::Squeeze(r, {0}));
     chainerx::Array h =
             initial_h.has_value() ? chainerx::Squeeze(initial_h.value(), {0}) : chainerx::Zeros({batch_size, hidden_size}, x.dtype());
 
     SequenceLengthMask mask(sequence_lens, x.dtype(), seq_length, batch_size);
 
-    chainerx::Array output = chainerx::Zeros({seq_length, batch_size, hidden_size}, x.dtype());
-    for (int64_t time = 0; time < x.shape()[0]; ++time) {
-        chainerx::Array cur_x = x.At({time});
-        chainerx::Array nh = chainerx::Dot(cur_x, wt) + chainerx::Dot(h, rt);
-        if (b.has_value()) {
-            nh += bm;
-        }
-        mask.UpdateState(time, chainerx::Tanh(nh), &h);
-        output.At({time}) += h;
+    // The new state is computed in the output buffer and the next
+    // step reads it from there.
+    chainerx::Array output = chainerx::Empty({seq_length, 1, batch_size, hidden_size}, x.dtype());
+    for (int64_t time = 0; time < seq_length; ++time) {
+        chainerx::Array nh = output.At({time, 0});
+        nh.device().Dot(h, rt, nh);
+        nh += xw.At({time, chainerx::Slice(), 0});
+        TanhInplace(nh);
+        mask.UpdateStateInplace(time, h, nh);
+        h = nh;
     }
+    h = chainerx::Reshape(h, {1, batch_size, hidden_size}).Copy();
     mask.MaskOutput(&output);
-    output = chainerx::Reshape(output, {seq_length, 1, batch_size, hidden_size});
-    h = chainerx::Reshape(h, {1, h.shape()[0], h.shape()[1]});
     return std::make_tuple(output, h);
 }
 
@@ -149,97 +197,91 @@ std::tuple<chainerx::Array, chainerx::Array> GRUOp::RunImpl(
         WARN_ONCE("Bidirectional GRU has huge error");
     }
 
+    chainerx::Array xw = ProjectInputs(x, w);
+    if (b.has_value()) {
+        // The biases of W and the biases of R for z and r are added
+        // to the projection. The bias of R for h is applied in the
+        // time loop as it may be multiplied by r.
+        xw += b->At({chainerx::Slice(), chainerx::Slice(0, 3 * hidden_size)});
+        xw.At({chainerx::Slice(), chainerx::Slice(), chainerx::Slice(), chainerx::Slice(0, 2 * hidden_size)}) +=
+                b->At({chainerx::Slice(), chainerx::Slice(3 * hidden_size, 5 * hidden_size)});
+    }
+
     SequenceLengthMask mask(sequence_lens, x.dtype(), seq_length, batch_size);
-    chainerx::Array outputs[2];
-    chainerx::Array hs[2];
+    // The new states are computed in the output buffer and the next
+    // step reads them from there.
+    chainerx::Array output = chainerx::Empty({seq_length, num_direction, batch_size, hidden_size}, x.dtype());
+    chainerx::Array gates = chainerx::Empty({batch_size, 2 * hidden_size}, x.dtype());
+    chainerx::Array tmp = chainerx::Empty({batch_size, hidden_size}, x.dtype());
+    std::vector<chainerx::Array> hs;
 
     for (int d = 0; d < num_direction; ++d) {
-        chainerx::Array ws = w.At({d});
         chainerx::Array rs = r.At({d});
-        chainerx::Array gates_w = chainerx::Transpose(ws.At({chainerx::Slice(0, 2 * hidden_size)}));
-        chainerx::Array w_h = chainerx::Transpose(ws.At({chainerx::Slice(2 * hidden_size, 3 * hidden_size)}));
         chainerx::Array gates_r = chainerx::Transpose(rs.At({chainerx::Slice(0, 2 * hidden_size)}));
         chainerx::Array r_h = chainerx::Transpose(rs.At({chainerx::Slice(2 * hidden_size, 3 * hidden_size)}));
-        chainerx::Array gates_b;
-        chainerx::Array w_bh;
         chainerx::Array r_bh;
         if (b.has_value()) {
-            chainerx::Array bs = b->At({d});
-            gates_b = bs.At({chainerx::Slice(0, 2 * hidden_size)}) + bs.At({chainerx::Slice(3 * hidden_size, 5 * hidden_size)});
-            w_bh = bs.At({chainerx::Slice(2 * hidden_size, 3 * hidden_size)});
-            r_bh = bs.At({chainerx::Slice(5 * hidden_size, 6 * hidden_size)});
+            r_bh = b->At({d, chainerx::Slice(5 * hidden_size, 6 * hidden_size)});
         }
         chainerx::Array h = initial_h.has_value() ? initial_h->At({d}) : chainerx::Zeros({batch_size, hidden_size}, x.dtype());
 
-        chainerx::Array output = chainerx::Zeros({seq_length, batch_size, hidden_size}, x.dtype());
-        for (int64_t t = 0; t < x.shape()[0]; ++t) {
+        for (int64_t t = 0; t < seq_length; ++t) {
             int64_t time = t;
-            if (direction == 1 || d == 1) time = x.shape()[0] - t - 1;
-
-            chainerx::Array cur_x = x.At({time});
-            chainerx::Array gates = chainerx::Dot(cur_x, gates_w) + chainerx::Dot(h, gates_r);
-            if (b.has_value()) {
-                gates += gates_b;
-            }
+            if (direction == 1 || d == 1) time = seq_length - t - 1;
+
+            chainerx::Array xw_t = xw.At({time, chainerx::Slice(), d});
+            chainerx::Array xw_h = xw_t.At({chainerx::Slice(), chainerx::Slice(2 * hidden_size, 3 * hidden_size)});
+            chainerx::Array nh = output.At({time, d});
+            gates.device().Dot(h, gates_r, gates);
+            gates += xw_t.At({chainerx::Slice(), chainerx::Slice(0, 2 * hidden_size)});
+            SigmoidInplace(gates);
             chainerx::Array z = gates.At({chainerx::Slice(), chainerx::Slice(0, hidden_size)});
             chainerx::Array r = gates.At({chainerx::Slice(), chainerx::Slice(hidden_size, 2 * hidden_size)});
-            z = Sigmoid(z);
-            r = Sigmoid(r);
-            chainerx::Array xw = chainerx::Dot(cur_x, w_h);
-            chainerx::Array nh;
             if (linear_before_reset) {
-                chainerx::Array hr = chainerx::Dot(h, r_h);
-                if (b.has_value()) hr += r_bh;
-                nh = xw + r * hr;
+                tmp.device().Dot(h, r_h, tmp);
+                if (b.has_value()) tmp += r_bh;
+                tmp *= r;
+                nh.device().Add(xw_h, tmp, nh);
             } else {
-                nh = xw + chainerx::Dot(r * h, r_h);
+                tmp.device().Multiply(r, h, tmp);
+                nh.device().Dot(tmp, r_h, nh);
+                nh += xw_h;
                 if (b.has_value()) nh += r_bh;
             }
-            if (b.has_value()) nh += w_bh;
-            nh = chainerx::Tanh(nh);
-            mask.UpdateState(time, (1 - z) * nh + z * h, &h);
-            output.At({time}) += h;
+            TanhInplace(nh);
+            // (1 - z) * nh + z * h = nh + z * (h - nh)
+            tmp.device().Subtract(h, nh, tmp);
+            tmp *= z;
+            nh += tmp;
+            mask.UpdateStateInplace(time, h, nh);
+            h = nh;
         }
-        mask.MaskOutput(&output);
-        outputs[d] = output;
-        hs[d] = h;
+        hs.push_back(h);
     }
 
-    if (num_direction == 1) {
-        chainerx::Array output = chainerx::Reshape(outputs[0], {seq_length, 1, batch_size, hidden_size});
-        chainerx::Array h = chainerx::Reshape(hs[0], {1, hs[0].shape()[0], hs[0].shape()[1]});
-        return std::make_tuple(output, h);
-    } else {
-        chainerx::Array output = chainerx::Stack({outputs[0], outputs[1]}, 1);
-        chainerx::Array h = chainerx::Stack({hs[0], hs[1]}, 0);
-        return std::make_tuple(output, h);
-    }
+    chainerx::Array h = chainerx::Stack(hs, 0);
+    mask.MaskOutput(&output);
+    return std::make_tuple(output, h);
 }
 
-std::tuple<chainerx::Array, chainerx::Array, chainerx::Array, XCVMOpaque*> LSTMOp::RunImpl(
-        XCVMState* st,
+namespace {
+
+// Runs LSTM over `x` with the states masked by `mask`. Returns the
+// output of [seq_length, num_directions, batch_size, hidden_size]
+// and the last hidden and cell states of [num_directions,
+// batch_size, hidden_size]. As LSTM on CPU is differentiated by the
+// autograd of ChainerX, the time loop consists of out-of-place
+// operations.
+std::tuple<chainerx::Array, chainerx::Array, chainerx::Array> RunLSTM(
         const chainerx::Array& x,
         const chainerx::Array& w,
         const chainerx::Array& r,
         const nonstd::optional<chainerx::Array>& b,
-        const nonstd::optional<chainerx::Array>& sequence_lens,
         const nonstd::optional<chainerx::Array>& initial_h,
         const nonstd::optional<chainerx::Array>& initial_c,
-        const nonstd::optional<chainerx::Array>& p) {
-#if CHAINER_COMPILER_ENABLE_CUDNN
-    // TODO(hamaji): Handle more cases.
-    if ((direction == 0 || direction == 2) && b.has_value() && !initial_h.has_value() && !initial_c.has_value() && !p.has_value()) {
-        std::tuple<chainerx::Array, chainerx::Array, chainerx::Array, XCVMOpaque*> result;
-        if (CudnnLSTM(st, x, w, r, b, sequence_lens, initial_h, initial_c, p, hidden_size, direction, &result)) {
-            return result;
-        }
-    }
-#endif  // CHAINER_COMPILER_ENABLE_CUDNN
-
-    std::vector<chainerx::Array> xs = {x, w, r};
-    if (b.has_value()) xs.push_back(*b);
-    std::unique_ptr<BackwardContext> bwd(new BackwardContext("LSTM", xs));
-    chainerx::ForceBackpropModeScope bp_scope{bwd->backprop_id()};
+        const nonstd::optional<chainerx::Array>& p,
+        int direction,
+        SequenceLengthMask* mask) {
     // X: [seq_length, batch_size, input_size]
     // W: [num_directions, 4 * hidden_size, input_size]
     // R: [num_directions, 4 * hidden_size, hidden_size]
@@ -260,24 +302,21 @@ std::tuple<chainerx::Array, chainerx::Array, chainerx::Array, XCVMOpaque*> LSTMO
         WARN_ONCE("Reverse LSTM is not tested yet");
     }
 
-    SequenceLengthMask mask(sequence_lens, x.dtype(), seq_length, batch_size);
+    chainerx::Array xw = ProjectInputs(x, w);
+    if (b.has_value()) {
+        xw = xw + b->At({chainerx::Slice(), chainerx::Slice(0, 4 * hidden_size)}) +
+             b->At({chainerx::Slice(), chainerx::Slice(4 * hidden_size, 8 * hidden_size)});
+    }
+
     chainerx::Array outputs[2];
     chainerx::Array hs[2];
     chainerx::Array cs[2];
 
     for (int d = 0; d < num_direction; ++d) {
-        chainerx::Array wt = chainerx::Transpose(w.At({d}));
         chainerx::Array rt = chainerx::Transpose(r.At({d}));
         chainerx::Array h = initial_h.has_value() ? initial_h->At({d}) : chainerx::Zeros({batch_size, hidden_size}, x.dtype());
         chainerx::Array c = initial_c.has_value() ? initial_c->At({d}) : chainerx::Zeros({batch_size, hidden_size}, x.dtype());
         std::vector<chainerx::ArrayIndex> indices(2, chainerx::Slice());
-        chainerx::Array bm;
-        if (b.has_value()) {
-            chainerx::Array bs = b->At({d});
-            chainerx::Array b1 = bs.At({chainerx::Slice(0, 4 * hidden_size)});
-            chainerx::Array b2 = bs.At({chainerx::Slice(4 * hidden_size, 8 * hidden_size)});
-            bm = b1 + b2;
-        }
         chainerx::Array pi, po, pf;
         if (p.has_value()) {
             chainerx::Array ps = p->At({d});
@@ -285,16 +324,15 @@ std::tuple<chainerx::Array, chainerx::Array, chainerx::Array, XCVMOpaque*> LSTMO
             po = ps.At({chainerx::Slice(hidden_size, 2 * hidden_size)});
             pf = ps.At({chainerx::Slice(2 * hidden_size, 3 * hidden_size)});
         }
+        // Split the projection once so the backward of each step
+        // does not produce a gradient of the whole projection.
+        std::vector<chainerx::Array> xws = chainerx::Split(xw.At({chainerx::Slice(), chainerx::Slice(), d}), seq_length, 0);
 
         std::vector<chainerx::Array> outs(seq_length);
-        for (int64_t t = 0; t < x.shape()[0]; ++t) {
+        for (int64_t t = 0; t < seq_length; ++t) {
             int64_t time = t;
-            if (direction == 1 || d == 1) time = x.shape()[0] - t - 1;
-            chainerx::Array cur_x = x.At({time});
-            chainerx::Array gates = chainerx::Dot(cur_x, wt) + chainerx::Dot(h, rt);
-            if (b.has_value()) {
-                gates = gates + bm;
-            }
+            if (direction == 1 || d == 1) time = seq_length - t - 1;
+            chainerx::Array gates = chainerx::Dot(h, rt) + chainerx::Squeeze(xws[time], {0});
             indices[1] = chainerx::Slice({0, hidden_size});
             chainerx::Array i = gates.At(indices);
             indices[1] = chainerx::Slice({hidden_size, hidden_size * 2});
@@ -315,13 +353,13 @@ std::tuple<chainerx::Array, chainerx::Array, chainerx::Array, XCVMOpaque*> LSTMO
             o = Sigmoid(o);
             nc = f * c + i * nc;
             chainerx::Array nh = o * chainerx::Tanh(nc);
-            mask.UpdateState(time, nc, &c);
-            mask.UpdateState(time, nh, &h);
+            mask->UpdateState(time, nc, &c);
+            mask->UpdateState(time, nh, &h);
             outs[time] = h;
         }
 
         chainerx::Array output = chainerx::Stack(outs, 0);
-        mask.MaskOutput(&output);
+        mask->MaskOutput(&output);
         outputs[d] = output;
         hs[d] = h;
         cs[d] = c;
@@ -337,6 +375,39 @@ std::tuple<chainerx::Array, chainerx::Array, chainerx::Array, XCVMOpaque*> LSTMO
         h = chainerx::Stack({hs[0], hs[1]}, 0);
         c = chainerx::Stack({cs[0], cs[1]}, 0);
     }
+    return std::make_tuple(output, h, c);
+}
+
+}  // namespace
+
+std::tuple<chainerx::Array, chainerx::Array, chainerx::Array, XCVMOpaque*> LSTMOp::RunImpl(
+        XCVMState* st,
+        const chainerx::Array& x,
+        const chainerx::Array& w,
+        const chainerx::Array& r,
+        const nonstd::optional<chainerx::Array>& b,
+        const nonstd::optional<chainerx::Array>& sequence_lens,
+        const nonstd::optional<chainerx::Array>& initial_h,
+        const nonstd::optional<chainerx::Array>& initial_c,
+        const nonstd::optional<chainerx::Array>& p) {
+#if CHAINER_COMPILER_ENABLE_CUDNN
+    // TODO(hamaji): Handle more cases.
+    if ((direction == 0 || direction == 2) && b.has_value() && !initial_h.has_value() && !initial_c.has_value() && !p.has_value()) {
+        std::tuple<chainerx::Array, chainerx::Array, chainerx::Array, XCVMOpaque*> result;
+        if (CudnnLSTM(st, x, w, r, b, sequence_lens, initial_h, initial_c, p, hidden_size, direction, &result)) {
+            return result;
+        }
+    }
+#endif  // CHAINER_COMPILER_ENABLE_CUDNN
+
+    std::vector<chainerx::Array> xs = {x, w, r};
+    if (b.has_value()) xs.push_back(*b);
+    std::unique_ptr<BackwardContext> bwd(new BackwardContext("LSTM", xs));
+    chainerx::ForceBackpropModeScope bp_scope{bwd->backprop_id()};
+
+    SequenceLengthMask mask(sequence_lens, x.dtype(), x.shape()[0], x.shape()[1]);
+    chainerx::Array output, h, c;
+    std::tie(output, h, c) = RunLSTM(x, w, r, b, initial_h, initial_c, p, direction, &mask);
 
     if (st->options().dump_memory_usage) {
         WARN_ONCE("Retained arrays for LSTM on CPU is inaccurate");
@@ -370,5 +441,71 @@ std::tuple<chainerx::Array, chainerx::Array, chainerx::Array, chainerx::Array> L
     return std::make_tuple(gxs[0], gxs[1], gxs[2], gxs[3]);
 }
 
+std::tuple<chainerx::Array, chainerx::Array, chainerx::Array, XCVMOpaque*> NStepLSTMOp::RunImpl(
+        XCVMState* st, const chainerx::Array& x, const chainerx::Array& sequence_lens, const std::vector<chainerx::Array>& weights) {
+    // X: [batch_size, seq_length, input_size]
+    // sequence_lens: [batch_size]
+    // weights: W, R, and B of each layer in the layout of ONNX's LSTM.
+    CHECK(!weights.empty());
+    CHECK_EQ(0, weights.size() % 3);
+    CHECK_EQ(3, x.ndim());
+    int64_t batch_size = x.shape()[0];
+    int64_t seq_length = x.shape()[1];
+
+    // The backward context is built only when it is requested.
+    std::unique_ptr<BackwardContext> bwd;
+    std::unique_ptr<chainerx::ForceBackpropModeScope> bp_scope;
+    if (ctx >= 0) {
+        std::vector<chainerx::Array> xs = {x};
+        xs.insert(xs.end(), weights.begin(), weights.end());
+        bwd.reset(new BackwardContext("NStepLSTM", xs));
+        bp_scope.reset(new chainerx::ForceBackpropModeScope(bwd->backprop_id()));
+    }
+
+    SequenceLengthMask mask(sequence_lens, x.dtype(), seq_length, batch_size);
+    chainerx::Array input = chainerx::Transpose(x, {1, 0, 2});
+    std::vector<chainerx::Array> hs, cs;
+    for (size_t i = 0; i < weights.size(); i += 3) {
+        chainerx::Array y, h, c;
+        std::tie(y, h, c) = RunLSTM(
+                input, weights[i], weights[i + 1], weights[i + 2], nonstd::nullopt, nonstd::nullopt, nonstd::nullopt, direction, &mask);
+        // [seq_length, num_directions, batch_size, hidden_size] to
+        // [seq_length, batch_size, num_directions * hidden_size].
+        input = chainerx::Reshape(chainerx::Transpose(y, {0, 2, 1, 3}), {seq_length, batch_size, y.shape()[1] * y.shape()[3]});
+        hs.push_back(h);
+        cs.push_back(c);
+    }
+
+    chainerx::Array y = chainerx::Transpose(input, {1, 0, 2});
+    chainerx::Array h = chainerx::Concatenate(hs, 0);
+    chainerx::Array c = chainerx::Concatenate(cs, 0);
+    if (bwd) {
+        if (st->options().dump_memory_usage) {
+            WARN_ONCE("Retained arrays for NStepLSTM is inaccurate");
+            std::vector<chainerx::Array> retained_arrays = {x, sequence_lens, y, h, c};
+            retained_arrays.insert(retained_arrays.end(), weights.begin(), weights.end());
+            bwd->SetRetainedArrays(retained_arrays);
+        }
+        bwd->SetOutput({y, h, c});
+    }
+    return std::make_tuple(y, h, c, static_cast<XCVMOpaque*>(bwd.release()));
+}
+
+std::vector<chainerx::Array> NStepLSTMGradOp::RunImpl(
+        XCVMState* st,
+        const nonstd::optional<chainerx::Array>& gy,
+        const nonstd::optional<chainerx::Array>& gy_h,
+        const nonstd::optional<chainerx::Array>& gy_c,
+        const XCVMOpaque& ctx) {
+    auto& context = dynamic_cast<const BackwardContext&>(ctx);
+    chainerx::ForceBackpropModeScope bp_scope{context.backprop_id()};
+    // Outputs which do not contribute to the loss have no gradient.
+    std::vector<chainerx::Array> gys;
+    for (const nonstd::optional<chainerx::Array>* g : {&gy, &gy_h, &gy_c}) {
+        gys.push_back(g->has_value() ? **g : chainerx::ZerosLike(context.ys()[gys.size()]));
+    }
+    return context.Backward(gys);
+}
+
 }  // namespace runtime
 }  // namespace chainer_compiler
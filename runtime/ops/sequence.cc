@@ -1,7 +1,11 @@
+#include <algorithm>
+#include <string>
+
 #include <chainerx/routines/creation.h>
 #include <chainerx/routines/manipulation.h>
 
 #include <common/log.h>
+#include <common/strutil.h>
 #include <runtime/chainerx_util.h>
 #include <runtime/gen_xcvm_ops.h>
 #include <runtime/xcvm_state.h>
@@ -19,6 +23,67 @@ int64_t GetOptionalInt(const nonstd::optional<chainerx::Array>& array, int64_t d
     }
 }
 
+// Collects arrays of the same shape into a preallocated array of
+// [capacity, ...]. The capacity is doubled when it is exhausted.
+class ScanBuffer : public XCVMOpaque {
+public:
+    explicit ScanBuffer(int64_t capacity) : capacity_(capacity) {
+        SetRetainedArrays({});
+    }
+    virtual ~ScanBuffer() = default;
+
+    void Append(const chainerx::Array& value) {
+        if (!buffer_.has_value()) {
+            chainerx::Shape shape = value.shape();
+            shape.insert(shape.begin(), std::max<int64_t>(capacity_, 1));
+            Reset(chainerx::Empty(shape, value.dtype(), value.device()));
+        } else if (size_ == buffer_->shape()[0]) {
+            chainerx::Shape shape = buffer_->shape();
+            shape[0] *= 2;
+            chainerx::Array buffer = chainerx::Empty(shape, buffer_->dtype(), buffer_->device());
+            buffer.device().Copy(*buffer_, buffer.At({chainerx::Slice(0, size_)}));
+            Reset(buffer);
+        }
+        chainerx::Array dest = buffer_->At({size_});
+        CHECK_EQ(dest.dtype(), value.dtype());
+        CHECK_EQ(dest.shape(), value.shape()) << "Scan outputs must have the same shape";
+        dest.device().Copy(value, dest);
+        ++size_;
+    }
+
+    chainerx::Array Stack(int axis) const {
+        CHECK(buffer_.has_value()) << "Cannot stack an empty scan output";
+        chainerx::Array stacked = buffer_->At({chainerx::Slice(0, size_)});
+        if (axis < 0) axis += stacked.ndim();
+        // Later appends only write rows after `size_`, so the slice
+        // for axis 0 is not changed by them.
+        if (axis == 0) return stacked;
+        chainerx::Axes axes;
+        for (int i = 1; i <= axis; ++i) axes.push_back(i);
+        axes.push_back(0);
+        for (int i = axis + 1; i < stacked.ndim(); ++i) axes.push_back(i);
+        // Do not return a non-contiguous view of the buffer.
+        return chainerx::Transpose(stacked, axes).Copy();
+    }
+
+    std::string ToString() const override {
+        return "ScanBuffer";
+    }
+    std::string DebugString() const override {
+        return StrCat("ScanBuffer(", size_, "/", buffer_.has_value() ? buffer_->shape()[0] : capacity_, ")");
+    }
+
+private:
+    void Reset(const chainerx::Array& buffer) {
+        buffer_ = buffer;
+        SetRetainedArrays({buffer});
+    }
+
+    const int64_t capacity_;
+    int64_t size_{0};
+    nonstd::optional<chainerx::Array> buffer_;
+};
+
 }  // namespace
 
 void SequenceClearOp::RunImpl(XCVMState* st) {
@@ -234,5 +299,20 @@ void SequenceMoveOp::RunImpl(XCVMState* st) {
     std::swap(*d, *s);
 }
 
+XCVMOpaque* ScanBufferCreateOp::RunImpl(XCVMState* st, const nonstd::optional<chainerx::Array>& capacity) {
+    return new ScanBuffer(GetOptionalInt(capacity, 0));
+}
+
+void ScanBufferAppendOp::RunImpl(XCVMState* st) {
+    ScanBuffer* b = dynamic_cast<ScanBuffer*>(st->GetVar(buffer)->GetOpaque());
+    CHECK(b);
+    b->Append(st->GetArray(value));
+}
+
+chainerx::Array ScanBufferStackOp::RunImpl(XCVMState* st, const XCVMOpaque& buffer) {
+    auto& b = dynamic_cast<const ScanBuffer&>(buffer);
+    return b.Stack(axis);
+}
+
 }  // namespace runtime
 }  // namespace chainer_compiler
@@ -1,22 +1,37 @@
 #include "runtime/xcvm.h"
 
+#include <algorithm>
+#include <chrono>
+#include <condition_variable>
+#include <exception>
+#include <functional>
 #include <iomanip>
+#include <map>
 #include <numeric>
+#include <set>
 #include <sstream>
+#include <stdexcept>
 
 #ifdef CHAINER_COMPILER_ENABLE_NVTX
 #include <nvToolsExt.h>
 #endif  // CHAINER_COMPILER_ENABLE_NVTX
 
 #include <chainerx/array.h>
+#include <chainerx/backprop_mode.h>
+#include <chainerx/context.h>
+#include <chainerx/device.h>
+#include <chainerx/dtype.h>
 
 #include <common/log.h>
 #include <common/strutil.h>
+#include <common/thread_pool.h>
 #include <runtime/chrome_tracing.h>
 #include <runtime/meminfo.h>
 #include <runtime/npy.h>
 #include <runtime/xcvm.pb.h>
+#include <runtime/xcvm_arena.h>
 #include <runtime/xcvm_op.h>
+#include <runtime/xcvm_profiler.h>
 #include <runtime/xcvm_state.h>
 
 #define RANGE(x) (x).begin(), (x).end()
@@ -25,9 +40,11 @@ namespace chainer_compiler {
 namespace runtime {
 
 struct XCVMInputDesc {
-    XCVMInputDesc(const std::string& n, chainerx::Dtype d, chainerx::Shape s) : name(n), dtype(d), shape(s) {
+    XCVMInputDesc(const std::string& n, int i, chainerx::Dtype d, chainerx::Shape s) : name(n), index(i), dtype(d), shape(s) {
     }
     const std::string name;
+    // The position in `XCVM::input_names` or -1 if no `In` takes it.
+    const int index;
     const chainerx::Dtype dtype;
     const chainerx::Shape shape;
 };
@@ -87,6 +104,157 @@ void DumpOutput(XCVMState* st, const XCVMOp* op, const std::string& output_dir)
     }
 }
 
+bool IsJump(XCInstructionProto::Op op) {
+    return op == XCInstructionProto::Jmp || op == XCInstructionProto::JmpTrue || op == XCInstructionProto::JmpFalse;
+}
+
+int GetJumpTarget(const XCInstructionProto& inst) {
+    switch (inst.op()) {
+        case XCInstructionProto::Jmp:
+            return inst.inputs(0).i();
+        case XCInstructionProto::JmpTrue:
+        case XCInstructionProto::JmpFalse:
+            return inst.inputs(1).i();
+        default:
+            return -1;
+    }
+}
+
+// Returns true if `op` updates its `i`-th input in place.
+bool ModifiesInput(XCInstructionProto::Op op, int i) {
+    switch (op) {
+        case XCInstructionProto::Free:
+        case XCInstructionProto::SequenceClear:
+        case XCInstructionProto::SequenceAppend:
+        case XCInstructionProto::SequencePop:
+        case XCInstructionProto::SequenceMove:
+        case XCInstructionProto::ScanBufferAppend:
+            return i == 0;
+        case XCInstructionProto::BatchNormalization:
+            // The running mean and variance.
+            return i == 3 || i == 4;
+        default:
+            return false;
+    }
+}
+
+// Ops which touch states other than their inputs and outputs. They
+// are executed in the program order.
+bool HasSideEffect(XCInstructionProto::Op op) {
+    switch (op) {
+        case XCInstructionProto::Out:
+        case XCInstructionProto::Print:
+        case XCInstructionProto::Dropout:
+        case XCInstructionProto::DoSomething:
+        case XCInstructionProto::ElementWiseNvrtc:
+        case XCInstructionProto::TVM:
+        case XCInstructionProto::NGraph:
+            return true;
+        default:
+            return false;
+    }
+}
+
+// Ops which keep states in themselves and must not run concurrently
+// in different runs of a program.
+bool HasOpState(XCInstructionProto::Op op) {
+    switch (op) {
+        case XCInstructionProto::Dropout:
+        case XCInstructionProto::DoSomething:
+        case XCInstructionProto::ElementWiseNvrtc:
+        case XCInstructionProto::TVM:
+        case XCInstructionProto::NGraph:
+            return true;
+        default:
+            return false;
+    }
+}
+
+// Calls `fn` with the index of the input and the variable ID for all
+// variables used as inputs of `inst`.
+template <class Fn>
+void ForEachInputVariable(const XCInstructionProto& inst, Fn fn) {
+    for (int i = 0; i < inst.inputs_size(); ++i) {
+        const XCValueProto& input = inst.inputs(i);
+        switch (input.type()) {
+            case XCValueProto::ARRAY:
+                if (input.array() >= 0) fn(i, input.array());
+                break;
+            case XCValueProto::ARRAY_LIST:
+                for (int id : input.array_list()) {
+                    if (id >= 0) fn(i, id);
+                }
+                break;
+            case XCValueProto::SEQUENCE:
+                if (input.sequence() >= 0) fn(i, input.sequence());
+                break;
+            case XCValueProto::OPAQUE:
+                if (input.opaque() >= 0) fn(i, input.opaque());
+                break;
+            default:
+                break;
+        }
+    }
+}
+
+void GetVariableAccesses(const XCInstructionProto& inst, std::vector<int>* reads, std::vector<int>* writes) {
+    const XCInstructionProto::Op op = inst.op();
+    ForEachInputVariable(inst, [reads, writes, op](int i, int id) {
+        if (ModifiesInput(op, i)) {
+            writes->push_back(id);
+        } else {
+            reads->push_back(id);
+        }
+    });
+    for (int id : inst.outputs()) {
+        if (id >= 0) writes->push_back(id);
+    }
+}
+
+// Adds edges for read-after-write, write-after-read, and
+// write-after-write hazards between instructions in [begin, end).
+void BuildDependencies(
+        const std::vector<std::unique_ptr<XCVMOp>>& program,
+        int begin,
+        int end,
+        std::vector<std::vector<int>>* successors,
+        std::vector<int>* num_predecessors) {
+    std::map<int, int> last_writers;
+    std::map<int, std::vector<int>> readers;
+    int last_side_effect = -1;
+    for (int pc = begin; pc < end; ++pc) {
+        const XCInstructionProto& inst = program[pc]->instruction();
+        std::vector<int> reads, writes;
+        GetVariableAccesses(inst, &reads, &writes);
+
+        std::set<int> deps;
+        for (int id : reads) {
+            auto found = last_writers.find(id);
+            if (found != last_writers.end()) deps.insert(found->second);
+        }
+        for (int id : writes) {
+            auto found = last_writers.find(id);
+            if (found != last_writers.end()) deps.insert(found->second);
+            for (int reader : readers[id]) deps.insert(reader);
+        }
+        if (HasSideEffect(inst.op())) {
+            if (last_side_effect >= 0) deps.insert(last_side_effect);
+            last_side_effect = pc;
+        }
+        deps.erase(pc);
+
+        for (int dep : deps) {
+            (*successors)[dep].push_back(pc);
+            ++(*num_predecessors)[pc];
+        }
+        for (int id : reads) readers[id].push_back(pc);
+        for (int id : writes) {
+            last_writers[id] = pc;
+            readers[id].clear();
+        }
+    }
+}
+
 }  // namespace
 
 XCVMOptions::XCVMOptions() {
@@ -97,7 +265,7 @@ XCVMOptions::XCVMOptions() {
     verbose_ops.resize(num_ops);
 }
 
-XCVM::XCVM(const XCProgramProto& program) {
+XCVM::XCVM(const XCProgramProto& program) : arena_size_(program.arena_size()) {
     num_variables_ = 0;
     for (const XCInstructionProto& inst : program.instructions()) {
         for (int output : inst.outputs()) {
@@ -105,9 +273,20 @@ XCVM::XCVM(const XCProgramProto& program) {
         }
     }
 
+    // Names of inputs and outputs are resolved to positions here so
+    // runs do not look up them.
     for (const XCInstructionProto& inst : program.instructions()) {
         XCVMOp* op = MakeXCVMOp(inst);
         program_.emplace_back(op);
+        if (inst.op() == XCInstructionProto::In) {
+            const std::string& name = inst.inputs(0).s();
+            auto inserted = input_indices_.emplace(name, input_names_.size());
+            if (inserted.second) input_names_.push_back(name);
+            op->set_inout_index(inserted.first->second);
+        } else if (inst.op() == XCInstructionProto::Out) {
+            op->set_inout_index(output_names_.size());
+            output_names_.push_back(inst.inputs(0).s());
+        }
     }
 
     CHECK_EQ(program.input_names_size(), program.input_types_size());
@@ -116,7 +295,31 @@ XCVM::XCVM(const XCProgramProto& program) {
         const XCTypeProto& type = program.input_types(i);
         chainerx::Dtype dtype = static_cast<chainerx::Dtype>(type.dtype());
         chainerx::Shape shape(type.shape().begin(), type.shape().end());
-        input_descs_.emplace_back(new XCVMInputDesc(name, dtype, shape));
+        input_descs_.emplace_back(new XCVMInputDesc(name, GetInputIndex(name), dtype, shape));
+    }
+
+    // Jumps and their targets split the program into basic blocks.
+    const int num_insts = program_.size();
+    std::vector<bool> is_leader(num_insts + 1);
+    is_leader[0] = true;
+    is_leader[num_insts] = true;
+    for (int pc = 0; pc < num_insts; ++pc) {
+        const XCInstructionProto& inst = program_[pc]->instruction();
+        if (!IsJump(inst.op())) continue;
+        is_leader[pc] = true;
+        is_leader[pc + 1] = true;
+        const int target = GetJumpTarget(inst);
+        if (0 <= target && target <= num_insts) is_leader[target] = true;
+    }
+    block_ends_.resize(num_insts, -1);
+    successors_.resize(num_insts);
+    num_predecessors_.resize(num_insts);
+    for (int begin = 0; begin < num_insts;) {
+        int end = begin + 1;
+        while (!is_leader[end]) ++end;
+        block_ends_[begin] = end;
+        BuildDependencies(program_, begin, end, &successors_, &num_predecessors_);
+        begin = end;
     }
 }
 
@@ -124,64 +327,111 @@ XCVM::~XCVM() {
 }
 
 InOuts XCVM::Run(const InOuts& program_inputs, const XCVMOptions& options) {
+    std::vector<std::shared_ptr<XCVMVar>> inputs(input_names_.size());
+    for (size_t i = 0; i < input_names_.size(); ++i) {
+        auto found = program_inputs.find(input_names_[i]);
+        if (found != program_inputs.end()) inputs[i] = found->second;
+    }
+    CheckInputs(inputs);
+
+    XCVMState state(options, num_variables_, inputs, output_names_.size());
+    Run(&state);
+
+    InOuts outputs;
+    for (size_t i = 0; i < output_names_.size(); ++i) {
+        const std::shared_ptr<XCVMVar>& output = state.outputs()[i];
+        if (!output) continue;
+        CHECK(outputs.emplace(output_names_[i], output).second) << "Duplicated output name: " << output_names_[i];
+    }
+    return outputs;
+}
+
+int XCVM::GetInputIndex(const std::string& name) const {
+    auto found = input_indices_.find(name);
+    return found == input_indices_.end() ? -1 : found->second;
+}
+
+void XCVM::CheckInputs(const std::vector<std::shared_ptr<XCVMVar>>& inputs) const {
+    if (input_names_.size() != inputs.size()) {
+        throw std::invalid_argument(StrCat("Unexpected number of inputs: ", inputs.size(), " vs ", input_names_.size()));
+    }
+    for (size_t i = 0; i < inputs.size(); ++i) {
+        if (!inputs[i]) {
+            throw std::invalid_argument(StrCat("Input '", input_names_[i], "' not found"));
+        }
+        CheckInput(i, *inputs[i]);
+    }
+}
+
+void XCVM::CheckInput(int index, const XCVMVar& var, bool ignore_batch_axis) const {
     for (const std::unique_ptr<XCVMInputDesc>& input : input_descs_) {
-        auto found = program_inputs.find(input->name);
-        CHECK(found != program_inputs.end()) << "Input '" << input->name << "' not found";
-        const XCVMVar& var = *found->second;
-        if (var.kind() == XCVMVar::Kind::kArray) {
-            const chainerx::Array& a = var.GetArray();
-            if (static_cast<int>(input->dtype) == 0) {
-                continue;
+        if (input->index != index) continue;
+        if (var.kind() != XCVMVar::Kind::kArray) {
+            if (static_cast<int>(input->dtype) != 0) {
+                throw std::invalid_argument(StrCat("Input '", input->name, "' must be a tensor"));
             }
-            CHECK_EQ(input->dtype, a.dtype()) << "Input '" << input->name << "' has an unexpected dtype";
-            CHECK_EQ(input->shape, a.shape()) << "Input '" << input->name << "' has an unexpected shape";
-        } else {
-            CHECK_EQ(static_cast<int>(input->dtype), 0) << "Input '" << input->name << "' must be a tensor";
+            continue;
+        }
+        // The type is unknown.
+        if (static_cast<int>(input->dtype) == 0) {
+            continue;
+        }
+        const chainerx::Array& a = var.GetArray();
+        if (input->dtype != a.dtype()) {
+            throw std::invalid_argument(StrCat(
+                    "Input '", input->name, "' has an unexpected dtype: ", chainerx::GetDtypeName(a.dtype()), " vs ",
+                    chainerx::GetDtypeName(input->dtype)));
+        }
+        bool shape_ok = input->shape.size() == a.shape().size();
+        for (size_t i = ignore_batch_axis ? 1 : 0; shape_ok && i < a.shape().size(); ++i) {
+            shape_ok = input->shape[i] == a.shape()[i];
+        }
+        if (!shape_ok) {
+            throw std::invalid_argument(StrCat(
+                    "Input '", input->name, "' has an unexpected shape: ", a.shape().ToString(), " vs ", input->shape.ToString()));
         }
     }
-
-    XCVMState state(options, num_variables_, program_inputs);
-    Run(&state);
-    return state.GetOutputs();
 }
 
 void XCVM::Run(XCVMState* state) {
     state->SetProgram(&program_);
     const XCVMOptions& options = state->options();
+    if (options.num_threads > 1 && !options.trace_level && !options.dump_memory_usage &&
+        std::find(RANGE(options.verbose_ops), true) == options.verbose_ops.end()) {
+        RunInParallel(state);
+        return;
+    }
+
     int64_t peak_used_mbs = 0, peak_total_mbs = 0;
 
+    // The memory plan assumes the sequential execution. Values of
+    // training runs may be kept for the backward computation beyond
+    // their planned lifetimes.
+    std::unique_ptr<XCVMArena> arena;
+    if (arena_size_ > 0 && !options.is_training) {
+        arena = AcquireArena();
+        state->set_arena(arena.get());
+    }
+
     while (true) {
         int pc = state->pc();
         if (pc >= program_.size()) break;
 
-        XCVMOp* op = program_[pc].get();
-
-        {
-            ChromeTracingEmitter::ScopedEvent se(options.chrome_tracing, "XCVM", op->name(), pc);
-#ifdef CHAINER_COMPILER_ENABLE_NVTX
-            nvtxRangePush(op->name().c_str());
-#endif
-            try {
-                op->Run(state);
-            } catch (...) {
-                std::cerr << "Exception in " << op->debug_info() << std::endl;
-                throw;
+        if (arena) arena->Prepare(pc);
+        try {
+            RunInstruction(state, pc);
+        } catch (...) {
+            if (arena) {
+                arena->Release();
+                state->set_arena(nullptr);
+                ReleaseArena(std::move(arena));
             }
-#ifdef CHAINER_COMPILER_ENABLE_NVTX
-            nvtxRangePop();
-#endif
+            throw;
         }
+        if (arena) arena->Release();
 
         state->set_pc(state->pc() + 1);
 
-        if (options.check_types) {
-            CheckType(state, op);
-        }
-
-        if (!options.dump_outputs_dir.empty()) {
-            DumpOutput(state, op, options.dump_outputs_dir);
-        }
-
         if (options.dump_memory_usage) {
             int64_t used_mbs = InMbs(state->GetTotalVariableSize());
             peak_used_mbs = std::max(used_mbs, peak_used_mbs);
@@ -195,6 +445,11 @@ void XCVM::Run(XCVMState* state) {
         }
     }
 
+    if (arena) {
+        state->set_arena(nullptr);
+        ReleaseArena(std::move(arena));
+    }
+
     if (options.dump_memory_usage) {
         state->ShowVariableStatus();
         std::string report = StrCat("Peak memory usage=", peak_used_mbs, "MB");
@@ -205,5 +460,185 @@ void XCVM::Run(XCVMState* state) {
     }
 }
 
+void XCVM::RunInstruction(XCVMState* state, int pc) {
+    const XCVMOptions& options = state->options();
+    XCVMOp* op = program_[pc].get();
+
+    // Buffers of inputs to tell newly allocated outputs.
+    std::set<const void*> input_buffers;
+    if (options.profiler) {
+        ForEachInputVariable(op->instruction(), [state, &input_buffers](int i, int id) {
+            for (const chainerx::Array& a : state->GetVar(id)->GetArrays()) {
+                input_buffers.insert(a.data().get());
+            }
+        });
+    }
+
+    std::chrono::steady_clock::time_point start_time;
+    {
+        ChromeTracingEmitter::ScopedEvent se(options.chrome_tracing, "XCVM", op->name(), pc);
+#ifdef CHAINER_COMPILER_ENABLE_NVTX
+        nvtxRangePush(op->name().c_str());
+#endif
+        start_time = std::chrono::steady_clock::now();
+        try {
+            std::unique_lock<std::mutex> lock{op_state_mu_, std::defer_lock};
+            if (HasOpState(op->op())) lock.lock();
+            op->Run(state);
+        } catch (...) {
+            std::cerr << "Exception in " << op->debug_info() << std::endl;
+            throw;
+        }
+#ifdef CHAINER_COMPILER_ENABLE_NVTX
+        nvtxRangePop();
+#endif
+    }
+
+    if (options.profiler) {
+        const int64_t elapsed_ns = std::chrono::duration_cast<std::chrono::nanoseconds>(std::chrono::steady_clock::now() - start_time).count();
+        int64_t output_bytes = 0;
+        int64_t allocated_bytes = 0;
+        for (int id : op->instruction().outputs()) {
+            if (id < 0) continue;
+            for (const chainerx::Array& a : state->GetVar(id)->GetArrays()) {
+                output_bytes += a.GetNBytes();
+                if (!input_buffers.count(a.data().get())) allocated_bytes += a.GetNBytes();
+            }
+        }
+        options.profiler->Add(pc, XCInstructionProto_Op_Name(op->op()), op->debug_info(), elapsed_ns, output_bytes, allocated_bytes);
+    }
+
+    if (options.check_types) {
+        CheckType(state, op);
+    }
+
+    if (!options.dump_outputs_dir.empty()) {
+        DumpOutput(state, op, options.dump_outputs_dir);
+    }
+}
+
+void XCVM::RunInParallel(XCVMState* state) {
+    ThreadPool* thread_pool = GetThreadPool(state->options().num_threads);
+    while (true) {
+        int pc = state->pc();
+        if (pc >= program_.size()) break;
+
+        const int end = block_ends_[pc];
+        CHECK_LT(pc, end) << "Jump to the middle of a basic block: " << pc;
+        if (end - pc == 1) {
+            // Jumps are always run by this thread as they update `pc`.
+            RunInstruction(state, pc);
+            state->set_pc(state->pc() + 1);
+        } else {
+            RunBlockInParallel(state, pc, end, thread_pool);
+            state->set_pc(end);
+        }
+    }
+}
+
+void XCVM::RunBlockInParallel(XCVMState* state, int begin, int end, ThreadPool* thread_pool) {
+    std::mutex mu;
+    std::condition_variable cond;
+    std::vector<int> num_waits(num_predecessors_.begin() + begin, num_predecessors_.begin() + end);
+    int num_remaining = end - begin;
+    int num_tasks = 0;
+    std::exception_ptr error;
+
+    // ChainerX keeps the default context, device, and backprop mode
+    // per thread.
+    chainerx::Context& context = chainerx::GetDefaultContext();
+    chainerx::Device& device = chainerx::GetDefaultDevice();
+    const bool is_backprop_required = chainerx::IsBackpropRequired();
+
+    // Runs the instruction at `pc` and then successors which become
+    // ready. Other ready successors are passed to the thread pool.
+    std::function<void(int)> run_task = [&](int pc) {
+        chainerx::ContextScope context_scope(context);
+        chainerx::DeviceScope device_scope(device);
+        std::unique_ptr<chainerx::NoBackpropModeScope> no_backprop;
+        if (!is_backprop_required) no_backprop.reset(new chainerx::NoBackpropModeScope());
+
+        while (pc >= 0) {
+            std::exception_ptr e;
+            try {
+                RunInstruction(state, pc);
+            } catch (...) {
+                e = std::current_exception();
+            }
+
+            std::vector<int> ready;
+            {
+                std::unique_lock<std::mutex> lock{mu};
+                --num_remaining;
+                if (e && !error) error = e;
+                if (!error) {
+                    for (int succ : successors_[pc]) {
+                        if (--num_waits[succ - begin] == 0) ready.push_back(succ);
+                    }
+                }
+                pc = -1;
+                if (!ready.empty()) {
+                    pc = ready.back();
+                    ready.pop_back();
+                }
+                num_tasks += ready.size();
+                if (pc < 0) {
+                    // Nothing captured by reference can be touched
+                    // after the last task is finished.
+                    if (--num_tasks == 0) cond.notify_all();
+                    break;
+                }
+            }
+            for (int r : ready) {
+                thread_pool->Schedule([&run_task, r]() { run_task(r); });
+            }
+        }
+    };
+
+    std::vector<int> ready;
+    for (int pc = begin; pc < end; ++pc) {
+        if (num_waits[pc - begin] == 0) ready.push_back(pc);
+    }
+    CHECK(!ready.empty());
+    num_tasks = ready.size();
+    for (size_t i = 1; i < ready.size(); ++i) {
+        int pc = ready[i];
+        thread_pool->Schedule([&run_task, pc]() { run_task(pc); });
+    }
+    run_task(ready[0]);
+
+    std::unique_lock<std::mutex> lock{mu};
+    cond.wait(lock, [&num_tasks]() { return num_tasks == 0; });
+    if (error) std::rethrow_exception(error);
+    CHECK_EQ(0, num_remaining);
+}
+
+ThreadPool* XCVM::GetThreadPool(int num_threads) {
+    std::unique_lock<std::mutex> lock{thread_pool_mu_};
+    std::unique_ptr<ThreadPool>& thread_pool = thread_pools_[num_threads];
+    if (!thread_pool) {
+        // The calling thread also runs instructions.
+        thread_pool.reset(new ThreadPool(num_threads - 1));
+    }
+    return thread_pool.get();
+}
+
+std::unique_ptr<XCVMArena> XCVM::AcquireArena() {
+    {
+        std::unique_lock<std::mutex> lock{arena_mu_};
+        if (!arenas_.empty()) {
+            std::unique_ptr<XCVMArena> arena = std::move(arenas_.back());
+            arenas_.pop_back();
+            return arena;
+        }
+    }
+    return std::unique_ptr<XCVMArena>(new XCVMArena(program_, arena_size_, chainerx::GetDefaultDevice()));
+}
+
+void XCVM::ReleaseArena(std::unique_ptr<XCVMArena> arena) {
+    std::unique_lock<std::mutex> lock{arena_mu_};
+    arenas_.push_back(std::move(arena));
+}
+
 }  // namespace runtime
 }  // namespace chainer_compiler
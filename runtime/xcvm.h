@@ -1,7 +1,9 @@
 #pragma once
 
 #include <cstdint>
+#include <map>
 #include <memory>
+#include <mutex>
 #include <string>
 #include <utility>
 #include <vector>
@@ -11,10 +13,15 @@
 #include "runtime/xcvm.pb.h"
 
 namespace chainer_compiler {
+
+class ThreadPool;
+
 namespace runtime {
 
 class ChromeTracingEmitter;
+class XCVMArena;
 class XCVMOp;
+class XCVMProfiler;
 class XCVMState;
 class XCVMVar;
 
@@ -44,7 +51,15 @@ public:
 
     ChromeTracingEmitter* chrome_tracing{nullptr};
 
+    // Aggregates time and output sizes of each instruction.
+    XCVMProfiler* profiler{nullptr};
+
     std::string dump_outputs_dir;
+
+    // When this is larger than one, independent instructions in each
+    // basic block run concurrently on a pool of `num_threads` threads.
+    // Tracing and memory dumps force the sequential execution.
+    int num_threads{0};
 };
 
 class XCVMInputDesc;
@@ -54,20 +69,80 @@ public:
     explicit XCVM(const XCProgramProto& program);
     ~XCVM();
 
+    // Thread-safe. Each run has its own `XCVMState` and ops which keep
+    // states in themselves (e.g., TVM) are serialized between runs.
     InOuts Run(const InOuts& program_inputs, const XCVMOptions& options);
+    // Thread-safe as long as `state` is not shared.
     void Run(XCVMState* state);
 
+    // Checks all inputs of the program exist with expected types.
+    // `inputs` are in the order of `input_names()`. Throws
+    // std::invalid_argument for a missing or mistyped input.
+    void CheckInputs(const std::vector<std::shared_ptr<XCVMVar>>& inputs) const;
+
+    // Checks `var` has the type of the input at `index` in
+    // `input_names()`. The first axis is not checked when
+    // `ignore_batch_axis` is true. Throws std::invalid_argument for a
+    // mistyped input.
+    void CheckInput(int index, const XCVMVar& var, bool ignore_batch_axis = false) const;
+
     int num_variables() const {
         return num_variables_;
     }
 
+    // Names of `In` instructions without duplicates in the program
+    // order.
+    const std::vector<std::string>& input_names() const {
+        return input_names_;
+    }
+
+    // Returns the position of `name` in `input_names()` or -1 if the
+    // program does not take the input.
+    int GetInputIndex(const std::string& name) const;
+
+    // Names of `Out` instructions in the program order.
+    const std::vector<std::string>& output_names() const {
+        return output_names_;
+    }
+
 private:
     XCVM(const XCVM&) = delete;
     XCVM& operator=(const XCVM&) = delete;
 
+    void RunInstruction(XCVMState* state, int pc);
+    void RunInParallel(XCVMState* state);
+    void RunBlockInParallel(XCVMState* state, int begin, int end, ThreadPool* thread_pool);
+    ThreadPool* GetThreadPool(int num_threads);
+    std::unique_ptr<XCVMArena> AcquireArena();
+    void ReleaseArena(std::unique_ptr<XCVMArena> arena);
+
     std::vector<std::unique_ptr<XCVMOp>> program_;
     std::vector<std::unique_ptr<XCVMInputDesc>> input_descs_;
     int num_variables_;
+    std::vector<std::string> input_names_;
+    std::map<std::string, int> input_indices_;
+    std::vector<std::string> output_names_;
+
+    // Dependencies between instructions for the parallel execution.
+    // Jumps split the program into basic blocks and instructions only
+    // depend on other instructions in the same block.
+    std::vector<int> block_ends_;
+    std::vector<std::vector<int>> successors_;
+    std::vector<int> num_predecessors_;
+
+    std::mutex op_state_mu_;
+
+    // Thread pools keyed by `num_threads` of runs. A pool is kept
+    // alive until the XCVM is destroyed because concurrent runs may
+    // still use it.
+    std::mutex thread_pool_mu_;
+    std::map<int, std::unique_ptr<ThreadPool>> thread_pools_;
+
+    // Memory arenas which are not used by running programs. A run
+    // takes one so concurrent runs never share an arena.
+    int64_t arena_size_;
+    std::mutex arena_mu_;
+    std::vector<std::unique_ptr<XCVMArena>> arenas_;
 };
 
 }  // namespace runtime
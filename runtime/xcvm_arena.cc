@@ -0,0 +1,62 @@
+#include "runtime/xcvm_arena.h"
+
+#include <cstdint>
+#include <memory>
+
+#include <chainerx/routines/creation.h>
+
+#include <common/log.h>
+#include <runtime/xcvm.pb.h>
+#include <runtime/xcvm_op.h>
+
+namespace chainer_compiler {
+namespace runtime {
+
+XCVMArena::XCVMArena(const std::vector<std::unique_ptr<XCVMOp>>& program, int64_t arena_size, chainerx::Device& device)
+    : size_(arena_size), buffer_(chainerx::Empty({arena_size}, chainerx::Dtype::kUInt8, device)) {
+    for (size_t pc = 0; pc < program.size(); ++pc) {
+        const XCInstructionProto& inst = program[pc]->instruction();
+        if (inst.output_offsets().empty()) continue;
+        CHECK_EQ(inst.outputs_size(), inst.output_offsets_size()) << inst.DebugString();
+        CHECK_EQ(inst.outputs_size(), inst.output_types_size()) << inst.DebugString();
+        for (int i = 0; i < inst.outputs_size(); ++i) {
+            const int64_t offset = inst.output_offsets(i);
+            const XCTypeProto& type = inst.output_types(i);
+            if (offset < 0 || type.dtype() == 0) continue;
+            chainerx::Dtype dtype = static_cast<chainerx::Dtype>(type.dtype());
+            chainerx::Shape shape(type.shape().begin(), type.shape().end());
+            CHECK_LE(offset + shape.GetTotalSize() * chainerx::GetItemSize(dtype), size_) << inst.DebugString();
+            // Kernels which access memory by `raw_data()` ignore the
+            // offset of arrays, so planned arrays share the buffer by
+            // aliasing pointers instead of having offsets.
+            std::shared_ptr<void> data(buffer_.data(), static_cast<uint8_t*>(buffer_.raw_data()) + offset);
+            chainerx::Array planned = chainerx::FromData(shape, dtype, data, nonstd::nullopt /* strides */, 0, device);
+            planned_[pc].emplace(inst.outputs(i), planned);
+        }
+    }
+}
+
+XCVMArena::~XCVMArena() {
+}
+
+void XCVMArena::Prepare(int pc) {
+    auto found = planned_.find(pc);
+    current_ = found == planned_.end() ? nullptr : &found->second;
+}
+
+void XCVMArena::Release() {
+    current_ = nullptr;
+}
+
+nonstd::optional<chainerx::Array> XCVMArena::Get(
+        int index, const chainerx::Shape& shape, chainerx::Dtype dtype, const chainerx::Device& device) const {
+    if (!current_) return nonstd::nullopt;
+    auto found = current_->find(index);
+    if (found == current_->end()) return nonstd::nullopt;
+    const chainerx::Array& planned = found->second;
+    if (planned.shape() != shape || planned.dtype() != dtype || &planned.device() != &device) return nonstd::nullopt;
+    return planned;
+}
+
+}  // namespace runtime
+}  // namespace chainer_compiler
@@ -0,0 +1,59 @@
+#pragma once
+
+#include <cstdint>
+#include <map>
+#include <memory>
+#include <vector>
+
+#include <nonstd/optional.hpp>
+
+#include <chainerx/array.h>
+#include <chainerx/device.h>
+#include <chainerx/dtype.h>
+#include <chainerx/shape.h>
+
+namespace chainer_compiler {
+namespace runtime {
+
+class XCVMOp;
+
+// A buffer for intermediate values allocated once and reused by all
+// runs. The compiler assigns byte offsets in the buffer to outputs of
+// instructions (`output_offsets`) so values whose lifetimes overlap
+// in the sequential execution do not share memory. Ops get the
+// planned array of an output by `XCVMState::GetPlannedArray` and
+// allocate their outputs as usual when it is not available, e.g.,
+// the shape was unknown at compile time.
+//
+// An arena must be used by one run at a time.
+class XCVMArena {
+public:
+    XCVMArena(const std::vector<std::unique_ptr<XCVMOp>>& program, int64_t arena_size, chainerx::Device& device);
+    ~XCVMArena();
+
+    // Makes planned arrays of outputs of the instruction at `pc`
+    // available until `Release` is called.
+    void Prepare(int pc);
+    void Release();
+
+    // Returns the planned array of the variable `index` if its shape,
+    // dtype, and device match.
+    nonstd::optional<chainerx::Array> Get(int index, const chainerx::Shape& shape, chainerx::Dtype dtype, const chainerx::Device& device) const;
+
+    int64_t size() const {
+        return size_;
+    }
+
+private:
+    XCVMArena(const XCVMArena&) = delete;
+    XCVMArena& operator=(const XCVMArena&) = delete;
+
+    const int64_t size_;
+    chainerx::Array buffer_;
+    // Planned arrays of outputs keyed by pc and variable ID.
+    std::map<int, std::map<int, chainerx::Array>> planned_;
+    const std::map<int, chainerx::Array>* current_{nullptr};
+};
+
+}  // namespace runtime
+}  // namespace chainer_compiler
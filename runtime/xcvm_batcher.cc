@@ -0,0 +1,236 @@
+#include "runtime/xcvm_batcher.h"
+
+#include <exception>
+#include <stdexcept>
+
+#include <chainerx/array.h>
+#include <chainerx/backprop_mode.h>
+#include <chainerx/context.h>
+#include <chainerx/device.h>
+#include <chainerx/routines/creation.h>
+#include <chainerx/routines/manipulation.h>
+
+#include <common/log.h>
+#include <common/strutil.h>
+#include <runtime/xcvm_var.h>
+
+namespace chainer_compiler {
+namespace runtime {
+
+XCVMBatcher::XCVMBatcher(
+        XCVM* xcvm,
+        const std::vector<std::string>& input_names,
+        const InOuts& params,
+        const XCVMOptions& options,
+        int max_batch_size,
+        int64_t timeout_usec,
+        int padded_batch_size,
+        int num_workers)
+    : xcvm_(xcvm),
+      max_batch_size_(max_batch_size),
+      timeout_usec_(timeout_usec),
+      padded_batch_size_(padded_batch_size),
+      context_(&chainerx::GetDefaultContext()),
+      device_(&chainerx::GetDefaultDevice()),
+      is_backprop_required_(chainerx::IsBackpropRequired()) {
+    CHECK_LT(0, max_batch_size_);
+    CHECK_LE(0, timeout_usec_);
+    CHECK(padded_batch_size_ == 0 || max_batch_size_ <= padded_batch_size_) << max_batch_size_ << " vs " << padded_batch_size_;
+    CHECK_LT(0, num_workers);
+    for (int i = 0; i < num_workers; ++i) {
+        sessions_.emplace_back(new XCVMSession(xcvm, input_names, options));
+        for (const auto& p : params) {
+            sessions_.back()->SetParam(p.first, p.second);
+        }
+    }
+    for (const std::unique_ptr<XCVMSession>& session : sessions_) {
+        XCVMSession* s = session.get();
+        threads_.emplace_back([this, s]() { Loop(s); });
+    }
+}
+
+XCVMBatcher::~XCVMBatcher() {
+    {
+        std::unique_lock<std::mutex> lock{mu_};
+        should_finish_ = true;
+        cond_.notify_all();
+    }
+    for (std::thread& thread : threads_) {
+        thread.join();
+    }
+}
+
+std::future<XCVMBatcher::Vars> XCVMBatcher::Enqueue(const Vars& inputs) {
+    // Requests come from clients, so they are validated with exceptions
+    // instead of CHECKs which would abort the whole server.
+    const std::vector<std::string>& input_names = sessions_[0]->input_names();
+    if (input_names.size() != inputs.size()) {
+        throw std::invalid_argument(StrCat("Unexpected number of inputs: ", inputs.size(), " vs ", input_names.size()));
+    }
+    std::unique_ptr<Request> request(new Request());
+    request->inputs = inputs;
+    request->batch_size = -1;
+    for (size_t i = 0; i < inputs.size(); ++i) {
+        if (!inputs[i] || inputs[i]->kind() != XCVMVar::Kind::kArray) {
+            throw std::invalid_argument(StrCat("Input '", input_names[i], "' must be an array"));
+        }
+        const chainerx::Array& a = inputs[i]->GetArray();
+        if (a.ndim() == 0) {
+            throw std::invalid_argument(StrCat("Input '", input_names[i], "' has no batch axis"));
+        }
+        if (request->batch_size < 0) request->batch_size = a.shape()[0];
+        if (request->batch_size != a.shape()[0]) {
+            throw std::invalid_argument(StrCat(
+                    "Inconsistent batch size: ", input_names[i], " has ", a.shape()[0], " rows but ", request->batch_size, " expected"));
+        }
+        // Rows must have the type of the program input, otherwise the
+        // concatenation or the program would fail for the whole batch.
+        const int index = xcvm_->GetInputIndex(input_names[i]);
+        if (index >= 0) xcvm_->CheckInput(index, *inputs[i], true /* ignore_batch_axis */);
+    }
+    if (padded_batch_size_ != 0 && request->batch_size > padded_batch_size_) {
+        throw std::invalid_argument(StrCat("Too large request: ", request->batch_size, " rows exceed ", padded_batch_size_));
+    }
+    request->enqueue_time = std::chrono::steady_clock::now();
+    std::future<Vars> future = request->promise.get_future();
+
+    std::unique_lock<std::mutex> lock{mu_};
+    CHECK(!should_finish_);
+    num_pending_rows_ += request->batch_size;
+    queue_.push_back(std::move(request));
+    cond_.notify_all();
+    return future;
+}
+
+XCVMBatcher::Vars XCVMBatcher::Run(const Vars& inputs) {
+    return Enqueue(inputs).get();
+}
+
+int64_t XCVMBatcher::num_batches() const {
+    std::unique_lock<std::mutex> lock{mu_};
+    return num_batches_;
+}
+
+int64_t XCVMBatcher::num_requests() const {
+    std::unique_lock<std::mutex> lock{mu_};
+    return num_requests_;
+}
+
+void XCVMBatcher::Loop(XCVMSession* session) {
+    chainerx::ContextScope context_scope(*context_);
+    chainerx::DeviceScope device_scope(*device_);
+    std::unique_ptr<chainerx::NoBackpropModeScope> no_backprop;
+    if (!is_backprop_required_) no_backprop.reset(new chainerx::NoBackpropModeScope());
+
+    while (true) {
+        std::vector<std::unique_ptr<Request>> requests;
+        {
+            std::unique_lock<std::mutex> lock{mu_};
+            while (queue_.empty() && !should_finish_) {
+                cond_.wait(lock);
+            }
+            // Pending requests are served before finishing.
+            if (queue_.empty()) return;
+
+            const std::chrono::steady_clock::time_point deadline =
+                    queue_.front()->enqueue_time + std::chrono::microseconds(timeout_usec_);
+            while (!should_finish_ && num_pending_rows_ < max_batch_size_) {
+                if (cond_.wait_until(lock, deadline) == std::cv_status::timeout) break;
+            }
+            // Other workers may have taken the requests.
+            if (queue_.empty()) continue;
+
+            int64_t num_rows = 0;
+            while (!queue_.empty()) {
+                const int64_t batch_size = queue_.front()->batch_size;
+                // A request larger than `max_batch_size` runs alone.
+                if (!requests.empty() && num_rows + batch_size > max_batch_size_) break;
+                num_rows += batch_size;
+                num_pending_rows_ -= batch_size;
+                requests.push_back(std::move(queue_.front()));
+                queue_.pop_front();
+            }
+            ++num_batches_;
+            num_requests_ += requests.size();
+        }
+        RunBatch(session, requests);
+    }
+}
+
+void XCVMBatcher::RunBatch(XCVMSession* session, const std::vector<std::unique_ptr<Request>>& requests) {
+    std::vector<Request*> batch;
+    for (const std::unique_ptr<Request>& request : requests) {
+        batch.push_back(request.get());
+    }
+
+    std::vector<Vars> results;
+    try {
+        results = RunRequests(session, batch);
+    } catch (...) {
+        if (batch.size() == 1) {
+            batch[0]->promise.set_exception(std::current_exception());
+            return;
+        }
+        // Retry the requests one by one so only the offending ones fail,
+        // e.g., a request whose shape does not match the others.
+        for (Request* request : batch) {
+            try {
+                request->promise.set_value(RunRequests(session, {request})[0]);
+            } catch (...) {
+                request->promise.set_exception(std::current_exception());
+            }
+        }
+        return;
+    }
+
+    for (size_t i = 0; i < batch.size(); ++i) {
+        batch[i]->promise.set_value(results[i]);
+    }
+}
+
+std::vector<XCVMBatcher::Vars> XCVMBatcher::RunRequests(XCVMSession* session, const std::vector<Request*>& requests) {
+    int64_t num_rows = 0;
+    for (const Request* request : requests) {
+        num_rows += request->batch_size;
+    }
+
+    Vars inputs;
+    for (size_t i = 0; i < session->input_names().size(); ++i) {
+        std::vector<chainerx::Array> arrays;
+        for (const Request* request : requests) {
+            arrays.push_back(request->inputs[i]->GetArray());
+        }
+        if (num_rows < padded_batch_size_) {
+            const chainerx::Array& a = arrays[0];
+            chainerx::Shape shape = a.shape();
+            shape[0] = padded_batch_size_ - num_rows;
+            arrays.push_back(chainerx::Zeros(shape, a.dtype(), a.device()));
+        }
+        chainerx::Array batch = arrays.size() == 1 ? arrays[0] : chainerx::Concatenate(arrays, 0);
+        inputs.push_back(std::make_shared<XCVMVar>(batch));
+    }
+
+    Vars outputs = session->Run(inputs);
+
+    std::vector<Vars> results;
+    int64_t offset = 0;
+    for (const Request* request : requests) {
+        Vars vars;
+        for (size_t i = 0; i < outputs.size(); ++i) {
+            if (outputs[i]->kind() != XCVMVar::Kind::kArray) {
+                throw std::runtime_error(StrCat("Output '", output_names()[i], "' must be an array"));
+            }
+            const chainerx::Array& a = outputs[i]->GetArray();
+            if (a.ndim() == 0 || a.shape()[0] < offset + request->batch_size) {
+                throw std::runtime_error(StrCat("Output '", output_names()[i], "' has no batch axis"));
+            }
+            vars.push_back(std::make_shared<XCVMVar>(a.At({chainerx::Slice(offset, offset + request->batch_size)})));
+        }
+        offset += request->batch_size;
+        results.push_back(vars);
+    }
+    return results;
+}
+
+}  // namespace runtime
+}  // namespace chainer_compiler
@@ -0,0 +1,102 @@
+#pragma once
+
+#include <chrono>
+#include <condition_variable>
+#include <cstdint>
+#include <deque>
+#include <future>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include <runtime/xcvm.h>
+#include <runtime/xcvm_session.h>
+
+namespace chainerx {
+class Context;
+class Device;
+}  // namespace chainerx
+
+namespace chainer_compiler {
+namespace runtime {
+
+class XCVMVar;
+
+// Serves concurrent requests by running them as a single batch.
+// Inputs of pending requests are concatenated along their first axis
+// until `max_batch_size` rows are collected or `timeout_usec` passes
+// since the oldest pending request. Outputs are split back along the
+// first axis. When `padded_batch_size` is positive, batches are
+// padded with zeros to that size, which allows serving programs
+// compiled for a fixed batch size. Each of `num_workers` threads owns
+// an `XCVMSession`, so up to `num_workers` batches run concurrently,
+// each with its own `XCVMState`.
+class XCVMBatcher {
+public:
+    typedef std::vector<std::shared_ptr<XCVMVar>> Vars;
+
+    XCVMBatcher(
+            XCVM* xcvm,
+            const std::vector<std::string>& input_names,
+            const InOuts& params,
+            const XCVMOptions& options,
+            int max_batch_size,
+            int64_t timeout_usec,
+            int padded_batch_size = 0,
+            int num_workers = 1);
+    ~XCVMBatcher();
+
+    // Thread-safe. `inputs` must be arrays in the order of
+    // `input_names`. Outputs are in the order of `output_names()`.
+    // Throws std::invalid_argument for a malformed request, e.g., rows
+    // whose shape or dtype differ from the program input. Errors
+    // while running a batch are set only on the failing requests.
+    std::future<Vars> Enqueue(const Vars& inputs);
+
+    // Thread-safe. Blocks until the outputs are ready.
+    Vars Run(const Vars& inputs);
+
+    const std::vector<std::string>& output_names() const {
+        return sessions_[0]->output_names();
+    }
+
+    int64_t num_batches() const;
+    int64_t num_requests() const;
+
+private:
+    struct Request {
+        Vars inputs;
+        int64_t batch_size;
+        std::chrono::steady_clock::time_point enqueue_time;
+        std::promise<Vars> promise;
+    };
+
+    void Loop(XCVMSession* session);
+    void RunBatch(XCVMSession* session, const std::vector<std::unique_ptr<Request>>& requests);
+    std::vector<Vars> RunRequests(XCVMSession* session, const std::vector<Request*>& requests);
+
+    XCVM* xcvm_;
+    std::vector<std::unique_ptr<XCVMSession>> sessions_;
+    const int max_batch_size_;
+    const int64_t timeout_usec_;
+    const int padded_batch_size_;
+
+    // ChainerX states of the thread which created the batcher.
+    chainerx::Context* context_;
+    chainerx::Device* device_;
+    bool is_backprop_required_;
+
+    mutable std::mutex mu_;
+    std::condition_variable cond_;
+    std::deque<std::unique_ptr<Request>> queue_;
+    int64_t num_pending_rows_{0};
+    int64_t num_batches_{0};
+    int64_t num_requests_{0};
+    bool should_finish_{false};
+    std::vector<std::thread> threads_;
+};
+
+}  // namespace runtime
+}  // namespace chainer_compiler
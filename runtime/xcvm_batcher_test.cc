@@ -0,0 +1,181 @@
+#include <future>
+#include <stdexcept>
+#include <thread>
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include <chainerx/array.h>
+#include <chainerx/context.h>
+#include <chainerx/numeric.h>
+#include <chainerx/routines/creation.h>
+#include <chainerx/testing/array.h>
+
+#include <compiler/gen_xcvm_codegen.h>
+#include <compiler/xcvm/xcvm_value.h>
+#include <runtime/xcvm.h>
+#include <runtime/xcvm.pb.h>
+#include <runtime/xcvm_batcher.h>
+#include <runtime/xcvm_var.h>
+
+namespace chainer_compiler {
+namespace runtime {
+namespace {
+
+void RunConcurrently(XCVMBatcher* batcher, int num_requests) {
+    std::vector<std::thread> threads;
+    std::vector<chainerx::Array> results(num_requests);
+    chainerx::Context& ctx = chainerx::GetDefaultContext();
+    for (int i = 0; i < num_requests; ++i) {
+        threads.emplace_back([batcher, i, &ctx, &results]() {
+            chainerx::ContextScope ctx_scope(ctx);
+            chainerx::Array x = chainerx::testing::BuildArray({1, 2}).WithData<float>({1.0f * i, 2.0f * i});
+            XCVMBatcher::Vars outputs = batcher->Run({std::make_shared<XCVMVar>(x)});
+            ASSERT_EQ(1, outputs.size());
+            results[i] = outputs[0]->GetArray();
+        });
+    }
+    for (std::thread& thread : threads) {
+        thread.join();
+    }
+    for (int i = 0; i < num_requests; ++i) {
+        chainerx::Array e = chainerx::testing::BuildArray({1, 2}).WithData<float>({2.0f * i, 4.0f * i});
+        EXPECT_TRUE(chainerx::AllClose(e, results[i], 0, 0)) << i;
+    }
+}
+
+XCProgramProto MakeProgram() {
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "x");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(2), "b");
+    xcvm::AddMulOp(&program, xcvm::XCVMValue(3), 1, 2);
+    xcvm::AddAddOp(&program, xcvm::XCVMValue(4), 3, 1);
+    xcvm::AddOutOp(&program, "y", 4);
+    xcvm::AddFreeOp(&program, 1);
+    xcvm::AddFreeOp(&program, 2);
+    xcvm::AddFreeOp(&program, 3);
+    xcvm::AddFreeOp(&program, 4);
+    return program;
+}
+
+TEST(XCVMBatcherTest, Run) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCVM xcvm(MakeProgram());
+    InOuts params;
+    params.emplace("b", std::make_shared<XCVMVar>(chainerx::Full({}, 1.0f, chainerx::Dtype::kFloat32)));
+    // y = x * 1 + x with a long timeout so requests are batched.
+    XCVMBatcher batcher(&xcvm, {"x"}, params, XCVMOptions(), 4, 100 * 1000);
+    RunConcurrently(&batcher, 8);
+    EXPECT_EQ(8, batcher.num_requests());
+    EXPECT_LE(2, batcher.num_batches());
+    EXPECT_GE(8, batcher.num_batches());
+}
+
+TEST(XCVMBatcherTest, Padding) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCVM xcvm(MakeProgram());
+    InOuts params;
+    params.emplace("b", std::make_shared<XCVMVar>(chainerx::Full({}, 1.0f, chainerx::Dtype::kFloat32)));
+    XCVMBatcher batcher(&xcvm, {"x"}, params, XCVMOptions(), 3, 0, 4);
+    RunConcurrently(&batcher, 5);
+    EXPECT_EQ(5, batcher.num_requests());
+}
+
+TEST(XCVMBatcherTest, MultipleWorkers) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCVM xcvm(MakeProgram());
+    InOuts params;
+    params.emplace("b", std::make_shared<XCVMVar>(chainerx::Full({}, 1.0f, chainerx::Dtype::kFloat32)));
+    // Batches of two requests run on three workers.
+    XCVMBatcher batcher(&xcvm, {"x"}, params, XCVMOptions(), 2, 1000, 0, 3);
+    RunConcurrently(&batcher, 16);
+    EXPECT_EQ(16, batcher.num_requests());
+    EXPECT_LE(8, batcher.num_batches());
+}
+
+TEST(XCVMBatcherTest, InvalidRequest) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCVM xcvm(MakeProgram());
+    InOuts params;
+    params.emplace("b", std::make_shared<XCVMVar>(chainerx::Full({}, 1.0f, chainerx::Dtype::kFloat32)));
+    XCVMBatcher batcher(&xcvm, {"x"}, params, XCVMOptions(), 2, 1000, 2);
+    chainerx::Array x = chainerx::testing::BuildArray({1, 2}).WithData<float>({1.0f, 2.0f});
+    chainerx::Array scalar = chainerx::Full({}, 1.0f, chainerx::Dtype::kFloat32);
+    chainerx::Array large = chainerx::Zeros({3, 2}, chainerx::Dtype::kFloat32);
+    EXPECT_THROW(batcher.Enqueue({}), std::invalid_argument);
+    EXPECT_THROW(batcher.Enqueue({std::make_shared<XCVMVar>(x), std::make_shared<XCVMVar>(x)}), std::invalid_argument);
+    EXPECT_THROW(batcher.Enqueue({std::make_shared<XCVMVar>(scalar)}), std::invalid_argument);
+    EXPECT_THROW(batcher.Enqueue({std::make_shared<XCVMVar>(large)}), std::invalid_argument);
+
+    // The batcher keeps serving after rejected requests.
+    XCVMBatcher::Vars outputs = batcher.Run({std::make_shared<XCVMVar>(x)});
+    ASSERT_EQ(1, outputs.size());
+    chainerx::Array e = chainerx::testing::BuildArray({1, 2}).WithData<float>({2.0f, 4.0f});
+    EXPECT_TRUE(chainerx::AllClose(e, outputs[0]->GetArray(), 0, 0));
+}
+
+TEST(XCVMBatcherTest, MistypedRequest) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    // Rows of `x` must be float32 with two columns.
+    XCProgramProto program = MakeProgram();
+    program.add_input_names("x");
+    XCTypeProto* type = program.add_input_types();
+    type->set_dtype(static_cast<int>(chainerx::Dtype::kFloat32));
+    type->add_shape(1);
+    type->add_shape(2);
+
+    XCVM xcvm(program);
+    InOuts params;
+    params.emplace("b", std::make_shared<XCVMVar>(chainerx::Full({}, 1.0f, chainerx::Dtype::kFloat32)));
+    XCVMBatcher batcher(&xcvm, {"x"}, params, XCVMOptions(), 2, 1000);
+    chainerx::Array x = chainerx::testing::BuildArray({1, 2}).WithData<float>({1.0f, 2.0f});
+    chainerx::Array wide = chainerx::Zeros({1, 3}, chainerx::Dtype::kFloat32);
+    chainerx::Array deep = chainerx::Zeros({1, 2, 1}, chainerx::Dtype::kFloat32);
+    chainerx::Array f64 = chainerx::Zeros({1, 2}, chainerx::Dtype::kFloat64);
+    EXPECT_THROW(batcher.Enqueue({std::make_shared<XCVMVar>(wide)}), std::invalid_argument);
+    EXPECT_THROW(batcher.Enqueue({std::make_shared<XCVMVar>(deep)}), std::invalid_argument);
+    EXPECT_THROW(batcher.Enqueue({std::make_shared<XCVMVar>(f64)}), std::invalid_argument);
+
+    XCVMBatcher::Vars outputs = batcher.Run({std::make_shared<XCVMVar>(x)});
+    ASSERT_EQ(1, outputs.size());
+    chainerx::Array e = chainerx::testing::BuildArray({1, 2}).WithData<float>({2.0f, 4.0f});
+    EXPECT_TRUE(chainerx::AllClose(e, outputs[0]->GetArray(), 0, 0));
+}
+
+TEST(XCVMBatcherTest, MismatchedRequests) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCVM xcvm(MakeProgram());
+    InOuts params;
+    params.emplace("b", std::make_shared<XCVMVar>(chainerx::Full({}, 1.0f, chainerx::Dtype::kFloat32)));
+    // Requests with different shapes cannot be concatenated, so they
+    // run one by one instead of failing the whole batch.
+    XCVMBatcher batcher(&xcvm, {"x"}, params, XCVMOptions(), 2, 100 * 1000);
+    chainerx::Array x2 = chainerx::testing::BuildArray({1, 2}).WithData<float>({1.0f, 2.0f});
+    chainerx::Array x3 = chainerx::testing::BuildArray({1, 3}).WithData<float>({1.0f, 2.0f, 3.0f});
+    std::future<XCVMBatcher::Vars> f2 = batcher.Enqueue({std::make_shared<XCVMVar>(x2)});
+    std::future<XCVMBatcher::Vars> f3 = batcher.Enqueue({std::make_shared<XCVMVar>(x3)});
+    XCVMBatcher::Vars y2 = f2.get();
+    XCVMBatcher::Vars y3 = f3.get();
+    ASSERT_EQ(1, y2.size());
+    ASSERT_EQ(1, y3.size());
+    chainerx::Array e2 = chainerx::testing::BuildArray({1, 2}).WithData<float>({2.0f, 4.0f});
+    chainerx::Array e3 = chainerx::testing::BuildArray({1, 3}).WithData<float>({2.0f, 4.0f, 6.0f});
+    EXPECT_TRUE(chainerx::AllClose(e2, y2[0]->GetArray(), 0, 0));
+    EXPECT_TRUE(chainerx::AllClose(e3, y3[0]->GetArray(), 0, 0));
+}
+
+}  // namespace
+}  // namespace runtime
+}  // namespace chainer_compiler
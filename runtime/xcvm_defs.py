@@ -199,6 +199,20 @@ XC_OPS = [
     ('ConvGradWeight',
      [Array('w'), Array('x'), Array('gy'), Ints('strides'), Ints('pads')],
      ['y']),
+    ('GroupedConv',
+     [Array('x'), Array('w'), OptionalArray('b'),
+      Ints('strides'), Ints('pads'), Int('group')], ['y']),
+    ('GroupedConvTranspose',
+     [Array('x'), Array('w'), OptionalArray('b'),
+      Ints('strides'), Ints('pads'), Ints('output_shape'), Int('group')],
+     ['y']),
+    ('GroupedConvTransposeWithDynamicShape',
+     [Array('x'), Array('w'), Array('output_shape'),
+      Ints('strides'), Ints('pads'), Int('group')], ['y']),
+    ('GroupedConvGradWeight',
+     [Array('w'), Array('x'), Array('gy'),
+      Ints('strides'), Ints('pads'), Int('group')],
+     ['y']),
 
     ('Relu', [Array('x')], ['y']),
     ('ReluGrad', [Array('x'), Array('gy')], ['gx']),
@@ -318,6 +332,14 @@ XC_OPS = [
     ('LSTMGrad',
      [Array('gy'), Opaque('ctx')],
      ['gx', 'gw', 'gr', 'gb']),
+    ('NStepLSTM',
+     [Array('x'), Array('sequence_lens'), ArrayList('weights'),
+      Int('hidden_size'), Int('direction')],
+     ['y', 'y_h', 'y_c', Opaque('ctx')]),
+    ('NStepLSTMGrad',
+     [OptionalArray('gy'), OptionalArray('gy_h'), OptionalArray('gy_c'),
+      Opaque('ctx')],
+     [ArrayList('gxs')]),
 
     ('BatchNormalization',
      [Array('x'), Array('s'), Array('bias'), Array('mean'), Array('var'),
@@ -384,6 +406,9 @@ XC_CUSTOM_FIELD_OPS = [
     ('NGraph',
      [ArrayList('inputs'), String('onnx')],
      [ArrayList('outputs')]),
+    ('ElementWiseCpu',
+     [ArrayList('inputs'), Int('num_outputs'), String('program')],
+     [ArrayList('outputs')]),
 ]
 
 XC_SEQ_OPS = [
@@ -416,6 +441,11 @@ XC_SEQ_OPS = [
     ('SequenceSize', [Sequence('seq')], ['output']),
     ('SequenceLengths', [Sequence('seq')], [Sequence('output')]),
     ('SequenceCopy', [Sequence('seq')], [Sequence('output')]),
+
+    # A buffer for scan outputs of Loop. `capacity` is a hint of the
+    # number of elements.
+    ('ScanBufferCreate', [OptionalArray('capacity')], [Opaque('buffer')]),
+    ('ScanBufferStack', [Opaque('buffer'), Int('axis')], ['output']),
 ]
 
 # Ops which modify the input in-place.
@@ -425,6 +455,7 @@ XC_SEQ_OPS_UNTYPED = [
      []),
     ('SequencePop', [Sequence('seq')], [Sequence('output')]),
     ('SequenceMove', [Sequence('seq')], [Sequence('output')]),
+    ('ScanBufferAppend', [Opaque('buffer'), Array('value')], []),
 ]
 
 XC_GENERIC_OPS = [
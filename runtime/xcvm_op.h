@@ -37,11 +37,22 @@ public:
         return inst_.debug_info();
     }
 
+    // The position of the value of `In` or `Out` ops in inputs or
+    // outputs of `XCVMState`. Resolved from the name when the program
+    // is loaded.
+    int inout_index() const {
+        return inout_index_;
+    }
+    void set_inout_index(int index) {
+        inout_index_ = index;
+    }
+
 protected:
     XCInstructionProto inst_;
     const int64_t id_;
     const XCInstructionProto::Op op_;
     const std::string name_;
+    int inout_index_{-1};
 };
 
 XCVMOp* MakeXCVMOp(const XCInstructionProto& inst);
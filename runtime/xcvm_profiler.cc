@@ -0,0 +1,187 @@
+#include "runtime/xcvm_profiler.h"
+
+#include <algorithm>
+#include <cmath>
+#include <fstream>
+#include <iomanip>
+#include <utility>
+
+#include <common/log.h>
+#include <common/strutil.h>
+
+namespace chainer_compiler {
+namespace runtime {
+namespace {
+
+// 2^(kNumBuckets / kBucketsPerOctave) ns is about 18 hours.
+constexpr int kBucketsPerOctave = 4;
+constexpr int kNumBuckets = 46 * kBucketsPerOctave;
+
+int GetBucket(int64_t ns) {
+    if (ns <= 1) return 0;
+    int bucket = static_cast<int>(std::log2(static_cast<double>(ns)) * kBucketsPerOctave);
+    return std::min(bucket, kNumBuckets - 1);
+}
+
+std::string EscapeJSON(const std::string& str) {
+    std::string escaped;
+    for (char c : str) {
+        if (c == '"' || c == '\\') {
+            escaped += '\\';
+            escaped += c;
+        } else if (c == '\n') {
+            escaped += "\\n";
+        } else if (static_cast<unsigned char>(c) < 0x20) {
+            escaped += ' ';
+        } else {
+            escaped += c;
+        }
+    }
+    return escaped;
+}
+
+template <class Key>
+std::vector<std::pair<Key, const XCVMProfiler::Stats*>> SortByTotalTime(const std::map<Key, XCVMProfiler::Stats>& stats) {
+    std::vector<std::pair<Key, const XCVMProfiler::Stats*>> sorted;
+    for (const auto& p : stats) {
+        sorted.emplace_back(p.first, &p.second);
+    }
+    std::stable_sort(sorted.begin(), sorted.end(), [](const auto& a, const auto& b) { return a.second->total_ns > b.second->total_ns; });
+    return sorted;
+}
+
+void ShowStatsHeader(std::ostream& os) {
+    os << std::setw(8) << "Count" << std::setw(12) << "Total(ms)" << std::setw(7) << "%" << std::setw(11) << "Mean(us)" << std::setw(11)
+       << "Min(us)" << std::setw(11) << "Max(us)" << std::setw(11) << "p50(us)" << std::setw(11) << "p90(us)" << std::setw(11) << "p99(us)"
+       << std::setw(12) << "Output(MB)" << std::setw(11) << "Alloc(MB)";
+}
+
+void ShowStats(std::ostream& os, const XCVMProfiler::Stats& stats, int64_t total_ns) {
+    auto us = [](int64_t ns) { return ns / 1000.0; };
+    auto mb = [](int64_t bytes) { return bytes / 1000.0 / 1000.0; };
+    os << std::fixed << std::setprecision(1);
+    os << std::setw(8) << stats.count << std::setw(12) << stats.total_ns / 1000.0 / 1000.0 << std::setw(7)
+       << (total_ns ? stats.total_ns * 100.0 / total_ns : 0.0) << std::setw(11) << us(stats.total_ns / std::max<int64_t>(stats.count, 1))
+       << std::setw(11) << us(stats.min_ns) << std::setw(11) << us(stats.max_ns) << std::setw(11) << us(stats.GetPercentileNs(50))
+       << std::setw(11) << us(stats.GetPercentileNs(90)) << std::setw(11) << us(stats.GetPercentileNs(99)) << std::setw(12)
+       << mb(stats.output_bytes) << std::setw(11) << mb(stats.allocated_bytes);
+    os << std::defaultfloat;
+}
+
+void EmitStatsJSON(std::ostream& os, const XCVMProfiler::Stats& stats) {
+    os << "\"count\":" << stats.count << ",";
+    os << "\"total_ns\":" << stats.total_ns << ",";
+    os << "\"min_ns\":" << stats.min_ns << ",";
+    os << "\"max_ns\":" << stats.max_ns << ",";
+    os << "\"p50_ns\":" << stats.GetPercentileNs(50) << ",";
+    os << "\"p90_ns\":" << stats.GetPercentileNs(90) << ",";
+    os << "\"p99_ns\":" << stats.GetPercentileNs(99) << ",";
+    os << "\"output_bytes\":" << stats.output_bytes << ",";
+    os << "\"allocated_bytes\":" << stats.allocated_bytes;
+}
+
+}  // namespace
+
+XCVMProfiler::Stats::Stats() : histogram_(kNumBuckets) {
+}
+
+void XCVMProfiler::Stats::Add(int64_t elapsed_ns, int64_t out_bytes, int64_t alloc_bytes) {
+    if (count == 0 || elapsed_ns < min_ns) min_ns = elapsed_ns;
+    if (count == 0 || elapsed_ns > max_ns) max_ns = elapsed_ns;
+    ++count;
+    total_ns += elapsed_ns;
+    output_bytes += out_bytes;
+    allocated_bytes += alloc_bytes;
+    ++histogram_[GetBucket(elapsed_ns)];
+}
+
+int64_t XCVMProfiler::Stats::GetPercentileNs(double p) const {
+    if (count == 0) return 0;
+    const int64_t rank = static_cast<int64_t>(std::ceil(count * p / 100.0));
+    int64_t seen = 0;
+    for (int i = 0; i < kNumBuckets; ++i) {
+        seen += histogram_[i];
+        if (seen >= rank) {
+            // The upper bound of the bucket, clipped by observed values.
+            const int64_t upper = static_cast<int64_t>(std::exp2(static_cast<double>(i + 1) / kBucketsPerOctave));
+            return std::max(min_ns, std::min(max_ns, upper));
+        }
+    }
+    return max_ns;
+}
+
+void XCVMProfiler::Add(
+        int pc, const std::string& op_type, const std::string& debug_info, int64_t elapsed_ns, int64_t output_bytes, int64_t allocated_bytes) {
+    std::lock_guard<std::mutex> lock(mu_);
+    op_stats_[op_type].Add(elapsed_ns, output_bytes, allocated_bytes);
+    instruction_stats_[InstructionKey(pc, op_type, debug_info)].Add(elapsed_ns, output_bytes, allocated_bytes);
+}
+
+void XCVMProfiler::ShowTable(std::ostream& os, int num_instructions) const {
+    std::lock_guard<std::mutex> lock(mu_);
+    int64_t total_ns = 0;
+    for (const auto& p : op_stats_) {
+        total_ns += p.second.total_ns;
+    }
+
+    os << "=== Profile by op (total " << total_ns / 1000 / 1000 << "ms) ===\n";
+    os << std::left << std::setw(32) << "Op" << std::right;
+    ShowStatsHeader(os);
+    os << '\n';
+    for (const auto& p : SortByTotalTime(op_stats_)) {
+        os << std::left << std::setw(32) << p.first << std::right;
+        ShowStats(os, *p.second, total_ns);
+        os << '\n';
+    }
+
+    os << "=== Top " << num_instructions << " instructions ===\n";
+    os << std::setw(6) << "pc" << ' ' << std::left << std::setw(25) << "Op" << std::right;
+    ShowStatsHeader(os);
+    os << "  Debug info\n";
+    int num_shown = 0;
+    for (const auto& p : SortByTotalTime(instruction_stats_)) {
+        if (num_shown++ >= num_instructions) break;
+        os << std::setw(6) << std::get<0>(p.first) << ' ' << std::left << std::setw(25) << std::get<1>(p.first) << std::right;
+        ShowStats(os, *p.second, total_ns);
+        os << "  " << std::get<2>(p.first) << '\n';
+    }
+    os << std::flush;
+}
+
+void XCVMProfiler::EmitJSON(std::ostream& os) const {
+    std::lock_guard<std::mutex> lock(mu_);
+    os << "{\"ops\":[\n";
+    bool is_first = true;
+    for (const auto& p : SortByTotalTime(op_stats_)) {
+        if (!is_first) os << ",\n";
+        is_first = false;
+        os << "{\"op\":\"" << EscapeJSON(p.first) << "\",";
+        EmitStatsJSON(os, *p.second);
+        os << "}";
+    }
+    os << "],\n\"instructions\":[\n";
+    is_first = true;
+    for (const auto& p : SortByTotalTime(instruction_stats_)) {
+        if (!is_first) os << ",\n";
+        is_first = false;
+        os << "{\"pc\":" << std::get<0>(p.first) << ",";
+        os << "\"op\":\"" << EscapeJSON(std::get<1>(p.first)) << "\",";
+        os << "\"debug_info\":\"" << EscapeJSON(std::get<2>(p.first)) << "\",";
+        EmitStatsJSON(os, *p.second);
+        os << "}";
+    }
+    os << "]}\n";
+}
+
+void XCVMProfiler::Emit(const std::string& output_filename) const {
+    std::ofstream ofs(output_filename);
+    CHECK(ofs) << "Failed to open output profile: " << output_filename;
+    if (HasSuffix(output_filename, ".json")) {
+        EmitJSON(ofs);
+    } else {
+        ShowTable(ofs);
+    }
+}
+
+}  // namespace runtime
+}  // namespace chainer_compiler
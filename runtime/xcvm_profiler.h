@@ -0,0 +1,70 @@
+#pragma once
+
+#include <cstdint>
+#include <map>
+#include <mutex>
+#include <ostream>
+#include <string>
+#include <tuple>
+#include <vector>
+
+namespace chainer_compiler {
+namespace runtime {
+
+// Aggregates the wall time and output sizes of executed XCVM
+// instructions by op type and by instruction. Unlike
+// `ChromeTracingEmitter`, the memory usage does not grow with the
+// number of runs, so this can be kept enabled for long runs.
+class XCVMProfiler {
+public:
+    class Stats {
+    public:
+        Stats();
+
+        void Add(int64_t elapsed_ns, int64_t output_bytes, int64_t allocated_bytes);
+
+        // Returns an approximated percentile from a histogram whose
+        // buckets grow by a factor of 2^(1/4).
+        int64_t GetPercentileNs(double p) const;
+
+        int64_t count{0};
+        int64_t total_ns{0};
+        int64_t min_ns{0};
+        int64_t max_ns{0};
+        int64_t output_bytes{0};
+        int64_t allocated_bytes{0};
+
+    private:
+        std::vector<int64_t> histogram_;
+    };
+
+    // Identifies an instruction by its pc, op type, and debug info.
+    typedef std::tuple<int, std::string, std::string> InstructionKey;
+
+    // Thread-safe. `allocated_bytes` is the size of outputs which do
+    // not share their buffers with inputs.
+    void Add(int pc,
+             const std::string& op_type,
+             const std::string& debug_info,
+             int64_t elapsed_ns,
+             int64_t output_bytes,
+             int64_t allocated_bytes);
+
+    // Shows statistics of ops and the top `num_instructions`
+    // instructions sorted by total time.
+    void ShowTable(std::ostream& os, int num_instructions = 20) const;
+
+    void EmitJSON(std::ostream& os) const;
+
+    // Writes JSON if `output_filename` ends with ".json" and a table
+    // otherwise.
+    void Emit(const std::string& output_filename) const;
+
+private:
+    mutable std::mutex mu_;
+    std::map<std::string, Stats> op_stats_;
+    std::map<InstructionKey, Stats> instruction_stats_;
+};
+
+}  // namespace runtime
+}  // namespace chainer_compiler
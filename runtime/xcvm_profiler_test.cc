@@ -0,0 +1,51 @@
+#include <sstream>
+
+#include <gtest/gtest.h>
+
+#include <runtime/xcvm_profiler.h>
+
+namespace chainer_compiler {
+namespace runtime {
+namespace {
+
+TEST(XCVMProfilerTest, Stats) {
+    XCVMProfiler::Stats stats;
+    for (int i = 1; i <= 100; ++i) {
+        stats.Add(i * 1000, 10, i % 2 ? 10 : 0);
+    }
+    EXPECT_EQ(100, stats.count);
+    EXPECT_EQ(5050000, stats.total_ns);
+    EXPECT_EQ(1000, stats.min_ns);
+    EXPECT_EQ(100000, stats.max_ns);
+    EXPECT_EQ(1000, stats.output_bytes);
+    EXPECT_EQ(500, stats.allocated_bytes);
+    // Percentiles are approximated within a factor of 2^(1/4).
+    EXPECT_LE(50000, stats.GetPercentileNs(50));
+    EXPECT_GE(50000 * 1.19, stats.GetPercentileNs(50));
+    EXPECT_LE(99000, stats.GetPercentileNs(99));
+    EXPECT_GE(100000, stats.GetPercentileNs(99));
+}
+
+TEST(XCVMProfilerTest, Emit) {
+    XCVMProfiler profiler;
+    profiler.Add(3, "Conv", "conv1", 2000, 400, 400);
+    profiler.Add(3, "Conv", "conv1", 4000, 400, 400);
+    profiler.Add(4, "Relu", "relu1", 1000, 400, 0);
+
+    std::ostringstream table;
+    profiler.ShowTable(table);
+    const std::string t = table.str();
+    // Ops are sorted by their total time.
+    EXPECT_LT(t.find("Conv"), t.find("Relu"));
+    EXPECT_NE(std::string::npos, t.find("conv1"));
+
+    std::ostringstream json;
+    profiler.EmitJSON(json);
+    const std::string j = json.str();
+    EXPECT_NE(std::string::npos, j.find("{\"op\":\"Conv\",\"count\":2,\"total_ns\":6000,\"min_ns\":2000,\"max_ns\":4000,"));
+    EXPECT_NE(std::string::npos, j.find("{\"pc\":4,\"op\":\"Relu\",\"debug_info\":\"relu1\",\"count\":1,"));
+}
+
+}  // namespace
+}  // namespace runtime
+}  // namespace chainer_compiler
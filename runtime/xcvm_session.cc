@@ -0,0 +1,91 @@
+#include "runtime/xcvm_session.h"
+
+#include <algorithm>
+#include <set>
+#include <stdexcept>
+
+#include <common/log.h>
+#include <common/strutil.h>
+#include <runtime/xcvm_state.h>
+#include <runtime/xcvm_var.h>
+
+namespace chainer_compiler {
+namespace runtime {
+
+XCVMSession::XCVMSession(XCVM* xcvm, const std::vector<std::string>& input_names, const XCVMOptions& options)
+    : xcvm_(xcvm),
+      input_names_(input_names),
+      state_(new XCVMState(options,
+                           xcvm->num_variables(),
+                           std::vector<std::shared_ptr<XCVMVar>>(xcvm->input_names().size()),
+                           xcvm->output_names().size())) {
+    std::set<std::string> seen;
+    for (const std::string& name : input_names_) {
+        CHECK(seen.insert(name).second) << "Duplicated input name: " << name;
+        input_indices_.push_back(xcvm->GetInputIndex(name));
+    }
+}
+
+XCVMSession::~XCVMSession() {
+}
+
+void XCVMSession::SetParam(const std::string& name, const std::shared_ptr<XCVMVar>& value) {
+    const int index = xcvm_->GetInputIndex(name);
+    if (index < 0) return;
+    CHECK(std::find(input_indices_.begin(), input_indices_.end(), index) == input_indices_.end())
+            << "Parameter conflicts with a positional input: " << name;
+    (*state_->mutable_inputs())[index] = value;
+}
+
+std::vector<std::shared_ptr<XCVMVar>> XCVMSession::Run(const std::vector<std::shared_ptr<XCVMVar>>& inputs) {
+    if (input_indices_.size() != inputs.size()) {
+        throw std::invalid_argument(StrCat("Unexpected number of inputs: ", inputs.size(), " vs ", input_indices_.size()));
+    }
+    for (size_t i = 0; i < inputs.size(); ++i) {
+        if (!inputs[i]) {
+            throw std::invalid_argument(StrCat("Input '", input_names_[i], "' is null"));
+        }
+    }
+
+    std::vector<std::shared_ptr<XCVMVar>>* state_inputs = state_->mutable_inputs();
+    for (size_t i = 0; i < inputs.size(); ++i) {
+        if (input_indices_[i] >= 0) (*state_inputs)[input_indices_[i]] = inputs[i];
+    }
+
+    std::vector<std::shared_ptr<XCVMVar>> outputs;
+    try {
+        if (state_->options().check_types) {
+            xcvm_->CheckInputs(*state_inputs);
+        }
+        state_->Reset();
+        xcvm_->Run(state_.get());
+        outputs = state_->outputs();
+        for (size_t i = 0; i < outputs.size(); ++i) {
+            if (!outputs[i]) {
+                throw std::runtime_error(StrCat("Output not found: ", output_names()[i]));
+            }
+        }
+    } catch (...) {
+        ClearState();
+        throw;
+    }
+
+    ClearState();
+    return outputs;
+}
+
+void XCVMSession::ClearState() {
+    // Do not keep temporary values and inputs alive between runs.
+    state_->Reset();
+    std::vector<std::shared_ptr<XCVMVar>>* state_inputs = state_->mutable_inputs();
+    for (int index : input_indices_) {
+        if (index >= 0) (*state_inputs)[index].reset();
+    }
+}
+
+XCVMOptions* XCVMSession::mutable_options() {
+    return state_->mutable_options();
+}
+
+}  // namespace runtime
+}  // namespace chainer_compiler
@@ -0,0 +1,58 @@
+#pragma once
+
+#include <memory>
+#include <string>
+#include <vector>
+
+#include <runtime/xcvm.h>
+
+namespace chainer_compiler {
+namespace runtime {
+
+class XCVMState;
+class XCVMVar;
+
+// Runs an XCVM program repeatedly. Input names are bound to positions
+// once and parameters stay resident between runs, so a run only
+// binds its positional inputs to a reused `XCVMState` without looking
+// up names. A session is not thread-safe, use a session per thread.
+class XCVMSession {
+public:
+    XCVMSession(XCVM* xcvm, const std::vector<std::string>& input_names, const XCVMOptions& options);
+    ~XCVMSession();
+
+    // Feeds `value` to the input `name` in all runs.
+    void SetParam(const std::string& name, const std::shared_ptr<XCVMVar>& value);
+
+    // `inputs` must be in the order of `input_names()`. Returns the
+    // outputs in the order of `output_names()`. Throws
+    // std::invalid_argument for malformed inputs and
+    // std::runtime_error for missing outputs.
+    std::vector<std::shared_ptr<XCVMVar>> Run(const std::vector<std::shared_ptr<XCVMVar>>& inputs);
+
+    const std::vector<std::string>& input_names() const {
+        return input_names_;
+    }
+
+    const std::vector<std::string>& output_names() const {
+        return xcvm_->output_names();
+    }
+
+    XCVMOptions* mutable_options();
+
+private:
+    XCVMSession(const XCVMSession&) = delete;
+    XCVMSession& operator=(const XCVMSession&) = delete;
+
+    void ClearState();
+
+    XCVM* xcvm_;
+    const std::vector<std::string> input_names_;
+    // Indices of inputs of `state_` for each input position, or -1
+    // if the program does not use the input.
+    std::vector<int> input_indices_;
+    std::unique_ptr<XCVMState> state_;
+};
+
+}  // namespace runtime
+}  // namespace chainer_compiler
@@ -0,0 +1,125 @@
+#include <stdexcept>
+
+#include <gtest/gtest.h>
+
+#include <chainerx/array.h>
+#include <chainerx/context.h>
+#include <chainerx/numeric.h>
+#include <chainerx/routines/creation.h>
+#include <chainerx/testing/array.h>
+
+#include <compiler/gen_xcvm_codegen.h>
+#include <compiler/xcvm/xcvm_value.h>
+#include <runtime/xcvm.h>
+#include <runtime/xcvm.pb.h>
+#include <runtime/xcvm_session.h>
+#include <runtime/xcvm_var.h>
+
+namespace chainer_compiler {
+namespace runtime {
+namespace {
+
+TEST(XCVMSessionTest, Run) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "x");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(2), "w");
+    xcvm::AddMulOp(&program, xcvm::XCVMValue(3), 1, 2);
+    xcvm::AddFreeOp(&program, 1);
+    xcvm::AddFreeOp(&program, 2);
+    xcvm::AddAddOp(&program, xcvm::XCVMValue(4), 3, 3);
+    xcvm::AddOutOp(&program, "y", 4);
+    xcvm::AddOutOp(&program, "z", 3);
+    xcvm::AddFreeOp(&program, 3);
+    xcvm::AddFreeOp(&program, 4);
+
+    XCVM xcvm(program);
+    XCVMSession session(&xcvm, {"x"}, XCVMOptions());
+    session.SetParam("w", std::make_shared<XCVMVar>(chainerx::testing::BuildArray({2}).WithData<float>({2, 3})));
+    ASSERT_EQ(2, session.output_names().size());
+    EXPECT_EQ("y", session.output_names()[0]);
+    EXPECT_EQ("z", session.output_names()[1]);
+
+    for (int i = 1; i <= 3; ++i) {
+        chainerx::Array x = chainerx::testing::BuildArray({2}).WithData<float>({1.0f * i, 2.0f * i});
+        std::vector<std::shared_ptr<XCVMVar>> outputs = session.Run({std::make_shared<XCVMVar>(x)});
+        ASSERT_EQ(2, outputs.size());
+        chainerx::Array y = chainerx::testing::BuildArray({2}).WithData<float>({4.0f * i, 12.0f * i});
+        chainerx::Array z = chainerx::testing::BuildArray({2}).WithData<float>({2.0f * i, 6.0f * i});
+        EXPECT_TRUE(chainerx::AllClose(y, outputs[0]->GetArray(), 0, 0));
+        EXPECT_TRUE(chainerx::AllClose(z, outputs[1]->GetArray(), 0, 0));
+    }
+}
+
+TEST(XCVMSessionTest, InputIndices) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "w");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(2), "x");
+    xcvm::AddMulOp(&program, xcvm::XCVMValue(3), 1, 2);
+    xcvm::AddFreeOp(&program, 1);
+    xcvm::AddFreeOp(&program, 2);
+    // The same input is taken again.
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "x");
+    xcvm::AddAddOp(&program, xcvm::XCVMValue(2), 3, 1);
+    xcvm::AddOutOp(&program, "y", 2);
+
+    XCVM xcvm(program);
+    ASSERT_EQ(2, xcvm.input_names().size());
+    EXPECT_EQ("w", xcvm.input_names()[0]);
+    EXPECT_EQ("x", xcvm.input_names()[1]);
+    EXPECT_EQ(0, xcvm.GetInputIndex("w"));
+    EXPECT_EQ(1, xcvm.GetInputIndex("x"));
+    EXPECT_EQ(-1, xcvm.GetInputIndex("unused"));
+
+    // Inputs and parameters the program does not take are ignored.
+    XCVMSession session(&xcvm, {"x", "unused"}, XCVMOptions());
+    session.SetParam("w", std::make_shared<XCVMVar>(chainerx::testing::BuildArray({2}).WithData<float>({2, 3})));
+    session.SetParam("unused_param", std::make_shared<XCVMVar>(chainerx::testing::BuildArray({1}).WithData<float>({0})));
+    chainerx::Array x = chainerx::testing::BuildArray({2}).WithData<float>({1, 2});
+    chainerx::Array unused = chainerx::testing::BuildArray({1}).WithData<float>({0});
+    std::vector<std::shared_ptr<XCVMVar>> outputs = session.Run({std::make_shared<XCVMVar>(x), std::make_shared<XCVMVar>(unused)});
+    ASSERT_EQ(1, outputs.size());
+    chainerx::Array y = chainerx::testing::BuildArray({2}).WithData<float>({3, 8});
+    EXPECT_TRUE(chainerx::AllClose(y, outputs[0]->GetArray(), 0, 0));
+}
+
+TEST(XCVMSessionTest, InvalidInputs) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "x");
+    xcvm::AddAddOp(&program, xcvm::XCVMValue(2), 1, 1);
+    xcvm::AddOutOp(&program, "y", 2);
+    program.add_input_names("x");
+    XCTypeProto* type = program.add_input_types();
+    type->set_dtype(static_cast<int>(chainerx::Dtype::kFloat32));
+    type->add_shape(2);
+
+    XCVM xcvm(program);
+    XCVMOptions options;
+    options.check_types = true;
+    XCVMSession session(&xcvm, {"x"}, options);
+    chainerx::Array x = chainerx::testing::BuildArray({2}).WithData<float>({1, 2});
+    chainerx::Array x3 = chainerx::Zeros({3}, chainerx::Dtype::kFloat32);
+    chainerx::Array f64 = chainerx::Zeros({2}, chainerx::Dtype::kFloat64);
+    EXPECT_THROW(session.Run({}), std::invalid_argument);
+    EXPECT_THROW(session.Run({nullptr}), std::invalid_argument);
+    EXPECT_THROW(session.Run({std::make_shared<XCVMVar>(x3)}), std::invalid_argument);
+    EXPECT_THROW(session.Run({std::make_shared<XCVMVar>(f64)}), std::invalid_argument);
+
+    // The session is still usable after the failures.
+    std::vector<std::shared_ptr<XCVMVar>> outputs = session.Run({std::make_shared<XCVMVar>(x)});
+    ASSERT_EQ(1, outputs.size());
+    chainerx::Array y = chainerx::testing::BuildArray({2}).WithData<float>({2, 4});
+    EXPECT_TRUE(chainerx::AllClose(y, outputs[0]->GetArray(), 0, 0));
+}
+
+}  // namespace
+}  // namespace runtime
+}  // namespace chainer_compiler
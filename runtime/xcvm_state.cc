@@ -8,19 +8,31 @@
 #include <common/log.h>
 #include <common/strutil.h>
 #include <runtime/xcvm.h>
+#include <runtime/xcvm_arena.h>
 #include <runtime/xcvm_op.h>
 #include <runtime/xcvm_var.h>
 
 namespace chainer_compiler {
 namespace runtime {
 
-XCVMState::XCVMState(const XCVMOptions& options, int num_variables, const InOuts& inputs)
-    : pc_(0), variables_(num_variables), inputs_(inputs), options_(options) {
+XCVMState::XCVMState(
+        const XCVMOptions& options, int num_variables, const std::vector<std::shared_ptr<XCVMVar>>& inputs, int num_outputs)
+    : pc_(0), variables_(num_variables), inputs_(inputs), outputs_(num_outputs), options_(options) {
 }
 
 XCVMState::~XCVMState() {
 }
 
+void XCVMState::Reset() {
+    pc_ = 0;
+    for (std::unique_ptr<XCVMVar>& var : variables_) {
+        var.reset();
+    }
+    for (std::shared_ptr<XCVMVar>& output : outputs_) {
+        output.reset();
+    }
+}
+
 chainerx::Array XCVMState::GetArray(int index) {
     CHECK_LE(0, index) << index;
     CHECK_GT(variables_.size(), index) << index;
@@ -33,6 +45,12 @@ nonstd::optional<chainerx::Array> XCVMState::GetOptionalArray(int index) {
     return GetArray(index);
 }
 
+nonstd::optional<chainerx::Array> XCVMState::GetPlannedArray(
+        int index, const chainerx::Shape& shape, chainerx::Dtype dtype, const chainerx::Device& device) {
+    if (!arena_) return nonstd::nullopt;
+    return arena_->Get(index, shape, dtype, device);
+}
+
 std::vector<chainerx::Array> XCVMState::GetArrayList(const std::vector<int>& index) {
     std::vector<chainerx::Array> vars;
     for (int i : index) vars.push_back(GetArray(i));
@@ -134,20 +152,26 @@ void XCVMState::FreeVar(int index) {
     variables_[index].reset();
 }
 
-void XCVMState::Input(const std::string& name, int index) {
+void XCVMState::Input(const std::string& name, int input_index, int index) {
     CHECK_LE(0, index) << index;
     CHECK_GT(variables_.size(), index) << index;
     CHECK(!variables_[index].get()) << index;
-    auto found = inputs_.find(name);
-    CHECK(found != inputs_.end()) << "Input value not exist: " << name;
-    variables_[index].reset(new XCVMVar(*found->second.get()));
+    CHECK_LE(0, input_index) << name;
+    CHECK_GT(inputs_.size(), input_index) << name;
+    const std::shared_ptr<XCVMVar>& input = inputs_[input_index];
+    CHECK(input) << "Input value not exist: " << name;
+    variables_[index].reset(new XCVMVar(*input));
 }
 
-void XCVMState::Output(const std::string& name, int index) {
+void XCVMState::Output(const std::string& name, int output_index, int index) {
     CHECK_LE(0, index) << index;
     CHECK_GT(variables_.size(), index) << index;
     CHECK(variables_[index].get()) << index;
-    CHECK(outputs_.emplace(name, std::shared_ptr<XCVMVar>(new XCVMVar(*variables_[index]))).second) << "Duplicated output name: " << name;
+    CHECK_LE(0, output_index) << name;
+    CHECK_GT(outputs_.size(), output_index) << name;
+    std::shared_ptr<XCVMVar>& output = outputs_[output_index];
+    CHECK(!output) << "Duplicated output name: " << name;
+    output.reset(new XCVMVar(*variables_[index]));
 }
 
 void XCVMState::ReportInvalidInOuts(const std::vector<int>& inputs, const std::vector<int>& outputs) {
@@ -1,5 +1,6 @@
 #pragma once
 
+#include <memory>
 #include <stack>
 #include <string>
 #include <vector>
@@ -15,12 +16,15 @@
 namespace chainer_compiler {
 namespace runtime {
 
+class XCVMArena;
 class XCVMOptions;
 class XCVMVar;
 
 class XCVMState {
 public:
-    XCVMState(const XCVMOptions& options, int num_variables, const InOuts& inputs);
+    // `inputs` and outputs are in the order of `XCVM::input_names`
+    // and `XCVM::output_names`.
+    XCVMState(const XCVMOptions& options, int num_variables, const std::vector<std::shared_ptr<XCVMVar>>& inputs, int num_outputs);
     ~XCVMState();
 
     int pc() const {
@@ -50,19 +54,32 @@ public:
     std::string GetVarString(int index);
     std::string GetVarListString(const std::vector<int>& indices);
 
-    void Input(const std::string& name, int index);
-    void Output(const std::string& name, int index);
+    // `name` is only for error messages.
+    void Input(const std::string& name, int input_index, int index);
+    void Output(const std::string& name, int output_index, int index);
 
-    const InOuts& GetOutputs() {
-        return std::move(outputs_);
+    // Outputs which are not produced by the run are null.
+    const std::vector<std::shared_ptr<XCVMVar>>& outputs() const {
+        return outputs_;
     }
 
+    std::vector<std::shared_ptr<XCVMVar>>* mutable_inputs() {
+        return &inputs_;
+    }
+
+    // Frees all variables and outputs so the program can run again
+    // with the same inputs.
+    void Reset();
+
     void CheckNans(const std::vector<int>& inputs, const std::vector<int>& outputs);
     void CheckInfs(const std::vector<int>& inputs, const std::vector<int>& outputs);
 
     const XCVMOptions& options() const {
         return options_;
     }
+    XCVMOptions* mutable_options() {
+        return &options_;
+    }
 
     int trace_level() const {
         return options_.trace_level;
@@ -83,6 +100,17 @@ public:
         program_ = program;
     }
 
+    void set_arena(XCVMArena* arena) {
+        arena_ = arena;
+    }
+
+    // Returns the array planned in the memory arena for the output
+    // `index` of the running instruction. Returns nullopt when the
+    // output is not placed or `shape`, `dtype`, or `device` differs
+    // from the plan, and then the op should allocate its output.
+    nonstd::optional<chainerx::Array> GetPlannedArray(
+            int index, const chainerx::Shape& shape, chainerx::Dtype dtype, const chainerx::Device& device);
+
     int64_t GetTotalVariableSize() const;
 
 private:
@@ -90,10 +118,11 @@ private:
 
     int pc_;
     std::vector<std::unique_ptr<XCVMVar>> variables_;
-    InOuts inputs_;
-    InOuts outputs_;
+    std::vector<std::shared_ptr<XCVMVar>> inputs_;
+    std::vector<std::shared_ptr<XCVMVar>> outputs_;
     XCVMOptions options_;
     const std::vector<std::unique_ptr<XCVMOp>>* program_;
+    XCVMArena* arena_{nullptr};
 };
 
 }  // namespace runtime
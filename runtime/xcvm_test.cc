@@ -1,11 +1,16 @@
 #include <iostream>
+#include <thread>
+#include <vector>
 
 #include <gtest/gtest.h>
 
 #include <chainerx/array.h>
 #include <chainerx/context.h>
 #include <chainerx/numeric.h>
+#include <chainerx/routines/connection.h>
 #include <chainerx/routines/creation.h>
+#include <chainerx/routines/manipulation.h>
+#include <chainerx/routines/math.h>
 #include <chainerx/testing/array.h>
 
 #include <compiler/gen_xcvm_codegen.h>
@@ -41,6 +46,516 @@ TEST(XCVMTest, Run) {
     EXPECT_TRUE(chainerx::AllClose(e, outputs["out"]->GetArray(), 0, 0));
 }
 
+TEST(XCVMTest, RunInParallel) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "in1");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(2), "in2");
+    // Two independent branches.
+    xcvm::AddAddOp(&program, xcvm::XCVMValue(3), 1, 2);
+    xcvm::AddMulOp(&program, xcvm::XCVMValue(4), 1, 2);
+    xcvm::AddFreeOp(&program, 1);
+    xcvm::AddFreeOp(&program, 2);
+    xcvm::AddSubOp(&program, xcvm::XCVMValue(5), 3, 4);
+    xcvm::AddFreeOp(&program, 3);
+    xcvm::AddFreeOp(&program, 4);
+    // Reuse a freed slot.
+    xcvm::AddIdentityOp(&program, xcvm::XCVMValue(1), 5);
+    xcvm::AddOutOp(&program, "out", 1);
+    xcvm::AddOutOp(&program, "out2", 5);
+
+    XCVM xcvm(program);
+    InOuts inputs;
+    chainerx::Array in1 = chainerx::Eye(2, nonstd::nullopt, nonstd::nullopt, chainerx::Dtype::kFloat32);
+    inputs.emplace("in1", std::shared_ptr<XCVMVar>(new XCVMVar(in1)));
+    inputs.emplace("in2", std::shared_ptr<XCVMVar>(new XCVMVar(chainerx::OnesLike(in1) * 2)));
+    XCVMOptions options;
+    options.num_threads = 4;
+    for (int i = 0; i < 10; ++i) {
+        InOuts outputs = xcvm.Run(inputs, options);
+        ASSERT_EQ(1, outputs.count("out"));
+        ASSERT_EQ(1, outputs.count("out2"));
+        chainerx::Array e = chainerx::testing::BuildArray({2, 2}).WithData<float>({1, 2, 2, 1});
+        EXPECT_TRUE(chainerx::AllClose(e, outputs["out"]->GetArray(), 0, 0));
+        EXPECT_TRUE(chainerx::AllClose(e, outputs["out2"]->GetArray(), 0, 0));
+    }
+}
+
+TEST(XCVMTest, RunConcurrently) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(0), "in1");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "in2");
+    xcvm::AddMulOp(&program, xcvm::XCVMValue(2), 0, 1);
+    xcvm::AddAddOp(&program, xcvm::XCVMValue(3), 2, 0);
+    xcvm::AddFreeOp(&program, 2);
+    xcvm::AddOutOp(&program, "out", 3);
+
+    XCVM xcvm(program);
+    const int kNumThreads = 8;
+    std::vector<std::thread> threads;
+    std::vector<chainerx::Array> results(kNumThreads);
+    for (int i = 0; i < kNumThreads; ++i) {
+        threads.emplace_back([&xcvm, &ctx, &results, i]() {
+            chainerx::ContextScope ctx_scope(ctx);
+            XCVMOptions options;
+            // Parallel runs share a thread pool for each number of
+            // threads and use pools of different sizes concurrently.
+            options.num_threads = i % 2 ? 2 + i % 4 : 0;
+            InOuts inputs;
+            inputs.emplace("in1", std::shared_ptr<XCVMVar>(new XCVMVar(chainerx::Full({2, 2}, i, chainerx::Dtype::kFloat32))));
+            inputs.emplace("in2", std::shared_ptr<XCVMVar>(new XCVMVar(chainerx::Full({2, 2}, 2, chainerx::Dtype::kFloat32))));
+            for (int j = 0; j < 10; ++j) {
+                InOuts outputs = xcvm.Run(inputs, options);
+                results[i] = outputs["out"]->GetArray();
+            }
+        });
+    }
+    for (std::thread& thread : threads) {
+        thread.join();
+    }
+    for (int i = 0; i < kNumThreads; ++i) {
+        chainerx::Array e = chainerx::Full({2, 2}, i * 3, chainerx::Dtype::kFloat32);
+        EXPECT_TRUE(chainerx::AllClose(e, results[i], 0, 0)) << i;
+    }
+}
+
+TEST(XCVMTest, MemoryArena) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(0), "in1");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "in2");
+    xcvm::AddMatMulOp(&program, xcvm::XCVMValue(2), 0, 1);
+    xcvm::AddAddOp(&program, xcvm::XCVMValue(3), 2, 1);
+    xcvm::AddFreeOp(&program, 2);
+    xcvm::AddMulOp(&program, xcvm::XCVMValue(4), 3, 3);
+    xcvm::AddFreeOp(&program, 3);
+    xcvm::AddOutOp(&program, "out", 4);
+
+    // Place the two temporary values planned for 2x2 inputs.
+    program.set_arena_size(32);
+    for (int pc : {2, 3}) {
+        XCInstructionProto* inst = program.mutable_instructions(pc);
+        XCTypeProto* type = inst->mutable_output_types(0);
+        type->set_dtype(static_cast<int>(chainerx::Dtype::kFloat32));
+        type->add_shape(2);
+        type->add_shape(2);
+        inst->add_output_offsets(pc == 2 ? 0 : 16);
+    }
+
+    XCVM xcvm(program);
+    // The arena is reused by the second run and 3x3 inputs are not
+    // placed in the arena.
+    for (int n : {2, 2, 3}) {
+        InOuts inputs;
+        chainerx::Array in1 = chainerx::Eye(n, nonstd::nullopt, nonstd::nullopt, chainerx::Dtype::kFloat32);
+        inputs.emplace("in1", std::shared_ptr<XCVMVar>(new XCVMVar(in1)));
+        inputs.emplace("in2", std::shared_ptr<XCVMVar>(new XCVMVar(chainerx::OnesLike(in1) * 2)));
+        InOuts outputs = xcvm.Run(inputs, XCVMOptions());
+        ASSERT_EQ(1, outputs.count("out"));
+        chainerx::Array e = chainerx::Full({n, n}, 16, chainerx::Dtype::kFloat32);
+        EXPECT_TRUE(chainerx::AllClose(e, outputs["out"]->GetArray(), 0, 0));
+    }
+}
+
+TEST(XCVMTest, MemoryArenaGroupedConv) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(0), "x");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "z");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(2), "w");
+    xcvm::AddAddOp(&program, xcvm::XCVMValue(3), 0, 1);
+    xcvm::AddGroupedConvOp(&program, xcvm::XCVMValue(4), 3, 2, -1, {1, 1}, {1, 1}, 2);
+    xcvm::AddFreeOp(&program, 3);
+    xcvm::AddOutOp(&program, "y", 4);
+
+    // The output of Add is placed in the middle of the arena and
+    // read by the native grouped convolution kernel.
+    const int64_t offset = 64;
+    program.set_arena_size(offset + 4 * 5 * 6 * 4);
+    XCInstructionProto* inst = program.mutable_instructions(3);
+    XCTypeProto* type = inst->mutable_output_types(0);
+    type->set_dtype(static_cast<int>(chainerx::Dtype::kFloat32));
+    for (int64_t d : {1, 4, 5, 6}) type->add_shape(d);
+    inst->add_output_offsets(offset);
+
+    XCVM xcvm(program);
+    chainerx::Array x = chainerx::testing::BuildArray({1, 4, 5, 6}).WithLinearData<float>(-3, 0.125);
+    chainerx::Array z = chainerx::OnesLike(x);
+    chainerx::Array w = chainerx::testing::BuildArray({4, 2, 3, 3}).WithLinearData<float>(-2, 0.25);
+    InOuts inputs;
+    inputs.emplace("x", std::shared_ptr<XCVMVar>(new XCVMVar(x)));
+    inputs.emplace("z", std::shared_ptr<XCVMVar>(new XCVMVar(z)));
+    inputs.emplace("w", std::shared_ptr<XCVMVar>(new XCVMVar(w)));
+    InOuts outputs = xcvm.Run(inputs, XCVMOptions());
+    ASSERT_EQ(1, outputs.count("y"));
+
+    chainerx::Array xz = x + z;
+    std::vector<chainerx::Array> ys;
+    for (int64_t i = 0; i < 2; ++i) {
+        const chainerx::Slice channels(i * 2, i * 2 + 2);
+        ys.push_back(chainerx::Conv(xz.At({chainerx::Slice(), channels}), w.At({channels}), nonstd::nullopt, {1, 1}, {1, 1}));
+    }
+    EXPECT_TRUE(chainerx::AllClose(chainerx::Concatenate(ys, 1), outputs["y"]->GetArray(), 1e-5, 1e-5));
+}
+
+TEST(XCVMTest, ElementWiseCpu) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(0), "in1");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "in2");
+    // out1 = in1 * 0.5 + in2, out2 = tanh(out1)
+    const std::string code = "const 2 0.5\nmul 3 0 2\nadd 4 3 1\ntanh 5 4\nout 4\nout 5\n";
+    xcvm::AddElementWiseCpuOp(&program, {xcvm::XCVMValue(2), xcvm::XCVMValue(3)}, {0, 1}, 2, code);
+    xcvm::AddOutOp(&program, "out1", 2);
+    xcvm::AddOutOp(&program, "out2", 3);
+
+    XCVM xcvm(program);
+    InOuts inputs;
+    chainerx::Array in1 = chainerx::Eye(2, nonstd::nullopt, nonstd::nullopt, chainerx::Dtype::kFloat32);
+    inputs.emplace("in1", std::shared_ptr<XCVMVar>(new XCVMVar(in1)));
+    // A scalar input is broadcasted.
+    inputs.emplace("in2", std::shared_ptr<XCVMVar>(new XCVMVar(chainerx::Full(chainerx::Shape{}, 2, chainerx::Dtype::kFloat32))));
+    InOuts outputs = xcvm.Run(inputs, XCVMOptions());
+    ASSERT_EQ(1, outputs.count("out1"));
+    ASSERT_EQ(1, outputs.count("out2"));
+    chainerx::Array e = chainerx::testing::BuildArray({2, 2}).WithData<float>({2.5, 2, 2, 2.5});
+    EXPECT_TRUE(chainerx::AllClose(e, outputs["out1"]->GetArray(), 0, 0));
+    EXPECT_TRUE(chainerx::AllClose(chainerx::Tanh(e), outputs["out2"]->GetArray(), 1e-6, 1e-6));
+}
+
+TEST(XCVMTest, ElementWiseCpuBroadcastAndMemoryArena) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(0), "x");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "b");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(2), "t");
+    xcvm::AddAddOp(&program, xcvm::XCVMValue(3), 0, 0);
+    // y = (x + x) * b + t
+    xcvm::AddElementWiseCpuOp(&program, {xcvm::XCVMValue(4)}, {3, 1, 2}, 1, "mul 3 0 1\nadd 4 3 2\nout 4\n");
+    xcvm::AddFreeOp(&program, 3);
+    xcvm::AddOutOp(&program, "y", 4);
+
+    // Both the input and the output of the fused op are planned at
+    // non-zero offsets.
+    const int64_t kBytes = 2 * 3 * 4 * 4;
+    program.set_arena_size(kBytes * 3);
+    for (int pc : {3, 4}) {
+        XCInstructionProto* inst = program.mutable_instructions(pc);
+        XCTypeProto* type = inst->mutable_output_types(0);
+        type->set_dtype(static_cast<int>(chainerx::Dtype::kFloat32));
+        for (int64_t d : {2, 3, 4}) type->add_shape(d);
+        inst->add_output_offsets(pc == 3 ? kBytes : kBytes * 2);
+    }
+
+    XCVM xcvm(program);
+    chainerx::Array x = chainerx::testing::BuildArray({2, 3, 4}).WithLinearData<float>(-3, 0.25);
+    // A bias broadcasted to the first and the last axes.
+    chainerx::Array b = chainerx::testing::BuildArray({3, 1}).WithData<float>({1, 2, 3});
+    // A non-contiguous input.
+    chainerx::Array t = chainerx::Transpose(chainerx::testing::BuildArray({4, 3, 2}).WithLinearData<float>());
+    InOuts inputs;
+    inputs.emplace("x", std::shared_ptr<XCVMVar>(new XCVMVar(x)));
+    inputs.emplace("b", std::shared_ptr<XCVMVar>(new XCVMVar(b)));
+    inputs.emplace("t", std::shared_ptr<XCVMVar>(new XCVMVar(t)));
+    for (int i = 0; i < 2; ++i) {
+        InOuts outputs = xcvm.Run(inputs, XCVMOptions());
+        ASSERT_EQ(1, outputs.count("y"));
+        EXPECT_TRUE(chainerx::AllClose((x + x) * b + t, outputs["y"]->GetArray(), 1e-6, 1e-6));
+    }
+}
+
+TEST(XCVMTest, GroupedConv) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(0), "x");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "w");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(2), "b");
+    xcvm::AddGroupedConvOp(&program, xcvm::XCVMValue(3), 0, 1, 2, {2, 1}, {1, 1}, 2);
+    xcvm::AddGroupedConvGradWeightOp(&program, xcvm::XCVMValue(4), 1, 0, 3, {2, 1}, {1, 1}, 2);
+    xcvm::AddOutOp(&program, "y", 3);
+    xcvm::AddOutOp(&program, "gw", 4);
+
+    XCVM xcvm(program);
+    chainerx::Array x = chainerx::testing::BuildArray({1, 4, 5, 6}).WithLinearData<float>(-3, 0.125);
+    chainerx::Array w = chainerx::testing::BuildArray({4, 2, 3, 3}).WithLinearData<float>(-2, 0.25);
+    chainerx::Array b = chainerx::testing::BuildArray({4}).WithLinearData<float>();
+    InOuts inputs;
+    inputs.emplace("x", std::shared_ptr<XCVMVar>(new XCVMVar(x)));
+    inputs.emplace("w", std::shared_ptr<XCVMVar>(new XCVMVar(w)));
+    inputs.emplace("b", std::shared_ptr<XCVMVar>(new XCVMVar(b)));
+    InOuts outputs = xcvm.Run(inputs, XCVMOptions());
+    ASSERT_EQ(1, outputs.count("y"));
+    ASSERT_EQ(1, outputs.count("gw"));
+
+    // Each group has two input and two output channels.
+    std::vector<chainerx::Array> ys;
+    std::vector<chainerx::Array> gws;
+    for (int64_t i = 0; i < 2; ++i) {
+        const chainerx::Slice channels(i * 2, i * 2 + 2);
+        chainerx::Array xi = x.At({chainerx::Slice(), channels});
+        chainerx::Array yi = chainerx::Conv(xi, w.At({channels}), b.At({channels}), {2, 1}, {1, 1});
+        ys.push_back(yi);
+        gws.push_back(x.device().ConvGradWeight(w.dtype(), {2, 2, 3, 3}, xi, yi, {2, 1}, {1, 1}, false /* cover_all */));
+    }
+    chainerx::Array y = chainerx::Concatenate(ys, 1);
+    EXPECT_TRUE(chainerx::AllClose(y, outputs["y"]->GetArray(), 1e-5, 1e-5));
+    EXPECT_TRUE(chainerx::AllClose(chainerx::Concatenate(gws, 0), outputs["gw"]->GetArray(), 1e-5, 1e-5));
+}
+
+TEST(XCVMTest, GroupedConvAfterSplit) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(0), "x");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "w");
+    // The second half of channels is a contiguous view with an offset
+    // for batch size 1.
+    xcvm::AddSplitOp(&program, {xcvm::XCVMValue(2), xcvm::XCVMValue(3)}, 0, 1, {2, 2});
+    xcvm::AddGroupedConvOp(&program, xcvm::XCVMValue(4), 3, 1, -1, {1, 1}, {1, 1}, 2);
+    xcvm::AddOutOp(&program, "y", 4);
+
+    XCVM xcvm(program);
+    chainerx::Array x = chainerx::testing::BuildArray({1, 4, 5, 6}).WithLinearData<float>(-3, 0.125);
+    // A depthwise convolution.
+    chainerx::Array w = chainerx::testing::BuildArray({2, 1, 3, 3}).WithLinearData<float>(-2, 0.25);
+    InOuts inputs;
+    inputs.emplace("x", std::shared_ptr<XCVMVar>(new XCVMVar(x)));
+    inputs.emplace("w", std::shared_ptr<XCVMVar>(new XCVMVar(w)));
+    InOuts outputs = xcvm.Run(inputs, XCVMOptions());
+    ASSERT_EQ(1, outputs.count("y"));
+
+    std::vector<chainerx::Array> ys;
+    for (int64_t i = 0; i < 2; ++i) {
+        chainerx::Array xi = x.At({chainerx::Slice(), chainerx::Slice(2 + i, 3 + i)});
+        ys.push_back(chainerx::Conv(xi, w.At({chainerx::Slice(i, i + 1)}), nonstd::nullopt, {1, 1}, {1, 1}));
+    }
+    EXPECT_TRUE(chainerx::AllClose(chainerx::Concatenate(ys, 1), outputs["y"]->GetArray(), 1e-5, 1e-5));
+}
+
+TEST(XCVMTest, NStepLSTM) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    const std::vector<std::string> names = {"x", "lens", "w0", "r0", "b0", "w1", "r1", "b1", "shape"};
+    for (size_t i = 0; i < names.size(); ++i) {
+        xcvm::AddInOp(&program, xcvm::XCVMValue(i), names[i]);
+    }
+    // Two bidirectional layers with hidden_size=2.
+    xcvm::AddNStepLSTMOp(
+            &program, xcvm::XCVMValue(10), xcvm::XCVMValue(11), xcvm::XCVMValue(12), xcvm::XCVMValue(-1), 0, 1, {2, 3, 4, 5, 6, 7}, 2, 2);
+    // The same computation by LSTM ops.
+    xcvm::AddTransposeOp(&program, xcvm::XCVMValue(20), 0, {1, 0, 2});
+    xcvm::AddLSTMOp(
+            &program, xcvm::XCVMValue(21), xcvm::XCVMValue(22), xcvm::XCVMValue(23), xcvm::XCVMValue(-1), 20, 2, 3, 4, 1, -1, -1, -1, 2, 2);
+    xcvm::AddTransposeOp(&program, xcvm::XCVMValue(24), 21, {0, 2, 1, 3});
+    xcvm::AddReshapeOp(&program, xcvm::XCVMValue(25), 24, 8);
+    xcvm::AddLSTMOp(
+            &program, xcvm::XCVMValue(26), xcvm::XCVMValue(27), xcvm::XCVMValue(28), xcvm::XCVMValue(-1), 25, 5, 6, 7, 1, -1, -1, -1, 2, 2);
+    xcvm::AddOutOp(&program, "y", 10);
+    xcvm::AddOutOp(&program, "h", 11);
+    xcvm::AddOutOp(&program, "c", 12);
+    xcvm::AddOutOp(&program, "ref_y", 26);
+    xcvm::AddOutOp(&program, "ref_h0", 22);
+    xcvm::AddOutOp(&program, "ref_c0", 23);
+    xcvm::AddOutOp(&program, "ref_h1", 27);
+    xcvm::AddOutOp(&program, "ref_c1", 28);
+
+    XCVM xcvm(program);
+    // The second sequence is shorter than the first one.
+    std::vector<chainerx::Array> arrays = {
+            chainerx::testing::BuildArray({2, 3, 2}).WithLinearData<float>(-1, 0.125),
+            chainerx::testing::BuildArray({2}).WithData<int64_t>({3, 1}),
+            chainerx::testing::BuildArray({2, 8, 2}).WithLinearData<float>(-1, 0.0625),
+            chainerx::testing::BuildArray({2, 8, 2}).WithLinearData<float>(-0.5, 0.03125),
+            chainerx::testing::BuildArray({2, 16}).WithLinearData<float>(-0.5, 0.03125),
+            chainerx::testing::BuildArray({2, 8, 4}).WithLinearData<float>(1, -0.03125),
+            chainerx::testing::BuildArray({2, 8, 2}).WithLinearData<float>(0.5, -0.03125),
+            chainerx::testing::BuildArray({2, 16}).WithLinearData<float>(0.5, -0.03125),
+            chainerx::testing::BuildArray({3}).WithData<int64_t>({3, 2, 4}),
+    };
+    InOuts inputs;
+    for (size_t i = 0; i < names.size(); ++i) {
+        inputs.emplace(names[i], std::shared_ptr<XCVMVar>(new XCVMVar(arrays[i])));
+    }
+    InOuts outputs = xcvm.Run(inputs, XCVMOptions());
+
+    // [seq_length, num_directions, batch_size, hidden_size] to
+    // [batch_size, seq_length, num_directions * hidden_size].
+    chainerx::Array ref_y = chainerx::Reshape(chainerx::Transpose(outputs["ref_y"]->GetArray(), {2, 0, 1, 3}), {2, 3, 4});
+    chainerx::Array ref_h = chainerx::Concatenate({outputs["ref_h0"]->GetArray(), outputs["ref_h1"]->GetArray()}, 0);
+    chainerx::Array ref_c = chainerx::Concatenate({outputs["ref_c0"]->GetArray(), outputs["ref_c1"]->GetArray()}, 0);
+    EXPECT_TRUE(chainerx::AllClose(ref_y, outputs["y"]->GetArray(), 1e-5, 1e-5));
+    EXPECT_TRUE(chainerx::AllClose(ref_h, outputs["h"]->GetArray(), 1e-5, 1e-5));
+    EXPECT_TRUE(chainerx::AllClose(ref_c, outputs["c"]->GetArray(), 1e-5, 1e-5));
+}
+
+TEST(XCVMTest, ScanBuffer) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    const std::vector<std::string> names = {"x0", "x1", "x2"};
+    for (size_t i = 0; i < names.size(); ++i) {
+        xcvm::AddInOp(&program, xcvm::XCVMValue(i), names[i]);
+    }
+    // No capacity hint so the buffer grows twice.
+    xcvm::AddScanBufferCreateOp(&program, xcvm::XCVMValue(3), -1);
+    for (int i = 0; i < 3; ++i) {
+        xcvm::AddScanBufferAppendOp(&program, 3, i);
+    }
+    xcvm::AddScanBufferStackOp(&program, xcvm::XCVMValue(4), 3, 0);
+    xcvm::AddScanBufferStackOp(&program, xcvm::XCVMValue(5), 3, 1);
+    // Stacked values do not change by later appends.
+    xcvm::AddScanBufferAppendOp(&program, 3, 0);
+    xcvm::AddOutOp(&program, "y0", 4);
+    xcvm::AddOutOp(&program, "y1", 5);
+
+    XCVM xcvm(program);
+    std::vector<chainerx::Array> xs;
+    InOuts inputs;
+    for (int i = 0; i < 3; ++i) {
+        xs.push_back(chainerx::testing::BuildArray({2, 3}).WithLinearData<float>(i * 6));
+        inputs.emplace(names[i], std::shared_ptr<XCVMVar>(new XCVMVar(xs.back())));
+    }
+    InOuts outputs = xcvm.Run(inputs, XCVMOptions());
+    EXPECT_TRUE(chainerx::AllClose(chainerx::Stack(xs, 0), outputs["y0"]->GetArray(), 0, 0));
+    EXPECT_TRUE(chainerx::AllClose(chainerx::Stack(xs, 1), outputs["y1"]->GetArray(), 0, 0));
+    EXPECT_TRUE(outputs["y1"]->GetArray().IsContiguous());
+}
+
+TEST(XCVMTest, ScanBufferInParallelLoop) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    const int kInt64 = static_cast<int>(chainerx::Dtype::kInt64);
+    const int kBool = static_cast<int>(chainerx::Dtype::kBool);
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(0), "x");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "n");
+    xcvm::AddIntScalarConstantOp(&program, xcvm::XCVMValue(2), 0, kInt64, true);
+    xcvm::AddIntScalarConstantOp(&program, xcvm::XCVMValue(3), 1, kInt64, true);
+    xcvm::AddIntScalarConstantOp(&program, xcvm::XCVMValue(9), 1, kBool, true);
+    xcvm::AddScanBufferCreateOp(&program, xcvm::XCVMValue(4), -1);
+    xcvm::AddScanBufferCreateOp(&program, xcvm::XCVMValue(5), -1);
+    // The loop body. Two appends to the same buffer in a basic block
+    // must keep their order.
+    const int body = program.instructions_size();
+    xcvm::AddFreeOp(&program, 9);
+    xcvm::AddMulOp(&program, xcvm::XCVMValue(6), 0, 2);
+    xcvm::AddAddOp(&program, xcvm::XCVMValue(7), 6, 0);
+    xcvm::AddScanBufferAppendOp(&program, 4, 6);
+    xcvm::AddScanBufferAppendOp(&program, 4, 7);
+    xcvm::AddScanBufferAppendOp(&program, 5, 7);
+    xcvm::AddFreeOp(&program, 6);
+    xcvm::AddFreeOp(&program, 7);
+    xcvm::AddAddOp(&program, xcvm::XCVMValue(8), 2, 3);
+    xcvm::AddFreeOp(&program, 2);
+    xcvm::AddIdentityOp(&program, xcvm::XCVMValue(2), 8);
+    xcvm::AddFreeOp(&program, 8);
+    xcvm::AddGreaterOp(&program, xcvm::XCVMValue(9), 1, 2);
+    xcvm::AddJmpTrueOp(&program, 9, body);
+    xcvm::AddScanBufferStackOp(&program, xcvm::XCVMValue(10), 4, 0);
+    xcvm::AddScanBufferStackOp(&program, xcvm::XCVMValue(11), 5, 1);
+    xcvm::AddOutOp(&program, "y0", 10);
+    xcvm::AddOutOp(&program, "y1", 11);
+
+    XCVM xcvm(program);
+    const int n = 5;
+    chainerx::Array x = chainerx::testing::BuildArray({2, 3}).WithLinearData<float>(1);
+    InOuts inputs;
+    inputs.emplace("x", std::shared_ptr<XCVMVar>(new XCVMVar(x)));
+    inputs.emplace("n", std::shared_ptr<XCVMVar>(new XCVMVar(chainerx::Full({}, n, chainerx::Dtype::kInt64))));
+    std::vector<chainerx::Array> ys0, ys1;
+    for (int i = 0; i < n; ++i) {
+        ys0.push_back(x * i);
+        ys0.push_back(x * (i + 1));
+        ys1.push_back(x * (i + 1));
+    }
+
+    XCVMOptions options;
+    options.num_threads = 4;
+    for (int i = 0; i < 10; ++i) {
+        InOuts outputs = xcvm.Run(inputs, options);
+        ASSERT_EQ(1, outputs.count("y0"));
+        ASSERT_EQ(1, outputs.count("y1"));
+        EXPECT_TRUE(chainerx::AllClose(chainerx::Stack(ys0, 0), outputs["y0"]->GetArray(), 0, 0));
+        EXPECT_TRUE(chainerx::AllClose(chainerx::Stack(ys1, 1), outputs["y1"]->GetArray(), 0, 0));
+    }
+}
+
+TEST(XCVMTest, BatchNormalizationInParallel) {
+    chainerx::Context ctx;
+    chainerx::ContextScope ctx_scope(ctx);
+
+    XCProgramProto program;
+    xcvm::AddInOp(&program, xcvm::XCVMValue(0), "x");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(1), "s");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(2), "bias");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(3), "mean");
+    xcvm::AddInOp(&program, xcvm::XCVMValue(4), "var");
+    // The running mean is read before and after it is updated in place.
+    xcvm::AddMulOp(&program, xcvm::XCVMValue(5), 3, 1);
+    xcvm::AddBatchNormalizationOp(
+            &program,
+            xcvm::XCVMValue(6),
+            xcvm::XCVMValue(7),
+            xcvm::XCVMValue(),
+            xcvm::XCVMValue(),
+            xcvm::XCVMValue(),
+            xcvm::XCVMValue(),
+            0,
+            1,
+            2,
+            3,
+            4,
+            1e-5,
+            0.5,
+            0);
+    xcvm::AddMulOp(&program, xcvm::XCVMValue(8), 3, 1);
+    xcvm::AddFreeOp(&program, 7);
+    xcvm::AddOutOp(&program, "before", 5);
+    xcvm::AddOutOp(&program, "after", 8);
+    xcvm::AddOutOp(&program, "y", 6);
+
+    XCVM xcvm(program);
+    XCVMOptions options;
+    options.is_training = true;
+    options.num_threads = 4;
+    for (int i = 0; i < 10; ++i) {
+        chainerx::Array x = chainerx::testing::BuildArray({4, 2}).WithLinearData<float>(1);
+        chainerx::Array mean = chainerx::Zeros({2}, chainerx::Dtype::kFloat32);
+        InOuts inputs;
+        inputs.emplace("x", std::shared_ptr<XCVMVar>(new XCVMVar(x)));
+        inputs.emplace("s", std::shared_ptr<XCVMVar>(new XCVMVar(chainerx::Ones({2}, chainerx::Dtype::kFloat32))));
+        inputs.emplace("bias", std::shared_ptr<XCVMVar>(new XCVMVar(chainerx::Zeros({2}, chainerx::Dtype::kFloat32))));
+        inputs.emplace("mean", std::shared_ptr<XCVMVar>(new XCVMVar(mean)));
+        inputs.emplace("var", std::shared_ptr<XCVMVar>(new XCVMVar(chainerx::Ones({2}, chainerx::Dtype::kFloat32))));
+        InOuts outputs = xcvm.Run(inputs, options);
+        ASSERT_EQ(1, outputs.count("before"));
+        ASSERT_EQ(1, outputs.count("after"));
+        EXPECT_TRUE(chainerx::AllClose(chainerx::Zeros({2}, chainerx::Dtype::kFloat32), outputs["before"]->GetArray(), 0, 0));
+        EXPECT_FALSE(chainerx::AllClose(chainerx::Zeros({2}, chainerx::Dtype::kFloat32), mean, 0, 0));
+        EXPECT_TRUE(chainerx::AllClose(mean, outputs["after"]->GetArray(), 0, 0));
+    }
+}
+
 }  // namespace
 }  // namespace runtime
 }  // namespace chainer_compiler
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+#
+# A load generator for XCVMBatcher. Concurrent clients send
+# single-row requests and throughput and latency are reported for
+# each batch size limit.
+#
+# Usage: batcher_benchmark.py out/onnx_real_resnet50/model.onnx \
+#            --batch_limits 1,8,32 --clients 64
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import chainerx
+import numpy as np
+import onnx
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(project_root, 'build/python'))
+sys.path.append(os.path.join(project_root, 'python'))
+
+import chainer_compiler_core
+
+
+def get_input_shapes(onnx_path, input_names):
+    model = onnx.load(onnx_path)
+    shapes = {}
+    for input in model.graph.input:
+        if input.name not in input_names:
+            continue
+        tensor_type = input.type.tensor_type
+        dtype = onnx.mapping.TENSOR_TYPE_TO_NP_TYPE[tensor_type.elem_type]
+        shape = tuple(d.dim_value for d in tensor_type.shape.dim)
+        shapes[input.name] = (shape, dtype)
+    return [shapes[name] for name in input_names]
+
+
+def run_clients(batcher, requests, num_clients, num_requests):
+    latencies = []
+    lock = threading.Lock()
+    counter = [0]
+
+    def client(inputs):
+        while True:
+            with lock:
+                if counter[0] >= num_requests:
+                    return
+                counter[0] += 1
+            start = time.time()
+            batcher.run(inputs)
+            elapsed = time.time() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client,
+                                args=(requests[i % len(requests)],))
+               for i in range(num_clients)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.time() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark XCVMBatcher')
+    parser.add_argument('onnx', help='ONNX model')
+    parser.add_argument('--batch_limits', default='1,4,16,32',
+                        help='Comma separated max batch sizes')
+    parser.add_argument('--clients', type=int, default=32,
+                        help='The number of concurrent clients')
+    parser.add_argument('--requests', type=int, default=1000,
+                        help='The number of requests for each batch limit')
+    parser.add_argument('--timeout_usec', type=int, default=1000,
+                        help='Max wait time to fill a batch')
+    parser.add_argument('--device', '-d', default='native',
+                        help='ChainerX device to be used')
+    parser.add_argument('--num_threads', type=int, default=0,
+                        help='The number of threads to run XCVM ops')
+    parser.add_argument('--num_workers', type=int, default=1,
+                        help='The number of batches run concurrently')
+    parser.add_argument('--no_padding', action='store_true',
+                        help='Do not pad batches to the batch size of '
+                        'the model')
+    args = parser.parse_args()
+
+    chainerx.set_default_device(args.device)
+    graph = chainer_compiler_core.load(args.onnx)
+    input_names = graph.input_names()
+    xcvm = graph.compile(use_cuda=args.device.startswith('cuda'))
+    params = graph.params()
+
+    input_shapes = get_input_shapes(args.onnx, input_names)
+    model_batch_size = input_shapes[0][0][0]
+    padded_batch_size = 0 if args.no_padding else model_batch_size
+
+    requests = []
+    for i in range(args.clients):
+        inputs = []
+        for shape, dtype in input_shapes:
+            a = np.random.rand(1, *shape[1:]).astype(dtype)
+            inputs.append(chainer_compiler_core.value(chainerx.array(a)))
+        requests.append(inputs)
+
+    print('batch_limit  throughput(req/s)  p50(ms)  p99(ms)  avg_batch')
+    for batch_limit in map(int, args.batch_limits.split(',')):
+        if padded_batch_size and batch_limit > padded_batch_size:
+            print('Skipping batch limit %d larger than the model batch '
+                  'size %d' % (batch_limit, padded_batch_size))
+            continue
+        batcher = xcvm.batcher(input_names, params,
+                               max_batch_size=batch_limit,
+                               timeout_usec=args.timeout_usec,
+                               padded_batch_size=padded_batch_size,
+                               num_threads=args.num_threads,
+                               num_workers=args.num_workers)
+        # Warm up.
+        batcher.run(requests[0])
+
+        elapsed, latencies = run_clients(batcher, requests,
+                                         args.clients, args.requests)
+        num_batches = batcher.num_batches() - 1
+        num_requests = batcher.num_requests() - 1
+        p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+        print('%11d  %17.1f  %7.2f  %7.2f  %9.2f' %
+              (batch_limit, len(latencies) / elapsed, p50, p99,
+               num_requests / max(num_batches, 1)))
+        del batcher
+
+
+if __name__ == '__main__':
+    main()
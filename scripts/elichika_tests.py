@@ -27,6 +27,7 @@ TESTS = [
     Generator('node', 'NpArray'),
     Generator('node', 'Shape'),
     Generator('node', 'PadSequence'),
+    Generator('node', 'NStepLSTM'),
 
     Generator('syntax', 'Cmp'),
     # Generator('syntax', 'For'),
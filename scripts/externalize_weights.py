@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+#
+# Moves initializers of an ONNX model to a single weights file using
+# ONNX's external data. Each tensor is aligned so the runtime can
+# mmap the file and use the weights without copying them.
+#
+# Usage: externalize_weights.py model.onnx out/model.onnx
+#
+# This writes out/model.onnx and out/model.onnx.weights.
+
+import argparse
+import os
+
+import onnx
+from onnx import numpy_helper
+
+ALIGNMENT = 64
+
+
+def externalize(tensor, weights, location, min_size):
+    if tensor.data_location == onnx.TensorProto.EXTERNAL:
+        return
+    array = numpy_helper.to_array(tensor)
+    if array.nbytes < min_size or array.dtype == object:
+        return
+    data = array.tobytes()
+    offset = weights.tell()
+    padding = -offset % ALIGNMENT
+    weights.write(b'\0' * padding)
+    offset += padding
+    weights.write(data)
+
+    name = tensor.name
+    tensor.Clear()
+    tensor.name = name
+    tensor.data_type = onnx.mapping.NP_TYPE_TO_TENSOR_TYPE[array.dtype]
+    tensor.dims.extend(array.shape)
+    tensor.data_location = onnx.TensorProto.EXTERNAL
+    for key, value in [('location', location),
+                       ('offset', str(offset)),
+                       ('length', str(len(data)))]:
+        entry = tensor.external_data.add()
+        entry.key = key
+        entry.value = value
+
+
+def externalize_graph(graph, weights, location, min_size):
+    for tensor in graph.initializer:
+        externalize(tensor, weights, location, min_size)
+    for node in graph.node:
+        for attr in node.attribute:
+            if attr.type == onnx.AttributeProto.GRAPH:
+                externalize_graph(attr.g, weights, location, min_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Move initializers to an external weights file')
+    parser.add_argument('input', help='Input ONNX model')
+    parser.add_argument('output', help='Output ONNX model')
+    parser.add_argument('--min_size', type=int, default=1024,
+                        help='Tensors smaller than this (in bytes) are '
+                        'kept in the model')
+    args = parser.parse_args()
+
+    model = onnx.load(args.input)
+    weights_path = args.output + '.weights'
+    # Locations are relative to the directory of the model.
+    location = os.path.basename(weights_path)
+    with open(weights_path, 'wb') as weights:
+        externalize_graph(model.graph, weights, location, args.min_size)
+    with open(args.output, 'wb') as f:
+        f.write(model.SerializeToString())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+#
+# Compares the native grouped Conv ops with the expansion of grouped
+# Conv into Split/Conv/Concat. The "xcvm" backend uses the native ops
+# and the "xcvm_test" backend expands grouped Conv. Other differences
+# between the two backends do not matter for ResNeXt50.
+#
+# Usage: grouped_conv_benchmark.py --batchsize 8 --iterations 10
+#        grouped_conv_benchmark.py out/resnext50/model.onnx
+
+import argparse
+import os
+import sys
+import time
+
+import chainer
+import chainerx
+import numpy as np
+import onnx
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(project_root, 'build/python'))
+sys.path.append(os.path.join(project_root, 'python'))
+sys.path.append(os.path.join(project_root, 'examples/imagenet'))
+
+import chainer_compiler_core
+
+
+def export_resnext50(onnx_path, batchsize):
+    import onnx_chainer
+    import resnext50
+
+    class ResNeXt50Predictor(resnext50.ResNeXt50):
+        """Outputs logits instead of the loss."""
+
+        def forward(self, x):
+            h = self.bn1(self.conv1(x))
+            h = chainer.functions.max_pooling_2d(
+                chainer.functions.relu(h), 3, stride=2)
+            h = self.res2(h)
+            h = self.res3(h)
+            h = self.res4(h)
+            h = self.res5(h)
+            h = chainer.functions.average_pooling_2d(h, 7, stride=1)
+            return self.fc(h)
+
+    model = ResNeXt50Predictor()
+    x = np.random.rand(batchsize, 3, model.insize,
+                       model.insize).astype(np.float32)
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    with chainer.using_config('train', False):
+        onnx_chainer.export(model, x, filename=onnx_path)
+
+
+def get_input_shapes(onnx_path, input_names):
+    model = onnx.load(onnx_path)
+    shapes = {}
+    for input in model.graph.input:
+        if input.name not in input_names:
+            continue
+        tensor_type = input.type.tensor_type
+        dtype = onnx.mapping.TENSOR_TYPE_TO_NP_TYPE[tensor_type.elem_type]
+        shape = tuple(d.dim_value for d in tensor_type.shape.dim)
+        shapes[input.name] = (shape, dtype)
+    return [shapes[name] for name in input_names]
+
+
+def run(onnx_path, backend, args):
+    graph = chainer_compiler_core.load(onnx_path)
+    input_names = graph.input_names()
+    output_names = graph.output_names()
+    start = time.time()
+    xcvm = graph.compile(backend_name=backend,
+                         use_cuda=args.device.startswith('cuda'))
+    compile_sec = time.time() - start
+    inputs = dict(graph.params())
+    rng = np.random.RandomState(42)
+    for name, (shape, dtype) in zip(
+            input_names, get_input_shapes(onnx_path, input_names)):
+        a = rng.rand(*shape).astype(dtype)
+        inputs[name] = chainer_compiler_core.value(chainerx.array(a))
+
+    # Warm up.
+    outputs = xcvm.run(inputs)
+    elapsed = []
+    for i in range(args.iterations):
+        start = time.time()
+        outputs = xcvm.run(inputs)
+        chainerx.get_default_device().synchronize()
+        elapsed.append(time.time() - start)
+    output = chainerx.to_numpy(outputs[output_names[0]].array())
+    return compile_sec, elapsed, output
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark native grouped Conv against its expansion')
+    parser.add_argument('onnx', nargs='?', default='out/resnext50/model.onnx',
+                        help='ONNX model. ResNeXt50 in examples/imagenet '
+                        'is exported if this does not exist')
+    parser.add_argument('--batchsize', '-B', type=int, default=8,
+                        help='The batch size of the exported model')
+    parser.add_argument('--iterations', '-I', type=int, default=10,
+                        help='The number of iterations')
+    parser.add_argument('--device', '-d', default='native',
+                        help='ChainerX device to be used')
+    args = parser.parse_args()
+
+    chainerx.set_default_device(args.device)
+    if not os.path.exists(args.onnx):
+        print('Exporting ResNeXt50 to %s...' % args.onnx)
+        export_resnext50(args.onnx, args.batchsize)
+
+    results = {}
+    print('%-10s %-12s %12s %12s %12s' %
+          ('backend', 'grouped_conv', 'compile(s)', 'mean(ms)', 'min(ms)'))
+    for backend, desc in [('xcvm', 'native'), ('xcvm_test', 'expanded')]:
+        compile_sec, elapsed, output = run(args.onnx, backend, args)
+        results[backend] = output
+        elapsed = np.array(elapsed) * 1000
+        print('%-10s %-12s %12.2f %12.2f %12.2f' %
+              (backend, desc, compile_sec, elapsed.mean(), elapsed.min()))
+
+    np.testing.assert_allclose(results['xcvm'], results['xcvm_test'],
+                               rtol=1e-3, atol=1e-4)
+
+
+if __name__ == '__main__':
+    main()
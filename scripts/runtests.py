@@ -46,6 +46,10 @@ parser.add_argument('--failure_log', default='out/failed_tests.log',
                     help='The file where names of failed tests are stored')
 parser.add_argument('--fuse', action='store_true', help='Enable fusion')
 parser.add_argument('--ngraph', action='store_true', help='Enable nGraph')
+parser.add_argument('--reuse_variable_slots', action='store_true',
+                    help='Enable register allocation of XCVM variables')
+parser.add_argument('--use_memory_arena', action='store_true',
+                    help='Place intermediate values in a memory arena')
 parser.add_argument('--computation_order', default=None,
                     help='Force setting --computation_order flag')
 parser.add_argument('--verbose', action='store_true',
@@ -724,9 +728,15 @@ def main():
             test_case.args.append('--fuse_operations')
             if is_gpu:
                 test_case.args.append('--use_nvrtc')
+            else:
+                test_case.args.append('--use_cpu_fusion')
         if args.ngraph:
             test_case.args.append('--fuse_operations')
             test_case.args.append('--use_ngraph')
+        if args.reuse_variable_slots:
+            test_case.args.append('--reuse_variable_slots')
+        if args.use_memory_arena:
+            test_case.args.append('--use_memory_arena')
 
         if is_gpu:
             gpu_tests.append(test_case)
@@ -10,10 +10,14 @@ void AddCompilerFlags(cmdline::parser* args) {
     args->add("permissive", '\0', "Relax checks to accept more kinds of ONNX");
     args->add("skip_inference", '\0', "Skip dtype/shape inference");
     args->add("replace_constant", '\0', "Replace Constant ops");
+    args->add("skip_batch_norm_folding", '\0', "Do not fold BatchNormalization into preceding Conv/Gemm in inference");
     args->add("fuse_operations", '\0', "Fuse consecutive operations");
     args->add("use_nvrtc", '\0', "Use NVRTC");
+    args->add("use_cpu_fusion", '\0', "Run fused elementwise operations in a single loop on CPU");
     args->add("use_tvm", '\0', "Use TVM");
     args->add("reuse_tvm_code", '\0', "Reuse TVM code (unsafe)");
+    args->add("reuse_variable_slots", '\0', "Reuse XCVM variable slots for values with disjoint lifetimes");
+    args->add("use_memory_arena", '\0', "Place intermediate values in a preallocated memory arena");
     args->add("use_ngraph", '\0', "Use nGraph");
     args->add<std::string>("dump_autotvm_task_dir", '\0', "Output AutoTVM tasks in this directory", false);
     args->add<std::string>("autotvm_log", '\0', "A tuning log of AutoTVM which contains best scheduling parameters", false);
@@ -23,8 +27,15 @@ void AddCompilerFlags(cmdline::parser* args) {
     args->add("dump_after_fusion", '\0', "Dump the ONNX graph after operator fusion");
     args->add("dump_after_scheduling", '\0', "Dump the ONNX graph after scheduling");
     args->add("dump_subgraphs", '\0', "Dump the subgraph tree of the ONNX graph");
+    args->add<std::string>("disabled_passes", '\0', "Comma separated names of compiler passes to be skipped", false);
+    args->add("pass_stats_json", '\0', "Show statistics of compiler passes as JSON with --compiler_log");
+    args->add<int>("compiler_threads", '\0', "The number of threads to run compiler passes for subgraphs", false, 0);
+    args->add<std::string>("scheduler", '\0', "The scheduler of nodes (greedy, naive, or memory)", false);
+    args->add<int>("scheduler_lookahead", '\0', "The number of nodes to look ahead in the memory scheduler", false, 0);
     args->add<std::string>("computation_order", '\0', "Run the specified policy of computation order (backprop only)", false);
     args->add<int>("chen_budget", '\0', "Memory budget of Chen's policy (in MB)", 0);
+    args->add<int>("chen_memory_target", '\0', "Search the budget of Chen's policy for this peak memory (in MB)", false, 0);
+    args->add<int>("recompute_budget", '\0', "Memory budget of the recompute policy (in MB)", false, 0);
 }
 
 void ApplyCompilerFlags(const cmdline::parser& args) {
@@ -32,10 +43,14 @@ void ApplyCompilerFlags(const cmdline::parser& args) {
     g_permissive = args.exist("permissive");
     g_skip_inference = args.exist("skip_inference");
     g_replace_constant = args.exist("replace_constant");
+    g_skip_batch_norm_folding = args.exist("skip_batch_norm_folding");
     g_fuse_operations = args.exist("fuse_operations");
     g_use_nvrtc = args.exist("use_nvrtc");
+    g_use_cpu_fusion = args.exist("use_cpu_fusion");
     g_use_tvm = args.exist("use_tvm");
     g_reuse_tvm_code = args.exist("reuse_tvm_code");
+    g_reuse_variable_slots = args.exist("reuse_variable_slots");
+    g_use_memory_arena = args.exist("use_memory_arena");
     g_use_ngraph = args.exist("use_ngraph");
     g_dump_autotvm_task_dir = args.get<std::string>("dump_autotvm_task_dir");
     g_autotvm_log = args.get<std::string>("autotvm_log");
@@ -45,8 +60,15 @@ void ApplyCompilerFlags(const cmdline::parser& args) {
     g_dump_after_fusion = args.exist("dump_after_fusion");
     g_dump_after_scheduling = args.exist("dump_after_scheduling");
     g_dump_subgraphs = args.exist("dump_subgraphs");
+    g_disabled_passes = args.get<std::string>("disabled_passes");
+    g_pass_stats_json = args.exist("pass_stats_json");
+    g_compiler_threads = args.get<int>("compiler_threads");
+    g_scheduler = args.get<std::string>("scheduler");
+    g_scheduler_lookahead = args.get<int>("scheduler_lookahead");
     g_computation_order = args.get<std::string>("computation_order");
     g_chen_budget = args.get<int>("chen_budget");
+    g_chen_memory_target = args.get<int>("chen_memory_target");
+    g_recompute_budget = args.get<int>("recompute_budget");
 }
 
 }  // namespace runtime
@@ -1,10 +1,12 @@
 #include <dirent.h>
+#include <sys/stat.h>
 #include <sys/types.h>
 
 #include <algorithm>
 #include <chrono>
 #include <cstdlib>
 #include <fstream>
+#include <iterator>
 #include <map>
 #include <queue>
 #include <set>
@@ -34,11 +36,14 @@
 #include <compiler/util.h>
 #include <compiler/value.h>
 #include <compiler/xcvm/emitter.h>
+#include <compiler/xcvm/program_cache.h>
 #include <runtime/chainerx_util.h>
 #include <runtime/chrome_tracing.h>
 #include <runtime/meminfo.h>
 #include <runtime/xcvm.h>
 #include <runtime/xcvm.pb.h>
+#include <runtime/xcvm_profiler.h>
+#include <runtime/xcvm_session.h>
 #include <runtime/xcvm_var.h>
 #include <tools/cmdline.h>
 #include <tools/compiler_flags.h>
@@ -57,6 +62,24 @@ bool g_quiet;
 #define LOG() \
     if (!g_quiet) std::cerr
 
+std::string ReadFile(const std::string& filename) {
+    std::ifstream ifs(filename, std::ios::binary);
+    CHECK(ifs) << "Failed to open " << filename;
+    return std::string(std::istreambuf_iterator<char>(ifs), std::istreambuf_iterator<char>());
+}
+
+// Returns the content of the model file and stamps of its external
+// data files, which identifies the model for `ProgramCache`.
+std::string GetModelFingerprint(const std::string& onnx_path, const onnx::ModelProto& xmodel) {
+    std::string fingerprint = ReadFile(onnx_path);
+    for (const std::string& filename : GetExternalDataFiles(xmodel)) {
+        struct stat st;
+        CHECK_EQ(0, stat(filename.c_str(), &st)) << "Failed to stat " << filename;
+        fingerprint += StrCat('\n', filename, ' ', st.st_size, ' ', st.st_mtime);
+    }
+    return fingerprint;
+}
+
 std::vector<std::string> ListDir(const std::string& dirname) {
     DIR* dir = opendir(dirname.c_str());
     std::vector<std::string> filenames;
@@ -71,9 +94,6 @@ std::vector<std::string> ListDir(const std::string& dirname) {
 
 chainerx::Array MakeArrayFromONNX(const onnx::TensorProto& xtensor) {
     Tensor tensor(xtensor);
-    int64_t size = tensor.ElementSize() * tensor.NumElements();
-    std::shared_ptr<void> data(new char[size], std::default_delete<char[]>());
-    std::memcpy(data.get(), tensor.GetRawData(), size);
     chainerx::Shape shape(tensor.dims());
     chainerx::Dtype dtype;
     switch (tensor.dtype()) {
@@ -93,9 +113,7 @@ chainerx::Array MakeArrayFromONNX(const onnx::TensorProto& xtensor) {
         default:
             CHECK(false) << "Unknown data type: " << static_cast<int>(tensor.dtype());
     }
-    chainerx::Array array(chainerx::FromData(
-            shape, dtype, data, nonstd::nullopt /* strides */, 0 /* offset */, chainerx::GetNativeBackend().GetDevice(0)));
-    return array;
+    return MakeHostArray(dtype, shape, tensor.data());
 }
 
 struct TestCase {
@@ -228,26 +246,23 @@ XCVMVar* StageVar(XCVMVar* var) {
 
 class ModelRunner {
 public:
-    ModelRunner(const cmdline::parser& args, int64_t initial_free_bytes, Model* model)
+    // `model_fingerprint` is used only when --cache_dir is specified.
+    ModelRunner(const cmdline::parser& args, int64_t initial_free_bytes, Model* model, const std::string& model_fingerprint)
         : model_(model), args_(args), initial_free_bytes_(initial_free_bytes) {
-        if (args.exist("backprop_two_phase")) {
-            Model backprop_model(*model, model->graph().name() + "_backprop");
-            RunDefaultPassesBeforeGradient(model->mutable_graph());
-            GenerateGradientNodes(model->mutable_graph(), backprop_model.mutable_graph());
+        const std::string cache_dir = args.get<std::string>("cache_dir");
+        if (!cache_dir.empty()) {
+            cache_.reset(new xcvm::ProgramCache(cache_dir));
+            const std::string options = StrCat(
+                    "backprop=", args.exist("backprop"), " backprop_two_phase=", args.exist("backprop_two_phase"), " trace=", trace_level() > 0);
+            cache_key_ = xcvm::ProgramCache::GetKey(model_fingerprint, options);
+        }
 
-            LOG() << "Constructing model (forward)..." << std::endl;
-            RunDefaultPasses(model->mutable_graph());
-            CompileModel(model, &xcvm_);
-            LOG() << "Constructing model (backward)..." << std::endl;
-            RunDefaultPasses(backprop_model.mutable_graph());
-            CompileModel(&backprop_model, &xcvm_bp_, "bp");
-            for (Value* value : backprop_model.graph().input_values()) {
-                backprop_ins_.push_back(value->name());
-            }
+        const Model* params_model = model;
+        if (cache_ && LoadFromCache()) {
+            LOG() << "Loaded compiled model from " << cache_dir << std::endl;
+            params_model = cached_model_.get();
         } else {
-            LOG() << "Constructing model..." << std::endl;
-            RunDefaultPasses(model->mutable_graph(), args_.exist("backprop"));
-            CompileModel(model, &xcvm_);
+            Compile(model);
         }
 
         for (const std::string& op_name : SplitString(args_.get<std::string>("verbose_ops"), ",")) {
@@ -263,14 +278,72 @@ public:
         xcvm_opts_.dump_memory_usage = args_.exist("trace");
         xcvm_opts_.base_memory_usage = initial_free_bytes_;
         xcvm_opts_.dump_outputs_dir = args_.get<std::string>("dump_outputs_dir");
+        xcvm_opts_.num_threads = args_.get<int>("num_threads");
         if (!args_.get<std::string>("chrome_tracing").empty()) {
             xcvm_opts_.chrome_tracing = new ChromeTracingEmitter();
         }
+        if (!args_.get<std::string>("profile").empty()) {
+            xcvm_opts_.profiler = new XCVMProfiler();
+        }
 
-        params_ = LoadParams(model->graph());
+        // Training updates parameters such as running statistics of
+        // BatchNormalization in place, so they must not share memory
+        // with the initializers.
+        params_ = LoadParams(params_model->graph(), xcvm_opts_.is_training);
         param_bytes_ = initial_free_bytes - GetMemoryUsageInBytes();
     }
 
+    void Compile(Model* model) {
+        if (!g_skip_inference) model->mutable_graph()->InferShapes();
+
+        if (args_.exist("backprop_two_phase")) {
+            Model backprop_model(*model, model->graph().name() + "_backprop");
+            RunDefaultPassesBeforeGradient(model->mutable_graph());
+            GenerateGradientNodes(model->mutable_graph(), backprop_model.mutable_graph());
+
+            LOG() << "Constructing model (forward)..." << std::endl;
+            RunDefaultPasses(model->mutable_graph());
+            CompileModel(model, &xcvm_);
+            LOG() << "Constructing model (backward)..." << std::endl;
+            RunDefaultPasses(backprop_model.mutable_graph());
+            CompileModel(&backprop_model, &xcvm_bp_, "bp");
+            for (Value* value : backprop_model.graph().input_values()) {
+                backprop_ins_.push_back(value->name());
+            }
+        } else {
+            LOG() << "Constructing model..." << std::endl;
+            RunDefaultPasses(model->mutable_graph(), args_.exist("backprop"));
+            CompileModel(model, &xcvm_);
+        }
+
+        if (cache_) {
+            // Stored after the programs so an entry with the model is
+            // complete.
+            onnx::ModelProto xmodel;
+            model->ToONNX(&xmodel);
+            cache_->Store(cache_key_, "onnx", xmodel);
+        }
+    }
+
+    // Loads the compiled programs and the optimized model which has
+    // parameters for them.
+    bool LoadFromCache() {
+        onnx::ModelProto xmodel;
+        XCProgramProto xcvm_prog;
+        XCProgramProto xcvm_bp_prog;
+        if (!cache_->Load(cache_key_, "onnx", &xmodel) || !cache_->Load(cache_key_, "xcvm", &xcvm_prog)) {
+            return false;
+        }
+        if (args_.exist("backprop_two_phase")) {
+            if (!cache_->Load(cache_key_, "bp.xcvm", &xcvm_bp_prog)) return false;
+            backprop_ins_.assign(xcvm_bp_prog.input_names().begin(), xcvm_bp_prog.input_names().end());
+            xcvm_bp_.reset(new XCVM(xcvm_bp_prog));
+        }
+        cached_model_.reset(new Model(xmodel));
+        xcvm_.reset(new XCVM(xcvm_prog));
+        return true;
+    }
+
     void CompileModel(Model* model, std::unique_ptr<XCVM>* xcvm, const char* name = nullptr, bool gen_backprop = false) {
         if (args_.exist("dump_onnx")) {
             onnx::ModelProto xmodel;
@@ -308,6 +381,9 @@ public:
             CHECK(ofs) << "Failed to open output XCVM: " << out_xcvm;
             CHECK(xcvm_prog.SerializeToOstream(&ofs));
         }
+        if (cache_) {
+            cache_->Store(cache_key_, name ? StrCat(name, ".xcvm") : "xcvm", xcvm_prog);
+        }
 
         xcvm->reset(new XCVM(xcvm_prog));
     }
@@ -316,6 +392,9 @@ public:
         if (xcvm_opts_.chrome_tracing) {
             xcvm_opts_.chrome_tracing->Emit(args_.get<std::string>("chrome_tracing"));
         }
+        if (xcvm_opts_.profiler) {
+            xcvm_opts_.profiler->Emit(args_.get<std::string>("profile"));
+        }
     }
 
     InOuts Run(const InOuts& inputs) {
@@ -353,6 +432,37 @@ public:
         return outputs;
     }
 
+    // Runs the forward model in a session which keeps parameters
+    // resident. `inputs` should not contain parameters.
+    InOuts RunWithSession(const InOuts& inputs) {
+        CHECK(!xcvm_bp_.get()) << "Sessions do not support --backprop_two_phase";
+        if (!session_) {
+            std::vector<std::string> input_names;
+            for (const auto& p : inputs) input_names.push_back(p.first);
+            session_.reset(new XCVMSession(xcvm_.get(), input_names, xcvm_opts_));
+            for (const auto& p : params_) session_->SetParam(p.first, p.second);
+        }
+
+        if (trace_level()) std::cerr << "Running XCVM session..." << std::endl;
+        std::vector<std::shared_ptr<XCVMVar>> input_vars;
+        for (const std::string& name : session_->input_names()) {
+            auto found = inputs.find(name);
+            CHECK(found != inputs.end()) << "Input not found: " << name;
+            input_vars.push_back(found->second);
+        }
+        std::vector<std::shared_ptr<XCVMVar>> output_vars = session_->Run(input_vars);
+        MaybeShowGPUMemory();
+
+        // Turn off type check from the next run.
+        session_->mutable_options()->check_types = false;
+
+        InOuts outputs;
+        for (size_t i = 0; i < output_vars.size(); ++i) {
+            CHECK(outputs.emplace(session_->output_names()[i], output_vars[i]).second);
+        }
+        return outputs;
+    }
+
     const InOuts& params() const {
         return params_;
     }
@@ -382,19 +492,28 @@ private:
 
     std::unique_ptr<XCVM> xcvm_bp_;
     std::vector<std::string> backprop_ins_;
+
+    std::unique_ptr<XCVMSession> session_;
+
+    std::unique_ptr<xcvm::ProgramCache> cache_;
+    std::string cache_key_;
+    std::unique_ptr<Model> cached_model_;
 };
 
 void RunMain(const std::vector<std::string>& argv) {
     cmdline::parser args;
     args.add<std::string>("chrome_tracing", '\0', "Output chrome tracing profile", false);
+    args.add<std::string>("profile", '\0', "Output aggregated profile of XCVM ops (JSON if it ends with .json)", false);
     args.add<std::string>("backend", '\0', "The name of the backend", false, "xcvm");
     args.add<std::string>("test", '\0', "ONNX's backend test directory", false);
     args.add<std::string>("onnx", '\0', "ONNX model", false);
     args.add<std::string>("device", 'd', "ChainerX device to be used", false);
     args.add<std::string>("out_onnx", '\0', "Output ONNX model after optimization", false);
     args.add<std::string>("out_xcvm", '\0', "Output XCVM program", false);
+    args.add<std::string>("cache_dir", '\0', "Cache compiled programs in this directory", false);
     args.add<std::string>("dump_outputs_dir", '\0', "Dump each output of XCVM ops to this directory", false);
     args.add<int>("iterations", 'I', "The number of iteartions", false, 1);
+    args.add<int>("num_threads", '\0', "The number of threads to run independent XCVM ops", false, 0);
     args.add<double>("rtol", '\0', "rtol of AllClose", false, 1e-4);
     args.add<double>("atol", '\0', "atol of AllClose", false, 1e-6);
     args.add("check_nans", '\0', "Check for NaNs after each operation");
@@ -406,6 +525,7 @@ void RunMain(const std::vector<std::string>& argv) {
     args.add("backprop_two_phase", '\0', "Backprop using different graphs for forward and backward");
     args.add("skip_shape_inference", '\0', "Skip shape inference");
     args.add("trace", 't', "Tracing mode");
+    args.add("use_session", '\0', "Run the model in a session which keeps parameters resident");
     args.add("verbose", 'v', "Verbose mode");
     args.add<std::string>("verbose_ops", '\0', "Show verbose outputs for specific ops", false);
     args.add("quiet", 'q', "Quiet mode");
@@ -445,9 +565,11 @@ void RunMain(const std::vector<std::string>& argv) {
 
     LOG() << "Loading model..." << std::endl;
     RegisterCustomOnnxOperatorSetSchema();
-    onnx::ModelProto xmodel(LoadLargeProto<onnx::ModelProto>(onnx_path));
+    onnx::ModelProto xmodel(LoadONNXModel(onnx_path));
     Model model(xmodel);
-    if (!g_skip_inference) model.mutable_graph()->InferShapes();
+    const std::string model_fingerprint = args.get<std::string>("cache_dir").empty() ? "" : GetModelFingerprint(onnx_path, xmodel);
+    // Initializers were copied to (or share external data with) `model`.
+    xmodel.mutable_graph()->clear_initializer();
 
     LOG() << "Loading data..." << std::endl;
 
@@ -488,7 +610,7 @@ void RunMain(const std::vector<std::string>& argv) {
         test_cases.swap(new_test_cases);
     }
 
-    ModelRunner model_runner(args, initial_free_bytes, &model);
+    ModelRunner model_runner(args, initial_free_bytes, &model, model_fingerprint);
 
     if (args.exist("compile_only")) return;
 
@@ -496,14 +618,16 @@ void RunMain(const std::vector<std::string>& argv) {
     int test_cnt = 0;
     for (const std::unique_ptr<TestCase>& test_case : test_cases) {
         LOG() << "Running for " << test_case->name << std::endl;
-        InOuts inputs(model_runner.params());
+        const bool use_session = args.exist("use_session");
+        InOuts inputs;
+        if (!use_session) inputs = model_runner.params();
         for (const auto& p : test_case->inputs) {
             XCVMVar* v = StageVar(p.second.get());
             CHECK(inputs.emplace(p.first, std::shared_ptr<XCVMVar>(v)).second) << "Duplicated input parameter: " << p.first;
         }
 
         std::chrono::system_clock::time_point start = std::chrono::system_clock::now();
-        InOuts outputs(model_runner.Run(inputs));
+        InOuts outputs(use_session ? model_runner.RunWithSession(inputs) : model_runner.Run(inputs));
 
         if (test_case->outputs.empty()) {
             if (outputs.size() == 1 && outputs.begin()->second->kind() == XCVMVar::Kind::kSequence) {
@@ -12,7 +12,6 @@
 #include <chainerx/routines/manipulation.h>
 
 #include <common/log.h>
-#include <common/protoutil.h>
 #include <common/strutil.h>
 #include <compiler/custom_onnx_ops.h>
 #include <compiler/flags.h>
@@ -28,6 +27,7 @@
 #include <runtime/chrome_tracing.h>
 #include <runtime/meminfo.h>
 #include <runtime/xcvm.h>
+#include <runtime/xcvm_profiler.h>
 #include <runtime/xcvm_var.h>
 #include <tools/cmdline.h>
 #include <tools/compiler_flags.h>
@@ -57,6 +57,8 @@ void RunMain(const std::vector<std::string>& argv) {
     args.add<std::string>("device", 'd', "ChainerX device to be used", false);
     args.add<std::string>("chrome_tracing", '\0', "Output chrome tracing profile", false);
     args.add<int>("chrome_tracing_frequency", '\0', "Output chrome tracing every this itearation", false, 100);
+    args.add<std::string>("profile", '\0', "Output aggregated profile of XCVM ops (JSON if it ends with .json)", false);
+    args.add<int>("profile_frequency", '\0', "Output the aggregated profile every this iteration", false, 1000);
     args.add<int>("iterations", 'I', "Number of iterations to train", false, 100);
     args.add("check_nans", '\0', "Check for NaNs after each operation");
     args.add("check_infs", '\0', "Check for infinities after each operation");
@@ -95,7 +97,7 @@ void RunMain(const std::vector<std::string>& argv) {
 
     LOG() << "Constructing model..." << std::endl;
     RegisterCustomOnnxOperatorSetSchema();
-    onnx::ModelProto xmodel(LoadLargeProto<onnx::ModelProto>(args.rest()[0]));
+    onnx::ModelProto xmodel(LoadONNXModel(args.rest()[0]));
     Model model(xmodel);
     if (!g_skip_inference) model.mutable_graph()->InferShapes();
     const bool expects_onehot = ExpectsOnehot(model);
@@ -112,7 +114,8 @@ void RunMain(const std::vector<std::string>& argv) {
 
     LOG() << "Loading data..." << std::endl;
 
-    InOuts params(LoadParams(model.graph()));
+    // Parameters are updated in place.
+    InOuts params(LoadParams(model.graph(), true /* copy */));
 
     chainerx::Array batch_size_array = MakeScalarArray(static_cast<float>(batch_size)).ToDevice(chainerx::GetDefaultDevice());
 
@@ -145,6 +148,12 @@ void RunMain(const std::vector<std::string>& argv) {
     xcvm_opts.check_infs = args.exist("check_infs");
     xcvm_opts.dump_memory_usage = args.exist("trace");
     xcvm_opts.base_memory_usage = initial_free_bytes;
+    const std::string profile = args.get<std::string>("profile");
+    std::unique_ptr<XCVMProfiler> profiler;
+    if (!profile.empty()) {
+        profiler.reset(new XCVMProfiler());
+        xcvm_opts.profiler = profiler.get();
+    }
 
     int64_t param_bytes = initial_free_bytes - GetMemoryUsageInBytes();
 
@@ -241,6 +250,15 @@ void RunMain(const std::vector<std::string>& argv) {
             delete xcvm_opts.chrome_tracing;
             xcvm_opts.chrome_tracing = nullptr;
         }
+
+        const int profile_frequency = args.get<int>("profile_frequency");
+        if (profiler && profile_frequency > 0 && (iter_count + 1) % profile_frequency == 0) {
+            profiler->Emit(profile);
+        }
+    }
+
+    if (profiler) {
+        profiler->Emit(profile);
     }
 
     train_iter.Terminate();
@@ -1,6 +1,9 @@
 #include "tools/util.h"
 
 #include <algorithm>
+#include <cstdlib>
+#include <cstring>
+#include <memory>
 
 #include <chainerx/array.h>
 #include <chainerx/dtype.h>
@@ -43,14 +46,20 @@ chainerx::Dtype ChainerXTypeFromONNX(int xtype) {
     }
 }
 
-InOuts LoadParams(const Graph& graph) {
+InOuts LoadParams(const Graph& graph, bool copy) {
     InOuts params;
     for (const Value* input : graph.input_values()) {
         if (input->users().empty()) continue;
         if (const Tensor* initializer = input->initializer()) {
             chainerx::Dtype dtype = ChainerXTypeFromONNX(initializer->dtype().ToONNX());
             chainerx::Shape shape(initializer->dims());
-            const void* data = initializer->GetRawData();
+            std::shared_ptr<void> data = initializer->data();
+            if (copy) {
+                const size_t nbytes = shape.GetTotalSize() * chainerx::GetItemSize(dtype);
+                std::shared_ptr<void> copied(std::malloc(nbytes), &std::free);
+                std::memcpy(copied.get(), data.get(), nbytes);
+                data = copied;
+            }
             chainerx::Array tensor;
             // If the input is used only by Reshape as a shape, place
             // it on host memory.
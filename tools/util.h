@@ -15,7 +15,10 @@ namespace runtime {
 
 chainerx::Dtype ChainerXTypeFromONNX(int xtype);
 
-InOuts LoadParams(const Graph& graph);
+// Arrays on native devices share the data of initializers, which may
+// be read-only memory mapped files, unless `copy` is true. Pass true
+// when the parameters are updated in place, e.g., in training.
+InOuts LoadParams(const Graph& graph, bool copy = false);
 
 // Returns Mis-match Count
 int MismatchInAllClose(const chainerx::Array& a, const chainerx::Array& b, double rtol, double atol, bool equal_nan = false);